@@ -0,0 +1,319 @@
+"""
+Headless batch analysis: run the swim analyzer over a folder (or glob) of
+videos without Streamlit.
+
+    python batch_analyze.py clips/ --out results/ --workers 4 --height 182 --discipline pool
+    python batch_analyze.py "session_*/**/*.mp4" --view side-underwater
+
+Each video gets its own folder of artifacts (PDF report, per-frame CSV,
+summary JSON, fatigue / split CSVs) named after the file and its content
+hash. A video whose content and settings match a finished run is skipped,
+so re-running over the same folder only analyzes new clips. index.csv in
+the output folder lists every analyzed video.
+
+With --history and --athlete, every analyzed video is also recorded in the
+session history read by the dashboard's Progress page (dated by the file's
+modification time, artifacts pointing at its output folder).
+
+With --tracks, the raw pose landmarks of every video are kept as a compact
+landmark track file (landmarks.track, see swim_analysis.tracks).
+"""
+import argparse
+import concurrent.futures
+import datetime
+import glob
+import hashlib
+import json
+import logging
+import os
+import sys
+from dataclasses import fields
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import pandas as pd
+
+from swim_analysis import (
+    AthleteProfile, CameraView, DEFAULT_CONF_THRESHOLD, DEFAULT_YAW_THRESHOLD, MEDIAPIPE_TASKS_AVAILABLE,
+    SessionHistory, SwimAnalyzer, WaterPosition, analyze_video, export_to_csv, generate_pdf_report, generate_plots,
+    render_annotated_video,
+)
+
+logger = logging.getLogger("batch_analyze")
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".m4v")
+HASH_CHUNK_BYTES = 1 << 20
+MANIFEST_NAME = "manifest.json"
+INDEX_NAME = "index.csv"
+TRACK_NAME = "landmarks.track"
+
+VIEW_CHOICES = {
+    "side-underwater": (CameraView.SIDE, WaterPosition.UNDERWATER),
+    "side-above": (CameraView.SIDE, WaterPosition.ABOVE_WATER),
+    "front-underwater": (CameraView.FRONT, WaterPosition.UNDERWATER),
+    "front-above": (CameraView.FRONT, WaterPosition.ABOVE_WATER),
+}
+
+INDEX_COLUMNS = [
+    "file", "sha256", "status", "artifacts", "analyzed_at", "duration_s", "avg_score", "stroke_rate",
+    "total_strokes", "breaths_per_min", "avg_evf_angle", "dropped_elbow_pct", "glide_ratio",
+    "avg_vertical_drop", "error",
+]
+
+# ─────────────────────────────────────────────
+# INPUT DISCOVERY
+# ─────────────────────────────────────────────
+
+def discover_videos(inputs: List[str], recursive: bool = False) -> List[str]:
+    """Video files named by directories, globs or paths (deduplicated, sorted)"""
+    found = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(item, "**", "*") if recursive else os.path.join(item, "*")
+            candidates = glob.glob(pattern, recursive=recursive)
+        else:
+            candidates = glob.glob(item, recursive=True) or [item]
+        for path in candidates:
+            if os.path.isfile(path) and path.lower().endswith(VIDEO_EXTENSIONS):
+                found.add(os.path.realpath(path))
+    return sorted(found)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def artifact_dir(out_dir: str, path: str, sha: str) -> str:
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(out_dir, f"{stem}_{sha[:12]}")
+
+
+def list_artifact_dirs(out_dir: str) -> List[str]:
+    return sorted(entry.path for entry in os.scandir(out_dir) if entry.is_dir())
+
+
+def read_manifest(folder: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(folder, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+# ─────────────────────────────────────────────
+# WORKER
+# ─────────────────────────────────────────────
+
+def _init_worker() -> None:
+    # One video per process: keep OpenCV from spawning a thread pool per worker
+    cv2.setNumThreads(1)
+
+
+def summary_to_dict(summary) -> Dict:
+    """JSON-serializable scalar fields and diagnostics of a SessionSummary"""
+    out = {}
+    for f in fields(summary):
+        value = getattr(summary, f.name)
+        if isinstance(value, (int, float, str, bool)):
+            out[f.name] = value
+    out["diagnostics"] = list(summary.diagnostics)
+    if summary.video_context is not None:
+        out["camera_view"] = summary.video_context.camera_view.value
+        out["water_position"] = summary.video_context.water_position.value
+    return out
+
+
+def analyze_one(path: str, sha: str, folder: str, settings: Dict,
+                history: Optional[Tuple[str, str]] = None) -> Dict:
+    """
+    Analyze one video and write its artifacts into folder (runs in a worker process).
+    history = (history folder, athlete name) also records it in the session history.
+
+    Returns:
+        - the video's index row
+    """
+    os.makedirs(folder, exist_ok=True)
+    view = VIEW_CHOICES.get(settings["view"]) if settings["view"] else None
+    analyzer = SwimAnalyzer(AthleteProfile(settings["height_cm"], settings["discipline"]),
+                            settings["conf_thresh"], settings["yaw_thresh"],
+                            manual_camera_view=view[0] if view else None,
+                            manual_water_position=view[1] if view else None,
+                            use_heavy_model=settings["heavy_model"],
+                            smoothing=settings["smoothing"],
+                            render_overlays=False)
+    try:
+        track_path = os.path.join(folder, TRACK_NAME) if settings.get("tracks") else None
+        if analyze_video(path, analyzer, track_path=track_path) == 0:
+            raise RuntimeError("cannot read video")
+        analyzer.close()
+
+        summary = analyzer.get_summary()
+        name = os.path.basename(path)
+        with open(os.path.join(folder, "report.pdf"), "wb") as f:
+            f.write(generate_pdf_report(summary, name, generate_plots(analyzer)).getvalue())
+        with open(os.path.join(folder, "metrics.csv"), "wb") as f:
+            f.write(export_to_csv(analyzer).getvalue())
+        if summary.fatigue is not None:
+            with open(os.path.join(folder, "fatigue_windows.csv"), "wb") as f:
+                f.write(summary.fatigue.to_csv().getvalue())
+        if summary.pool_segmentation is not None:
+            summary.pool_segmentation.splits_dataframe().to_csv(os.path.join(folder, "splits.csv"), index=False)
+        if settings["video"]:
+            with open(os.path.join(folder, "annotated.mp4"), "wb") as f:
+                f.write(render_annotated_video(path, analyzer))
+        with open(os.path.join(folder, "summary.json"), "w") as f:
+            json.dump(summary_to_dict(summary), f, indent=2)
+        if history is not None:
+            history_dir, athlete = history
+            SessionHistory(history_dir).save_session(
+                athlete, summary, os.path.basename(path),
+                recorded_at=datetime.datetime.fromtimestamp(os.path.getmtime(path)), video_sha256=sha,
+                discipline=settings["discipline"], height_cm=settings["height_cm"],
+                artifact_dir=os.path.abspath(folder), settings=settings)
+    finally:
+        analyzer.release_metrics()
+
+    row = {
+        "file": path, "sha256": sha, "status": "ok", "artifacts": folder,
+        "analyzed_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "duration_s": round(summary.duration_s, 2), "avg_score": round(summary.avg_score, 1),
+        "stroke_rate": round(summary.stroke_rate, 1), "total_strokes": summary.total_strokes,
+        "breaths_per_min": round(summary.breaths_per_min, 1), "avg_evf_angle": round(summary.avg_evf_angle, 1),
+        "dropped_elbow_pct": round(summary.dropped_elbow_pct, 1), "glide_ratio": round(summary.glide_ratio, 1),
+        "avg_vertical_drop": round(summary.avg_vertical_drop, 1), "error": "",
+    }
+    # Written last: its presence marks the run as complete
+    with open(os.path.join(folder, MANIFEST_NAME), "w") as f:
+        json.dump({"settings": settings, "row": row}, f, indent=2)
+    return row
+
+# ─────────────────────────────────────────────
+# INDEX
+# ─────────────────────────────────────────────
+
+def write_index(out_dir: str, rows: List[Dict]) -> str:
+    """Combined index of every finished video in out_dir plus this run's failures"""
+    by_sha = {}
+    for folder in list_artifact_dirs(out_dir):
+        manifest = read_manifest(folder)
+        if manifest:
+            by_sha[manifest["row"]["sha256"]] = manifest["row"]
+    for row in rows:
+        if row["status"] != "ok":
+            by_sha[row["sha256"]] = row         # This run's failure outranks an older result
+    index_path = os.path.join(out_dir, INDEX_NAME)
+    pd.DataFrame(list(by_sha.values()), columns=INDEX_COLUMNS).to_csv(index_path, index=False)
+    return index_path
+
+
+def run_batch(videos: List[str], out_dir: str, settings: Dict, workers: int, force: bool = False,
+              history: Optional[Tuple[str, str]] = None) -> List[Dict]:
+    """Analyze every video not already done with the same settings; returns this run's index rows"""
+    os.makedirs(out_dir, exist_ok=True)
+    done = {}                                   # sha256 -> (folder, manifest)
+    for folder in list_artifact_dirs(out_dir):
+        manifest = read_manifest(folder)
+        if manifest:
+            done[manifest["row"]["sha256"]] = (folder, manifest)
+    pending = {}
+    for path in videos:
+        sha = file_sha256(path)
+        done_folder, manifest = done.get(sha, (None, None))
+        if sha in pending:
+            logger.info("skip %s (same content as %s)", path, pending[sha][0])
+        elif manifest and manifest["settings"] == settings and not force:
+            logger.info("skip %s (already analyzed as %s)", path, manifest["row"]["file"])
+        else:
+            if manifest:
+                # Re-analysis: until it finishes, the folder must not look done with the old settings
+                os.remove(os.path.join(done_folder, MANIFEST_NAME))
+            pending[sha] = (path, manifest["row"]["artifacts"] if manifest else artifact_dir(out_dir, path, sha))
+
+    rows = []
+    if not pending:
+        return rows
+    logger.info("analyzing %d video(s) with %d worker(s)", len(pending), workers)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {pool.submit(analyze_one, path, sha, folder, settings, history): (path, sha, folder)
+                   for sha, (path, folder) in pending.items()}
+        for n, future in enumerate(concurrent.futures.as_completed(futures), start=1):
+            path, sha, folder = futures[future]
+            try:
+                row = future.result()
+                logger.info("[%d/%d] %s: score %.0f, %d strokes", n, len(futures), os.path.basename(path),
+                            row["avg_score"], row["total_strokes"])
+            except Exception as e:
+                logger.error("[%d/%d] %s failed: %s", n, len(futures), os.path.basename(path), e)
+                row = dict.fromkeys(INDEX_COLUMNS, "")
+                row.update(file=path, sha256=sha, status="failed", artifacts=folder, error=str(e),
+                           analyzed_at=datetime.datetime.now().isoformat(timespec="seconds"))
+            rows.append(row)
+    return rows
+
+# ─────────────────────────────────────────────
+# CLI
+# ─────────────────────────────────────────────
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Analyze a folder of swim videos without the dashboard.")
+    parser.add_argument("inputs", nargs="+", help="video files, directories or glob patterns")
+    parser.add_argument("--out", default="batch_results", help="output folder (default: batch_results)")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="videos analyzed in parallel (default: half the CPU cores)")
+    parser.add_argument("--recursive", action="store_true", help="search directories recursively")
+    parser.add_argument("--height", type=int, default=170, help="athlete height in cm")
+    parser.add_argument("--discipline", choices=["pool", "triathlon", "open water"], default="pool")
+    parser.add_argument("--view", choices=sorted(VIEW_CHOICES), default=None,
+                        help="camera view (default: detect automatically)")
+    parser.add_argument("--conf", type=float, default=DEFAULT_CONF_THRESHOLD, help="pose confidence threshold")
+    parser.add_argument("--yaw", type=float, default=DEFAULT_YAW_THRESHOLD, help="breath detection sensitivity")
+    parser.add_argument("--smoothing", choices=["mean", "one_euro"], default="mean")
+    parser.add_argument("--heavy-model", action="store_true", help="use the heavy pose model")
+    parser.add_argument("--video", action="store_true", help="also render an annotated MP4 per video")
+    parser.add_argument("--tracks", action="store_true", help="also keep each video's pose landmarks as a track file")
+    parser.add_argument("--force", action="store_true", help="re-analyze videos that are already done")
+    parser.add_argument("--history", metavar="DIR", help="also record sessions in this session-history folder")
+    parser.add_argument("--athlete", help="athlete the sessions belong to (required with --history)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s", datefmt="%H:%M:%S")
+    args = parse_args(argv)
+    if args.history and not (args.athlete or "").strip():
+        logger.error("--history needs --athlete")
+        return 2
+    if not MEDIAPIPE_TASKS_AVAILABLE:
+        logger.error("MediaPipe Tasks not installed. Run: pip install mediapipe>=0.10.14")
+        return 2
+
+    videos = discover_videos(args.inputs, args.recursive)
+    if not videos:
+        logger.error("no videos found in %s", " ".join(args.inputs))
+        return 2
+
+    settings = {
+        "height_cm": args.height, "discipline": args.discipline, "view": args.view,
+        "conf_thresh": args.conf, "yaw_thresh": args.yaw, "smoothing": args.smoothing,
+        "heavy_model": args.heavy_model, "video": args.video,
+    }
+    if args.tracks:
+        settings["tracks"] = True   # Only when set, so runs from before --tracks still count as done
+    # Download the pose model once, before workers race for it
+    SwimAnalyzer(AthleteProfile(args.height, args.discipline), args.conf, args.yaw,
+                 use_heavy_model=args.heavy_model, render_overlays=False).close()
+
+    history = (args.history, args.athlete) if args.history else None
+    rows = run_batch(videos, args.out, settings, max(1, args.workers), args.force, history)
+    index_path = write_index(args.out, rows)
+    failed = sum(1 for row in rows if row["status"] != "ok")
+    logger.info("done: %d analyzed, %d failed, %d skipped - index: %s",
+                len(rows) - failed, failed, len(videos) - len(rows), index_path)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,25 +3,24 @@ import streamlit.components.v1 as components
 import cv2
 import numpy as np
 import math
-import statistics
-from enum import Enum
-from dataclasses import dataclass, field
-from typing import List, Optional, Dict, Tuple
+from typing import Optional, Dict
 import tempfile
 import os
 import datetime
+import hashlib
+import json
+import time
+import uuid
 import pandas as pd
-import matplotlib.pyplot as plt
-from collections import deque
-import io
-import zipfile
-import urllib.request
-
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak, Image as RLImage
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.units import inch
+
+# Analysis engine (no Streamlit inside - shared with batch_analyze.py)
+from swim_analysis import (
+    AthleteProfile, CameraView, DEFAULT_CONF_THRESHOLD, DEFAULT_YAW_THRESHOLD, FATIGUE_METRICS,
+    JOB_CANCELLED, JOB_DONE, JOB_FAILED, JOB_POLL_INTERVAL_S, JOB_QUEUED, JobQueue, SessionHistory,
+    LiveSummary, MEDIAPIPE_TASKS_AVAILABLE, ProgressReporter, SwimAnalyzer, WaterPosition,
+    analyze_video, build_analysis_results, build_overlay_track, build_results_zip, encode_web_mp4, export_to_csv,
+    extract_key_frames, generate_pdf_report, generate_plots, probe_video, render_annotated_video,
+)
 
 STRIPE_PAYMENT_LINK = "https://buy.stripe.com/test_8x2eVdaBSe7mf2JaIEao800"  # From your app.py
 
@@ -46,19 +45,6 @@ try:
 except ImportError:
     STRIPE_AVAILABLE = False
 
-# ─────────────────────────────────────────────
-# MEDIAPIPE TASKS API
-# ─────────────────────────────────────────────
-
-try:
-    import mediapipe as mp
-    from mediapipe.tasks import python
-    from mediapipe.tasks.python import vision
-    MEDIAPIPE_TASKS_AVAILABLE = True
-except ImportError:
-    MEDIAPIPE_TASKS_AVAILABLE = False
-    st.error("MediaPipe Tasks not installed → pip install mediapipe>=0.10.0")
-
 # ─────────────────────────────────────────────
 # CUSTOM CSS - Enhanced for new UI
 # ─────────────────────────────────────────────
@@ -534,2342 +520,484 @@ def render_swim_metrics_component(metrics: dict, height: int = 420):
     components.html(html, height=height, scrolling=False)
 
 # ─────────────────────────────────────────────
-# CONSTANTS & DEFAULTS - Updated thresholds
+# OVERLAY PLAYER COMPONENT - Browser-side annotation
 # ─────────────────────────────────────────────
 
-DEFAULT_CONF_THRESHOLD = 0.5
-DEFAULT_YAW_THRESHOLD = 0.15
-MIN_BREATH_GAP_S = 1.0
-MIN_BREATH_HOLD_FRAMES = 4
-
-# Alignment thresholds
-DEFAULT_HORIZONTAL_DEV_GOOD = (0, 8)   # degrees - shoulder-hip-ankle alignment
-DEFAULT_HORIZONTAL_DEV_OK = (0, 15)
-
-# Torso lean thresholds
-DEFAULT_TORSO_GOOD = (4, 12)
-DEFAULT_TORSO_OK   = (0, 18)
-
-# EVF thresholds - now based on plane angle
-DEFAULT_EVF_ANGLE_GOOD = (0, 25)   # degrees from vertical plane
-DEFAULT_EVF_ANGLE_OK = (0, 40)
-
-# Legacy forearm thresholds (for display compatibility)
-DEFAULT_FOREARM_GOOD = (0, 35)
-DEFAULT_FOREARM_OK   = (0, 60)
+OVERLAY_PLAYER_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+<style>
+    body { margin: 0; background: transparent; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; color: #cbd5e1; }
+    .stage { position: relative; width: 100%; background: #000; border-radius: 12px; overflow: hidden; }
+    .stage video { display: block; width: 100%; }
+    .stage canvas { position: absolute; left: 0; top: 0; width: 100%; height: 100%; pointer-events: none; }
+    .toggles { display: flex; gap: 16px; flex-wrap: wrap; padding: 8px 4px; font-size: 13px; }
+    .toggles label { cursor: pointer; }
+    .error { display: none; padding: 12px; color: #eab308; font-size: 13px; }
+</style>
+</head>
+<body>
+    <div class="stage">
+        <video id="video" controls playsinline></video>
+        <canvas id="overlay"></canvas>
+    </div>
+    <div class="toggles">
+        <label><input type="checkbox" id="t-skeleton" checked> Skeleton</label>
+        <label><input type="checkbox" id="t-alignment" checked> Alignment line</label>
+        <label><input type="checkbox" id="t-evf" checked> EVF indicator</label>
+        <label><input type="checkbox" id="t-panel" checked> Metrics panel</label>
+    </div>
+    <div class="error" id="error">⚠️ Your browser cannot play this video format. Use "Render Annotated Video" to get an MP4 with burned-in overlays.</div>
+<script>
+const TRACK = __TRACK__;
+
+const video = document.getElementById('video');
+const canvas = document.getElementById('overlay');
+const ctx = canvas.getContext('2d');
+
+// Streamed from Streamlit's media endpoint (range requests), not inlined into the component
+video.src = __VIDEO_URL__;
+video.addEventListener('error', () => { document.getElementById('error').style.display = 'block'; });
+
+// Dense frame -> row lookup (frames without a valid pose map to -1)
+const rowOfFrame = new Int32Array(TRACK.n_frames).fill(-1);
+TRACK.frame_idx.forEach((f, row) => { if (f < rowOfFrame.length) rowOfFrame[f] = row; });
+
+const LM = TRACK.landmark_index;
+const show = name => document.getElementById('t-' + name).checked;
+
+function zoneColor(val, good, ok) {
+    if (good[0] <= val && val <= good[1]) return '#22c55e';
+    if (ok[0] <= val && val <= ok[1]) return '#eab308';
+    return '#ef4444';
+}
+
+function point(row, name) {
+    const k = (row * TRACK.n_landmarks + LM[name]) * 2;
+    let x = TRACK.landmarks[k] / TRACK.scale, y = TRACK.landmarks[k + 1] / TRACK.scale;
+    // Landmarks of flipped frames are in flipped coordinates; the player shows the original
+    if (TRACK.is_inverted[row]) { x = 1 - x; y = 1 - y; }
+    return [x * canvas.width, y * canvas.height];
+}
+
+function mid(row, a, b) {
+    const p = point(row, a), q = point(row, b);
+    return [(p[0] + q[0]) / 2, (p[1] + q[1]) / 2];
+}
+
+function line(p, q, color, width) {
+    ctx.strokeStyle = color; ctx.lineWidth = width;
+    ctx.beginPath(); ctx.moveTo(p[0], p[1]); ctx.lineTo(q[0], q[1]); ctx.stroke();
+}
+
+function drawSkeleton(row) {
+    TRACK.connections.forEach(([a, b]) => line(point(row, a), point(row, b), 'rgba(0,255,128,0.8)', 2));
+    ctx.fillStyle = '#80ff00';
+    Object.keys(LM).forEach(name => {
+        const p = point(row, name);
+        ctx.beginPath(); ctx.arc(p[0], p[1], 3, 0, 2 * Math.PI); ctx.fill();
+    });
+}
+
+function drawAlignment(row) {
+    const color = zoneColor(TRACK.horizontal_deviation[row], TRACK.limits.horizontal_dev_good, TRACK.limits.horizontal_dev_ok);
+    const s = mid(row, 'left_shoulder', 'right_shoulder'), h = mid(row, 'left_hip', 'right_hip'), a = mid(row, 'left_ankle', 'right_ankle');
+    line(s, h, color, 3); line(h, a, color, 3);
+}
+
+function drawEvf(row, phase) {
+    if (phase !== 'Pull' && phase !== 'Push') return;
+    // Pulling arm = lower wrist
+    const side = point(row, 'left_wrist')[1] > point(row, 'right_wrist')[1] ? 'left' : 'right';
+    const elbow = point(row, side + '_elbow'), wrist = point(row, side + '_wrist');
+    line(elbow, wrist, zoneColor(TRACK.evf_plane_angle[row], TRACK.limits.evf_good, TRACK.limits.evf_ok), 4);
+    line(elbow, [elbow[0], elbow[1] + 80], 'rgb(100,100,100)', 2);
+}
+
+function drawPanel(row, phase) {
+    const L = TRACK.limits;
+    const hd = TRACK.horizontal_deviation[row], evf = TRACK.evf_plane_angle[row], torso = TRACK.torso_lean[row];
+    const roll = TRACK.body_roll[row], kd = TRACK.kick_depth[row], ks = TRACK.kick_symmetry[row], score = TRACK.score[row];
+    const breath = TRACK.breath_state[row], breathPull = TRACK.breathing_during_pull[row];
+    const lines = [
+        [`Alignment: ${hd.toFixed(1)}°`, zoneColor(hd, L.horizontal_dev_good, L.horizontal_dev_ok)],
+        (phase === 'Pull' || phase === 'Push')
+            ? [`EVF Angle: ${evf.toFixed(1)}°`, zoneColor(evf, L.evf_good, L.evf_ok)]
+            : ['EVF: n/a (Recovery)', '#808080'],
+        [`Torso Lean: ${torso.toFixed(1)}°`, zoneColor(Math.abs(torso), L.torso_good, L.torso_ok)],
+        [`Body Roll: ${roll.toFixed(1)}°`, zoneColor(roll, L.roll_good, L.roll_ok)],
+        [`Kick Depth: ${kd.toFixed(2)}`, zoneColor(kd, L.kick_depth_good, L.kick_depth_ok)],
+        [`Kick Sym: ${ks.toFixed(1)}°`, zoneColor(ks, L.kick_sym_good, L.kick_sym_ok)],
+        [`Phase: ${phase}`, TRACK.phase_colors[phase] || '#c8c8c8'],
+        breath === '-' ? ['Breath: Neutral', '#b4b4b4']
+            : breathPull ? [`⚠ BREATH DURING PULL (${breath})`, '#ef4444']
+            : [`Breath: ${breath === 'L' ? 'Left' : 'Right'}`, breath === 'L' ? '#00a5ff' : '#ffbf00'],
+        [`Score: ${score.toFixed(0)}/100`, score >= 70 ? '#22c55e' : score >= 50 ? '#eab308' : '#ef4444'],
+    ];
+    const unit = canvas.width / 1280, pad = 10 * unit, lh = 26 * unit;
+    const pw = 250 * unit, ph = pad * 2 + lh * (lines.length + 1);
+    const px = canvas.width - pw - pad, py = pad;
+    ctx.fillStyle = 'rgba(0,0,0,0.65)';
+    ctx.fillRect(px, py, pw, ph);
+    ctx.font = `bold ${16 * unit}px sans-serif`;
+    ctx.fillStyle = '#ffffff';
+    ctx.fillText('YOUR STROKE', px + pad, py + pad + lh * 0.7);
+    ctx.font = `${14 * unit}px sans-serif`;
+    lines.forEach(([text, color], i) => {
+        ctx.fillStyle = color;
+        ctx.fillText(text, px + pad, py + pad + lh * (i + 1.7));
+    });
+}
+
+function draw() {
+    ctx.clearRect(0, 0, canvas.width, canvas.height);
+    const frame = Math.round(video.currentTime * TRACK.fps);
+    const row = frame < rowOfFrame.length ? rowOfFrame[frame] : -1;
+    if (row < 0) return;
+    const phase = TRACK.phase_names[TRACK.phase[row]];
+    if (show('skeleton')) drawSkeleton(row);
+    if (show('alignment')) drawAlignment(row);
+    if (show('evf')) drawEvf(row, phase);
+    if (show('panel')) drawPanel(row, phase);
+}
+
+function resize() {
+    canvas.width = video.videoWidth || video.clientWidth;
+    canvas.height = video.videoHeight || video.clientHeight;
+    draw();
+}
+
+// Redraw on every presented frame when supported, else on animation frames
+function loop() {
+    draw();
+    if ('requestVideoFrameCallback' in video) video.requestVideoFrameCallback(loop);
+    else requestAnimationFrame(loop);
+}
+
+video.addEventListener('loadedmetadata', resize);
+video.addEventListener('seeked', draw);
+document.querySelectorAll('.toggles input').forEach(el => el.addEventListener('change', draw));
+loop();
+</script>
+</body>
+</html>
+"""
 
-# Roll thresholds
-DEFAULT_ROLL_GOOD = (35, 55)
-DEFAULT_ROLL_OK   = (25, 65)
+def get_overlay_player_html(video_url: str, track: dict) -> str:
+    """Generate the overlay player HTML: the per-frame track is inlined, the video loaded by URL"""
+    return (OVERLAY_PLAYER_TEMPLATE
+            .replace("__TRACK__", json.dumps(track, separators=(',', ':')))
+            .replace("__VIDEO_URL__", json.dumps(video_url)))
 
-# Kick thresholds - now relative to hip-ankle span
-DEFAULT_KICK_SYM_MAX_GOOD = 15
-DEFAULT_KICK_DEPTH_GOOD = (0.15, 0.35)  # Relative to hip-ankle span
-DEFAULT_KICK_DEPTH_OK = (0.10, 0.45)
+def media_file_url(data: bytes, mime: str, key: str) -> Optional[str]:
+    """
+    Register data with Streamlit's media file manager (what st.video uses)
+    and return its URL, so the browser streams it over HTTP instead of
+    receiving it inside a websocket message. The file lives as long as
+    the session keeps registering it under key on each rerun.
 
-# Breathing penalty during pull
-BREATH_PULL_PENALTY = 15  # Points deducted for breathing during pull phase
+    Returns:
+        - the URL, or None if this Streamlit version has no media file manager
+    """
+    try:
+        from streamlit.runtime import Runtime
+        url = Runtime.instance().media_file_mgr.add(data, mime, key)
+    except Exception:
+        return None
+    base_path = (st.get_option("server.baseUrlPath") or "").strip("/")
+    return f"/{base_path}{url}" if base_path else url
+
+def render_overlay_player(video_bytes: bytes, track: dict, mime: str = "video/mp4", height: int = 620):
+    """Play the original video with skeleton, alignment, EVF and panel overlays drawn in the browser"""
+    video_url = media_file_url(video_bytes, mime, "overlay_player_video")
+    if video_url is None:
+        st.video(video_bytes, format=mime)
+        st.caption("Overlays are unavailable in this Streamlit version; render the annotated video to see them.")
+        return
+    components.html(get_overlay_player_html(video_url, track), height=height, scrolling=False)
 
 # ─────────────────────────────────────────────
-# DATA MODELS - Enhanced
+# MAIN APP - Enhanced UI
 # ─────────────────────────────────────────────
 
-class SwimPhase(Enum):
-    ENTRY = "Entry"
-    PULL = "Pull"
-    PUSH = "Push"
-    RECOVERY = "Recovery"
-
-class CameraView(Enum):
-    SIDE = "Side View"
-    FRONT = "Front View"
-    TOP = "Top View"
-    UNKNOWN = "Unknown"
-
-class WaterPosition(Enum):
-    UNDERWATER = "Underwater"
-    ABOVE_WATER = "Above Water"
-    MIXED = "Mixed/Waterline"
-    UNKNOWN = "Unknown"
-
-@dataclass
-class VideoContext:
-    """Detected video context for adaptive analysis"""
-    camera_view: CameraView = CameraView.UNKNOWN
-    water_position: WaterPosition = WaterPosition.UNKNOWN
-    swimming_direction: str = "left_to_right"  # or "right_to_left"
-    confidence: float = 0.0
-    detection_frames: int = 0
-    
-    # Color analysis results
-    avg_blue_ratio: float = 0.0
-    has_lane_lines: bool = False
-    has_splash: bool = False
-    
-    # Landmark visibility stats
-    upper_body_visible_pct: float = 0.0
-    lower_body_visible_pct: float = 0.0
-    
-    def get_available_metrics(self) -> List[str]:
-        """Return list of metrics available for this view"""
-        metrics = []
-        
-        if self.camera_view == CameraView.SIDE:
-            if self.water_position == WaterPosition.UNDERWATER:
-                metrics = ["evf", "body_alignment", "kick_depth", "stroke_phase", "torso_lean"]
-            else:  # Above water
-                metrics = ["recovery_arm", "breathing", "head_position", "stroke_rate"]
-        
-        elif self.camera_view == CameraView.FRONT:
-            if self.water_position == WaterPosition.UNDERWATER:
-                metrics = ["body_roll", "hand_entry_width", "kick_symmetry", "streamline"]
-            else:
-                metrics = ["entry_angle", "breathing_side", "catch_width"]
-        
-        elif self.camera_view == CameraView.TOP:
-            metrics = ["body_roll", "stroke_symmetry", "kick_width", "streamline"]
-        
+def streamlit_progress(bar, status):
+    """Update callback for ProgressReporter that drives a progress bar and a status line"""
+    def update(fraction: float, text: str) -> None:
+        bar.progress(fraction)
+        status.text(text)
+    return update
+
+
+def render_live_summary(placeholder, live: LiveSummary, queued: bool = False) -> None:
+    """Redraw the partial-results panel shown during processing (queued = running on a worker)"""
+    with placeholder.container():
+        st.markdown(f"#### 📡 Live Results (first {live.time_s:.0f}s of video)")
+        cols = st.columns(5)
+        cols[0].metric("Running Score", f"{live.avg_score:.1f}")
+        cols[1].metric("Stroke Rate", f"{live.stroke_rate:.1f} spm")
+        cols[2].metric("Strokes", f"{live.total_strokes}")
+        cols[3].metric("Breaths L / R", f"{live.breath_left} / {live.breath_right}")
+        cols[4].metric("Dropped Elbow", f"{live.dropped_elbow_pct:.0f}%")
+        if len(live.score_sparkline) >= 2:
+            st.line_chart(pd.DataFrame({'score': live.score_sparkline}), height=120)
+        if queued:
+            st.caption("Wrong camera angle or swimmer not detected? Press **Cancel Analysis** above; "
+                       "progress is saved and can be resumed.")
         else:
-            # Unknown - provide basic metrics
-            metrics = ["body_roll", "stroke_rate", "breathing"]
-        
-        return metrics
-    
-    def get_description(self) -> str:
-        """Get human-readable description of detected context"""
-        return f"{self.camera_view.value} • {self.water_position.value}"
-
-@dataclass
-class AthleteProfile:
-    height_cm: float
-    discipline: str
-
-@dataclass
-class FrameMetrics:
-    time_s: float
-    elbow_angle: float
-    knee_left: float
-    knee_right: float
-    kick_symmetry: float
-    kick_depth_proxy: float  # Now relative to hip-ankle span
-    symmetry_hips: float
-    score: float
-    body_roll: float
-    torso_lean: float
-    forearm_vertical: float
-    phase: str
-    breath_state: str
-    confidence: float = 1.0
-    # New metrics
-    horizontal_deviation: float = 0.0  # Combined alignment score
-    vertical_drop: float = 0.0         # Hip/leg sinking angle
-    evf_plane_angle: float = 0.0       # EVF quality score
-    is_dropped_elbow: bool = False     # True if elbow below wrist (bad!)
-    evf_status: str = ""               # Descriptive EVF status
-    alignment_status: str = ""         # Descriptive alignment status
-    wrist_velocity_y: float = 0.0      # For phase detection
-    alignment_score: float = 100.0     # Sub-score for alignment
-    evf_score: float = 100.0           # Sub-score for EVF
-    breathing_during_pull: bool = False
-    # Glide metrics
-    is_gliding: bool = False           # True if in glide phase
-    glide_score: float = 100.0         # Quality of glide (streamline)
-    arm_extension: float = 0.0         # How extended the lead arm is (0-1)
-
-@dataclass
-class SessionSummary:
-    duration_s: float
-    avg_score: float
-    avg_body_roll: float
-    max_body_roll: float
-    stroke_rate: float
-    breaths_per_min: float
-    breath_left: int
-    breath_right: int
-    total_strokes: int
-    avg_kick_symmetry: float
-    avg_kick_depth: float
-    kick_status: str
-    avg_confidence: float
-    best_frame_bytes: Optional[bytes] = None
-    worst_frame_bytes: Optional[bytes] = None
-    # New summary metrics
-    avg_horizontal_deviation: float = 0.0
-    avg_vertical_drop: float = 0.0      # Hip/leg sinking
-    avg_evf_angle: float = 0.0
-    dropped_elbow_frames: int = 0       # Count of frames with dropped elbow
-    dropped_elbow_pct: float = 0.0      # Percentage of pull frames with dropped elbow
-    avg_alignment_score: float = 100.0
-    avg_evf_score: float = 100.0
-    breaths_during_pull: int = 0
-    total_breaths: int = 0
-    diagnostics: List[str] = field(default_factory=list)
-    # Video context
-    video_context: Optional[VideoContext] = None
-    available_metrics: Dict = field(default_factory=dict)
-    # Glide metrics
-    glide_ratio: float = 0.0           # Percentage of stroke cycle spent gliding
-    avg_glide_score: float = 0.0       # Average quality of glide phases
-    glide_frames: int = 0              # Number of frames in glide
-    total_analyzed_frames: int = 0     # Total frames analyzed
+            st.caption("Wrong camera angle or swimmer not detected? Press **Stop** (top right) to cancel and re-upload.")
 
-# ─────────────────────────────────────────────
-# HELPERS - Enhanced calculations
-# ─────────────────────────────────────────────
 
-def calculate_angle(a, b, c):
-    """Calculate angle at point b given points a, b, c"""
-    ba = np.array(a) - np.array(b)
-    bc = np.array(c) - np.array(b)
-    cosang = np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc) + 1e-8)
-    return np.degrees(np.arccos(np.clip(cosang, -1, 1)))
-
-def compute_torso_lean(lm_pixel: Dict):
-    """Compute torso lean angle from vertical"""
-    mid_s = ((lm_pixel["left_shoulder"][0] + lm_pixel["right_shoulder"][0]) / 2,
-             (lm_pixel["left_shoulder"][1] + lm_pixel["right_shoulder"][1]) / 2)
-    mid_h = ((lm_pixel["left_hip"][0] + lm_pixel["right_hip"][0]) / 2,
-             (lm_pixel["left_hip"][1] + lm_pixel["right_hip"][1]) / 2)
-    dy = mid_s[1] - mid_h[1]
-    dx = mid_s[0] - mid_h[0]
-    return math.degrees(math.atan2(dy, dx))
-
-def compute_forearm_vertical(lm_pixel: Dict):
-    """Legacy forearm vertical calculation for display"""
-    dx = lm_pixel["left_wrist"][0] - lm_pixel["left_elbow"][0]
-    dy = lm_pixel["left_wrist"][1] - lm_pixel["left_elbow"][1]
-    return abs(math.degrees(math.atan2(dx, -dy)))
-
-def compute_horizontal_deviation(lm_pixel: Dict) -> Tuple[float, float, str]:
-    """
-    Calculate body alignment including VERTICAL sinking (not just lateral).
-    
-    Measures:
-    1. Lateral deviation (snake swimming / hip sway)
-    2. Vertical drop (hip/leg sinking below shoulders)
-    
-    Returns:
-        - total_deviation: combined alignment score (lower is better)
-        - vertical_drop: how much hips sink below shoulder line (in degrees)
-        - status: descriptive status
-    """
-    # Get midpoints
-    mid_shoulder = np.array([
-        (lm_pixel["left_shoulder"][0] + lm_pixel["right_shoulder"][0]) / 2,
-        (lm_pixel["left_shoulder"][1] + lm_pixel["right_shoulder"][1]) / 2
-    ])
-    mid_hip = np.array([
-        (lm_pixel["left_hip"][0] + lm_pixel["right_hip"][0]) / 2,
-        (lm_pixel["left_hip"][1] + lm_pixel["right_hip"][1]) / 2
-    ])
-    mid_ankle = np.array([
-        (lm_pixel["left_ankle"][0] + lm_pixel["right_ankle"][0]) / 2,
-        (lm_pixel["left_ankle"][1] + lm_pixel["right_ankle"][1]) / 2
-    ])
-    
-    # Calculate body length for normalization
-    body_length = np.linalg.norm(mid_ankle - mid_shoulder)
-    if body_length < 10:
-        return 0.0, 0.0, "No data"
-    
-    # 1. LATERAL DEVIATION (side-to-side snake swimming)
-    ideal_line = mid_ankle - mid_shoulder
-    ideal_len = np.linalg.norm(ideal_line)
-    
-    if ideal_len > 1:
-        ideal_unit = ideal_line / ideal_len
-        to_hip = mid_hip - mid_shoulder
-        proj_len = np.dot(to_hip, ideal_unit)
-        proj_point = mid_shoulder + proj_len * ideal_unit
-        lateral_dev_pixels = np.linalg.norm(mid_hip - proj_point)
-        lateral_deviation = math.degrees(math.atan2(lateral_dev_pixels, body_length / 2))
-    else:
-        lateral_deviation = 0.0
-    
-    # 2. VERTICAL DROP (hips/legs sinking - critical for drag!)
-    # In a streamlined position, shoulder-hip-ankle should be roughly horizontal
-    # In image coordinates: higher Y = lower in water (sinking)
-    
-    # Calculate angle from horizontal: how much are legs/hips dropping?
-    dx = mid_ankle[0] - mid_shoulder[0]
-    dy = mid_ankle[1] - mid_shoulder[1]  # Positive = ankles below shoulders (sinking)
-    
-    # Body angle from horizontal (0° = flat, positive = feet sinking)
-    body_angle_from_horizontal = math.degrees(math.atan2(dy, abs(dx) + 0.001))
-    
-    # Also check hip drop specifically
-    hip_dx = mid_hip[0] - mid_shoulder[0]
-    hip_dy = mid_hip[1] - mid_shoulder[1]
-    hip_drop_angle = math.degrees(math.atan2(hip_dy, abs(hip_dx) + 0.001))
-    
-    # Vertical drop is the max of body angle and hip drop (only count sinking, not rising)
-    vertical_drop = max(0, body_angle_from_horizontal, hip_drop_angle)
-    
-    # Combined deviation score
-    total_deviation = lateral_deviation + vertical_drop
-    
-    # Status determination
-    if vertical_drop > 15:
-        status = "Sinking hips/legs"
-    elif vertical_drop > 8:
-        status = "Slight hip drop"
-    elif lateral_deviation > 10:
-        status = "Snake swimming"
-    elif total_deviation <= 8:
-        status = "Good alignment"
-    else:
-        status = "OK alignment"
-    
-    return total_deviation, vertical_drop, status
+def remove_files(*paths: str) -> None:
+    for path in paths:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
 
-def compute_evf_plane_angle(lm_pixel: Dict) -> Tuple[float, bool, str]:
-    """
-    Calculate Early Vertical Forearm quality.
-    
-    Good EVF requires:
-    1. Forearm near vertical (pointing down)
-    2. Elbow HIGHER than wrist (high elbow catch) - CRITICAL!
-    3. Elbow staying near surface while hand reaches deep
-    
-    Returns:
-        - effective_angle: EVF quality score (lower is better, includes penalties)
-        - is_dropped_elbow: True if elbow is below wrist (bad technique!)
-        - evf_status: descriptive status string
-    """
-    # Use the arm that's more likely in the pull phase (lower wrist = catching water)
-    left_wrist_y = lm_pixel["left_wrist"][1]
-    right_wrist_y = lm_pixel["right_wrist"][1]
-    
-    if left_wrist_y > right_wrist_y:
-        shoulder = np.array(lm_pixel["left_shoulder"])
-        elbow = np.array(lm_pixel["left_elbow"])
-        wrist = np.array(lm_pixel["left_wrist"])
-    else:
-        shoulder = np.array(lm_pixel["right_shoulder"])
-        elbow = np.array(lm_pixel["right_elbow"])
-        wrist = np.array(lm_pixel["right_wrist"])
-    
-    # === CHECK 1: Is elbow HIGHER than wrist? ===
-    # In image coordinates: lower Y value = higher position in frame
-    # For good EVF, elbow.y should be LESS than wrist.y (elbow above wrist)
-    elbow_wrist_diff = wrist[1] - elbow[1]  # Positive = good (wrist below elbow)
-    elbow_above_wrist = elbow_wrist_diff > 10  # Need meaningful difference
-    
-    # === CHECK 2: Forearm angle from vertical ===
-    forearm = wrist - elbow
-    vertical = np.array([0, 1])  # Down in image coordinates
-    
-    forearm_len = np.linalg.norm(forearm)
-    if forearm_len < 1:
-        return 0.0, False, "No data"
-    
-    cos_angle = np.dot(forearm, vertical) / forearm_len
-    forearm_angle = math.degrees(math.acos(np.clip(cos_angle, -1, 1)))
-    
-    # === CHECK 3: Elbow drop relative to shoulder ===
-    # Elbow shouldn't drop too far below shoulder during catch
-    elbow_drop_from_shoulder = elbow[1] - shoulder[1]  # Positive = elbow below shoulder
-    excessive_elbow_drop = elbow_drop_from_shoulder > 80  # Threshold in pixels
-    
-    # === DETERMINE EVF QUALITY ===
-    is_dropped_elbow = not elbow_above_wrist or excessive_elbow_drop
-    
-    if is_dropped_elbow:
-        evf_status = "DROPPED ELBOW"
-        # Heavy penalty - this is the main technique flaw you identified
-        effective_angle = forearm_angle + 35
-    elif forearm_angle <= 20 and elbow_above_wrist:
-        evf_status = "Excellent EVF"
-        effective_angle = forearm_angle
-    elif forearm_angle <= 30:
-        evf_status = "Good EVF"
-        effective_angle = forearm_angle
-    elif forearm_angle <= 45:
-        evf_status = "OK EVF"
-        effective_angle = forearm_angle
-    else:
-        evf_status = "Sweeping (no catch)"
-        effective_angle = forearm_angle + 10  # Small penalty for sweep
-    
-    return effective_angle, is_dropped_elbow, evf_status
 
-def compute_kick_depth_relative(lm_pixel: Dict):
-    """
-    NEW: Calculate kick depth relative to hip-ankle span
-    This normalizes for body size and camera angle
+def run_video_analysis(uploaded, analyzer: SwimAnalyzer, analysis_only: bool = False) -> Dict:
     """
-    # Hip-ankle span (body length reference)
-    hip_y = (lm_pixel["left_hip"][1] + lm_pixel["right_hip"][1]) / 2
-    ankle_y = (lm_pixel["left_ankle"][1] + lm_pixel["right_ankle"][1]) / 2
-    hip_ankle_span = abs(ankle_y - hip_y)
-    
-    if hip_ankle_span < 10:  # Avoid division by zero
-        return 0.0
-    
-    # Knee deviation from hip-ankle line
-    knee_l_y = lm_pixel["left_knee"][1]
-    knee_r_y = lm_pixel["right_knee"][1]
-    
-    # Expected knee position if legs were straight (midpoint of hip-ankle)
-    expected_knee_y = (hip_y + ankle_y) / 2
-    
-    # Kick depth is the deviation of knees from this expected position
-    left_dev = abs(knee_l_y - expected_knee_y)
-    right_dev = abs(knee_r_y - expected_knee_y)
-    
-    # Average deviation normalized by hip-ankle span
-    kick_depth = (left_dev + right_dev) / (2 * hip_ankle_span)
-    
-    return kick_depth
+    Analyze the uploaded video with progress widgets and build every result artifact.
 
-def detect_phase_enhanced(lm_pixel: Dict, elbow_angle: float, prev_wrist_y: Optional[float], fps: float):
-    """
-    NEW: Enhanced phase detection using elbow angle + wrist vertical velocity
-    """
-    wrist_y = min(lm_pixel["left_wrist"][1], lm_pixel["right_wrist"][1])
-    shoulder_y = min(lm_pixel["left_shoulder"][1], lm_pixel["right_shoulder"][1])
-    
-    # Calculate wrist velocity if we have previous position
-    wrist_velocity_y = 0.0
-    if prev_wrist_y is not None:
-        wrist_velocity_y = (wrist_y - prev_wrist_y) * fps  # pixels per second
-    
-    underwater = wrist_y > shoulder_y + 20
-    
-    # Phase detection logic
-    if not underwater:
-        phase = "Recovery"
-    elif elbow_angle > 140:
-        phase = "Entry"
-    elif elbow_angle > 90:
-        # Distinguish Pull from Push using wrist velocity
-        if wrist_velocity_y > 50:  # Wrist moving down = Pull
-            phase = "Pull"
-        else:
-            phase = "Pull"  # Default to Pull in this elbow range
-    else:
-        # Low elbow angle
-        if wrist_velocity_y < -30:  # Wrist moving up = Push exit
-            phase = "Push"
-        else:
-            phase = "Push"
-    
-    return phase, wrist_velocity_y, wrist_y
+    In analysis-only mode no overlays are drawn and nothing is encoded; the
+    input file is kept so the annotated video can be rendered on demand.
+    If the run fails or is stopped, the writer is released and every temp
+    file (input included) deleted.
 
-def compute_glide_metrics(lm_pixel: Dict, phase: str, elbow_angle: float, horizontal_dev: float) -> Tuple[bool, float, float]:
-    """
-    Compute glide metrics for freestyle swimming.
-    
-    GLIDE ASSESSMENT:
-    ================
-    Glide is the brief "catch-up" or extension phase where the lead arm is fully 
-    extended forward while the other arm completes its stroke. Good glide:
-    
-    1. Maximizes distance per stroke (DPS)
-    2. Reduces energy expenditure 
-    3. Maintains streamlined position
-    4. Allows momentary rest between strokes
-    
-    DETECTION CRITERIA:
-    - Phase: Entry or early Pull (arm extended forward)
-    - Lead arm fully extended (elbow angle > 155° - stricter)
-    - Good body alignment (low horizontal deviation)
-    - Streamlined position
-    
-    QUALITY FACTORS:
-    - Arm extension: How straight is the lead arm (elbow angle)
-    - Body alignment: Is the body streamlined during glide
-    - Duration: Longer glide (within reason) = more efficient
-    
     Returns:
-        - is_gliding: Boolean, True if currently in glide phase
-        - glide_score: 0-100, quality of the glide position
-        - arm_extension: 0-1, how extended the lead arm is
+        - dict with analyzer, summary, report/CSV/ZIP buffers, video_bytes (None in analysis-only mode),
+          input_path, the overlay_track for the browser player and the key-frame gallery
     """
-    
-    # Get arm measurements
-    # Find the lead arm (the one that's more extended/forward)
-    left_elbow_angle = calculate_angle(
-        lm_pixel["left_shoulder"], 
-        lm_pixel["left_elbow"], 
-        lm_pixel["left_wrist"]
-    )
-    right_elbow_angle = calculate_angle(
-        lm_pixel["right_shoulder"], 
-        lm_pixel["right_elbow"], 
-        lm_pixel["right_wrist"]
-    )
-    
-    # Lead arm is the one with higher elbow angle (more extended)
-    lead_elbow_angle = max(left_elbow_angle, right_elbow_angle)
-    
-    # Calculate arm extension (0-1 scale)
-    # 180° = fully extended = 1.0
-    # 90° = bent = 0.0
-    arm_extension = max(0, min(1, (lead_elbow_angle - 90) / 90))
-    
-    # Determine if in glide phase - IMPROVED
-    # Glide occurs during Entry phase or very early Pull when arm is extended
-    is_gliding = False
-    
-    if phase in ("Entry", "Pull"):
-        # Check if lead arm is sufficiently extended (>155° - stricter)
-        if lead_elbow_angle > 155:
-            # Check if body is reasonably streamlined
-            if horizontal_dev < 12:  # Stricter
-                is_gliding = True
-    
-    # Calculate glide quality score
-    glide_score = 0.0
-    
-    if is_gliding:
-        # Base score from arm extension (40 points max)
-        extension_score = arm_extension * 40
-        
-        # Body alignment score (40 points max)
-        # Lower deviation = higher score
-        if horizontal_dev <= 5:
-            alignment_score = 40
-        elif horizontal_dev <= 10:
-            alignment_score = 30
-        elif horizontal_dev <= 15:
-            alignment_score = 20
-        else:
-            alignment_score = 10
-        
-        # Elbow angle bonus (20 points max)
-        # 170°+ = excellent extension
-        if lead_elbow_angle >= 170:
-            angle_bonus = 20
-        elif lead_elbow_angle >= 160:
-            angle_bonus = 15
-        elif lead_elbow_angle >= 150:
-            angle_bonus = 10
-        else:
-            angle_bonus = 5
-        
-        glide_score = extension_score + alignment_score + angle_bonus
-    
-    return is_gliding, glide_score, arm_extension
-
-def get_zone_color(val, good, ok):
-    """Return color based on value zone"""
-    if good[0] <= val <= good[1]: 
-        return (0, 180, 0)  # Green
-    if ok[0] <= val <= ok[1]: 
-        return (0, 220, 220)  # Yellow/Amber
-    return (220, 0, 0)  # Red
-
-def get_zone_status(val, good, ok):
-    """Return status string based on value zone"""
-    if good[0] <= val <= good[1]: 
-        return "Good"
-    if ok[0] <= val <= ok[1]: 
-        return "OK"
-    return "Needs Work"
-
-def detect_local_minimum(arr, threshold=10):
-    """Detect stroke based on elbow angle local minimum"""
-    if len(arr) < 3: 
-        return False
-    mid = len(arr) // 2
-    return arr[mid] < min(arr[:mid] + arr[mid+1:]) and (arr[mid] + threshold) <= min(arr[:mid] + arr[mid+1:])
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as tmp_in:
+        tmp_in.write(uploaded.getvalue())
+        input_path = tmp_in.name
+
+    writer = None
+    temp_raw_path = out_path = None
+    try:
+        fps, w, h, total = probe_video(input_path)
+
+        if not analysis_only:
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".avi") as tmp_raw:
+                temp_raw_path = tmp_raw.name
+            fourcc = cv2.VideoWriter_fourcc(*'XVID')  # Use XVID for intermediate
+            writer = cv2.VideoWriter(temp_raw_path, fourcc, fps, (w, h))
 
-# ─────────────────────────────────────────────
-# VIDEO CONTEXT DETECTION
-# ─────────────────────────────────────────────
+        st.markdown("### ⏳ Processing Video")
+        processing_progress = st.progress(0)
+        processing_status = st.empty()
+        reporter = ProgressReporter(total, streamlit_progress(processing_progress, processing_status))
+        live_placeholder = st.empty()
 
-class VideoContextDetector:
-    """Analyzes video frames to detect camera angle and water position"""
-    
-    def __init__(self):
-        self.frame_analyses = []
-        self.detection_complete = False
-        self.context = VideoContext()
-        self.video_width = 0
-        self.video_height = 0
-        
-    def analyze_frame(self, frame: np.ndarray, landmarks_pixel: Optional[Dict] = None) -> None:
-        """Analyze a single frame for context detection"""
-        if self.detection_complete:
-            return
-        
-        # Store video dimensions from first frame
-        if self.video_height == 0:
-            self.video_height, self.video_width = frame.shape[:2]
-            
-        analysis = {
-            'color': self._analyze_color(frame),
-            'landmarks': self._analyze_landmarks(landmarks_pixel) if landmarks_pixel else None,
-            'edges': self._detect_lane_lines(frame),
-            'splash': self._detect_splash(frame)
-        }
-        self.frame_analyses.append(analysis)
-        
-        # After analyzing enough frames, make determination
-        if len(self.frame_analyses) >= 30:
-            self._finalize_detection()
-    
-    def _analyze_color(self, frame: np.ndarray) -> Dict:
-        """Analyze color distribution for water detection"""
-        h, w = frame.shape[:2]
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        # Blue/cyan detection
-        lower_blue = np.array([85, 50, 50])
-        upper_blue = np.array([130, 255, 255])
-        blue_mask = cv2.inRange(hsv, lower_blue, upper_blue)
-        blue_ratio = np.sum(blue_mask > 0) / (h * w)
-        
-        # White/bright detection (splash/surface indicator)
-        lower_white = np.array([0, 0, 200])
-        upper_white = np.array([180, 30, 255])
-        white_mask = cv2.inRange(hsv, lower_white, upper_white)
-        white_ratio = np.sum(white_mask > 0) / (h * w)
-        
-        # Split frame into thirds for regional analysis
-        top_third = hsv[:h//3, :]
-        middle_third = hsv[h//3:2*h//3, :]
-        bottom_third = hsv[2*h//3:, :]
-        
-        top_gray = gray[:h//3, :]
-        bottom_gray = gray[2*h//3:, :]
-        
-        # Saturation analysis
-        top_saturation = np.mean(top_third[:,:,1])
-        bottom_saturation = np.mean(bottom_third[:,:,1])
-        saturation_gradient = bottom_saturation - top_saturation
-        
-        # Brightness analysis
-        top_brightness = np.mean(top_third[:,:,2])
-        bottom_brightness = np.mean(bottom_third[:,:,2])
-        brightness_gradient = top_brightness - bottom_brightness
-        
-        # Bright spots in top region
-        bright_spots_top = cv2.inRange(top_third, np.array([0, 0, 180]), np.array([180, 60, 255]))
-        bright_ratio_top = np.sum(bright_spots_top > 0) / (top_third.shape[0] * top_third.shape[1])
-        
-        # Sky detection
-        sky_mask = cv2.inRange(top_third, np.array([90, 20, 150]), np.array([130, 100, 255]))
-        sky_ratio = np.sum(sky_mask > 0) / (top_third.shape[0] * top_third.shape[1])
-        
-        # === HORIZONTAL LINE DETECTION ===
-        edges = cv2.Canny(gray, 50, 150)
-        lines = cv2.HoughLinesP(edges, 1, np.pi/180, threshold=80, minLineLength=w//6, maxLineGap=20)
-        horizontal_line_count = 0
-        if lines is not None:
-            for line in lines:
-                x1, y1, x2, y2 = line[0]
-                angle = abs(math.degrees(math.atan2(y2-y1, x2-x1)))
-                if angle < 15 or angle > 165:  # Near horizontal
-                    horizontal_line_count += 1
-        
-        # === TEXTURE VARIANCE ===
-        laplacian = cv2.Laplacian(gray, cv2.CV_64F)
-        texture_variance = laplacian.var()
-        
-        # === SKIN TONE DETECTION ===
-        lower_skin = np.array([0, 20, 70])
-        upper_skin = np.array([20, 150, 255])
-        skin_mask = cv2.inRange(hsv, lower_skin, upper_skin)
-        skin_ratio = np.sum(skin_mask > 0) / (h * w)
-        
-        # === COLOR VARIANCE ===
-        b, g, r = cv2.split(frame)
-        color_variance = np.std([np.mean(b), np.mean(g), np.mean(r)])
-        
-        # === NEW: UNDERWATER-SPECIFIC INDICATORS ===
-        
-        # 1. Surface ripples at TOP of frame (underwater looking up)
-        # Underwater footage shows wavy surface distortion at top
-        top_edges = cv2.Canny(top_gray, 30, 100)
-        top_edge_density = np.sum(top_edges > 0) / (top_gray.shape[0] * top_gray.shape[1])
-        
-        # 2. Pool bottom detection (darker region at bottom with lane markings)
-        # Pool bottom is typically darker and has distinct lane lines
-        bottom_edges = cv2.Canny(bottom_gray, 30, 100)
-        bottom_edge_density = np.sum(bottom_edges > 0) / (bottom_gray.shape[0] * bottom_gray.shape[1])
-        
-        # 3. Detect if bottom is darker than top (underwater: pool bottom darker)
-        # Above water: top (sky/ceiling) often darker or similar to water
-        bottom_brightness_val = np.mean(bottom_gray)
-        top_brightness_val = np.mean(top_gray)
-        bottom_darker = bottom_brightness_val < top_brightness_val - 10
-        
-        # 4. Check for uniform blue saturation (underwater indicator)
-        sat_uniformity = 1.0 - (abs(top_saturation - bottom_saturation) / max(top_saturation, bottom_saturation, 1))
-        
-        # 5. Detect vertical/diagonal lines in bottom (pool floor T-marks)
-        bottom_lines = cv2.HoughLinesP(bottom_edges, 1, np.pi/180, threshold=30, minLineLength=h//10, maxLineGap=10)
-        vertical_lines_bottom = 0
-        if bottom_lines is not None:
-            for line in bottom_lines:
-                x1, y1, x2, y2 = line[0]
-                angle = abs(math.degrees(math.atan2(y2-y1, x2-x1)))
-                if 70 < angle < 110:  # Near vertical
-                    vertical_lines_bottom += 1
-        
-        # 6. Check for wavy distortion pattern at top (water surface from below)
-        # High frequency variations in the top region indicate looking up at surface
-        top_laplacian = cv2.Laplacian(top_gray, cv2.CV_64F)
-        top_texture = top_laplacian.var()
-        
-        # 7. Lane rope appearance: from above = crisp horizontal lines
-        # From below = blurry, distorted by water
-        # Check sharpness of detected lines
-        
-        return {
-            'blue_ratio': blue_ratio,
-            'white_ratio': white_ratio,
-            'sky_ratio': sky_ratio,
-            'avg_brightness': np.mean(frame),
-            'saturation_gradient': saturation_gradient,
-            'brightness_gradient': brightness_gradient,
-            'bright_ratio_top': bright_ratio_top,
-            'top_saturation': top_saturation,
-            'bottom_saturation': bottom_saturation,
-            # Above-water indicators
-            'horizontal_lines': horizontal_line_count,
-            'texture_variance': texture_variance,
-            'skin_ratio': skin_ratio,
-            'color_variance': color_variance,
-            # Underwater indicators
-            'top_edge_density': top_edge_density,
-            'bottom_edge_density': bottom_edge_density,
-            'bottom_darker': bottom_darker,
-            'sat_uniformity': sat_uniformity,
-            'vertical_lines_bottom': vertical_lines_bottom,
-            'top_texture': top_texture,
-        }
-    
-    def _analyze_landmarks(self, lm_pixel: Dict) -> Dict:
-        """Analyze landmark positions for camera angle detection"""
-        if not lm_pixel:
-            return None
-        
-        # Calculate distances for view detection
-        try:
-            # Shoulder width (X distance)
-            shoulder_width = abs(lm_pixel["left_shoulder"][0] - lm_pixel["right_shoulder"][0])
-            
-            # Shoulder-hip depth (Y distance in side view, minimal in front view)
-            shoulder_y = (lm_pixel["left_shoulder"][1] + lm_pixel["right_shoulder"][1]) / 2
-            hip_y = (lm_pixel["left_hip"][1] + lm_pixel["right_hip"][1]) / 2
-            torso_height = abs(hip_y - shoulder_y)
-            
-            # Hip width
-            hip_width = abs(lm_pixel["left_hip"][0] - lm_pixel["right_hip"][0])
-            
-            # Check visibility of different body parts
-            # Upper body: shoulders, elbows, wrists
-            # Lower body: hips, knees, ankles
-            
-            return {
-                'shoulder_width': shoulder_width,
-                'torso_height': torso_height,
-                'hip_width': hip_width,
-                'width_to_height_ratio': shoulder_width / (torso_height + 1),
-                'hip_to_shoulder_ratio': hip_width / (shoulder_width + 1)
-            }
-        except:
-            return None
-    
-    def _detect_lane_lines(self, frame: np.ndarray) -> bool:
-        """Detect pool lane lines (indicates underwater pool view)"""
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        edges = cv2.Canny(gray, 50, 150)
-        
-        # Look for horizontal lines (lane lines on pool bottom)
-        lines = cv2.HoughLinesP(edges, 1, np.pi/180, threshold=100, 
-                                 minLineLength=100, maxLineGap=10)
-        
-        if lines is None:
-            return False
-        
-        horizontal_lines = 0
-        for line in lines:
-            x1, y1, x2, y2 = line[0]
-            angle = abs(math.atan2(y2-y1, x2-x1) * 180 / np.pi)
-            if angle < 15 or angle > 165:  # Near horizontal
-                horizontal_lines += 1
-        
-        return horizontal_lines >= 2
-    
-    def _detect_splash(self, frame: np.ndarray) -> float:
-        """Detect splash/turbulence (indicates surface/above water)"""
-        # Splash appears as high-frequency white regions
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        # High contrast areas
-        laplacian = cv2.Laplacian(gray, cv2.CV_64F)
-        variance = laplacian.var()
-        
-        # White bubble detection
-        _, white_thresh = cv2.threshold(gray, 220, 255, cv2.THRESH_BINARY)
-        white_ratio = np.sum(white_thresh > 0) / (frame.shape[0] * frame.shape[1])
-        
-        return variance * white_ratio
-    
-    def _finalize_detection(self) -> None:
-        """Make final determination based on collected analyses"""
-        if not self.frame_analyses:
-            return
-        
-        # Aggregate all metrics
-        avg_blue = np.mean([a['color']['blue_ratio'] for a in self.frame_analyses])
-        avg_white = np.mean([a['color']['white_ratio'] for a in self.frame_analyses])
-        has_pool_bottom_lanes = sum([1 for a in self.frame_analyses if a['edges']]) > len(self.frame_analyses) * 0.3
-        avg_splash = np.mean([a['splash'] for a in self.frame_analyses])
-        
-        # Regional analysis
-        avg_top_sat = np.mean([a['color']['top_saturation'] for a in self.frame_analyses])
-        avg_bottom_sat = np.mean([a['color']['bottom_saturation'] for a in self.frame_analyses])
-        avg_bright_gradient = np.mean([a['color']['brightness_gradient'] for a in self.frame_analyses])
-        
-        # Above-water indicators
-        avg_horizontal_lines = np.mean([a['color'].get('horizontal_lines', 0) for a in self.frame_analyses])
-        avg_texture = np.mean([a['color'].get('texture_variance', 0) for a in self.frame_analyses])
-        avg_color_variance = np.mean([a['color'].get('color_variance', 0) for a in self.frame_analyses])
-        
-        # Underwater indicators
-        avg_top_edge_density = np.mean([a['color'].get('top_edge_density', 0) for a in self.frame_analyses])
-        avg_bottom_edge_density = np.mean([a['color'].get('bottom_edge_density', 0) for a in self.frame_analyses])
-        bottom_darker_pct = np.mean([1 if a['color'].get('bottom_darker', False) else 0 for a in self.frame_analyses])
-        avg_sat_uniformity = np.mean([a['color'].get('sat_uniformity', 0) for a in self.frame_analyses])
-        avg_vertical_lines_bottom = np.mean([a['color'].get('vertical_lines_bottom', 0) for a in self.frame_analyses])
-        avg_top_texture = np.mean([a['color'].get('top_texture', 0) for a in self.frame_analyses])
-        
-        # === BALANCED SCORING SYSTEM ===
-        above_water_score = 0
-        underwater_score = 0
-        
-        # ==========================================
-        # ABOVE-WATER INDICATORS
-        # ==========================================
-        
-        # 1. Many horizontal lines from floating lane ropes (seen from above)
-        # Above-water typically has 50+ crisp horizontal lines
-        if avg_horizontal_lines > 50:
-            above_water_score += 4
-        elif avg_horizontal_lines > 35:
-            above_water_score += 3
-        elif avg_horizontal_lines > 20:
-            above_water_score += 1
-        # Few horizontal lines suggests underwater
-        elif avg_horizontal_lines < 15:
-            underwater_score += 2
-        
-        # 2. High overall texture (surface ripples from above)
-        if avg_texture > 90:
-            above_water_score += 3
-        elif avg_texture > 70:
-            above_water_score += 2
-        # Low texture suggests underwater (more uniform)
-        elif avg_texture < 50:
-            underwater_score += 2
-        elif avg_texture < 70:
-            underwater_score += 1
-        
-        # 3. Top brighter than bottom (sky/ceiling above)
-        if avg_bright_gradient > 10:
-            above_water_score += 2
-        elif avg_bright_gradient > 0:
-            above_water_score += 1
-        
-        # 4. White/splash ratio
-        if avg_white > 0.02:
-            above_water_score += 1
-        
-        # ==========================================
-        # UNDERWATER INDICATORS
-        # ==========================================
-        
-        # 5. Bottom darker than top (pool floor is darker)
-        if bottom_darker_pct > 0.6:
-            underwater_score += 3
-        elif bottom_darker_pct > 0.3:
-            underwater_score += 2
-        
-        # 6. High saturation uniformity (underwater is uniformly blue)
-        if avg_sat_uniformity > 0.92:
-            underwater_score += 3
-        elif avg_sat_uniformity > 0.85:
-            underwater_score += 2
-        elif avg_sat_uniformity > 0.75:
-            underwater_score += 1
-        # Low uniformity suggests above water (different regions)
-        elif avg_sat_uniformity < 0.7:
-            above_water_score += 1
-        
-        # 7. Vertical lines at bottom (pool floor T-marks)
-        if avg_vertical_lines_bottom > 3:
-            underwater_score += 2
-        elif avg_vertical_lines_bottom > 1:
-            underwater_score += 1
-        
-        # 8. Edge density patterns
-        # Underwater: more edges at top (wavy surface) or bottom (pool floor)
-        # Above water: edges more distributed
-        if avg_top_edge_density > 0.08 and avg_bottom_edge_density > 0.06:
-            underwater_score += 1
-        
-        # 9. Pool bottom lane lines detected by edge detector
-        if has_pool_bottom_lanes and avg_horizontal_lines < 30:
-            underwater_score += 2
-        
-        # 10. Color variance - underwater has moderate to low variance
-        if avg_color_variance < 30:
-            underwater_score += 2
-        elif avg_color_variance < 45:
-            underwater_score += 1
-        elif avg_color_variance > 60:
-            above_water_score += 1
-        
-        # 11. High blue ratio with uniform saturation = underwater
-        if avg_blue > 0.8 and avg_sat_uniformity > 0.85:
-            underwater_score += 2
-        
-        # ==========================================
-        # FINAL DETERMINATION
-        # ==========================================
-        
-        # Calculate difference
-        score_diff = above_water_score - underwater_score
-        
-        if score_diff >= 3:
-            self.context.water_position = WaterPosition.ABOVE_WATER
-            water_confidence = min(0.95, 0.6 + score_diff * 0.05)
-        elif score_diff <= -3:
-            self.context.water_position = WaterPosition.UNDERWATER
-            water_confidence = min(0.95, 0.6 + abs(score_diff) * 0.05)
-        elif score_diff > 0:
-            self.context.water_position = WaterPosition.ABOVE_WATER
-            water_confidence = 0.55 + score_diff * 0.05
-        elif score_diff < 0:
-            self.context.water_position = WaterPosition.UNDERWATER
-            water_confidence = 0.55 + abs(score_diff) * 0.05
-        else:
-            # Tie - use aspect ratio as tiebreaker
-            # Underwater footage tends to be more square, above-water more wide
-            aspect_ratio = self.video_width / self.video_height if self.video_height > 0 else 1.0
-            if aspect_ratio > 1.6:
-                self.context.water_position = WaterPosition.ABOVE_WATER
-                water_confidence = 0.55
-            else:
-                self.context.water_position = WaterPosition.UNDERWATER
-                water_confidence = 0.55
-        
-        # === CAMERA VIEW DETECTION ===
-        # Use multiple signals: video aspect ratio, landmark geometry, body orientation
-        
-        # Signal 1: Video aspect ratio (very reliable!)
-        # Side view swimming videos are typically very wide (3:1 to 5:1 ratio)
-        # Front view videos are more square or portrait
-        video_aspect_ratio = self.video_width / self.video_height if hasattr(self, 'video_height') and self.video_height > 0 else 1.0
-        
-        side_view_score = 0
-        front_view_score = 0
-        top_view_score = 0
-        
-        # Wide video strongly suggests side view
-        if video_aspect_ratio > 3.0:
-            side_view_score += 3
-        elif video_aspect_ratio > 2.0:
-            side_view_score += 2
-        elif video_aspect_ratio < 1.0:  # Portrait
-            front_view_score += 2
-        
-        # Signal 2: Landmark geometry (if available)
-        landmark_analyses = [a['landmarks'] for a in self.frame_analyses if a['landmarks']]
-        
-        if landmark_analyses:
-            avg_width_height = np.mean([l['width_to_height_ratio'] for l in landmark_analyses])
-            avg_hip_shoulder = np.mean([l['hip_to_shoulder_ratio'] for l in landmark_analyses])
-            
-            # For side view: shoulders appear stacked (small X diff)
-            # But torso height varies based on body angle
-            if avg_width_height < 0.5:
-                side_view_score += 2
-            elif avg_width_height > 3.0 and avg_hip_shoulder > 0.8:
-                front_view_score += 2
-            elif avg_width_height > 3.0:
-                # High ratio could be side view with horizontal body OR top view
-                # Use video aspect ratio to disambiguate
-                if video_aspect_ratio > 2.5:
-                    side_view_score += 1  # Wide video = probably side view
-                else:
-                    top_view_score += 1
-        
-        # Signal 3: Above water typically means side view (most common filming angle)
-        if self.context.water_position == WaterPosition.ABOVE_WATER:
-            side_view_score += 1  # Slight bias toward side view for above-water
-        
-        # Determine camera view
-        max_score = max(side_view_score, front_view_score, top_view_score)
-        
-        if side_view_score == max_score:
-            self.context.camera_view = CameraView.SIDE
-            view_confidence = min(0.9, 0.4 + side_view_score * 0.1)
-        elif front_view_score == max_score:
-            self.context.camera_view = CameraView.FRONT
-            view_confidence = min(0.85, 0.4 + front_view_score * 0.1)
-        else:
-            self.context.camera_view = CameraView.TOP
-            view_confidence = min(0.7, 0.4 + top_view_score * 0.1)
-        
-        # Set overall confidence
-        self.context.confidence = (water_confidence + view_confidence) / 2
-        self.context.avg_blue_ratio = avg_blue
-        self.context.has_lane_lines = has_pool_bottom_lanes
-        self.context.has_splash = avg_splash > 300
-        self.context.detection_frames = len(self.frame_analyses)
-        
-        self.detection_complete = True
-    
-    def get_context(self) -> VideoContext:
-        """Get the detected video context"""
-        if not self.detection_complete and self.frame_analyses:
-            self._finalize_detection()
-        return self.context
-    
-    def force_context(self, camera_view: CameraView, water_position: WaterPosition) -> None:
-        """Manually override detected context"""
-        self.context.camera_view = camera_view
-        self.context.water_position = water_position
-        self.context.confidence = 1.0  # Manual = 100% confidence
-        self.detection_complete = True
+        analyze_video(input_path, analyzer,
+                      progress_callback=lambda done, _total: reporter.tick(done),
+                      live_callback=lambda live: render_live_summary(live_placeholder, live),
+                      frame_callback=writer.write if writer is not None else None)
+        reporter.finish()
+        live_placeholder.empty()
 
+        gallery = extract_key_frames(input_path, analyzer)
 
-def get_metrics_for_context(context: VideoContext) -> Dict:
-    """Return metric configurations based on video context"""
-    
-    base_metrics = {
-        'stroke_rate': True,
-        'breathing': True,
-    }
-    
-    if context.camera_view == CameraView.SIDE:
-        if context.water_position == WaterPosition.UNDERWATER:
-            return {
-                **base_metrics,
-                'evf': True,
-                'body_alignment': True,
-                'vertical_drop': True,
-                'kick_depth': True,
-                'stroke_phase': True,
-                'torso_lean': True,
-                'dropped_elbow': True,
-                # Not available in this view
-                'body_roll': False,  # Need front view for accurate roll
-                'hand_entry_width': False,
-            }
-        else:  # Above water
-            return {
-                **base_metrics,
-                'recovery_arm': True,
-                'head_position': True,
-                'breathing_timing': True,
-                # Limited underwater metrics
-                'evf': False,
-                'body_alignment': False,
-                'kick_depth': False,
-            }
-    
-    elif context.camera_view == CameraView.FRONT:
-        if context.water_position == WaterPosition.UNDERWATER:
-            return {
-                **base_metrics,
-                'body_roll': True,
-                'hand_entry_width': True,
-                'kick_symmetry': True,
-                'streamline': True,
-                # Not available in front view
-                'evf': False,
-                'body_alignment': False,
-            }
-        else:
-            return {
-                **base_metrics,
-                'entry_angle': True,
-                'breathing_side': True,
-                'catch_width': True,
-            }
-    
-    elif context.camera_view == CameraView.TOP:
-        return {
-            **base_metrics,
-            'body_roll': True,
-            'stroke_symmetry': True,
-            'kick_width': True,
-        }
-    
-    # Unknown - provide basic metrics only
-    return base_metrics
+        video_bytes = None
+        if writer is not None:
+            writer.release()
+            writer = None
 
-# ─────────────────────────────────────────────
-# VISUAL PANELS - Enhanced
-# ─────────────────────────────────────────────
+            # Re-encode to H.264 for web compatibility
+            st.markdown("### 🎥 Finalizing Video")
+            encoding_status = st.empty()
+            encoding_status.text("🔄 Converting to web-compatible format...")
 
-def draw_simplified_silhouette(frame, x, y, color=(180,180,180), th=3):
-    """Draw a simple stick figure silhouette"""
-    cv2.circle(frame, (x, y-50), 18, color, th)
-    cv2.line(frame, (x, y-32), (x, y+70), color, th+2)
-    cv2.line(frame, (x, y-10), (x-45, y+30), color, th)
-    cv2.line(frame, (x, y-10), (x+45, y+30), color, th)
-    cv2.line(frame, (x, y+70), (x-35, y+130), color, th)
-    cv2.line(frame, (x, y+70), (x+35, y+130), color, th)
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as tmp_out:
+                out_path = tmp_out.name
+            error = encode_web_mp4(temp_raw_path, out_path)
+            if error:
+                encoding_status.warning(f"⚠️ FFmpeg conversion failed: {error}. Using original format.")
+            else:
+                encoding_status.text("✅ Video saved as native MP4 (ready for playback)")
 
-def draw_technique_panel_enhanced(frame, origin_x, title, metrics_dict, phase, is_ideal=False, breath_side='N'):
-    """
-    Enhanced technique panel with separate alignment and EVF indicators
-    (Silhouette removed for cleaner video output)
-    """
-    h, w = frame.shape[:2]
-    px, py = origin_x - 160, 30
-    pw, ph = 320, 380  # Reduced height since silhouette removed
-    
-    # Semi-transparent background
-    ov = frame.copy()
-    cv2.rectangle(ov, (px, py), (px+pw, py+ph), (0,0,0), -1)
-    cv2.addWeighted(ov, 0.65, frame, 0.35, 0, frame)
+            # READ VIDEO BYTES BEFORE DELETING FILES
+            with open(out_path, 'rb') as f:
+                video_bytes = f.read()
 
-    # Title
-    cv2.putText(frame, title.upper(), (px+10, py+30), cv2.FONT_HERSHEY_SIMPLEX, 0.8,
-                (255,255,255) if not is_ideal else (200,200,255), 2)
+            # The input is only kept for deferred rendering
+            remove_files(input_path)
+            input_path = None
+    except BaseException:
+        # Includes Streamlit's StopException (Stop button): nothing of a failed run is kept
+        if input_path is not None:
+            remove_files(input_path)
+        raise
+    finally:
+        if writer is not None:
+            writer.release()
+        remove_files(*(p for p in (temp_raw_path, out_path) if p is not None))
 
-    y_offset = py + 55
-    
-    # 1. Horizontal Alignment Score
-    h_dev = metrics_dict.get('horizontal_deviation', 0)
-    h_color = get_zone_color(h_dev, DEFAULT_HORIZONTAL_DEV_GOOD, DEFAULT_HORIZONTAL_DEV_OK)
-    cv2.putText(frame, f"Alignment: {h_dev:.1f}°", (px+10, y_offset), 
-                cv2.FONT_HERSHEY_SIMPLEX, 0.6, h_color, 2)
-    # Visual indicator bar
-    bar_len = int(min(h_dev / 20, 1.0) * 100)
-    cv2.rectangle(frame, (px+180, y_offset-12), (px+180+bar_len, y_offset-2), h_color, -1)
-    y_offset += 30
-
-    # 2. EVF Score (during Pull/Push phases)
-    evf_angle = metrics_dict.get('evf_plane_angle', 0)
-    if phase in ("Pull", "Push"):
-        evf_color = get_zone_color(evf_angle, DEFAULT_EVF_ANGLE_GOOD, DEFAULT_EVF_ANGLE_OK)
-        cv2.putText(frame, f"EVF Angle: {evf_angle:.1f}°", (px+10, y_offset), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, evf_color, 2)
-        bar_len = int(min(evf_angle / 60, 1.0) * 100)
-        cv2.rectangle(frame, (px+180, y_offset-12), (px+180+bar_len, y_offset-2), evf_color, -1)
-    else:
-        cv2.putText(frame, "EVF: n/a (Recovery)", (px+10, y_offset), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (128, 128, 128), 2)
-    y_offset += 30
-
-    # 3. Torso Lean
-    torso = metrics_dict.get('torso_lean', 8)
-    tc = get_zone_color(abs(torso), DEFAULT_TORSO_GOOD, DEFAULT_TORSO_OK)
-    cv2.putText(frame, f"Torso Lean: {torso:.1f}°", (px+10, y_offset), 
-                cv2.FONT_HERSHEY_SIMPLEX, 0.6, tc, 2)
-    # Visual torso line
-    tlen = 60
-    tdx = tlen * math.sin(math.radians(torso))
-    tdy = tlen * math.cos(math.radians(torso))
-    cv2.line(frame, (px+250, y_offset+20), (int(px+250+tdx), int(py+y_offset+20+tdy)), tc, 4)
-    y_offset += 35
-
-    # 4. Body Roll
-    roll = metrics_dict.get('body_roll', 45)
-    rc = get_zone_color(roll, DEFAULT_ROLL_GOOD, DEFAULT_ROLL_OK)
-    cv2.putText(frame, f"Body Roll: {roll:.1f}°", (px+10, y_offset), 
-                cv2.FONT_HERSHEY_SIMPLEX, 0.6, rc, 2)
-    # Visual roll indicator
-    rdx = 50 * math.cos(math.radians(roll))
-    rdy = 50 * math.sin(math.radians(roll))
-    cv2.line(frame, (px+250, y_offset+10), (int(px+250+rdx), int(y_offset+10+rdy)), rc, 4)
-    y_offset += 35
-
-    # 5. Kick Depth (relative to hip-ankle span)
-    kick_depth = metrics_dict.get('kick_depth', 0.25)
-    kdc = get_zone_color(kick_depth, DEFAULT_KICK_DEPTH_GOOD, DEFAULT_KICK_DEPTH_OK)
-    cv2.putText(frame, f"Kick Depth: {kick_depth:.2f}", (px+10, y_offset), 
-                cv2.FONT_HERSHEY_SIMPLEX, 0.6, kdc, 2)
-    # Visual bar
-    bar_len = int(min(kick_depth / 0.5, 1.0) * 100)
-    cv2.rectangle(frame, (px+180, y_offset-12), (px+180+bar_len, y_offset-2), kdc, -1)
-    y_offset += 35
-
-    # 6. Kick Symmetry
-    kick_sym = metrics_dict.get('kick_symmetry', 0)
-    ksc = get_zone_color(kick_sym, (0, DEFAULT_KICK_SYM_MAX_GOOD), (0, 25))
-    cv2.putText(frame, f"Kick Sym: {kick_sym:.1f}°", (px+10, y_offset), 
-                cv2.FONT_HERSHEY_SIMPLEX, 0.6, ksc, 2)
-    y_offset += 35
-
-    # 7. Phase indicator with color coding
-    phase_colors = {
-        "Entry": (59, 130, 246),    # Blue
-        "Pull": (34, 197, 94),      # Green
-        "Push": (245, 158, 11),     # Amber
-        "Recovery": (107, 114, 128) # Gray
-    }
-    phase_color = phase_colors.get(phase, (200, 200, 200))
-    cv2.putText(frame, f"Phase: {phase}", (px+10, y_offset), 
-                cv2.FONT_HERSHEY_SIMPLEX, 0.6, phase_color, 2)
-    y_offset += 35
-
-    # 8. Breathing indicator with warning if during pull
-    breathing_during_pull = metrics_dict.get('breathing_during_pull', False)
-    if breath_side != 'N':
-        if breathing_during_pull:
-            bcolor = (0, 0, 255)  # Red warning
-            btxt = f"⚠ BREATH DURING PULL ({breath_side})"
-        else:
-            bcolor = (255,165,0) if breath_side == 'L' else (0,191,255)
-            btxt = f"Breath: {'Left' if breath_side == 'L' else 'Right'}"
-        cv2.putText(frame, btxt, (px+10, y_offset), cv2.FONT_HERSHEY_SIMPLEX, 0.55, bcolor, 2)
-    else:
-        cv2.putText(frame, "Breath: Neutral", (px+10, y_offset), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (180,180,180), 2)
-    y_offset += 35
+    results = build_analysis_results(analyzer, uploaded.name, total, fps, gallery, video_bytes, input_path)
+    analyzer.close()
+    return results
 
-    # Overall score at bottom
-    score = metrics_dict.get('score', 0)
-    score_color = (0, 255, 0) if score >= 70 else (0, 220, 220) if score >= 50 else (0, 0, 255)
-    cv2.putText(frame, f"Score: {score:.0f}/100", (px+10, y_offset), 
-                cv2.FONT_HERSHEY_SIMPLEX, 0.7, score_color, 2)
 
-    # Footer
-    stxt = "IDEAL REFERENCE" if is_ideal else "YOUR STROKE"
-    cv2.putText(frame, stxt, (px+10, py+ph-15), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (180,180,180), 1)
+@st.cache_resource
+def get_job_queue() -> JobQueue:
+    """Queue shared with `python -m swim_analysis.worker` (same SWIM_JOB_DIR)"""
+    return JobQueue(os.environ.get("SWIM_JOB_DIR", "swim_jobs"))
 
-def draw_overlay_zones(frame, lm_pixel, horizontal_dev, evf_angle, phase):
+
+def browser_token() -> Optional[str]:
     """
-    Draw color-coded overlay zones on the swimmer
-    Green = Good, Amber = OK, Red = Needs Work
+    Token of Streamlit's XSRF cookie: one per browser, kept across refreshes.
+    The cookie is re-masked on every page load ("2|mask|masked|time"), so
+    the mask is removed to get a stable value.
     """
-    h, w = frame.shape[:2]
-    
-    # Draw alignment line (shoulder-hip-ankle)
-    mid_shoulder = (
-        int((lm_pixel["left_shoulder"][0] + lm_pixel["right_shoulder"][0]) / 2),
-        int((lm_pixel["left_shoulder"][1] + lm_pixel["right_shoulder"][1]) / 2)
-    )
-    mid_hip = (
-        int((lm_pixel["left_hip"][0] + lm_pixel["right_hip"][0]) / 2),
-        int((lm_pixel["left_hip"][1] + lm_pixel["right_hip"][1]) / 2)
-    )
-    mid_ankle = (
-        int((lm_pixel["left_ankle"][0] + lm_pixel["right_ankle"][0]) / 2),
-        int((lm_pixel["left_ankle"][1] + lm_pixel["right_ankle"][1]) / 2)
-    )
-    
-    # Color based on alignment
-    align_color = get_zone_color(horizontal_dev, DEFAULT_HORIZONTAL_DEV_GOOD, DEFAULT_HORIZONTAL_DEV_OK)
-    # Draw body line
-    cv2.line(frame, mid_shoulder, mid_hip, align_color, 3)
-    cv2.line(frame, mid_hip, mid_ankle, align_color, 3)
-    
-    # Draw EVF indicator during pull/push
-    if phase in ("Pull", "Push"):
-        # Find the pulling arm (lower wrist)
-        if lm_pixel["left_wrist"][1] > lm_pixel["right_wrist"][1]:
-            elbow = (int(lm_pixel["left_elbow"][0]), int(lm_pixel["left_elbow"][1]))
-            wrist = (int(lm_pixel["left_wrist"][0]), int(lm_pixel["left_wrist"][1]))
-        else:
-            elbow = (int(lm_pixel["right_elbow"][0]), int(lm_pixel["right_elbow"][1]))
-            wrist = (int(lm_pixel["right_wrist"][0]), int(lm_pixel["right_wrist"][1]))
-        
-        evf_color = get_zone_color(evf_angle, DEFAULT_EVF_ANGLE_GOOD, DEFAULT_EVF_ANGLE_OK)
-        cv2.line(frame, elbow, wrist, evf_color, 4)
-        
-        # Draw ideal vertical line from elbow for reference
-        cv2.line(frame, elbow, (elbow[0], elbow[1] + 80), (100, 100, 100), 2, cv2.LINE_AA)
-
-# ─────────────────────────────────────────────
-# ANALYZER CLASS – Enhanced with new metrics
-# ─────────────────────────────────────────────
-
-class SwimAnalyzer:
-    # Use LITE model for faster downloads and sufficient accuracy for swimming analysis
-    # Heavy model: ~120MB, Lite model: ~8MB
-    MODEL_URL_LITE = "https://storage.googleapis.com/mediapipe-models/pose_landmarker/pose_landmarker_lite/float16/1/pose_landmarker_lite.task"
-    MODEL_URL_HEAVY = "https://storage.googleapis.com/mediapipe-models/pose_landmarker/pose_landmarker_heavy/float16/1/pose_landmarker_heavy.task"
-    MODEL_FILENAME_LITE = "pose_landmarker_lite.task"
-    MODEL_FILENAME_HEAVY = "pose_landmarker_heavy.task"
-    
-    # Default to lite for cloud deployment
-    USE_LITE_MODEL = True
-
-    def __init__(self, athlete: AthleteProfile, conf_thresh, yaw_thresh, 
-                 manual_camera_view: Optional[CameraView] = None,
-                 manual_water_position: Optional[WaterPosition] = None,
-                 use_heavy_model: bool = False):
-        self.athlete = athlete
-        self.conf_thresh = conf_thresh
-        self.yaw_thresh = yaw_thresh
-        self.use_heavy_model = use_heavy_model
-
-        self.landmarker = self._init_landmarker()
-        
-        # Video context detection
-        self.context_detector = VideoContextDetector()
-        self.video_context = VideoContext()
-        self.available_metrics = {}
-        
-        # Manual override if provided
-        if manual_camera_view and manual_water_position:
-            self.context_detector.force_context(manual_camera_view, manual_water_position)
-            self.video_context = self.context_detector.get_context()
-            self.available_metrics = get_metrics_for_context(self.video_context)
-
-        self.metrics: List[FrameMetrics] = []
-        self.stroke_times = []
-        self.breath_l = self.breath_r = 0
-        self.breath_side = 'N'
-        self.breath_persist = 0
-        self.last_breath = -1000
-        self.elbow_win = deque(maxlen=9)
-        self.time_win = deque(maxlen=9)
-        self.best_dev = float('inf')
-        self.worst_dev = -float('inf')
-        self.best_bytes = self.worst_bytes = None
-
-        # Smoothing buffers
-        self.torso_buffer = deque(maxlen=7)
-        self.forearm_buffer = deque(maxlen=7)
-        self.kick_depth_buffer = deque(maxlen=7)
-        self.horizontal_dev_buffer = deque(maxlen=7)
-        self.evf_buffer = deque(maxlen=7)
-        self.vertical_drop_buffer = deque(maxlen=7)
-        
-        # Track last timestamp and wrist position
-        self.last_timestamp_ms = -1
-        self.prev_wrist_y = None
-        
-        # Breathing during pull tracking
-        self.breaths_during_pull = 0
-        
-        # Dropped elbow tracking (only during Pull phase for catch analysis)
-        self.dropped_elbow_frames = 0
-        self.pull_phase_frames = 0
-        
-        # Glide tracking
-        self.glide_frames = 0
-
-    @st.cache_resource
-    @staticmethod
-    def _download_model(model_url: str, model_path: str, model_size: str):
-        """Download model with caching to avoid repeated downloads"""
-        if not os.path.exists(model_path):
-            st.info(f"⏳ First run: Downloading MediaPipe Pose model ({model_size})...")
-            try:
-                urllib.request.urlretrieve(model_url, model_path)
-                st.success("✅ Model downloaded successfully!")
-            except Exception as e:
-                st.error(f"Failed to download model: {e}")
-                raise
-        return model_path
-
-    def _init_landmarker(self):
-        if not MEDIAPIPE_TASKS_AVAILABLE:
-            raise RuntimeError("MediaPipe Tasks not available")
-
-        # Choose model based on setting
-        if self.use_heavy_model:
-            model_url = self.MODEL_URL_HEAVY
-            model_filename = self.MODEL_FILENAME_HEAVY
-            model_size = "~120 MB - may take a minute"
-        else:
-            model_url = self.MODEL_URL_LITE
-            model_filename = self.MODEL_FILENAME_LITE
-            model_size = "~8 MB"
-        
-        # Download with caching
-        model_path = SwimAnalyzer._download_model(model_url, model_filename, model_size)
-
-        base_options = python.BaseOptions(
-            model_asset_path=model_path,
-            delegate=python.BaseOptions.Delegate.CPU
-        )
-        options = vision.PoseLandmarkerOptions(
-            base_options=base_options,
-            running_mode=vision.RunningMode.VIDEO,
-            num_poses=1,
-            min_pose_detection_confidence=0.5,
-            min_pose_presence_confidence=0.5,
-            min_tracking_confidence=0.5,
-            output_segmentation_masks=False
-        )
-        return vision.PoseLandmarker.create_from_options(options)
-
-    def process(self, frame, t, timestamp_ms, fps=30.0):
-        """
-        Process a frame with pose detection.
-        
-        Args:
-            frame: BGR image frame
-            t: Real time in seconds (for metrics/stroke timing)
-            timestamp_ms: Monotonically increasing timestamp in milliseconds for MediaPipe
-            fps: Frames per second for velocity calculations
-        """
-        if self.landmarker is None:
-            return frame, None
-
-        # Ensure timestamp is strictly increasing
-        if timestamp_ms <= self.last_timestamp_ms:
-            timestamp_ms = self.last_timestamp_ms + 1
-        self.last_timestamp_ms = timestamp_ms
-
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb)
-
-        result = self.landmarker.detect_for_video(mp_image, timestamp_ms)
-
-        if not result.pose_landmarks:
-            # Analyze frame for context detection (even without landmarks)
-            if not self.context_detector.detection_complete:
-                self.context_detector.analyze_frame(frame, None)
-                # Check if detection just completed
-                if self.context_detector.detection_complete:
-                    self.video_context = self.context_detector.get_context()
-                    self.available_metrics = get_metrics_for_context(self.video_context)
-            return frame, None
-
-        landmarks = result.pose_landmarks[0]
-        h, w = frame.shape[:2]
-
-        landmark_names = [
-            "nose", "left_shoulder", "right_shoulder", "left_elbow", "right_elbow",
-            "left_wrist", "right_wrist", "left_hip", "right_hip",
-            "left_knee", "right_knee", "left_ankle", "right_ankle"
-        ]
-        indices = [0, 11, 12, 13, 14, 15, 16, 23, 24, 25, 26, 27, 28]
-
-        lm_pixel = {}
-        vis_sum = 0.0
-        vis_count = 0
-
-        for name, idx in zip(landmark_names, indices):
-            lm = landmarks[idx]
-            lm_pixel[name] = (lm.x * w, lm.y * h)
-            vis_sum += lm.visibility
-            vis_count += 1
-
-        conf = vis_sum / vis_count if vis_count > 0 else 0.0
-        
-        # === POSE VALIDATION ===
-        # Reject false positives where MediaPipe detects pool lane markings as a person
-        # A valid human pose should have:
-        # 1. Reasonable body proportions (not too stretched or compressed)
-        # 2. Shoulder width > 0 (not a single line)
-        # 3. Body parts in realistic relative positions
-        # 4. NOT be a pool floor marking (dark blue in bottom of frame)
-        
-        def validate_pose(lm_pixel, frame_bgr, frame_h, frame_w):
-            """Validate that detected pose is actually a human, not a pool lane marking"""
-            try:
-                # Get key measurements
-                left_shoulder = np.array(lm_pixel["left_shoulder"])
-                right_shoulder = np.array(lm_pixel["right_shoulder"])
-                left_hip = np.array(lm_pixel["left_hip"])
-                right_hip = np.array(lm_pixel["right_hip"])
-                nose = np.array(lm_pixel["nose"])
-                left_ankle = np.array(lm_pixel["left_ankle"])
-                right_ankle = np.array(lm_pixel["right_ankle"])
-                
-                # 1. Shoulder width should be reasonable (not near zero)
-                shoulder_width = np.linalg.norm(left_shoulder - right_shoulder)
-                min_shoulder_width = min(frame_w, frame_h) * 0.02  # At least 2% of frame
-                if shoulder_width < min_shoulder_width:
-                    return False, "shoulders too narrow"
-                
-                # 2. Hip width should be reasonable
-                hip_width = np.linalg.norm(left_hip - right_hip)
-                if hip_width < min_shoulder_width * 0.5:
-                    return False, "hips too narrow"
-                
-                # 3. Torso length should be reasonable
-                mid_shoulder = (left_shoulder + right_shoulder) / 2
-                mid_hip = (left_hip + right_hip) / 2
-                torso_length = np.linalg.norm(mid_shoulder - mid_hip)
-                
-                # Torso should be at least as long as shoulder width (roughly)
-                if torso_length < shoulder_width * 0.3:
-                    return False, "torso too short"
-                
-                # 4. Body shouldn't be extremely elongated (like a lane line)
-                body_height = max(
-                    np.linalg.norm(nose - mid_hip),
-                    torso_length
-                )
-                body_width = max(shoulder_width, hip_width)
-                
-                aspect_ratio = body_height / (body_width + 1)
-                if aspect_ratio > 15:
-                    return False, "too elongated"
-                
-                # 5. Nose should be reasonably close to shoulders
-                nose_to_shoulders = np.linalg.norm(nose - mid_shoulder)
-                if nose_to_shoulders > torso_length * 3:
-                    return False, "head too far from body"
-                
-                # 6. All key points should be within frame bounds
-                margin = 0.1
-                for name, (x, y) in lm_pixel.items():
-                    if x < -frame_w * margin or x > frame_w * (1 + margin):
-                        return False, f"{name} out of frame horizontally"
-                    if y < -frame_h * margin or y > frame_h * (1 + margin):
-                        return False, f"{name} out of frame vertically"
-                
-                # === POOL FLOOR MARKING DETECTION ===
-                # Pool floor markings are:
-                # - Located in bottom portion of frame (in above-water footage)
-                # - Dark blue/teal colored (not skin tones)
-                
-                # 7. Check if all major body points are in bottom 60% of frame
-                all_points = [nose, left_shoulder, right_shoulder, mid_hip, left_ankle, right_ankle]
-                points_in_bottom = sum(1 for p in all_points if p[1] > frame_h * 0.4)
-                
-                if points_in_bottom >= 5:  # Most points in bottom portion
-                    # Sample colors around the detected "body"
-                    all_x = [p[0] for p in all_points]
-                    all_y = [p[1] for p in all_points]
-                    min_x = max(0, int(min(all_x)) - 10)
-                    max_x = min(frame_w-1, int(max(all_x)) + 10)
-                    min_y = max(0, int(min(all_y)) - 10)
-                    max_y = min(frame_h-1, int(max(all_y)) + 10)
-                    
-                    if max_x > min_x + 20 and max_y > min_y + 20:
-                        roi = frame_bgr[min_y:max_y, min_x:max_x]
-                        
-                        if roi.size > 100:
-                            hsv_roi = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
-                            
-                            # Check for dark pool marking colors (dark blue/teal tiles)
-                            lower_pool_mark = np.array([85, 30, 20])
-                            upper_pool_mark = np.array([135, 255, 140])
-                            pool_mark_mask = cv2.inRange(hsv_roi, lower_pool_mark, upper_pool_mark)
-                            pool_mark_ratio = np.sum(pool_mark_mask > 0) / (roi.shape[0] * roi.shape[1])
-                            
-                            # Check for skin tones
-                            lower_skin = np.array([0, 20, 70])
-                            upper_skin = np.array([25, 150, 255])
-                            skin_mask = cv2.inRange(hsv_roi, lower_skin, upper_skin)
-                            skin_ratio = np.sum(skin_mask > 0) / (roi.shape[0] * roi.shape[1])
-                            
-                            # If mostly dark pool marking color and very little skin = reject
-                            if pool_mark_ratio > 0.25 and skin_ratio < 0.08:
-                                return False, "pool floor marking detected"
-                            
-                            # Check for cyan/teal water color (pool water around marking)
-                            lower_water = np.array([80, 30, 100])
-                            upper_water = np.array([110, 255, 255])
-                            water_mask = cv2.inRange(hsv_roi, lower_water, upper_water)
-                            water_ratio = np.sum(water_mask > 0) / (roi.shape[0] * roi.shape[1])
-                            
-                            # If very high water color + pool marking and no skin = floor marking
-                            if (water_ratio + pool_mark_ratio) > 0.7 and skin_ratio < 0.05:
-                                return False, "pool floor marking (water + marking colors)"
-                
-                # 8. Check minimum body size relative to frame
-                body_area = body_width * body_height
-                frame_area = frame_w * frame_h
-                body_ratio = body_area / frame_area
-                
-                if body_ratio < 0.003:  # Less than 0.3% of frame = too small
-                    return False, "detected body too small"
-                
-                return True, "valid"
-                
-            except Exception as e:
-                return False, f"validation error: {e}"
-        
-        is_valid_pose, validation_reason = validate_pose(lm_pixel, frame, h, w)
-        if not is_valid_pose:
-            # Not a valid human pose - skip this frame
-            return frame, None
-        
-        # Continue context detection with landmarks
-        was_complete = self.context_detector.detection_complete
-        if not was_complete:
-            self.context_detector.analyze_frame(frame, lm_pixel)
-            
-            # Update context once detection completes
-            if self.context_detector.detection_complete:
-                self.video_context = self.context_detector.get_context()
-                self.available_metrics = get_metrics_for_context(self.video_context)
-        
-        if conf < self.conf_thresh:
-            return frame, None
-
-        # Check for inverted video (upside-down footage)
-        # CRITICAL FIX: Do NOT flip above-water footage!
-        # Above-water footage perspective is always correct from the viewer's standpoint.
-        # Only consider flipping for confirmed UNDERWATER footage where camera might be inverted.
-        is_inverted = False
-        
-        # ONLY consider flipping if we have HIGH CONFIDENCE that this is underwater footage
-        # AND the pose clearly indicates inversion
-        is_confirmed_underwater = (
-            self.context_detector.detection_complete and 
-            self.video_context.water_position == WaterPosition.UNDERWATER and
-            self.video_context.confidence > 0.7
-        )
-        
-        # IMPROVED INVERTED DETECTION
-        if is_confirmed_underwater:
-            # Get average positions
-            avg_hip_y = (lm_pixel["left_hip"][1] + lm_pixel["right_hip"][1]) / 2
-            avg_shoulder_y = (lm_pixel["left_shoulder"][1] + lm_pixel["right_shoulder"][1]) / 2
-            
-            # Calculate torso height for threshold
-            torso_height = abs(avg_hip_y - avg_shoulder_y)
-            
-            # Only consider inverted if hips are VERY significantly above shoulders
-            # (more than 50% of torso height, to be very conservative)
-            hips_above_shoulders = avg_hip_y < avg_shoulder_y - torso_height * 0.65
-            # Additional check: ankles should be above hips in inverted footage
-            avg_ankle_y = (lm_pixel["left_ankle"][1] + lm_pixel["right_ankle"][1]) / 2
-            ankles_above_hips = avg_ankle_y < avg_hip_y - 30
-            # Additional check: nose should be well below shoulders in inverted footage
-            head_below_shoulders = False
-            if "nose" in lm_pixel:
-                head_below_shoulders = lm_pixel["nose"][1] > avg_shoulder_y + torso_height * 0.4
-            
-            # Require ALL conditions for flipping
-            is_inverted = hips_above_shoulders and ankles_above_hips and head_below_shoulders
-        
-        if is_inverted:
-            frame = cv2.flip(frame, -1)
-            try:
-                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb)
-                
-                self.last_timestamp_ms += 1
-                result = self.landmarker.detect_for_video(mp_image, self.last_timestamp_ms)
-                
-                if result.pose_landmarks:
-                    landmarks = result.pose_landmarks[0]
-                    for name, idx in zip(landmark_names, indices):
-                        lm = landmarks[idx]
-                        lm_pixel[name] = (lm.x * w, lm.y * h)
-                # If no landmarks after flip, continue with flipped coordinates
-                # (just invert the Y coordinates of existing landmarks)
-                else:
-                    for name in lm_pixel:
-                        x, y = lm_pixel[name]
-                        lm_pixel[name] = (w - x, h - y)
-            except Exception:
-                # If re-detection fails, just use flipped coordinates
-                for name in lm_pixel:
-                    x, y = lm_pixel[name]
-                    lm_pixel[name] = (w - x, h - y)
-
-        # Calculate basic metrics
-        elbow = min(
-            calculate_angle(lm_pixel["left_shoulder"], lm_pixel["left_elbow"], lm_pixel["left_wrist"]),
-            calculate_angle(lm_pixel["right_shoulder"], lm_pixel["right_elbow"], lm_pixel["right_wrist"])
-        )
-
-        roll = abs(math.degrees(math.atan2(
-            lm_pixel["left_shoulder"][1] - lm_pixel["right_shoulder"][1],
-            lm_pixel["left_shoulder"][0] - lm_pixel["right_shoulder"][0]
-        )))
-
-        knee_l = calculate_angle(lm_pixel["left_hip"], lm_pixel["left_knee"], lm_pixel["left_ankle"])
-        knee_r = calculate_angle(lm_pixel["right_hip"], lm_pixel["right_knee"], lm_pixel["right_ankle"])
-        kick_sym = abs(knee_l - knee_r)
-
-        symmetry_hips = abs(lm_pixel["left_hip"][0] - lm_pixel["right_hip"][0]) / w * 100
-
-        # NEW: Enhanced phase detection with wrist velocity
-        phase, wrist_velocity_y, current_wrist_y = detect_phase_enhanced(
-            lm_pixel, elbow, self.prev_wrist_y, fps
-        )
-        self.prev_wrist_y = current_wrist_y
-
-        # NEW: Calculate horizontal deviation (body alignment) - now returns tuple
-        horizontal_dev_raw, vertical_drop_raw, alignment_status = compute_horizontal_deviation(lm_pixel)
-        
-        # NEW: Calculate EVF plane angle - now returns tuple with dropped elbow detection
-        evf_angle_raw, is_dropped_elbow, evf_status = compute_evf_plane_angle(lm_pixel)
-        
-        # NEW: Calculate kick depth relative to hip-ankle span
-        kick_depth_raw = compute_kick_depth_relative(lm_pixel)
-
-        # Breathing detection
-        yaw = 0
-        if "nose" in lm_pixel:
-            mid_s = (lm_pixel["left_shoulder"][0] + lm_pixel["right_shoulder"][0]) / 2
-            shoulder_width = abs(lm_pixel["right_shoulder"][0] - lm_pixel["left_shoulder"][0])
-            if shoulder_width > 0:
-                yaw = (lm_pixel["nose"][0] - mid_s) / shoulder_width
-
-        breathing_during_pull = False
-        if abs(yaw) > self.yaw_thresh:
-            side = 'R' if yaw > 0 else 'L'
-            if side == self.breath_side:
-                self.breath_persist += 1
-            else:
-                self.breath_persist = 1
-                self.breath_side = side
-            if self.breath_persist >= MIN_BREATH_HOLD_FRAMES and t - self.last_breath >= MIN_BREATH_GAP_S:
-                if side == 'L': 
-                    self.breath_l += 1
-                else: 
-                    self.breath_r += 1
-                self.last_breath = t
-                
-                # NEW: Check if breathing during pull phase
-                if phase == "Pull":
-                    breathing_during_pull = True
-                    self.breaths_during_pull += 1
-
-        # Stroke detection
-        self.elbow_win.append(elbow)
-        self.time_win.append(t)
-        if len(self.elbow_win) >= 9 and detect_local_minimum(list(self.elbow_win)):
-            ct = self.time_win[4]
-            if not self.stroke_times or ct - self.stroke_times[-1] >= 0.5:
-                self.stroke_times.append(ct)
-
-        # Calculate legacy metrics for compatibility
-        torso_raw = compute_torso_lean(lm_pixel)
-        forearm_raw = compute_forearm_vertical(lm_pixel)
-
-        # Smooth all metrics
-        self.torso_buffer.append(torso_raw)
-        self.forearm_buffer.append(forearm_raw)
-        self.kick_depth_buffer.append(kick_depth_raw)
-        self.horizontal_dev_buffer.append(horizontal_dev_raw)
-        self.evf_buffer.append(evf_angle_raw)
-        self.vertical_drop_buffer.append(vertical_drop_raw)
-
-        torso = statistics.mean(self.torso_buffer) if self.torso_buffer else torso_raw
-        forearm = statistics.mean(self.forearm_buffer) if self.forearm_buffer else forearm_raw
-        kick_depth = statistics.mean(self.kick_depth_buffer) if self.kick_depth_buffer else kick_depth_raw
-        horizontal_dev = statistics.mean(self.horizontal_dev_buffer) if self.horizontal_dev_buffer else horizontal_dev_raw
-        evf_angle = statistics.mean(self.evf_buffer) if self.evf_buffer else evf_angle_raw
-        vertical_drop = statistics.mean(self.vertical_drop_buffer) if self.vertical_drop_buffer else vertical_drop_raw
-        roll_abs = abs(roll)
-        
-        # Track dropped elbow ONLY during Pull phase (the catch)
-        # Dropped elbow is primarily a catch problem - during push the elbow naturally drops
-        # Also only count when elbow angle is in catch range (>100°)
-        if phase == "Pull" and elbow > 100:
-            self.pull_phase_frames += 1
-            if is_dropped_elbow:
-                self.dropped_elbow_frames += 1
-
-        # Draw landmarks
-        for lm in landmarks:
-            x, y = int(lm.x * w), int(lm.y * h)
-            cv2.circle(frame, (x, y), 3, (0, 255, 128), -1)
-
-        # NEW: Draw color-coded overlay zones
-        draw_overlay_zones(frame, lm_pixel, horizontal_dev, evf_angle, phase)
-
-        # Calculate sub-scores
-        # Alignment score (0-100)
-        if horizontal_dev <= DEFAULT_HORIZONTAL_DEV_GOOD[1]:
-            alignment_score = 100
-        elif horizontal_dev <= DEFAULT_HORIZONTAL_DEV_OK[1]:
-            alignment_score = 100 - ((horizontal_dev - DEFAULT_HORIZONTAL_DEV_GOOD[1]) / 
-                                     (DEFAULT_HORIZONTAL_DEV_OK[1] - DEFAULT_HORIZONTAL_DEV_GOOD[1]) * 30)
-        else:
-            alignment_score = max(0, 70 - (horizontal_dev - DEFAULT_HORIZONTAL_DEV_OK[1]) * 2)
-
-        # EVF score (only during Pull/Push)
-        if phase in ("Pull", "Push"):
-            if evf_angle <= DEFAULT_EVF_ANGLE_GOOD[1]:
-                evf_score = 100
-            elif evf_angle <= DEFAULT_EVF_ANGLE_OK[1]:
-                evf_score = 100 - ((evf_angle - DEFAULT_EVF_ANGLE_GOOD[1]) / 
-                                   (DEFAULT_EVF_ANGLE_OK[1] - DEFAULT_EVF_ANGLE_GOOD[1]) * 30)
-            else:
-                evf_score = max(0, 70 - (evf_angle - DEFAULT_EVF_ANGLE_OK[1]))
-        else:
-            evf_score = 100  # Don't penalize during recovery
-
-        # Calculate overall score with new components
-        # Weight distribution: Alignment 25%, EVF 25%, Roll 15%, Kick 15%, Torso 10%, Breathing 10%
-        
-        # Roll score
-        if DEFAULT_ROLL_GOOD[0] <= roll_abs <= DEFAULT_ROLL_GOOD[1]:
-            roll_score = 100
-        elif DEFAULT_ROLL_OK[0] <= roll_abs <= DEFAULT_ROLL_OK[1]:
-            roll_score = 80
-        else:
-            roll_score = max(0, 60 - abs(roll_abs - 45))
-
-        # Kick score
-        kick_sym_score = max(0, 100 - (kick_sym / DEFAULT_KICK_SYM_MAX_GOOD * 30))
-        if DEFAULT_KICK_DEPTH_GOOD[0] <= kick_depth <= DEFAULT_KICK_DEPTH_GOOD[1]:
-            kick_depth_score = 100
-        elif DEFAULT_KICK_DEPTH_OK[0] <= kick_depth <= DEFAULT_KICK_DEPTH_OK[1]:
-            kick_depth_score = 80
-        else:
-            kick_depth_score = 60
-        kick_score = (kick_sym_score + kick_depth_score) / 2
-
-        # Torso score
-        if DEFAULT_TORSO_GOOD[0] <= abs(torso) <= DEFAULT_TORSO_GOOD[1]:
-            torso_score = 100
-        elif DEFAULT_TORSO_OK[0] <= abs(torso) <= DEFAULT_TORSO_OK[1]:
-            torso_score = 80
-        else:
-            torso_score = 60
-
-        # NEW: Breathing penalty
-        breath_penalty = BREATH_PULL_PENALTY if breathing_during_pull else 0
-        
-        # NEW: Compute glide metrics - IMPROVED
-        is_gliding, glide_score, arm_extension = compute_glide_metrics(
-            lm_pixel, phase, elbow, horizontal_dev
-        )
-        
-        # Track glide frames
-        if is_gliding:
-            self.glide_frames += 1
-
-        # Weighted overall score (updated to include glide)
-        # Weight distribution: Alignment 20%, EVF 20%, Roll 15%, Kick 15%, Torso 10%, Glide 10%, Breathing 10%
-        score = (
-            alignment_score * 0.20 +
-            evf_score * 0.20 +
-            roll_score * 0.15 +
-            kick_score * 0.15 +
-            torso_score * 0.10 +
-            (glide_score if is_gliding else 70) * 0.10 +  # Glide score or neutral
-            100 * 0.10  # Base breathing score
-        ) - breath_penalty
-
-        score = max(0, min(100, score))
-
-        # Prepare metrics dict for panel
-        metrics_dict = {
-            'horizontal_deviation': horizontal_dev,
-            'evf_plane_angle': evf_angle,
-            'torso_lean': torso,
-            'body_roll': roll_abs,
-            'kick_depth': kick_depth,
-            'kick_symmetry': kick_sym,
-            'breathing_during_pull': breathing_during_pull,
-            'score': score,
-            'is_gliding': is_gliding,
-            'glide_score': glide_score
-        }
-
-        # Draw enhanced technique panels
-        draw_technique_panel_enhanced(frame, w-180, "YOUR STROKE", metrics_dict, phase, False, self.breath_side)
-        
-        # Ideal reference values
-        ideal_metrics = {
-            'horizontal_deviation': 3.0,
-            'evf_plane_angle': 15.0,
-            'torso_lean': 8.0,
-            'body_roll': 45.0,
-            'kick_depth': 0.25,
-            'kick_symmetry': 5.0,
-            'breathing_during_pull': False,
-            'score': 95,
-            'is_gliding': True,
-            'glide_score': 90
-        }
-        draw_technique_panel_enhanced(frame, 180, "IDEAL REFERENCE", ideal_metrics, "Pull", True, 'N')
-
-        # Track best/worst frames during Pull phase
-        if phase == "Pull":
-            dev = abs(elbow - 110) + horizontal_dev + evf_angle * 0.5
-            if dev < self.best_dev:
-                self.best_dev = dev
-                _, buf = cv2.imencode('.jpg', frame)
-                self.best_bytes = buf.tobytes()
-            if dev > self.worst_dev:
-                self.worst_dev = dev
-                _, buf = cv2.imencode('.jpg', frame)
-                self.worst_bytes = buf.tobytes()
-
-        # Store metrics
-        metrics = FrameMetrics(
-            time_s=t,
-            elbow_angle=elbow,
-            knee_left=knee_l,
-            knee_right=knee_r,
-            kick_symmetry=kick_sym,
-            kick_depth_proxy=kick_depth,
-            symmetry_hips=symmetry_hips,
-            score=score,
-            body_roll=roll_abs,
-            torso_lean=torso,
-            forearm_vertical=forearm,
-            phase=phase,
-            breath_state=self.breath_side if self.breath_side != 'N' else "-",
-            confidence=conf,
-            horizontal_deviation=horizontal_dev,
-            vertical_drop=vertical_drop,
-            evf_plane_angle=evf_angle,
-            is_dropped_elbow=is_dropped_elbow,
-            evf_status=evf_status,
-            alignment_status=alignment_status,
-            wrist_velocity_y=wrist_velocity_y,
-            alignment_score=alignment_score,
-            evf_score=evf_score,
-            breathing_during_pull=breathing_during_pull,
-            is_gliding=is_gliding,
-            glide_score=glide_score,
-            arm_extension=arm_extension
-        )
-        self.metrics.append(metrics)
-
-        return frame, score
-
-    def close(self):
-        if hasattr(self, 'landmarker') and self.landmarker:
-            self.landmarker.close()
-
-    def get_summary(self):
-        if not self.metrics:
-            return SessionSummary(0,0,0,0,0,0,0,0,0,0,0,"No data",1.0,None,None)
-        
-        # Ensure video context is finalized
-        if not self.context_detector.detection_complete:
-            self.video_context = self.context_detector.get_context()
-            self.available_metrics = get_metrics_for_context(self.video_context)
+    cookie = (st.context.cookies.get("_streamlit_xsrf") or "").strip("\"'")
+    parts = cookie.split("|")
+    if len(parts) != 4 or parts[0] != "2":
+        return cookie or None
+    try:
+        mask, masked = bytes.fromhex(parts[1]), bytes.fromhex(parts[2])
+    except ValueError:
+        return None
+    return bytes(b ^ mask[i % 4] for i, b in enumerate(masked)).hex()
+
+
+def queue_owner() -> str:
+    """
+    Fair-share identity of this user in the job queue, stable across
+    refreshes and shared by their tabs: the login when authentication is
+    configured, else the browser's XSRF token (see browser_token), else the
+    client IP (hashed - only used for grouping). Without any of these the share
+    falls back to one per browser session.
+    """
+    user = st.user.to_dict()
+    if user.get("is_logged_in"):
+        identity = f"user:{user.get('email') or user.get('sub')}"
+    elif browser_token():
+        identity = f"browser:{browser_token()}"
+    elif st.context.ip_address:
+        identity = f"ip:{st.context.ip_address}"
+    else:
+        return st.session_state.setdefault("queue_owner", uuid.uuid4().hex)
+    return hashlib.sha256(identity.encode()).hexdigest()[:32]
 
-        d = self.metrics[-1].time_s
-        high_conf_metrics = [m for m in self.metrics if m.confidence >= DEFAULT_CONF_THRESHOLD]
-        
-        if not high_conf_metrics:
-            high_conf_metrics = self.metrics
-
-        scores = [m.score for m in high_conf_metrics]
-        rolls = [m.body_roll for m in high_conf_metrics]
-        ksyms = [m.kick_symmetry for m in high_conf_metrics]
-        kdepths = [m.kick_depth_proxy for m in high_conf_metrics]
-        confs = [m.confidence for m in self.metrics]
-        h_devs = [m.horizontal_deviation for m in high_conf_metrics]
-        v_drops = [m.vertical_drop for m in high_conf_metrics]
-        evf_angles = [m.evf_plane_angle for m in high_conf_metrics if m.phase in ("Pull", "Push")]
-        alignment_scores = [m.alignment_score for m in high_conf_metrics]
-        evf_scores = [m.evf_score for m in high_conf_metrics if m.phase in ("Pull", "Push")]
-
-        # Stroke rate calculation
-        sr = 0
-        if len(self.stroke_times) >= 2:
-            dur = self.stroke_times[-1] - self.stroke_times[0]
-            if dur > 0.1: 
-                sr = 60 * (len(self.stroke_times)-1) / dur
-
-        bpm = (self.breath_l + self.breath_r) / (d/60) if d > 0 else 0
-
-        avg_kick_sym = statistics.mean(ksyms) if ksyms else 0
-        avg_kick_depth = statistics.mean(kdepths) if kdepths else 0
-        
-        # Determine kick status
-        kick_sym_ok = avg_kick_sym < DEFAULT_KICK_SYM_MAX_GOOD
-        kick_depth_ok = DEFAULT_KICK_DEPTH_GOOD[0] < avg_kick_depth < DEFAULT_KICK_DEPTH_GOOD[1]
-        if kick_sym_ok and kick_depth_ok:
-            kick_status = "Good"
-        elif kick_sym_ok or kick_depth_ok:
-            kick_status = "OK"
-        else:
-            kick_status = "Needs Work"
 
-        # Calculate dropped elbow percentage
-        dropped_elbow_pct = (self.dropped_elbow_frames / self.pull_phase_frames * 100) if self.pull_phase_frames > 0 else 0
-        
-        # Calculate averages
-        avg_h_dev = statistics.mean(h_devs) if h_devs else 0
-        avg_v_drop = statistics.mean(v_drops) if v_drops else 0
-        avg_evf = statistics.mean(evf_angles) if evf_angles else 0
-        avg_roll = statistics.mean(rolls) if rolls else 0
-
-        # Generate diagnostics - prioritized by importance
-        diagnostics = []
-        
-        # 1. DROPPED ELBOW - Most critical EVF issue
-        if dropped_elbow_pct > 50:
-            diagnostics.append(f"🚨 DROPPED ELBOW detected in {dropped_elbow_pct:.0f}% of catch frames - this is your #1 priority! Keep elbow HIGH and above wrist during the catch.")
-        elif dropped_elbow_pct > 20:
-            diagnostics.append(f"⚠️ Dropped elbow detected in {dropped_elbow_pct:.0f}% of catch frames - focus on 'elbow up' cue during entry and catch.")
-        
-        # 2. VERTICAL DROP / SINKING - Critical for drag
-        if avg_v_drop > 15:
-            diagnostics.append("🚨 SINKING HIPS/LEGS - your lower body is dragging. Focus on: head position (look down), core engagement, and kick from hips.")
-        elif avg_v_drop > 8:
-            diagnostics.append("⚠️ Slight hip drop detected - engage core and press chest down slightly to lift hips.")
-        
-        # 3. Horizontal alignment (lateral)
-        if avg_h_dev > DEFAULT_HORIZONTAL_DEV_OK[1]:
-            diagnostics.append("⚠️ Body alignment deviation - you may be 'snake swimming'. Focus on rotating around your spine axis.")
-        
-        # 4. EVF angle (if not already flagged for dropped elbow)
-        if dropped_elbow_pct <= 20:
-            if avg_evf > DEFAULT_EVF_ANGLE_OK[1]:
-                diagnostics.append("⚠️ EVF needs work - focus on 'fingertips down, elbow up' during the catch.")
-            elif avg_evf > DEFAULT_EVF_ANGLE_GOOD[1]:
-                diagnostics.append("💡 EVF is OK - work on reaching forward then dropping fingertips before pulling.")
-
-        # 5. Breathing during pull
-        if self.breaths_during_pull > 0:
-            diagnostics.append(f"⚠️ {self.breaths_during_pull} breath(s) during pull phase - breathe during recovery to maintain EVF.")
-
-        # 6. Body roll
-        if avg_roll < DEFAULT_ROLL_GOOD[0]:
-            diagnostics.append("💡 Body roll is too flat - aim for 35-55° rotation to engage lats.")
-        elif avg_roll > DEFAULT_ROLL_GOOD[1]:
-            diagnostics.append("⚠️ Excessive body roll - this may cause energy leaks and over-rotation.")
-
-        # 7. Breathing balance
-        breath_balance = abs(self.breath_l - self.breath_r)
-        if breath_balance > 5:
-            side = "left" if self.breath_l > self.breath_r else "right"
-            diagnostics.append(f"💡 Breathing is asymmetric (favoring {side}) - practice bilateral breathing.")
-
-        # Calculate glide metrics
-        glide_metrics = [m for m in high_conf_metrics if m.is_gliding]
-        glide_ratio = (len(glide_metrics) / len(high_conf_metrics) * 100) if high_conf_metrics else 0
-        avg_glide_score = statistics.mean([m.glide_score for m in glide_metrics]) if glide_metrics else 0
-        
-        # 8. GLIDE assessment
-        if glide_ratio < 10:
-            diagnostics.append("🚨 MINIMAL GLIDE detected - you're rushing your stroke! Extend your lead arm and glide briefly after each entry to maximize distance per stroke.")
-        elif glide_ratio < 20:
-            diagnostics.append("⚠️ Low glide ratio ({:.0f}%) - try extending your lead arm longer before starting the catch. This improves efficiency.".format(glide_ratio))
-        elif glide_ratio > 40:
-            diagnostics.append("💡 High glide ratio ({:.0f}%) - good for distance swimming! For sprints, you may want to reduce glide time.".format(glide_ratio))
-        elif avg_glide_score < 60 and glide_ratio >= 15:
-            diagnostics.append("💡 Glide detected but form could improve - focus on full arm extension and streamlined body during glide phase.")
-
-        if not diagnostics:
-            diagnostics.append("✅ Great technique! Keep up the good work.")
-
-        return SessionSummary(
-            duration_s=d,
-            avg_score=statistics.mean(scores) if scores else 0,
-            avg_body_roll=avg_roll,
-            max_body_roll=max(rolls) if rolls else 0,
-            stroke_rate=sr,
-            breaths_per_min=bpm,
-            breath_left=self.breath_l,
-            breath_right=self.breath_r,
-            total_strokes=len(self.stroke_times),
-            avg_kick_symmetry=avg_kick_sym,
-            avg_kick_depth=avg_kick_depth,
-            kick_status=kick_status,
-            avg_confidence=statistics.mean(confs) if confs else 1.0,
-            best_frame_bytes=self.best_bytes,
-            worst_frame_bytes=self.worst_bytes,
-            avg_horizontal_deviation=avg_h_dev,
-            avg_vertical_drop=avg_v_drop,
-            avg_evf_angle=avg_evf,
-            dropped_elbow_frames=self.dropped_elbow_frames,
-            dropped_elbow_pct=dropped_elbow_pct,
-            avg_alignment_score=statistics.mean(alignment_scores) if alignment_scores else 100,
-            avg_evf_score=statistics.mean(evf_scores) if evf_scores else 100,
-            breaths_during_pull=self.breaths_during_pull,
-            total_breaths=self.breath_l + self.breath_r,
-            diagnostics=diagnostics,
-            video_context=self.video_context,
-            available_metrics=self.available_metrics,
-            # Glide metrics
-            glide_ratio=glide_ratio,
-            avg_glide_score=avg_glide_score,
-            glide_frames=self.glide_frames,
-            total_analyzed_frames=len(high_conf_metrics)
-        )
+def format_duration(seconds: float) -> str:
+    return f"{int(seconds // 60)}:{int(seconds % 60):02d}"
 
-# ─────────────────────────────────────────────
-# PLOTS - Enhanced with new metrics
-# ─────────────────────────────────────────────
 
-def generate_plots(analyzer: SwimAnalyzer):
-    if not analyzer.metrics:
-        return io.BytesIO()
-
-    times = [m.time_s for m in analyzer.metrics]
-    plt.style.use('dark_background')
-    fig, axs = plt.subplots(5, 1, figsize=(10, 14), sharex=True)
-
-    # 1. Body Alignment (Horizontal Deviation)
-    axs[0].plot(times, [m.horizontal_deviation for m in analyzer.metrics], 
-                label="Horizontal Deviation", color='#06b6d4', linewidth=1.5)
-    axs[0].axhspan(0, DEFAULT_HORIZONTAL_DEV_GOOD[1], color='green', alpha=0.2, label='Good Zone')
-    axs[0].axhspan(DEFAULT_HORIZONTAL_DEV_GOOD[1], DEFAULT_HORIZONTAL_DEV_OK[1], 
-                   color='yellow', alpha=0.2, label='OK Zone')
-    axs[0].set_ylabel("Degrees")
-    axs[0].set_title("Body Alignment (Shoulder-Hip-Ankle Deviation)")
-    axs[0].legend(loc='upper right')
-    axs[0].set_ylim(0, 30)
-
-    # 2. EVF Angle
-    pull_push_times = [m.time_s for m in analyzer.metrics if m.phase in ("Pull", "Push")]
-    pull_push_evf = [m.evf_plane_angle for m in analyzer.metrics if m.phase in ("Pull", "Push")]
-    axs[1].scatter(pull_push_times, pull_push_evf, label="EVF Angle (Pull/Push)", 
-                   color='#a855f7', s=10, alpha=0.7)
-    axs[1].axhspan(0, DEFAULT_EVF_ANGLE_GOOD[1], color='green', alpha=0.2)
-    axs[1].axhspan(DEFAULT_EVF_ANGLE_GOOD[1], DEFAULT_EVF_ANGLE_OK[1], color='yellow', alpha=0.2)
-    axs[1].set_ylabel("Degrees")
-    axs[1].set_title("Early Vertical Forearm Angle (lower is better)")
-    axs[1].legend(loc='upper right')
-    axs[1].set_ylim(0, 60)
-
-    # 3. Body Roll
-    axs[2].plot(times, [m.body_roll for m in analyzer.metrics], 
-                label="Body Roll", color='#f59e0b', linewidth=1.5)
-    axs[2].axhspan(DEFAULT_ROLL_GOOD[0], DEFAULT_ROLL_GOOD[1], color='green', alpha=0.2)
-    axs[2].axhline(45, color='white', linestyle='--', alpha=0.5, label='Ideal (45°)')
-    axs[2].set_ylabel("Degrees")
-    axs[2].set_title("Body Roll Over Time")
-    axs[2].legend(loc='upper right')
-
-    # 4. Kick Metrics
-    ax4 = axs[3]
-    ax4.plot(times, [m.kick_symmetry for m in analyzer.metrics], 
-             label="Kick Symmetry", color='#ef4444', linewidth=1.5)
-    ax4.axhline(DEFAULT_KICK_SYM_MAX_GOOD, color='red', linestyle='--', alpha=0.5)
-    ax4.set_ylabel("Symmetry (°)", color='#ef4444')
-    ax4.tick_params(axis='y', labelcolor='#ef4444')
-    
-    ax4b = ax4.twinx()
-    ax4b.plot(times, [m.kick_depth_proxy for m in analyzer.metrics], 
-              label="Kick Depth", color='#22c55e', linewidth=1.5, alpha=0.7)
-    ax4b.axhspan(DEFAULT_KICK_DEPTH_GOOD[0], DEFAULT_KICK_DEPTH_GOOD[1], 
-                 color='green', alpha=0.1)
-    ax4b.set_ylabel("Depth (normalized)", color='#22c55e')
-    ax4b.tick_params(axis='y', labelcolor='#22c55e')
-    ax4.set_title("Kick Metrics")
-    
-    # Combined legend
-    lines1, labels1 = ax4.get_legend_handles_labels()
-    lines2, labels2 = ax4b.get_legend_handles_labels()
-    ax4.legend(lines1 + lines2, labels1 + labels2, loc='upper right')
-
-    # 5. Overall Score with sub-scores
-    axs[4].plot(times, [m.score for m in analyzer.metrics], 
-                label="Overall Score", color='#22c55e', linewidth=2)
-    axs[4].plot(times, [m.alignment_score for m in analyzer.metrics], 
-                label="Alignment Score", color='#06b6d4', linewidth=1, alpha=0.7)
-    axs[4].plot(times, [m.evf_score for m in analyzer.metrics], 
-                label="EVF Score", color='#a855f7', linewidth=1, alpha=0.7)
-    axs[4].axhline(70, color='yellow', linestyle='--', alpha=0.5, label='Good threshold')
-    axs[4].set_xlabel("Time (seconds)")
-    axs[4].set_ylabel("Score")
-    axs[4].set_title("Technique Scores Over Time")
-    axs[4].legend(loc='lower right')
-    axs[4].set_ylim(0, 105)
-
-    plt.tight_layout()
-    buf = io.BytesIO()
-    plt.savefig(buf, format="png", dpi=150, bbox_inches="tight")
-    plt.close(fig)
-    buf.seek(0)
-    return buf
+def run_queued_analysis(uploaded, settings: Dict, analysis_key) -> Dict:
+    """
+    Submit the video to the worker pool and poll until its results are ready.
 
-# ─────────────────────────────────────────────
-# PDF REPORT - Enhanced
-# ─────────────────────────────────────────────
+    The job survives Streamlit reruns, the Stop button and browser
+    refreshes: a rerun with the same analysis_key re-attaches to the job in
+    session state, and a new session (refresh, reconnect) finds this user's
+    job for the same upload and settings in the queue instead of
+    resubmitting. While waiting for a worker, the queue position and
+    predicted start / finish times are shown. A cancelled job keeps its
+    checkpoint and can be resumed from where it stopped; a failed one is
+    only retried when the user asks.
 
-def generate_pdf_report(summary: SessionSummary, filename: str, plot_buffer: io.BytesIO) -> io.BytesIO:
-    buffer = io.BytesIO()
-    pdf = SimpleDocTemplate(
-        buffer, 
-        pagesize=letter, 
-        topMargin=0.75*inch, 
-        bottomMargin=0.5*inch,
-        leftMargin=0.75*inch,
-        rightMargin=0.75*inch
-    )
-    styles = getSampleStyleSheet()
-    
-    # Custom styles with proper spacing
-    styles.add(ParagraphStyle(
-        name='CustomTitle', 
-        fontSize=20,  # Reduced from 24 to prevent overlap
-        textColor=colors.HexColor('#06b6d4'), 
-        spaceAfter=12,
-        spaceBefore=0,
-        alignment=1  # Center alignment
-    ))
-    styles.add(ParagraphStyle(
-        name='ReportSubtitle', 
-        fontSize=12, 
-        textColor=colors.HexColor('#64748b'), 
-        spaceAfter=20,
-        alignment=1  # Center alignment
-    ))
-    styles.add(ParagraphStyle(name='DiagnosticGood', fontSize=10, textColor=colors.HexColor('#22c55e'), leftIndent=15, spaceAfter=6))
-    styles.add(ParagraphStyle(name='DiagnosticWarn', fontSize=10, textColor=colors.HexColor('#f59e0b'), leftIndent=15, spaceAfter=6))
-    styles.add(ParagraphStyle(name='DiagnosticError', fontSize=10, textColor=colors.HexColor('#ef4444'), leftIndent=15, spaceAfter=6))
-
-    story = []
-    
-    # Title - centered and properly sized
-    story.append(Paragraph("Freestyle Swimming Technique Analysis", styles['CustomTitle']))
-    story.append(Paragraph(f"Analysis Report • {datetime.datetime.now().strftime('%B %d, %Y')}", styles['ReportSubtitle']))
-    story.append(Spacer(1, 0.15*inch))
-
-    # Session Information
-    story.append(Paragraph("Session Information", styles['Heading2']))
-    session_data = [
-        ['File', filename[:40] + '...' if len(filename) > 40 else filename],  # Truncate long filenames
-        ['Duration', f"{summary.duration_s:.1f} seconds"],
-        ['Analyzed', datetime.datetime.now().strftime("%Y-%m-%d %H:%M")],
-        ['Detection Confidence', f"{summary.avg_confidence*100:.1f}%"]
-    ]
-    t = Table(session_data, colWidths=[1.8*inch, 4.2*inch])
-    t.setStyle(TableStyle([
-        ('FONTSIZE', (0,0), (-1,-1), 10),
-        ('TEXTCOLOR', (0,0), (0,-1), colors.HexColor('#64748b')),
-        ('ALIGN', (0,0), (0,-1), 'RIGHT'),
-        ('RIGHTPADDING', (0,0), (0,-1), 12),
-    ]))
-    story.append(t)
-    story.append(Spacer(1, 0.25*inch))
-
-    # Overall Score Card
-    story.append(Paragraph("Overall Performance", styles['Heading2']))
-    score_color = colors.HexColor('#22c55e') if summary.avg_score >= 70 else colors.HexColor('#f59e0b') if summary.avg_score >= 50 else colors.HexColor('#ef4444')
-    story.append(Paragraph(f"<font size='32' color='{score_color}'><b>{summary.avg_score:.1f}/100</b></font>", styles['Normal']))
-    story.append(Spacer(1, 0.15*inch))
-
-    # Sub-Scores
-    story.append(Paragraph("Component Scores", styles['Heading3']))
-    subscore_data = [
-        ['Component', 'Score', 'Status'],
-        ['Body Alignment', f"{summary.avg_alignment_score:.1f}", get_zone_status(summary.avg_horizontal_deviation, DEFAULT_HORIZONTAL_DEV_GOOD, DEFAULT_HORIZONTAL_DEV_OK)],
-        ['EVF (Pull Phase)', f"{summary.avg_evf_score:.1f}", f"Dropped: {summary.dropped_elbow_pct:.0f}%" if summary.dropped_elbow_pct > 10 else get_zone_status(summary.avg_evf_angle, DEFAULT_EVF_ANGLE_GOOD, DEFAULT_EVF_ANGLE_OK)],
-        ['Body Roll', f"{summary.avg_body_roll:.1f}°", get_zone_status(summary.avg_body_roll, DEFAULT_ROLL_GOOD, DEFAULT_ROLL_OK)],
-        ['Kick', summary.kick_status, summary.kick_status],
-        ['Glide Ratio', f"{summary.glide_ratio:.0f}%", "Good" if summary.glide_ratio > 20 else "Low"],
-    ]
-    t = Table(subscore_data, colWidths=[2*inch, 1.3*inch, 1.7*inch])
-    t.setStyle(TableStyle([
-        ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
-        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#1e3a5f')),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.white),
-        ('FONTSIZE', (0,0), (-1,-1), 10),
-        ('ALIGN', (1,0), (-1,-1), 'CENTER'),
-    ]))
-    story.append(t)
-    story.append(Spacer(1, 0.25*inch))
-
-    # Performance Metrics
-    story.append(Paragraph("Performance Metrics", styles['Heading2']))
-    metrics_data = [
-        ['Metric', 'Value', 'Notes'],
-        ['Stroke Rate', f"{summary.stroke_rate:.1f} spm", 'strokes per minute'],
-        ['Total Strokes', f"{summary.total_strokes}", ''],
-        ['Breaths/min', f"{summary.breaths_per_min:.1f}", f"Left: {summary.breath_left}  Right: {summary.breath_right}"],
-        ['Breaths During Pull', f"{summary.breaths_during_pull}", 'Ideally 0'],
-        ['Dropped Elbow', f"{summary.dropped_elbow_pct:.0f}%", 'of catch frames'],
-        ['Vertical Drop', f"{summary.avg_vertical_drop:.1f}°", 'hip sink angle'],
-        ['Max Body Roll', f"{summary.max_body_roll:.1f}°", 'peak rotation'],
-        ['Avg EVF Angle', f"{summary.avg_evf_angle:.1f}°", 'lower is better'],
-        ['Kick Depth', f"{summary.avg_kick_depth:.2f}", 'relative to hip-ankle'],
-        ['Kick Symmetry', f"{summary.avg_kick_symmetry:.1f}°", 'L-R difference'],
-        ['Glide Ratio', f"{summary.glide_ratio:.0f}%", 'time in glide phase'],
-    ]
-    t = Table(metrics_data, colWidths=[1.8*inch, 1.2*inch, 2*inch])
-    t.setStyle(TableStyle([
-        ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
-        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#1e3a5f')),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.white),
-        ('FONTSIZE', (0,0), (-1,-1), 9),
-        ('ALIGN', (1,0), (1,-1), 'CENTER'),
-    ]))
-    story.append(t)
-    story.append(Spacer(1, 0.25*inch))
-
-    # Diagnostics
-    story.append(Paragraph("Coaching Insights", styles['Heading2']))
-    for diag in summary.diagnostics:
-        if diag.startswith("✅"):
-            style = styles['DiagnosticGood']
-        elif diag.startswith("⚠️"):
-            style = styles['DiagnosticError']
+    Returns:
+        - the same dict as run_video_analysis, plus job_id
+    """
+    queue = get_job_queue()
+    owner = queue_owner()
+    attached = st.session_state.get("analysis_job")
+    job = queue.get(attached[1]) if attached and attached[0] == analysis_key else None
+    if attached and job is None:
+        queue.cancel(attached[1])   # Settings or upload changed: stop computing the old analysis
+    if job is None:
+        video_sha256 = hashlib.sha256(uploaded.getvalue()).hexdigest()
+        job = queue.find(video_sha256, settings, owner)
+        if job is None:
+            job = queue.submit(uploaded.name, uploaded.getvalue(), settings, owner=owner, video_sha256=video_sha256)
+        st.session_state.analysis_job = (analysis_key, job.id)
+
+    st.markdown("### ⏳ Processing Video")
+    if st.button("⏹️ Cancel Analysis", key=f"cancel_{job.id}"):
+        queue.cancel(job.id)
+    processing_progress = st.progress(0)
+    processing_status = st.empty()
+    live_placeholder = st.empty()
+    while True:
+        job = queue.get(job.id)
+        if job is None:
+            raise RuntimeError("Analysis job was removed from the queue")
+        if job.status == JOB_CANCELLED:
+            live_placeholder.empty()
+            processing_status.warning(f"{job.message}. Progress is saved - resume to continue where it stopped.")
+            if st.button("▶️ Resume Analysis", key=f"resume_{job.id}"):
+                queue.resume(job.id)
+                st.rerun()
+            st.stop()
+        processing_progress.progress(min(job.progress, 1.0))
+        estimate = queue.estimate(job.id) if job.status == JOB_QUEUED else None
+        if estimate is not None:
+            processing_status.text(f"🕒 In queue: position {estimate.position} of {estimate.queued} • "
+                                   f"starts in ~{format_duration(estimate.wait_s)} • "
+                                   f"ready in ~{format_duration(estimate.eta_s)}")
         else:
-            style = styles['DiagnosticWarn']
-        story.append(Paragraph(diag, style))
-        story.append(Spacer(1, 0.1*inch))
-
-    # Best & Worst Frames
-    if summary.best_frame_bytes or summary.worst_frame_bytes:
-        story.append(Spacer(1, 0.3*inch))
-        story.append(Paragraph("Best & Worst Frames (Pull Phase)", styles['Heading2']))
-        if summary.best_frame_bytes:
-            img = RLImage(io.BytesIO(summary.best_frame_bytes))
-            img.drawWidth = 3*inch
-            img.drawHeight = 2*inch
-            story.append(Paragraph("Best Pull Frame:", styles['Normal']))
-            story.append(img)
-        if summary.worst_frame_bytes:
-            img = RLImage(io.BytesIO(summary.worst_frame_bytes))
-            img.drawWidth = 3*inch
-            img.drawHeight = 2*inch
-            story.append(Paragraph("Worst Pull Frame:", styles['Normal']))
-            story.append(img)
-
-    # Charts
-    if plot_buffer.getvalue():
-        story.append(PageBreak())
-        story.append(Paragraph("Analysis Charts", styles['Heading2']))
-        plot_buffer.seek(0)
-        img = RLImage(plot_buffer)
-        # Scale to fit page (letter is 8.5x11, with margins we have ~7x9 usable)
-        img.drawWidth = 6.5*inch
-        img.drawHeight = 8.5*inch
-        story.append(img)
-
-    pdf.build(story)
-    buffer.seek(0)
-    return buffer
-
-# ─────────────────────────────────────────────
-# CSV & ZIP - Enhanced
-# ─────────────────────────────────────────────
-
-def export_to_csv(analyzer: SwimAnalyzer):
-    if not analyzer.metrics:
-        return io.BytesIO()
-    data = {
-        'time_s': [m.time_s for m in analyzer.metrics],
-        'phase': [m.phase for m in analyzer.metrics],
-        'score': [m.score for m in analyzer.metrics],
-        'alignment_score': [m.alignment_score for m in analyzer.metrics],
-        'evf_score': [m.evf_score for m in analyzer.metrics],
-        'horizontal_deviation': [m.horizontal_deviation for m in analyzer.metrics],
-        'evf_plane_angle': [m.evf_plane_angle for m in analyzer.metrics],
-        'body_roll': [m.body_roll for m in analyzer.metrics],
-        'torso_lean': [m.torso_lean for m in analyzer.metrics],
-        'kick_symmetry': [m.kick_symmetry for m in analyzer.metrics],
-        'kick_depth': [m.kick_depth_proxy for m in analyzer.metrics],
-        'elbow_angle': [m.elbow_angle for m in analyzer.metrics],
-        'wrist_velocity_y': [m.wrist_velocity_y for m in analyzer.metrics],
-        'breath_state': [m.breath_state for m in analyzer.metrics],
-        'breathing_during_pull': [m.breathing_during_pull for m in analyzer.metrics],
-        'confidence': [m.confidence for m in analyzer.metrics],
+            processing_status.text(job.message)
+        if job.status == JOB_DONE:
+            break
+        if job.status == JOB_FAILED:
+            # Not resubmitted on the next rerun: a video that fails would keep taking worker slots
+            live_placeholder.empty()
+            processing_status.error(f"❌ Analysis failed: {job.error}")
+            if st.button("🔁 Retry Analysis", key=f"retry_{job.id}"):
+                queue.resume(job.id)
+                st.rerun()
+            st.stop()
+        if job.live:
+            render_live_summary(live_placeholder, LiveSummary(**job.live), queued=True)
+        time.sleep(JOB_POLL_INTERVAL_S)
+    live_placeholder.empty()
+
+    results = queue.load_results(job.id)
+    results['job_id'] = job.id
+    st.session_state.pop("analysis_job", None)
+    return results
+
+
+@st.cache_resource
+def get_session_history() -> SessionHistory:
+    """History store shared with the Progress page and batch_analyze.py --history"""
+    return SessionHistory(os.environ.get("SWIM_HISTORY_DIR", "swim_history"))
+
+
+def save_to_history(results: Dict, uploaded, athlete_name: str, session_date: datetime.date,
+                    settings: Dict) -> int:
+    """Store the summary, per-stroke aggregates and report/CSV artifacts of this analysis"""
+    summary = results['summary']
+    artifacts = {
+        f"report_{results['timestamp']}.pdf": results['pdf_buf'].getvalue(),
+        f"metrics_{results['timestamp']}.csv": results['csv_buf'].getvalue(),
     }
-    df = pd.DataFrame(data)
-    buf = io.BytesIO()
-    df.to_csv(buf, index=False)
-    buf.seek(0)
-    return buf
-
-def create_results_bundle(video_path, csv_buf, pdf_buf, timestamp):
-    """Create ZIP with just video, PDF report, and CSV data"""
-    zip_buf = io.BytesIO()
-    with zipfile.ZipFile(zip_buf, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        if os.path.exists(video_path):
-            with open(video_path, 'rb') as f:
-                zipf.writestr(f"annotated_video_{timestamp}.mp4", f.read())
-        zipf.writestr(f"technique_report_{timestamp}.pdf", pdf_buf.getvalue())
-        zipf.writestr(f"frame_data_{timestamp}.csv", csv_buf.getvalue())
-    zip_buf.seek(0)
-    return zip_buf
+    if results['fatigue_csv'] is not None:
+        artifacts[f"fatigue_windows_{results['timestamp']}.csv"] = results['fatigue_csv'].getvalue()
+    if summary.pool_segmentation is not None:
+        artifacts[f"splits_{results['timestamp']}.csv"] = \
+            summary.pool_segmentation.splits_dataframe().to_csv(index=False).encode()
+    return get_session_history().save_session(
+        athlete_name, summary, uploaded.name,
+        recorded_at=datetime.datetime.combine(session_date, datetime.datetime.now().time()),
+        video_sha256=hashlib.sha256(uploaded.getvalue()).hexdigest(),
+        discipline=settings['discipline'], height_cm=settings['height_cm'],
+        artifacts=artifacts, settings=settings)
+
+
+def discard_analysis_results(results: Optional[Dict]) -> None:
+    """Delete the input file kept by an analysis-only run and any spilled metrics"""
+    if results and results.get('job_id'):
+        get_job_queue().delete(results['job_id'])   # Input, metrics and results all live in the job dir
+        return
+    if results and results.get('analyzer') is not None:
+        results['analyzer'].release_metrics()
+    if results and results.get('input_path'):
+        remove_files(results['input_path'])
 
-# ─────────────────────────────────────────────
-# MAIN APP - Enhanced UI
-# ─────────────────────────────────────────────
 
 def main():
     st.set_page_config(
@@ -3039,6 +1167,20 @@ def main():
         ↓ Lower = more sensitive, may count minor head movements as breaths.
         """)
         
+        smoothing_label = st.selectbox("Metric Smoothing", ["Moving average", "One-Euro (low lag)"])
+        smoothing = "one_euro" if smoothing_label.startswith("One-Euro") else "mean"
+        st.caption("""
+        **What it does**: Reduces frame-to-frame jitter in angles and alignment.  
+        **Ideal setting**: **Moving average** (default) for 25-30 fps phone footage.  
+        One-Euro reacts faster to real changes - better for 60+ fps video.
+        """)
+        
+        analysis_only = st.checkbox("⚡ Analysis-only (skip annotated video)", value=True)
+        st.caption("""
+        **What it does**: Computes all metrics without drawing or encoding video - much faster.  
+        Overlays are drawn live in the interactive player; a downloadable annotated MP4 can still be rendered with one click.
+        """)
+        
         # NEW: Coach Mode toggle
         coach_mode = st.checkbox("🛠️ Coach Mode (technical details)", value=False)
         
@@ -3146,128 +1288,40 @@ def main():
 
     if uploaded and video_type:
         try:
-            manual_camera_view = selected_camera
-            manual_water_position = selected_water
-    
-            analyzer = SwimAnalyzer(athlete, conf_thresh, yaw_thresh,
-                                    manual_camera_view=manual_camera_view,
-                                    manual_water_position=manual_water_position)
-    
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as tmp_in:
-                tmp_in.write(uploaded.getvalue())
-                input_path = tmp_in.name
-    
-            cap = cv2.VideoCapture(input_path)
-            fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
-            w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    
-
-            temp_raw_path = tempfile.mktemp(suffix=".avi")
-            fourcc = cv2.VideoWriter_fourcc(*'XVID')  # Use XVID for intermediate
-            writer = cv2.VideoWriter(temp_raw_path, fourcc, fps, (w, h))
-            
-            st.markdown("### ⏳ Processing Video")
-            processing_progress = st.progress(0)
-            processing_status = st.empty()
-            
-            frame_idx = 0
-            while cap.isOpened():
-                ret, frame = cap.read()
-                if not ret: break
-            
-                timestamp_ms = frame_idx * 33 + 1
-                real_t = frame_idx / fps
-            
-                annotated, _ = analyzer.process(frame, real_t, timestamp_ms, fps)
-                writer.write(annotated)
-            
-                frame_idx += 1
-                if total > 0:
-                    processing_progress.progress(frame_idx / total)
-                processing_status.text(f"🎬 Analyzing frame {frame_idx}/{total}")
-            
-            cap.release()
-            writer.release()
-            processing_status.text("✅ Analysis complete!")
-            
-            # Re-encode to H.264 for web compatibility
-            st.markdown("### 🎥 Finalizing Video")
-            encoding_status = st.empty()
-            encoding_status.text("🔄 Converting to web-compatible format...")
-            
-            out_path = tempfile.mktemp(suffix=".mp4")
-            
-            try:
-                # Try using ffmpeg via subprocess (most reliable)
-                import subprocess
-                
-                ffmpeg_cmd = [
-                    'ffmpeg', '-i', temp_raw_path,
-                    '-c:v', 'libx264',  # H.264 codec
-                    '-preset', 'fast',
-                    '-crf', '23',  # Quality (lower = better, 18-28 is good range)
-                    '-pix_fmt', 'yuv420p',  # Ensure compatibility
-                    '-y',  # Overwrite output
-                    out_path
-                ]
-                
-                result = subprocess.run(
-                    ffmpeg_cmd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    timeout=300  # 5 minute timeout
-                )
-                
-                if result.returncode != 0:
-                    raise Exception(f"FFmpeg failed: {result.stderr.decode()}")
-                
-                encoding_status.text("✅ Video conversion complete!")
-                
-            except Exception as e:
-                encoding_status.warning(f"⚠️ FFmpeg conversion failed: {e}. Using original format.")
-                # Fallback: just copy the original
-                import shutil
-                shutil.copy(temp_raw_path, out_path)
-
-            
-            
-            
-            
-            processing_status.text("✅ Analysis complete!")
+            # Keep results across Streamlit reruns (e.g. the render button below)
+            analysis_key = (uploaded.name, uploaded.size, video_type, height, discipline,
+                            conf_thresh, yaw_thresh, smoothing, analysis_only)
+            settings = {
+                "height_cm": height, "discipline": discipline,
+                "conf_thresh": conf_thresh, "yaw_thresh": yaw_thresh,
+                "camera_view": selected_camera.value, "water_position": selected_water.value,
+                "smoothing": smoothing, "analysis_only": analysis_only,
+            }
+            results = st.session_state.get("analysis_results")
+            if results is None or results['key'] != analysis_key:
+                discard_analysis_results(results)
+                st.session_state.pop("analysis_results", None)
+
+                if get_job_queue().active_workers() > 0:
+                    # Worker pool running: analyze out of process (crash isolation, bounded concurrency)
+                    results = run_queued_analysis(uploaded, settings, analysis_key)
+                else:
+                    analyzer = SwimAnalyzer(athlete, conf_thresh, yaw_thresh,
+                                            manual_camera_view=selected_camera,
+                                            manual_water_position=selected_water,
+                                            smoothing=smoothing,
+                                            render_overlays=not analysis_only,
+                                            on_status=st.info)
+                    results = run_video_analysis(uploaded, analyzer, analysis_only)
+                results['key'] = analysis_key
+                st.session_state.analysis_results = results
+
+            analyzer = results['analyzer']
+            summary = results['summary']
+            pdf_buf = results['pdf_buf']
+            csv_buf = results['csv_buf']
+            timestamp = results['timestamp']
 
-            encoding_status = st.empty()
-            encoding_status.text("✅ Video saved as native MP4 (ready for playback)")
-    
-            # READ VIDEO BYTES BEFORE DELETING FILES
-            with open(out_path, 'rb') as f:
-                video_bytes = f.read()
-    
-            # PROCESS RESULTS (before cleanup)
-            summary = analyzer.get_summary()
-            plot_buf = generate_plots(analyzer)
-            pdf_buf = generate_pdf_report(summary, uploaded.name, plot_buf)
-            csv_buf = export_to_csv(analyzer)
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            
-            # Create ZIP bundle with video bytes instead of file path
-            zip_buf = io.BytesIO()
-            with zipfile.ZipFile(zip_buf, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                zipf.writestr(f"annotated_video_{timestamp}.mp4", video_bytes)
-                zipf.writestr(f"technique_report_{timestamp}.pdf", pdf_buf.getvalue())
-                zipf.writestr(f"frame_data_{timestamp}.csv", csv_buf.getvalue())
-            zip_buf.seek(0)
-    
-            # CLEANUP TEMP FILES (after everything is processed)
-            try:
-                os.unlink(input_path)
-                os.unlink(out_path)
-            except:
-                pass
-    
-            analyzer.close()
-    
             st.success("✅ Analysis complete!")
              
             # Display video type information - User selected vs Auto-detected
@@ -3417,12 +1471,100 @@ def main():
                     st.image(summary.worst_frame_bytes, caption="Worst Pull Frame")
                 else:
                     st.info("No worst frame captured")
-    
+
+            # Top-k gallery (frames decoded by seeking back after the pass)
+            gallery = results['gallery']
+            if any(gallery.values()):
+                st.subheader("🖼️ Key-Frame Gallery")
+                tracker = analyzer.key_frame_tracker
+                tabs = st.tabs([tracker.label(name) for name in gallery])
+                for tab, (name, frames) in zip(tabs, gallery.items()):
+                    with tab:
+                        if not frames:
+                            st.info("No frames matched this criterion")
+                            continue
+                        cols = st.columns(len(frames))
+                        for col, (cand, jpeg) in zip(cols, frames):
+                            col.image(jpeg, caption=f"{cand.time_s:.1f}s • {cand.value:.1f}")
+
+            # Per-stroke drilldown (precomputed stroke index, no per-frame scans)
+            stroke_index = summary.stroke_index
+            if stroke_index is not None and len(stroke_index) > 0:
+                st.subheader("🔁 Per-Stroke Breakdown")
+                dropped = stroke_index.dropped_elbow_strokes()
+                worst = stroke_index.worst('avg_score', k=3)
+                col1, col2 = st.columns(2)
+                col1.metric("Strokes with Dropped Elbow", f"{len(dropped)} / {len(stroke_index)}")
+                col2.metric("Weakest Strokes", ", ".join(f"#{c.stroke_number} ({c.avg_score:.0f})" for c in worst))
+                st.line_chart(stroke_index.to_dataframe().set_index('stroke_number')[['avg_score', 'avg_alignment_score', 'avg_evf_score']])
+                with st.expander("Per-stroke table"):
+                    st.dataframe(stroke_index.to_dataframe(), use_container_width=True, hide_index=True)
+
+            # Pool lengths: split times and technique per length, turns excluded
+            pool = summary.pool_segmentation
+            if pool is not None:
+                st.subheader("🏁 Per-Length Splits")
+                complete = [s for s in pool.lengths if s.complete]
+                c1, c2, c3 = st.columns(3)
+                c1.metric("Lengths", len(pool.lengths))
+                c2.metric("Turns Detected", pool.n_turns)
+                if complete:
+                    c3.metric("Avg Full Length", f"{np.mean([s.duration_s for s in complete]):.1f}s")
+                st.caption("Technique scores above use free swimming only - turns and push-offs are excluded.")
+                st.dataframe(pool.splits_dataframe().round(1), use_container_width=True, hide_index=True)
+            elif discipline == "pool" and summary.video_context and summary.video_context.camera_view != CameraView.SIDE:
+                st.caption(f"🏁 Per-length splits need side-view video: turns are not detected in "
+                           f"{summary.video_context.camera_view.value.lower()} footage, so turns and "
+                           f"push-offs are included in the technique scores above.")
+
+            # Fatigue over the session (windowed aggregates + trend fit)
+            fatigue = summary.fatigue
+            if fatigue is not None:
+                st.subheader("📉 Fatigue Analysis")
+                if fatigue.trends:
+                    cols = st.columns(len(fatigue.trends))
+                    for col, trend in zip(cols, fatigue.trends.values()):
+                        unit = FATIGUE_METRICS[trend.metric][1]
+                        col.metric(trend.label, f"{trend.end_value:.1f}{unit}",
+                                   delta=f"{trend.change_pct:+.0f}% over session",
+                                   delta_color="inverse" if FATIGUE_METRICS[trend.metric][2] else "normal")
+                st.caption(f"Trailing {fatigue.window_s:.0f} s averages")
+                st.line_chart(fatigue.rolling.set_index('time_s'))
+                with st.expander(f"Per-window table ({fatigue.window_description})"):
+                    st.dataframe(fatigue.windows.round(2), use_container_width=True, hide_index=True)
+                st.download_button("⬇️ Download Fatigue Windows (CSV)", fatigue.to_csv(),
+                                   f"fatigue_windows_{timestamp}.csv", "text/csv")
+
             # Video player - use st.video for cross-platform compatibility
             st.subheader("🎬 Annotated Video")
+            # Interactive player: original upload + overlays drawn client-side
+            render_overlay_player(uploaded.getvalue(), results['overlay_track'],
+                                  mime=uploaded.type or "video/mp4")
+            if results['video_bytes'] is None and results['input_path']:
+                st.caption("⚡ Analysis-only mode: overlays are drawn in your browser. Render a burned-in MP4 to download or share.")
+                if st.button("🎬 Render Annotated Video"):
+                    render_progress = st.progress(0)
+                    render_status = st.empty()
+                    reporter = None
+
+                    def on_render_progress(done, total):
+                        nonlocal reporter
+                        if reporter is None:
+                            reporter = ProgressReporter(total, streamlit_progress(render_progress, render_status),
+                                                        label="🎬 Rendering frame")
+                        reporter.tick(done)
+
+                    results['video_bytes'] = render_annotated_video(
+                        results['input_path'], analyzer, progress_callback=on_render_progress)
+                    if reporter is not None:
+                        reporter.finish("✅ Video rendered")
+                    results['zip_buf'] = build_results_zip(results['video_bytes'], csv_buf, pdf_buf, timestamp,
+                                                           results['fatigue_csv'])
+            video_bytes = results['video_bytes']
             if video_bytes:
-                # st.video works better across platforms
-                st.video(video_bytes, format="video/mp4")
+                with st.expander("Burned-in annotated MP4", expanded=False):
+                    # st.video works better across platforms
+                    st.video(video_bytes, format="video/mp4")
                 
                 # Also provide download link for the video separately
                 st.download_button(
@@ -3435,10 +1577,26 @@ def main():
             # Download button
             st.download_button(
                 "📦 Download Full Results (ZIP)",
-                zip_buf,
+                results['zip_buf'],
                 f"swim_analysis_{timestamp}.zip",
                 "application/zip"
             )
+
+            # Session history (read by the Progress page)
+            st.divider()
+            st.subheader("💾 Save to Session History")
+            col_name, col_date = st.columns(2)
+            with col_name:
+                athlete_name = st.text_input("Athlete name", key="history_athlete",
+                                             help="Sessions are grouped by this name on the Progress page")
+            with col_date:
+                session_date = st.date_input("Session date", value=datetime.date.today())
+            if results.get('history_session_id') is not None:
+                st.success(f"✅ Saved as session #{results['history_session_id']} - open **Progress** to see trends.")
+            if st.button("💾 Save Session", disabled=not athlete_name.strip()):
+                results['history_session_id'] = save_to_history(results, uploaded, athlete_name,
+                                                                session_date, settings)
+                st.rerun()
     
         except Exception as e:
             st.error(f"Error during processing: {str(e)}")
@@ -0,0 +1,167 @@
+import streamlit as st
+import datetime
+import os
+import time
+import pandas as pd
+
+# Reads only the session history store: no video or per-frame data is touched here
+from swim_analysis import (
+    PROGRESS_LATENCY_BUDGET_MS, PROGRESS_PAGE_SIZE, PROGRESS_WEEKLY_AFTER, TREND_METRICS, SessionHistory,
+)
+
+STRIPE_PAYMENT_LINK = "https://buy.stripe.com/test_8x2eVdaBSe7mf2JaIEao800"  # From your app.py
+
+DEFAULT_TREND_METRICS = ['dropped_elbow_pct', 'avg_vertical_drop', 'glide_ratio']
+
+
+@st.cache_resource
+def get_session_history() -> SessionHistory:
+    """Same store as the Dashboard's "Save to Session History" (same SWIM_HISTORY_DIR)"""
+    return SessionHistory(os.environ.get("SWIM_HISTORY_DIR", "swim_history"))
+
+
+def trend_label(metric: str) -> str:
+    label, unit, lower_is_better = TREND_METRICS[metric]
+    return f"{label} ({unit.strip()})" if unit.strip() else label
+
+
+def render_trend_deltas(trend: pd.DataFrame, metrics: list):
+    """First vs. latest point of each trend, coloured by whether it improved"""
+    if len(trend) < 2:
+        return
+    cols = st.columns(len(metrics))
+    for col, metric in zip(cols, metrics):
+        label, unit, lower_is_better = TREND_METRICS[metric]
+        values = trend[metric].dropna()
+        if values.empty:
+            col.metric(label, "—")
+            continue
+        delta = values.iloc[-1] - values.iloc[0]
+        col.metric(label, f"{values.iloc[-1]:.1f}{unit}", f"{delta:+.1f}{unit}",
+                   delta_color="inverse" if lower_is_better else "normal")
+
+
+def main():
+    st.set_page_config(
+        page_title="SwimForm AI • Progress",
+        page_icon="📈",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+
+    st.markdown("""
+    <style>
+        .water-bg, .lane-lines, .bubble { display: none !important; }
+        .stApp { background: linear-gradient(135deg, #0f172a 0%, #1e3a5f 50%, #0f172a 100%) !important; }
+    </style>
+    """, unsafe_allow_html=True)
+
+    # Payment gating - Use the same "paid" key as app.py
+    if not st.session_state.get("paid", False):
+        st.error("🔒 Access Denied")
+        st.markdown("Please complete payment to access progress tracking.")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("← Back to Home", use_container_width=True):
+                st.switch_page("app.py")
+
+        with col2:
+            st.link_button("→ Go to Payment", STRIPE_PAYMENT_LINK, use_container_width=True, type="primary")
+
+        st.stop()
+
+    st.title("📈 Progress Over Time")
+    st.markdown("Technique trends across saved sessions. Save an analysis from the Dashboard "
+                "(**💾 Save to Session History**) or with `batch_analyze.py --history` to add sessions.")
+
+    history = get_session_history()
+    started = time.perf_counter()
+
+    athletes = history.athletes()
+    if athletes.empty:
+        st.info("No sessions saved yet.")
+        st.stop()
+
+    # ─────────────────────────────────────────────
+    # FILTERS
+    # ─────────────────────────────────────────────
+    with st.sidebar:
+        st.header("📈 Progress")
+        athlete = st.selectbox("Athlete", athletes['name'].tolist())
+        today = datetime.date.today()
+        date_range = st.date_input("Date range", value=(today - datetime.timedelta(days=365), today),
+                                   max_value=today)
+        metrics = st.multiselect("Metrics", list(TREND_METRICS), default=DEFAULT_TREND_METRICS,
+                                 format_func=lambda m: TREND_METRICS[m][0])
+        page_size = st.select_slider("Sessions per page", options=[10, 25, 50, 100], value=PROGRESS_PAGE_SIZE)
+
+    # The picker returns a 1-tuple while the user is choosing the second date
+    start, end = (date_range + (None,))[:2] if isinstance(date_range, tuple) else (date_range, None)
+    n_sessions = history.count_sessions(athlete, start, end)
+    if n_sessions == 0:
+        st.info(f"No sessions for {athlete} in this date range.")
+        st.stop()
+    if not metrics:
+        st.info("Select at least one metric.")
+        st.stop()
+
+    # ─────────────────────────────────────────────
+    # TRENDS
+    # ─────────────────────────────────────────────
+    # Up to PROGRESS_WEEKLY_AFTER sessions are plotted individually; beyond
+    # that SQLite returns one mean per week so the chart stays small
+    st.subheader(f"📊 Trends — {athlete} ({n_sessions} sessions)")
+    if n_sessions <= PROGRESS_WEEKLY_AFTER:
+        trend = history.sessions(athlete, start, end, metrics=metrics).set_index('recorded_at')[metrics]
+        st.caption("One point per session.")
+    else:
+        trend = history.weekly_trends(athlete, metrics, start, end).set_index('week_start')[metrics]
+        st.caption("Weekly means (Monday start).")
+    render_trend_deltas(trend, metrics)
+    for metric in metrics:
+        st.markdown(f"**{trend_label(metric)}**" + (" — lower is better" if TREND_METRICS[metric][2] else ""))
+        st.line_chart(trend[[metric]].rename(columns={metric: trend_label(metric)}), height=200)
+
+    # ─────────────────────────────────────────────
+    # SESSIONS (paginated, newest first)
+    # ─────────────────────────────────────────────
+    st.subheader("🗂️ Sessions")
+    n_pages = (n_sessions + page_size - 1) // page_size
+    page = st.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1, step=1)
+    rows = history.sessions(athlete, start, end, metrics=metrics, limit=page_size,
+                            offset=(page - 1) * page_size, newest_first=True)
+    table = rows[['session_id', 'recorded_at', 'video_name', 'discipline', 'duration_s', 'n_lengths'] + metrics]
+    table = table.round({col: 1 for col in ['duration_s'] + metrics})
+    st.dataframe(table.rename(columns={m: trend_label(m) for m in metrics}),
+                 use_container_width=True, hide_index=True)
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    over_budget = elapsed_ms > PROGRESS_LATENCY_BUDGET_MS
+    st.caption(f"{'⚠️ ' if over_budget else ''}History queries: {elapsed_ms:.0f} ms "
+               f"(budget {PROGRESS_LATENCY_BUDGET_MS} ms)")
+
+    # ─────────────────────────────────────────────
+    # STROKE DRILLDOWN (loaded only on request)
+    # ─────────────────────────────────────────────
+    st.subheader("🔍 Session Detail")
+    choices = {int(r.session_id): f"{r.recorded_at:%Y-%m-%d %H:%M} — {r.video_name}" for r in rows.itertuples()}
+    session_id = st.selectbox("Session on this page", [None] + list(choices),
+                              format_func=lambda s: "Select a session…" if s is None else choices[s])
+    if session_id is not None:
+        strokes = history.strokes(session_id)
+        if strokes.empty:
+            st.info("No per-stroke data was saved for this session.")
+        else:
+            st.line_chart(strokes.set_index('stroke_number')[['avg_score', 'avg_alignment_score', 'avg_evf_score']])
+            with st.expander("Per-stroke table"):
+                st.dataframe(strokes, use_container_width=True, hide_index=True)
+        diagnostics = history.diagnostics(session_id)
+        if diagnostics:
+            with st.expander("Diagnostics"):
+                for line in diagnostics:
+                    st.markdown(f"- {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Swim technique analysis engine.
+
+Pure Python / OpenCV / MediaPipe - no Streamlit - so the dashboard, the
+batch CLI, worker processes and benchmarks all share one implementation.
+UI code observes long-running work through callbacks (see
+analyze_video, render_annotated_video and SwimAnalyzer's on_status).
+"""
+from .constants import *  # noqa: F401,F403 - thresholds and tuning constants
+from .models import (
+    AthleteProfile, CameraView, FrameMetrics, LiveSummary, SessionSummary, SwimPhase, VideoContext,
+    WaterPosition,
+)
+from .aggregates import PartialSummary, SummaryAccumulator, build_session_summary, merge_partial_summaries
+from .store import FrameMetricStore
+from .tracks import LandmarkFrames, LandmarkTrack, LandmarkTrackWriter, synthetic_landmarks
+from .strokes import StrokeCycle, StrokeIndex
+from .fatigue import FATIGUE_METRICS, FatigueReport, FatigueTrend, compute_fatigue_report
+from .pool import LengthSplit, PoolSegmentation, segment_pool_lengths
+from .analyzer import MEDIAPIPE_TASKS_AVAILABLE, SwimAnalyzer, download_model
+from .plots import generate_plots
+from .report import generate_pdf_report
+from .video import build_overlay_track, encode_web_mp4, extract_key_frames, render_annotated_video
+from .export import build_results_zip, export_to_csv
+from .pipeline import (
+    AnalysisCancelled, AnalysisCheckpoint, ProgressReporter, analyze_video, build_analysis_results, probe_video,
+    replay_landmarks, replay_track,
+)
+from .jobs import (
+    JOB_CANCELLED, JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, Job, JobQueue, QueueEstimate, analyzer_from_settings,
+    run_job,
+)
+from .history import SUMMARY_METRICS, TREND_METRICS, SessionHistory
@@ -0,0 +1,419 @@
+"""Online, mergeable session statistics and the SessionSummary built from them."""
+import numpy as np
+import math
+from typing import List, Optional, Dict, Tuple
+
+from .constants import (
+    DEFAULT_CONF_THRESHOLD, DEFAULT_EVF_ANGLE_GOOD, DEFAULT_EVF_ANGLE_OK, DEFAULT_HORIZONTAL_DEV_OK,
+    DEFAULT_KICK_DEPTH_GOOD, DEFAULT_KICK_SYM_MAX_GOOD, DEFAULT_ROLL_GOOD,
+)
+from .models import FrameMetrics, SessionSummary
+
+# ─────────────────────────────────────────────
+# SESSION AGGREGATES - Online summary statistics
+# ─────────────────────────────────────────────
+
+class RunningStat:
+    """Count, sum, min/max and Welford mean/variance of a stream, O(1) per value"""
+
+    __slots__ = ("count", "total", "min", "max", "mean", "m2")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x: float) -> None:
+        self.count += 1
+        self.total += x
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (0 for fewer than two values)"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    @classmethod
+    def from_array(cls, values: np.ndarray) -> "RunningStat":
+        """Statistics of a whole array at once (same result as add() per value)"""
+        out = cls()
+        values = np.asarray(values, dtype=np.float64)
+        if len(values):
+            out.count = len(values)
+            out.total = float(values.sum())
+            out.min = float(values.min())
+            out.max = float(values.max())
+            out.mean = out.total / out.count
+            out.m2 = float(((values - out.mean) ** 2).sum())
+        return out
+
+    def merge(self, other: "RunningStat") -> "RunningStat":
+        """Combined statistics of both streams (Chan et al. parallel variance)"""
+        out = RunningStat()
+        out.count = self.count + other.count
+        out.total = self.total + other.total
+        out.min = min(self.min, other.min)
+        out.max = max(self.max, other.max)
+        if out.count:
+            delta = other.mean - self.mean
+            out.mean = self.mean + delta * other.count / out.count
+            out.m2 = self.m2 + other.m2 + delta * delta * self.count * other.count / out.count
+        return out
+
+    def mean_or(self, default: float) -> float:
+        return self.mean if self.count else default
+
+    def max_or(self, default: float) -> float:
+        return self.max if self.count else default
+
+
+class FrameAggregates:
+    """Sufficient statistics of a set of analyzed frames, for SessionSummary"""
+
+    # Tracked on every frame: stat name -> FrameMetrics attribute
+    FRAME_STATS = {
+        'score': 'score',
+        'body_roll': 'body_roll',
+        'kick_symmetry': 'kick_symmetry',
+        'kick_depth': 'kick_depth_proxy',
+        'horizontal_deviation': 'horizontal_deviation',
+        'vertical_drop': 'vertical_drop',
+        'alignment_score': 'alignment_score',
+    }
+    # Tracked on Pull/Push frames only
+    STROKE_STATS = {
+        'evf_angle': 'evf_plane_angle',
+        'evf_score': 'evf_score',
+    }
+
+    def __init__(self):
+        self.stats: Dict[str, RunningStat] = {name: RunningStat() for name in
+                                              (*self.FRAME_STATS, *self.STROKE_STATS, 'glide_score')}
+        self.phase_counts: Dict[str, int] = {}
+
+    @property
+    def count(self) -> int:
+        return self.stats['score'].count
+
+    @property
+    def glide_count(self) -> int:
+        return self.stats['glide_score'].count
+
+    def __getitem__(self, name: str) -> RunningStat:
+        return self.stats[name]
+
+    def add(self, m: FrameMetrics) -> None:
+        for name, attr in self.FRAME_STATS.items():
+            self.stats[name].add(getattr(m, attr))
+        if m.phase in ("Pull", "Push"):
+            for name, attr in self.STROKE_STATS.items():
+                self.stats[name].add(getattr(m, attr))
+        if m.is_gliding:
+            self.stats['glide_score'].add(m.glide_score)
+        self.phase_counts[m.phase] = self.phase_counts.get(m.phase, 0) + 1
+
+    @classmethod
+    def from_columns(cls, cols: Dict[str, np.ndarray], rows: np.ndarray) -> "FrameAggregates":
+        """Aggregates of the selected rows of FrameMetricStore columns (vectorized add())"""
+        out = cls()
+        for name, attr in cls.FRAME_STATS.items():
+            out.stats[name] = RunningStat.from_array(cols[attr][rows])
+        pull_push = rows & np.isin(cols['phase'], ("Pull", "Push"))
+        for name, attr in cls.STROKE_STATS.items():
+            out.stats[name] = RunningStat.from_array(cols[attr][pull_push])
+        out.stats['glide_score'] = RunningStat.from_array(cols['glide_score'][rows & cols['is_gliding']])
+        phases, counts = np.unique(cols['phase'][rows], return_counts=True)
+        out.phase_counts = {str(p): int(n) for p, n in zip(phases, counts)}
+        return out
+
+    def merge(self, other: "FrameAggregates") -> "FrameAggregates":
+        out = FrameAggregates()
+        out.stats = {name: stat.merge(other.stats[name]) for name, stat in self.stats.items()}
+        out.phase_counts = dict(self.phase_counts)
+        for phase, n in other.phase_counts.items():
+            out.phase_counts[phase] = out.phase_counts.get(phase, 0) + n
+        return out
+
+
+class SummaryAccumulator:
+    """
+    Online session statistics, updated once per analyzed frame.
+
+    Keeps aggregates for all frames and for high-confidence frames (the
+    summary prefers the latter and falls back to the former), so
+    get_summary() never has to revisit per-frame metrics.
+    """
+
+    def __init__(self, conf_threshold: float = DEFAULT_CONF_THRESHOLD):
+        self.conf_threshold = conf_threshold
+        self.all_frames = FrameAggregates()
+        self.high_conf = FrameAggregates()
+        self.confidence = RunningStat()
+        self.last_time_s = 0.0
+
+    @property
+    def count(self) -> int:
+        return self.all_frames.count
+
+    @property
+    def summary_frames(self) -> FrameAggregates:
+        """Aggregates the summary is computed from"""
+        return self.high_conf if self.high_conf.count else self.all_frames
+
+    def add(self, m: FrameMetrics) -> None:
+        self.all_frames.add(m)
+        if m.confidence >= self.conf_threshold:
+            self.high_conf.add(m)
+        self.confidence.add(m.confidence)
+        self.last_time_s = m.time_s
+
+    @classmethod
+    def from_store(cls, metrics: "FrameMetricStore", rows: np.ndarray,
+                   conf_threshold: float = DEFAULT_CONF_THRESHOLD) -> "SummaryAccumulator":
+        """Accumulator over a subset of stored frames (rows: bool mask per stored row)"""
+        names = {*FrameAggregates.FRAME_STATS.values(), *FrameAggregates.STROKE_STATS.values(),
+                 'phase', 'is_gliding', 'glide_score', 'confidence', 'time_s'}
+        cols = {name: metrics.column(name) for name in names}
+        cols['phase'] = cols['phase'].astype(str)
+        out = cls(conf_threshold)
+        out.all_frames = FrameAggregates.from_columns(cols, rows)
+        out.high_conf = FrameAggregates.from_columns(cols, rows & (cols['confidence'] >= conf_threshold))
+        out.confidence = RunningStat.from_array(cols['confidence'][rows])
+        times = cols['time_s'][rows]
+        out.last_time_s = float(times[-1]) if len(times) else 0.0     # Last selected row, not the whole store
+        return out
+
+    def merge(self, other: "SummaryAccumulator") -> "SummaryAccumulator":
+        out = SummaryAccumulator(self.conf_threshold)
+        out.all_frames = self.all_frames.merge(other.all_frames)
+        out.high_conf = self.high_conf.merge(other.high_conf)
+        out.confidence = self.confidence.merge(other.confidence)
+        out.last_time_s = max(self.last_time_s, other.last_time_s)
+        return out
+
+class PartialSummary:
+    """
+    Sufficient statistics of one analyzed clip (or of several, merged).
+
+    merge() is associative, with PartialSummary() as identity, so halves of
+    a video or clips analyzed by different workers / camera angles can be
+    reduced in any grouping and turned into one SessionSummary by
+    build_session_summary() without re-reading frames.
+
+    Stroke times are kept per clip (stroke_segments): stroke rate is only
+    measured within a clip, never across the gap between two clips.
+    """
+
+    def __init__(self, accumulator: Optional[SummaryAccumulator] = None, duration_s: float = 0.0,
+                 stroke_segments: Optional[List[List[float]]] = None,
+                 breath_events: Optional[List[Tuple[float, str]]] = None,
+                 breaths_during_pull: int = 0, dropped_elbow_frames: int = 0,
+                 pull_phase_frames: int = 0, glide_frames: int = 0, clips: Optional[int] = None):
+        self.accumulator = accumulator if accumulator is not None else SummaryAccumulator()
+        self.duration_s = duration_s
+        self.stroke_segments = stroke_segments if stroke_segments is not None else []
+        self.breath_events = breath_events if breath_events is not None else []
+        self.breaths_during_pull = breaths_during_pull
+        self.dropped_elbow_frames = dropped_elbow_frames
+        self.pull_phase_frames = pull_phase_frames
+        self.glide_frames = glide_frames
+        self.clips = clips if clips is not None else int(self.accumulator.count > 0)
+
+    def merge(self, other: "PartialSummary") -> "PartialSummary":
+        """Combined statistics of both (neither input is modified)"""
+        return PartialSummary(
+            accumulator=self.accumulator.merge(other.accumulator),
+            duration_s=self.duration_s + other.duration_s,
+            stroke_segments=self.stroke_segments + other.stroke_segments,
+            breath_events=self.breath_events + other.breath_events,
+            breaths_during_pull=self.breaths_during_pull + other.breaths_during_pull,
+            dropped_elbow_frames=self.dropped_elbow_frames + other.dropped_elbow_frames,
+            pull_phase_frames=self.pull_phase_frames + other.pull_phase_frames,
+            glide_frames=self.glide_frames + other.glide_frames,
+            clips=self.clips + other.clips,
+        )
+
+    @property
+    def breath_left(self) -> int:
+        return sum(1 for _, side in self.breath_events if side == 'L')
+
+    @property
+    def breath_right(self) -> int:
+        return sum(1 for _, side in self.breath_events if side == 'R')
+
+    @property
+    def total_strokes(self) -> int:
+        return sum(len(seg) for seg in self.stroke_segments)
+
+    @property
+    def stroke_rate(self) -> float:
+        """Strokes per minute over the stroke intervals of every clip"""
+        intervals = 0
+        span = 0.0
+        for seg in self.stroke_segments:
+            if len(seg) >= 2 and seg[-1] - seg[0] > 0.1:
+                intervals += len(seg) - 1
+                span += seg[-1] - seg[0]
+        return 60 * intervals / span if span > 0 else 0
+
+
+def merge_partial_summaries(parts: List[PartialSummary]) -> PartialSummary:
+    """Reduce any number of partial summaries into one"""
+    merged = PartialSummary()
+    for part in parts:
+        merged = merged.merge(part)
+    return merged
+
+
+def build_session_summary(partial: PartialSummary, **extras) -> SessionSummary:
+    """
+    SessionSummary (scores, rates, diagnostics) from sufficient statistics.
+
+    extras are passed through to SessionSummary (key frames, video context,
+    stroke index) - they are not derivable from a partial summary.
+    """
+    acc = partial.accumulator
+    if not acc.count:
+        return SessionSummary(0,0,0,0,0,0,0,0,0,0,0,"No data",1.0,None,None)
+
+    d = partial.duration_s
+    breath_l, breath_r = partial.breath_left, partial.breath_right
+    # High-confidence frames, or all frames if none pass the threshold
+    frames = acc.summary_frames
+
+    # Stroke rate calculation
+    sr = partial.stroke_rate
+
+    bpm = (breath_l + breath_r) / (d/60) if d > 0 else 0
+
+    avg_kick_sym = frames['kick_symmetry'].mean_or(0)
+    avg_kick_depth = frames['kick_depth'].mean_or(0)
+
+    # Determine kick status
+    kick_sym_ok = avg_kick_sym < DEFAULT_KICK_SYM_MAX_GOOD
+    kick_depth_ok = DEFAULT_KICK_DEPTH_GOOD[0] < avg_kick_depth < DEFAULT_KICK_DEPTH_GOOD[1]
+    if kick_sym_ok and kick_depth_ok:
+        kick_status = "Good"
+    elif kick_sym_ok or kick_depth_ok:
+        kick_status = "OK"
+    else:
+        kick_status = "Needs Work"
+
+    # Calculate dropped elbow percentage
+    dropped_elbow_pct = (partial.dropped_elbow_frames / partial.pull_phase_frames * 100) if partial.pull_phase_frames > 0 else 0
+
+    # Calculate averages
+    avg_h_dev = frames['horizontal_deviation'].mean_or(0)
+    avg_v_drop = frames['vertical_drop'].mean_or(0)
+    avg_evf = frames['evf_angle'].mean_or(0)
+    avg_roll = frames['body_roll'].mean_or(0)
+
+    # Generate diagnostics - prioritized by importance
+    diagnostics = []
+
+    # 1. DROPPED ELBOW - Most critical EVF issue
+    if dropped_elbow_pct > 50:
+        diagnostics.append(f"🚨 DROPPED ELBOW detected in {dropped_elbow_pct:.0f}% of catch frames - this is your #1 priority! Keep elbow HIGH and above wrist during the catch.")
+    elif dropped_elbow_pct > 20:
+        diagnostics.append(f"⚠️ Dropped elbow detected in {dropped_elbow_pct:.0f}% of catch frames - focus on 'elbow up' cue during entry and catch.")
+
+    # 2. VERTICAL DROP / SINKING - Critical for drag
+    if avg_v_drop > 15:
+        diagnostics.append("🚨 SINKING HIPS/LEGS - your lower body is dragging. Focus on: head position (look down), core engagement, and kick from hips.")
+    elif avg_v_drop > 8:
+        diagnostics.append("⚠️ Slight hip drop detected - engage core and press chest down slightly to lift hips.")
+
+    # 3. Horizontal alignment (lateral)
+    if avg_h_dev > DEFAULT_HORIZONTAL_DEV_OK[1]:
+        diagnostics.append("⚠️ Body alignment deviation - you may be 'snake swimming'. Focus on rotating around your spine axis.")
+
+    # 4. EVF angle (if not already flagged for dropped elbow)
+    if dropped_elbow_pct <= 20:
+        if avg_evf > DEFAULT_EVF_ANGLE_OK[1]:
+            diagnostics.append("⚠️ EVF needs work - focus on 'fingertips down, elbow up' during the catch.")
+        elif avg_evf > DEFAULT_EVF_ANGLE_GOOD[1]:
+            diagnostics.append("💡 EVF is OK - work on reaching forward then dropping fingertips before pulling.")
+
+    # 5. Breathing during pull
+    if partial.breaths_during_pull > 0:
+        diagnostics.append(f"⚠️ {partial.breaths_during_pull} breath(s) during pull phase - breathe during recovery to maintain EVF.")
+
+    # 6. Body roll
+    if avg_roll < DEFAULT_ROLL_GOOD[0]:
+        diagnostics.append("💡 Body roll is too flat - aim for 35-55° rotation to engage lats.")
+    elif avg_roll > DEFAULT_ROLL_GOOD[1]:
+        diagnostics.append("⚠️ Excessive body roll - this may cause energy leaks and over-rotation.")
+
+    # 7. Breathing balance
+    breath_balance = abs(breath_l - breath_r)
+    if breath_balance > 5:
+        side = "left" if breath_l > breath_r else "right"
+        diagnostics.append(f"💡 Breathing is asymmetric (favoring {side}) - practice bilateral breathing.")
+
+    # Calculate glide metrics
+    glide_ratio = (frames.glide_count / frames.count * 100) if frames.count else 0
+    avg_glide_score = frames['glide_score'].mean_or(0)
+
+    # 8. GLIDE assessment
+    if glide_ratio < 10:
+        diagnostics.append("🚨 MINIMAL GLIDE detected - you're rushing your stroke! Extend your lead arm and glide briefly after each entry to maximize distance per stroke.")
+    elif glide_ratio < 20:
+        diagnostics.append("⚠️ Low glide ratio ({:.0f}%) - try extending your lead arm longer before starting the catch. This improves efficiency.".format(glide_ratio))
+    elif glide_ratio > 40:
+        diagnostics.append("💡 High glide ratio ({:.0f}%) - good for distance swimming! For sprints, you may want to reduce glide time.".format(glide_ratio))
+    elif avg_glide_score < 60 and glide_ratio >= 15:
+        diagnostics.append("💡 Glide detected but form could improve - focus on full arm extension and streamlined body during glide phase.")
+
+    # 9. Fatigue - technique degrading over the session
+    fatigue = extras.get('fatigue')
+    if fatigue is not None and fatigue.worsening:
+        diagnostics.append("📉 Technique fades over the session - " + "; ".join(t.describe() for t in fatigue.worsening)
+                           + ". Build endurance at race pace, or shorten repeats to hold form.")
+
+    if not diagnostics:
+        diagnostics.append("✅ Great technique! Keep up the good work.")
+
+    return SessionSummary(
+        duration_s=d,
+        avg_score=frames['score'].mean_or(0),
+        avg_body_roll=avg_roll,
+        max_body_roll=frames['body_roll'].max_or(0),
+        stroke_rate=sr,
+        breaths_per_min=bpm,
+        breath_left=breath_l,
+        breath_right=breath_r,
+        total_strokes=partial.total_strokes,
+        avg_kick_symmetry=avg_kick_sym,
+        avg_kick_depth=avg_kick_depth,
+        kick_status=kick_status,
+        avg_confidence=acc.confidence.mean_or(1.0),
+        avg_horizontal_deviation=avg_h_dev,
+        avg_vertical_drop=avg_v_drop,
+        avg_evf_angle=avg_evf,
+        dropped_elbow_frames=partial.dropped_elbow_frames,
+        dropped_elbow_pct=dropped_elbow_pct,
+        avg_alignment_score=frames['alignment_score'].mean_or(100),
+        avg_evf_score=frames['evf_score'].mean_or(100),
+        breaths_during_pull=partial.breaths_during_pull,
+        total_breaths=breath_l + breath_r,
+        diagnostics=diagnostics,
+        # Glide metrics
+        glide_ratio=glide_ratio,
+        avg_glide_score=avg_glide_score,
+        glide_frames=partial.glide_frames,
+        total_analyzed_frames=frames.count,
+        **extras
+    )
@@ -0,0 +1,956 @@
+"""SwimAnalyzer: MediaPipe pose detection and per-frame technique metrics."""
+import cv2
+import numpy as np
+import os
+import urllib.request
+import copy
+import logging
+from typing import Callable, List, Optional, Dict, Tuple
+
+from .constants import (
+    BREATH_PULL_PENALTY, DEFAULT_EVF_ANGLE_GOOD, DEFAULT_EVF_ANGLE_OK, DEFAULT_HORIZONTAL_DEV_GOOD,
+    DEFAULT_HORIZONTAL_DEV_OK, DEFAULT_KICK_DEPTH_GOOD, DEFAULT_KICK_DEPTH_OK,
+    DEFAULT_KICK_SYM_MAX_GOOD, DEFAULT_ROLL_GOOD, DEFAULT_ROLL_OK, DEFAULT_TORSO_GOOD,
+    DEFAULT_TORSO_OK, FATIGUE_MIN_WINDOWS, LIVE_SPARKLINE_BUCKET_S, MIN_BREATH_GAP_S,
+    MIN_BREATH_HOLD_FRAMES, STROKE_PROMINENCE_DEG,
+)
+from .models import (
+    AthleteProfile, CameraView, FrameMetrics, LiveSummary, SessionSummary, VideoContext, WaterPosition,
+)
+from .geometry import (
+    TRACKED_LANDMARK_INDICES, compute_evf_plane_angle, compute_geometry, compute_glide_metrics,
+    compute_kick_depth_relative, detect_phase_enhanced, detect_strokes, get_alignment_status,
+    lm_array_to_dict, pose_landmarks_to_array,
+)
+from .smoothing import MetricSmoother
+from .aggregates import PartialSummary, SummaryAccumulator, build_session_summary
+from .store import FrameMetricStore
+from .key_frames import KeyFrameTracker
+from .context import VideoContextDetector, get_metrics_for_context
+from .overlay import OverlayCompositor, draw_frame_overlay
+from .strokes import StrokeIndex
+from .fatigue import compute_fatigue_report
+from .pool import segment_pool_lengths
+from .tracks import LandmarkTrackWriter
+
+logger = logging.getLogger(__name__)
+
+# ─────────────────────────────────────────────
+# MEDIAPIPE TASKS API
+# ─────────────────────────────────────────────
+
+try:
+    import mediapipe as mp
+    from mediapipe.tasks import python
+    from mediapipe.tasks.python import vision
+    MEDIAPIPE_TASKS_AVAILABLE = True
+except ImportError:
+    MEDIAPIPE_TASKS_AVAILABLE = False
+
+
+def download_model(model_url: str, model_path: str, model_size: str,
+                   on_status: Optional[Callable[[str], None]] = None) -> str:
+    """
+    Download a pose model unless it is already on disk. The file is written
+    under a temporary name and renamed, so concurrent workers never load a
+    partial download.
+
+    on_status(message) receives progress messages (default: the module logger).
+    """
+    if os.path.exists(model_path):
+        return model_path
+    notify = on_status or logger.info
+    notify(f"⏳ First run: Downloading MediaPipe Pose model ({model_size})...")
+    tmp_path = f"{model_path}.{os.getpid()}.part"
+    try:
+        urllib.request.urlretrieve(model_url, tmp_path)
+        os.replace(tmp_path, model_path)
+    except Exception as e:
+        logger.error("Failed to download model: %s", e)
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    notify("✅ Model downloaded successfully!")
+    return model_path
+
+# ─────────────────────────────────────────────
+# ANALYZER CLASS – Enhanced with new metrics
+# ─────────────────────────────────────────────
+
+class SwimAnalyzer:
+    # Use LITE model for faster downloads and sufficient accuracy for swimming analysis
+    # Heavy model: ~120MB, Lite model: ~8MB
+    MODEL_URL_LITE = "https://storage.googleapis.com/mediapipe-models/pose_landmarker/pose_landmarker_lite/float16/1/pose_landmarker_lite.task"
+    MODEL_URL_HEAVY = "https://storage.googleapis.com/mediapipe-models/pose_landmarker/pose_landmarker_heavy/float16/1/pose_landmarker_heavy.task"
+    MODEL_FILENAME_LITE = "pose_landmarker_lite.task"
+    MODEL_FILENAME_HEAVY = "pose_landmarker_heavy.task"
+    
+    # Default to lite for cloud deployment
+    USE_LITE_MODEL = True
+
+    def __init__(self, athlete: AthleteProfile, conf_thresh, yaw_thresh, 
+                 manual_camera_view: Optional[CameraView] = None,
+                 manual_water_position: Optional[WaterPosition] = None,
+                 use_heavy_model: bool = False,
+                 smoothing: str = "mean",
+                 render_overlays: bool = True,
+                 on_status: Optional[Callable[[str], None]] = None,
+                 metrics_dir: Optional[str] = None,
+                 replay: bool = False):
+        self.athlete = athlete
+        # Receives user-facing status messages (model download); defaults to the module logger
+        self.on_status = on_status
+        # False = analysis-only: no drawing per frame, video rendered later on request
+        self.render_overlays = render_overlays
+        self.conf_thresh = conf_thresh
+        self.yaw_thresh = yaw_thresh
+        self.use_heavy_model = use_heavy_model
+        # True = no pose model: landmarks come from process_landmarks() (see replay_track)
+        self.replay = replay
+
+        self.landmarker = None if replay else self._init_landmarker()
+        
+        # Video context detection
+        self.context_detector = VideoContextDetector()
+        self.video_context = VideoContext()
+        self.available_metrics = {}
+        
+        # Manual override if provided
+        if manual_camera_view and manual_water_position:
+            self.context_detector.force_context(manual_camera_view, manual_water_position)
+            self.video_context = self.context_detector.get_context()
+            self.available_metrics = get_metrics_for_context(self.video_context)
+
+        # Per-frame metrics + (33, 2) normalized landmarks (columnar, spills to disk on long videos;
+        # with metrics_dir, straight into that directory so a pickled analyzer can be reopened elsewhere)
+        self.metrics = FrameMetricStore(spill_dir=metrics_dir)
+        self._next_frame_idx = 0
+        self.breath_l = self.breath_r = 0
+        self.breath_side = 'N'
+        self.breath_persist = 0
+        self.last_breath = -1000
+        # Elbow-angle series for batched stroke detection (see detect_strokes)
+        self.elbow_series: List[float] = []
+        self.time_series: List[float] = []
+        self.stroke_prominence = STROKE_PROMINENCE_DEG
+        self._stroke_cache = None
+        self._stroke_index = None
+        self._pool_segmentation = None
+        self._fatigue_report = None
+        # Best/worst Pull frames: one retained raw frame per slot, JPEG-encoded once on demand
+        self.best_dev = float('inf')
+        self.worst_dev = -float('inf')
+        self._key_frames: Dict[str, Tuple[int, np.ndarray]] = {}
+        self._key_frame_jpegs: Dict[str, bytes] = {}
+        # Top-k gallery candidates (indices only; frames decoded after the pass)
+        self.key_frame_tracker = KeyFrameTracker()
+
+        # Smoothing: torso, forearm, kick depth, horizontal dev, EVF, vertical drop
+        self.smoother = MetricSmoother(channels=6, method=smoothing)
+        
+        # Track last timestamp and wrist position
+        self.last_timestamp_ms = -1
+        self.prev_wrist_y = None
+        
+        # Breathing during pull tracking
+        self.breaths_during_pull = 0
+        self.breath_events: List[Tuple[float, str]] = []  # (time_s, 'L'/'R') per counted breath
+        
+        # Dropped elbow tracking (only during Pull phase for catch analysis)
+        self.dropped_elbow_frames = 0
+        self.pull_phase_frames = 0
+        
+        # Glide tracking
+        self.glide_frames = 0
+
+        # Online session statistics (get_summary / live_snapshot read these, not self.metrics)
+        self.accumulator = SummaryAccumulator()
+        self.score_sparkline: List[float] = []
+        self._spark_bucket = [0.0, 0, 0.0]     # score sum, count, bucket start time
+
+        # Overlay drawing (created on the first frame, per frame size)
+        self.compositor: Optional[OverlayCompositor] = None
+
+        # Set by analyze_video(track_path=...): raw pose landmarks of every detection are recorded
+        self.track_writer: Optional[LandmarkTrackWriter] = None
+
+    def _init_landmarker(self):
+        if not MEDIAPIPE_TASKS_AVAILABLE:
+            raise RuntimeError("MediaPipe Tasks not available")
+
+        # Choose model based on setting
+        if self.use_heavy_model:
+            model_url = self.MODEL_URL_HEAVY
+            model_filename = self.MODEL_FILENAME_HEAVY
+            model_size = "~120 MB - may take a minute"
+        else:
+            model_url = self.MODEL_URL_LITE
+            model_filename = self.MODEL_FILENAME_LITE
+            model_size = "~8 MB"
+        
+        # Download with caching
+        model_path = download_model(model_url, model_filename, model_size, self.on_status)
+
+        base_options = python.BaseOptions(
+            model_asset_path=model_path,
+            delegate=python.BaseOptions.Delegate.CPU
+        )
+        options = vision.PoseLandmarkerOptions(
+            base_options=base_options,
+            running_mode=vision.RunningMode.VIDEO,
+            num_poses=1,
+            min_pose_detection_confidence=0.5,
+            min_pose_presence_confidence=0.5,
+            min_tracking_confidence=0.5,
+            output_segmentation_masks=False
+        )
+        return vision.PoseLandmarker.create_from_options(options)
+
+    def process(self, frame, t, timestamp_ms, fps=30.0, frame_idx: Optional[int] = None):
+        """
+        Process a frame with pose detection.
+        
+        Args:
+            frame: BGR image frame
+            t: Real time in seconds (for metrics/stroke timing)
+            timestamp_ms: Monotonically increasing timestamp in milliseconds for MediaPipe
+            fps: Frames per second for velocity calculations
+            frame_idx: Index of the frame in the source video (defaults to a running count)
+        """
+        frame_idx = self._frame_index(frame_idx)
+        if self.landmarker is None:
+            return frame, None
+
+        # Ensure timestamp is strictly increasing
+        if timestamp_ms <= self.last_timestamp_ms:
+            timestamp_ms = self.last_timestamp_ms + 1
+        self.last_timestamp_ms = timestamp_ms
+
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb)
+
+        result = self.landmarker.detect_for_video(mp_image, timestamp_ms)
+
+        if not result.pose_landmarks:
+            # Analyze frame for context detection (even without landmarks)
+            if not self.context_detector.detection_complete:
+                self.context_detector.analyze_frame(frame, None)
+                # Check if detection just completed
+                if self.context_detector.detection_complete:
+                    self.video_context = self.context_detector.get_context()
+                    self.available_metrics = get_metrics_for_context(self.video_context)
+            return frame, None
+
+        landmarks = result.pose_landmarks[0]
+        if self.track_writer is not None:
+            self.track_writer.append_pose(frame_idx, t, landmarks)
+        landmarks_norm, vis = pose_landmarks_to_array(landmarks)
+        return self.process_landmarks(landmarks_norm, vis, t, fps, frame_idx, frame=frame)
+
+    def _frame_index(self, frame_idx: Optional[int]) -> int:
+        if frame_idx is None:
+            frame_idx = self._next_frame_idx
+        self._next_frame_idx = frame_idx + 1
+        return frame_idx
+
+    def process_landmark_batch(self, landmarks_norm: np.ndarray, vis: np.ndarray, times: List[float],
+                               frame_idx: List[int], frame_size: Tuple[int, int], fps: float = 30.0) -> None:
+        """
+        process_landmarks over consecutive poses without frames (replay). The
+        geometry kernel runs once over the whole (N, 13, 2) batch instead of
+        once per pose; the rest of the per-pose state is sequential.
+
+        Args:
+            landmarks_norm: (N, 33, 2) normalized x, y
+            vis: (N, 33) visibility
+            times: (N,) real times in seconds
+            frame_idx: (N,) indices of the frames in the source video
+            frame_size: (width, height) in pixels
+        """
+        w, h = frame_size
+        geom = compute_geometry(landmarks_norm[:, TRACKED_LANDMARK_INDICES] * (w, h))
+        columns = {k: v.tolist() if v.ndim == 1 else v for k, v in geom.items()}
+        for j in range(len(times)):
+            self.process_landmarks(landmarks_norm[j], vis[j], times[j], fps, frame_idx[j], frame_size=frame_size,
+                                   geometry={k: v[j] for k, v in columns.items()})
+
+    def process_landmarks(self, landmarks_norm: np.ndarray, vis: np.ndarray, t: float, fps: float = 30.0,
+                          frame_idx: Optional[int] = None, frame: Optional[np.ndarray] = None,
+                          frame_size: Optional[Tuple[int, int]] = None, geometry: Optional[Dict] = None):
+        """
+        Metrics for one detected pose: validation, phase, breathing, scoring.
+
+        process() calls this with each MediaPipe detection. Called directly
+        (replay), the frame is optional unless the analyzer renders
+        overlays; without it the pixel-based steps are skipped: context
+        detection (pass manual_camera_view / manual_water_position), the
+        pool-marking check, re-detection of inverted footage (the
+        coordinates are flipped instead) and best/worst key frames.
+
+        Args:
+            landmarks_norm: (33, 2) normalized x, y of all pose landmarks
+            vis: (33,) visibility
+            t: Real time in seconds
+            fps: Frames per second for velocity calculations
+            frame_idx: Index of the frame in the source video (defaults to a running count)
+            frame: BGR image frame, if available
+            frame_size: (width, height) in pixels - required without a frame
+            geometry: compute_geometry of this pose, if already computed (see
+                process_landmark_batch); recomputed when the pose is flipped
+        """
+        frame_idx = self._frame_index(frame_idx)
+        if frame is not None:
+            h, w = frame.shape[:2]
+        elif self.render_overlays:
+            raise ValueError("render_overlays needs the frame: create the analyzer with render_overlays=False")
+        elif frame_size is None:
+            raise ValueError("frame_size is required when no frame is given")
+        else:
+            w, h = frame_size
+
+        # Contiguous (13, 2) pixel array for the geometry kernel, dict view for the helpers
+        pts = landmarks_norm[TRACKED_LANDMARK_INDICES] * (w, h)
+        lm_pixel = lm_array_to_dict(pts)
+        conf = float(vis[TRACKED_LANDMARK_INDICES].mean())
+        
+        # === POSE VALIDATION ===
+        # Reject false positives where MediaPipe detects pool lane markings as a person
+        # A valid human pose should have:
+        # 1. Reasonable body proportions (not too stretched or compressed)
+        # 2. Shoulder width > 0 (not a single line)
+        # 3. Body parts in realistic relative positions
+        # 4. NOT be a pool floor marking (dark blue in bottom of frame)
+        
+        def validate_pose(lm_pixel, frame_bgr, frame_h, frame_w):
+            """Validate that detected pose is actually a human, not a pool lane marking"""
+            try:
+                # Get key measurements
+                left_shoulder = np.array(lm_pixel["left_shoulder"])
+                right_shoulder = np.array(lm_pixel["right_shoulder"])
+                left_hip = np.array(lm_pixel["left_hip"])
+                right_hip = np.array(lm_pixel["right_hip"])
+                nose = np.array(lm_pixel["nose"])
+                left_ankle = np.array(lm_pixel["left_ankle"])
+                right_ankle = np.array(lm_pixel["right_ankle"])
+                
+                # 1. Shoulder width should be reasonable (not near zero)
+                shoulder_width = np.linalg.norm(left_shoulder - right_shoulder)
+                min_shoulder_width = min(frame_w, frame_h) * 0.02  # At least 2% of frame
+                if shoulder_width < min_shoulder_width:
+                    return False, "shoulders too narrow"
+                
+                # 2. Hip width should be reasonable
+                hip_width = np.linalg.norm(left_hip - right_hip)
+                if hip_width < min_shoulder_width * 0.5:
+                    return False, "hips too narrow"
+                
+                # 3. Torso length should be reasonable
+                mid_shoulder = (left_shoulder + right_shoulder) / 2
+                mid_hip = (left_hip + right_hip) / 2
+                torso_length = np.linalg.norm(mid_shoulder - mid_hip)
+                
+                # Torso should be at least as long as shoulder width (roughly)
+                if torso_length < shoulder_width * 0.3:
+                    return False, "torso too short"
+                
+                # 4. Body shouldn't be extremely elongated (like a lane line)
+                body_height = max(
+                    np.linalg.norm(nose - mid_hip),
+                    torso_length
+                )
+                body_width = max(shoulder_width, hip_width)
+                
+                aspect_ratio = body_height / (body_width + 1)
+                if aspect_ratio > 15:
+                    return False, "too elongated"
+                
+                # 5. Nose should be reasonably close to shoulders
+                nose_to_shoulders = np.linalg.norm(nose - mid_shoulder)
+                if nose_to_shoulders > torso_length * 3:
+                    return False, "head too far from body"
+                
+                # 6. All key points should be within frame bounds
+                margin = 0.1
+                for name, (x, y) in lm_pixel.items():
+                    if x < -frame_w * margin or x > frame_w * (1 + margin):
+                        return False, f"{name} out of frame horizontally"
+                    if y < -frame_h * margin or y > frame_h * (1 + margin):
+                        return False, f"{name} out of frame vertically"
+                
+                # === POOL FLOOR MARKING DETECTION ===
+                # Pool floor markings are:
+                # - Located in bottom portion of frame (in above-water footage)
+                # - Dark blue/teal colored (not skin tones)
+                
+                # 7. Check if all major body points are in bottom 60% of frame
+                all_points = [nose, left_shoulder, right_shoulder, mid_hip, left_ankle, right_ankle]
+                points_in_bottom = sum(1 for p in all_points if p[1] > frame_h * 0.4)
+                
+                if points_in_bottom >= 5 and frame_bgr is not None:  # Most points in bottom portion
+                    # Sample colors around the detected "body"
+                    all_x = [p[0] for p in all_points]
+                    all_y = [p[1] for p in all_points]
+                    min_x = max(0, int(min(all_x)) - 10)
+                    max_x = min(frame_w-1, int(max(all_x)) + 10)
+                    min_y = max(0, int(min(all_y)) - 10)
+                    max_y = min(frame_h-1, int(max(all_y)) + 10)
+                    
+                    if max_x > min_x + 20 and max_y > min_y + 20:
+                        roi = frame_bgr[min_y:max_y, min_x:max_x]
+                        
+                        if roi.size > 100:
+                            hsv_roi = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
+                            
+                            # Check for dark pool marking colors (dark blue/teal tiles)
+                            lower_pool_mark = np.array([85, 30, 20])
+                            upper_pool_mark = np.array([135, 255, 140])
+                            pool_mark_mask = cv2.inRange(hsv_roi, lower_pool_mark, upper_pool_mark)
+                            pool_mark_ratio = np.sum(pool_mark_mask > 0) / (roi.shape[0] * roi.shape[1])
+                            
+                            # Check for skin tones
+                            lower_skin = np.array([0, 20, 70])
+                            upper_skin = np.array([25, 150, 255])
+                            skin_mask = cv2.inRange(hsv_roi, lower_skin, upper_skin)
+                            skin_ratio = np.sum(skin_mask > 0) / (roi.shape[0] * roi.shape[1])
+                            
+                            # If mostly dark pool marking color and very little skin = reject
+                            if pool_mark_ratio > 0.25 and skin_ratio < 0.08:
+                                return False, "pool floor marking detected"
+                            
+                            # Check for cyan/teal water color (pool water around marking)
+                            lower_water = np.array([80, 30, 100])
+                            upper_water = np.array([110, 255, 255])
+                            water_mask = cv2.inRange(hsv_roi, lower_water, upper_water)
+                            water_ratio = np.sum(water_mask > 0) / (roi.shape[0] * roi.shape[1])
+                            
+                            # If very high water color + pool marking and no skin = floor marking
+                            if (water_ratio + pool_mark_ratio) > 0.7 and skin_ratio < 0.05:
+                                return False, "pool floor marking (water + marking colors)"
+                
+                # 8. Check minimum body size relative to frame
+                body_area = body_width * body_height
+                frame_area = frame_w * frame_h
+                body_ratio = body_area / frame_area
+                
+                if body_ratio < 0.003:  # Less than 0.3% of frame = too small
+                    return False, "detected body too small"
+                
+                return True, "valid"
+                
+            except Exception as e:
+                return False, f"validation error: {e}"
+        
+        is_valid_pose, validation_reason = validate_pose(lm_pixel, frame, h, w)
+        if not is_valid_pose:
+            # Not a valid human pose - skip this frame
+            return frame, None
+        
+        # Continue context detection with landmarks
+        was_complete = self.context_detector.detection_complete
+        if not was_complete and frame is not None:
+            self.context_detector.analyze_frame(frame, lm_pixel)
+            
+            # Update context once detection completes
+            if self.context_detector.detection_complete:
+                self.video_context = self.context_detector.get_context()
+                self.available_metrics = get_metrics_for_context(self.video_context)
+        
+        if conf < self.conf_thresh:
+            return frame, None
+
+        # Check for inverted video (upside-down footage)
+        # CRITICAL FIX: Do NOT flip above-water footage!
+        # Above-water footage perspective is always correct from the viewer's standpoint.
+        # Only consider flipping for confirmed UNDERWATER footage where camera might be inverted.
+        is_inverted = False
+        
+        # ONLY consider flipping if we have HIGH CONFIDENCE that this is underwater footage
+        # AND the pose clearly indicates inversion
+        is_confirmed_underwater = (
+            self.context_detector.detection_complete and 
+            self.video_context.water_position == WaterPosition.UNDERWATER and
+            self.video_context.confidence > 0.7
+        )
+        
+        # IMPROVED INVERTED DETECTION
+        if is_confirmed_underwater:
+            # Get average positions
+            avg_hip_y = (lm_pixel["left_hip"][1] + lm_pixel["right_hip"][1]) / 2
+            avg_shoulder_y = (lm_pixel["left_shoulder"][1] + lm_pixel["right_shoulder"][1]) / 2
+            
+            # Calculate torso height for threshold
+            torso_height = abs(avg_hip_y - avg_shoulder_y)
+            
+            # Only consider inverted if hips are VERY significantly above shoulders
+            # (more than 50% of torso height, to be very conservative)
+            hips_above_shoulders = avg_hip_y < avg_shoulder_y - torso_height * 0.65
+            # Additional check: ankles should be above hips in inverted footage
+            avg_ankle_y = (lm_pixel["left_ankle"][1] + lm_pixel["right_ankle"][1]) / 2
+            ankles_above_hips = avg_ankle_y < avg_hip_y - 30
+            # Additional check: nose should be well below shoulders in inverted footage
+            head_below_shoulders = False
+            if "nose" in lm_pixel:
+                head_below_shoulders = lm_pixel["nose"][1] > avg_shoulder_y + torso_height * 0.4
+            
+            # Require ALL conditions for flipping
+            is_inverted = hips_above_shoulders and ankles_above_hips and head_below_shoulders
+        
+        if is_inverted:
+            redetected = None
+            if frame is not None:
+                frame = cv2.flip(frame, -1)
+                if self.landmarker is not None:
+                    redetected = self._redetect(frame)
+            # If no landmarks after flip (or no pose model), continue with flipped coordinates
+            # (just invert the coordinates of existing landmarks)
+            landmarks_norm = redetected if redetected is not None else 1.0 - landmarks_norm
+            pts = landmarks_norm[TRACKED_LANDMARK_INDICES] * (w, h)
+            lm_pixel = lm_array_to_dict(pts)
+
+        # Calculate basic metrics - all joint angles, midpoints and projections in one call
+        geom = geometry if geometry is not None and not is_inverted else compute_geometry(pts)
+        elbow = min(geom['elbow_left'], geom['elbow_right'])
+        roll = geom['roll']
+
+        knee_l = geom['knee_left']
+        knee_r = geom['knee_right']
+        kick_sym = abs(knee_l - knee_r)
+
+        symmetry_hips = abs(lm_pixel["left_hip"][0] - lm_pixel["right_hip"][0]) / w * 100
+
+        # NEW: Enhanced phase detection with wrist velocity
+        phase, wrist_velocity_y, current_wrist_y = detect_phase_enhanced(
+            lm_pixel, elbow, self.prev_wrist_y, fps
+        )
+        self.prev_wrist_y = current_wrist_y
+
+        # NEW: Calculate horizontal deviation (body alignment) from the kernel projections
+        vertical_drop_raw = geom['vertical_drop']
+        horizontal_dev_raw = geom['lateral_deviation'] + vertical_drop_raw
+        alignment_status = get_alignment_status(geom['body_length'], geom['lateral_deviation'], vertical_drop_raw)
+        
+        # NEW: Calculate EVF plane angle - now returns tuple with dropped elbow detection
+        evf_angle_raw, is_dropped_elbow, evf_status = compute_evf_plane_angle(lm_pixel)
+        
+        # NEW: Calculate kick depth relative to hip-ankle span
+        kick_depth_raw = compute_kick_depth_relative(lm_pixel)
+
+        # Breathing detection
+        yaw = 0
+        if "nose" in lm_pixel:
+            mid_s = (lm_pixel["left_shoulder"][0] + lm_pixel["right_shoulder"][0]) / 2
+            shoulder_width = abs(lm_pixel["right_shoulder"][0] - lm_pixel["left_shoulder"][0])
+            if shoulder_width > 0:
+                yaw = (lm_pixel["nose"][0] - mid_s) / shoulder_width
+
+        breathing_during_pull = False
+        if abs(yaw) > self.yaw_thresh:
+            side = 'R' if yaw > 0 else 'L'
+            if side == self.breath_side:
+                self.breath_persist += 1
+            else:
+                self.breath_persist = 1
+                self.breath_side = side
+            if self.breath_persist >= MIN_BREATH_HOLD_FRAMES and t - self.last_breath >= MIN_BREATH_GAP_S:
+                if side == 'L': 
+                    self.breath_l += 1
+                else: 
+                    self.breath_r += 1
+                self.last_breath = t
+                self.breath_events.append((t, side))
+                
+                # NEW: Check if breathing during pull phase
+                if phase == "Pull":
+                    breathing_during_pull = True
+                    self.breaths_during_pull += 1
+
+        # Stroke detection runs over the whole series on demand (see detect_strokes)
+        self.elbow_series.append(float(elbow))
+        self.time_series.append(t)
+
+        # Calculate legacy metrics for compatibility
+        torso_raw = geom['torso_lean']
+        forearm_raw = geom['forearm_vertical']
+
+        # Smooth all metrics in one state vector
+        torso, forearm, kick_depth, horizontal_dev, evf_angle, vertical_drop = self.smoother.update(
+            (torso_raw, forearm_raw, kick_depth_raw, horizontal_dev_raw, evf_angle_raw, vertical_drop_raw), t
+        ).tolist()
+        roll_abs = abs(roll)
+        
+        # Track dropped elbow ONLY during Pull phase (the catch)
+        # Dropped elbow is primarily a catch problem - during push the elbow naturally drops
+        # Also only count when elbow angle is in catch range (>100°)
+        if phase == "Pull" and elbow > 100:
+            self.pull_phase_frames += 1
+            if is_dropped_elbow:
+                self.dropped_elbow_frames += 1
+
+        # Calculate sub-scores
+        # Alignment score (0-100)
+        if horizontal_dev <= DEFAULT_HORIZONTAL_DEV_GOOD[1]:
+            alignment_score = 100
+        elif horizontal_dev <= DEFAULT_HORIZONTAL_DEV_OK[1]:
+            alignment_score = 100 - ((horizontal_dev - DEFAULT_HORIZONTAL_DEV_GOOD[1]) / 
+                                     (DEFAULT_HORIZONTAL_DEV_OK[1] - DEFAULT_HORIZONTAL_DEV_GOOD[1]) * 30)
+        else:
+            alignment_score = max(0, 70 - (horizontal_dev - DEFAULT_HORIZONTAL_DEV_OK[1]) * 2)
+
+        # EVF score (only during Pull/Push)
+        if phase in ("Pull", "Push"):
+            if evf_angle <= DEFAULT_EVF_ANGLE_GOOD[1]:
+                evf_score = 100
+            elif evf_angle <= DEFAULT_EVF_ANGLE_OK[1]:
+                evf_score = 100 - ((evf_angle - DEFAULT_EVF_ANGLE_GOOD[1]) / 
+                                   (DEFAULT_EVF_ANGLE_OK[1] - DEFAULT_EVF_ANGLE_GOOD[1]) * 30)
+            else:
+                evf_score = max(0, 70 - (evf_angle - DEFAULT_EVF_ANGLE_OK[1]))
+        else:
+            evf_score = 100  # Don't penalize during recovery
+
+        # Calculate overall score with new components
+        # Weight distribution: Alignment 25%, EVF 25%, Roll 15%, Kick 15%, Torso 10%, Breathing 10%
+        
+        # Roll score
+        if DEFAULT_ROLL_GOOD[0] <= roll_abs <= DEFAULT_ROLL_GOOD[1]:
+            roll_score = 100
+        elif DEFAULT_ROLL_OK[0] <= roll_abs <= DEFAULT_ROLL_OK[1]:
+            roll_score = 80
+        else:
+            roll_score = max(0, 60 - abs(roll_abs - 45))
+
+        # Kick score
+        kick_sym_score = max(0, 100 - (kick_sym / DEFAULT_KICK_SYM_MAX_GOOD * 30))
+        if DEFAULT_KICK_DEPTH_GOOD[0] <= kick_depth <= DEFAULT_KICK_DEPTH_GOOD[1]:
+            kick_depth_score = 100
+        elif DEFAULT_KICK_DEPTH_OK[0] <= kick_depth <= DEFAULT_KICK_DEPTH_OK[1]:
+            kick_depth_score = 80
+        else:
+            kick_depth_score = 60
+        kick_score = (kick_sym_score + kick_depth_score) / 2
+
+        # Torso score
+        if DEFAULT_TORSO_GOOD[0] <= abs(torso) <= DEFAULT_TORSO_GOOD[1]:
+            torso_score = 100
+        elif DEFAULT_TORSO_OK[0] <= abs(torso) <= DEFAULT_TORSO_OK[1]:
+            torso_score = 80
+        else:
+            torso_score = 60
+
+        # NEW: Breathing penalty
+        breath_penalty = BREATH_PULL_PENALTY if breathing_during_pull else 0
+        
+        # NEW: Compute glide metrics - IMPROVED
+        is_gliding, glide_score, arm_extension = compute_glide_metrics(
+            lm_pixel, phase, elbow, horizontal_dev,
+            elbow_angles=(geom['elbow_left'], geom['elbow_right'])
+        )
+        
+        # Track glide frames
+        if is_gliding:
+            self.glide_frames += 1
+
+        # Weighted overall score (updated to include glide)
+        # Weight distribution: Alignment 20%, EVF 20%, Roll 15%, Kick 15%, Torso 10%, Glide 10%, Breathing 10%
+        score = (
+            alignment_score * 0.20 +
+            evf_score * 0.20 +
+            roll_score * 0.15 +
+            kick_score * 0.15 +
+            torso_score * 0.10 +
+            (glide_score if is_gliding else 70) * 0.10 +  # Glide score or neutral
+            100 * 0.10  # Base breathing score
+        ) - breath_penalty
+
+        score = max(0, min(100, score))
+
+        # Store metrics
+        metrics = FrameMetrics(
+            time_s=t,
+            elbow_angle=elbow,
+            knee_left=knee_l,
+            knee_right=knee_r,
+            kick_symmetry=kick_sym,
+            kick_depth_proxy=kick_depth,
+            symmetry_hips=symmetry_hips,
+            score=score,
+            body_roll=roll_abs,
+            torso_lean=torso,
+            forearm_vertical=forearm,
+            phase=phase,
+            breath_state=self.breath_side if self.breath_side != 'N' else "-",
+            confidence=conf,
+            horizontal_deviation=horizontal_dev,
+            vertical_drop=vertical_drop,
+            evf_plane_angle=evf_angle,
+            is_dropped_elbow=is_dropped_elbow,
+            evf_status=evf_status,
+            alignment_status=alignment_status,
+            wrist_velocity_y=wrist_velocity_y,
+            alignment_score=alignment_score,
+            evf_score=evf_score,
+            breathing_during_pull=breathing_during_pull,
+            is_gliding=is_gliding,
+            glide_score=glide_score,
+            arm_extension=arm_extension,
+            frame_idx=frame_idx,
+            is_inverted=is_inverted
+        )
+        self.metrics.append(metrics, landmarks_norm)
+        self.key_frame_tracker.update(metrics, len(self.metrics) - 1)
+        self.accumulator.add(metrics)
+        self._update_sparkline(t, score)
+
+        # Track best/worst frames during Pull phase (raw frame kept, overlay + JPEG deferred)
+        if phase == "Pull" and frame is not None:
+            dev = abs(elbow - 110) + horizontal_dev + evf_angle * 0.5
+            if dev < self.best_dev:
+                self.best_dev = dev
+                self._retain_key_frame('best', frame)
+            if dev > self.worst_dev:
+                self.worst_dev = dev
+                self._retain_key_frame('worst', frame)
+
+        if self.render_overlays:
+            draw_frame_overlay(frame, landmarks_norm, metrics, self._get_compositor(w, h))
+
+        return frame, score
+
+    def _redetect(self, frame) -> Optional[np.ndarray]:
+        """(33, 2) normalized landmarks of an already flipped frame, None if no pose is found"""
+        try:
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb)
+
+            self.last_timestamp_ms += 1
+            result = self.landmarker.detect_for_video(mp_image, self.last_timestamp_ms)
+
+            if result.pose_landmarks:
+                return pose_landmarks_to_array(result.pose_landmarks[0])[0]
+        except Exception:
+            # If re-detection fails, the caller just uses flipped coordinates
+            pass
+        return None
+
+    def _update_sparkline(self, t: float, score: float) -> None:
+        bucket = self._spark_bucket
+        if bucket[1] and t - bucket[2] >= LIVE_SPARKLINE_BUCKET_S:
+            self.score_sparkline.append(bucket[0] / bucket[1])
+            bucket[:] = [0.0, 0, t]
+        if not bucket[1]:
+            bucket[2] = t
+        bucket[0] += score
+        bucket[1] += 1
+
+    def live_snapshot(self) -> LiveSummary:
+        """
+        Partial results so far, from the running aggregates (same high-confidence
+        rule as get_summary). Stroke rate uses the vectorized stroke detector.
+        """
+        acc = self.accumulator
+
+        stroke_times = self.stroke_times
+        sr = 0.0
+        if len(stroke_times) >= 2:
+            dur = stroke_times[-1] - stroke_times[0]
+            if dur > 0.1:
+                sr = 60 * (len(stroke_times) - 1) / dur
+
+        bucket = self._spark_bucket
+        sparkline = self.score_sparkline + ([bucket[0] / bucket[1]] if bucket[1] else [])
+        return LiveSummary(
+            time_s=acc.last_time_s,
+            analyzed_frames=acc.count,
+            avg_score=acc.summary_frames['score'].mean_or(0.0),
+            stroke_rate=sr,
+            total_strokes=len(stroke_times),
+            breath_left=self.breath_l,
+            breath_right=self.breath_r,
+            dropped_elbow_pct=(self.dropped_elbow_frames / self.pull_phase_frames * 100) if self.pull_phase_frames > 0 else 0,
+            score_sparkline=sparkline,
+        )
+
+    def _retain_key_frame(self, slot: str, frame) -> None:
+        """Copy the current raw frame into the slot's buffer (reused, no allocation per update)"""
+        row = len(self.metrics) - 1
+        held = self._key_frames.get(slot)
+        if held is not None and held[1].shape == frame.shape:
+            np.copyto(held[1], frame)
+            self._key_frames[slot] = (row, held[1])
+        else:
+            self._key_frames[slot] = (row, frame.copy())
+        self._key_frame_jpegs.pop(slot, None)
+
+    def _key_frame_jpeg(self, slot: str) -> Optional[bytes]:
+        """Annotate and JPEG-encode a retained key frame (cached until the slot changes)"""
+        if slot not in self._key_frame_jpegs:
+            held = self._key_frames.get(slot)
+            if held is None:
+                return None
+            row, raw = held
+            snapshot = raw.copy()
+            h, w = snapshot.shape[:2]
+            draw_frame_overlay(snapshot, self.metrics.landmarks(row), self.metrics[row], self._get_compositor(w, h))
+            _, buf = cv2.imencode('.jpg', snapshot)
+            self._key_frame_jpegs[slot] = buf.tobytes()
+        return self._key_frame_jpegs[slot]
+
+    @property
+    def best_bytes(self) -> Optional[bytes]:
+        return self._key_frame_jpeg('best')
+
+    @property
+    def worst_bytes(self) -> Optional[bytes]:
+        return self._key_frame_jpeg('worst')
+
+    def _get_compositor(self, w: int, h: int) -> OverlayCompositor:
+        if self.compositor is None or self.compositor.size != (w, h):
+            self.compositor = OverlayCompositor(w, h)
+        return self.compositor
+
+    def __getstate__(self):
+        # The pose model, drawing cache and UI callback stay with the process that created them;
+        # an unpickled analyzer can summarize, export and render, but not process new frames
+        state = self.__dict__.copy()
+        state.update(landmarker=None, compositor=None, on_status=None, track_writer=None)
+        return state
+
+    def reopen(self, on_status: Optional[Callable[[str], None]] = None):
+        """Load the pose model again after unpickling (resuming from a checkpoint)"""
+        self.on_status = on_status
+        if not getattr(self, 'replay', False):
+            self.landmarker = self._init_landmarker()
+
+    def close(self):
+        """Release the pose model (per-frame metrics stay readable until release_metrics())"""
+        if hasattr(self, 'landmarker') and self.landmarker:
+            self.landmarker.close()
+            self.landmarker = None
+
+    def release_metrics(self):
+        """Delete any per-frame metrics spilled to disk"""
+        self.metrics.close()
+
+    def detect_strokes(self, prominence: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Stroke times and frame indices for the series recorded so far.
+        Re-runnable with a different prominence; results are cached per
+        (series length, prominence).
+        """
+        if prominence is None:
+            prominence = self.stroke_prominence
+        key = (len(self.elbow_series), prominence)
+        if self._stroke_cache is None or self._stroke_cache[0] != key:
+            result = detect_strokes(self.elbow_series, self.time_series, prominence)
+            self._stroke_cache = (key, result)
+        return self._stroke_cache[1]
+
+    @property
+    def stroke_times(self) -> List[float]:
+        return self.detect_strokes()[0].tolist()
+
+    def get_stroke_index(self) -> "StrokeIndex":
+        """Per-stroke index over the metrics recorded so far (built once per stroke detection)"""
+        _, stroke_indices = self.detect_strokes()
+        key = (len(self.metrics), tuple(stroke_indices.tolist()))
+        if self._stroke_index is None or self._stroke_index[0] != key:
+            index = StrokeIndex.build(self.metrics, stroke_indices, self.breath_events)
+            self._stroke_index = (key, index)
+        return self._stroke_index[1]
+
+    def get_pool_segmentation(self) -> Optional["PoolSegmentation"]:
+        """
+        Lengths and turns of a pool session (None for other disciplines,
+        camera views other than side - facing and hip travel along the pool
+        are not observable from the front or above - or without a turn)
+        """
+        if self.athlete.discipline != "pool" or self.video_context.camera_view != CameraView.SIDE:
+            return None
+        stroke_times = self.stroke_times
+        key = (len(self.metrics), len(stroke_times))
+        if self._pool_segmentation is None or self._pool_segmentation[0] != key:
+            self._pool_segmentation = (key, segment_pool_lengths(self.metrics, stroke_times))
+        return self._pool_segmentation[1]
+
+    def get_fatigue_report(self) -> Optional["FatigueReport"]:
+        """Windowed fatigue analytics over the metrics recorded so far (per length in the pool)"""
+        segmentation = self.get_pool_segmentation()
+        stroke_times = self.stroke_times
+        key = (len(self.metrics), len(stroke_times), segmentation is not None)
+        cached = getattr(self, '_fatigue_report', None)   # Absent on analyzers pickled before the cache
+        if cached is None or cached[0] != key:
+            if segmentation is not None and len(segmentation.lengths) >= FATIGUE_MIN_WINDOWS:
+                report = compute_fatigue_report(self.metrics, stroke_times, segmentation=segmentation)
+            else:
+                report = compute_fatigue_report(self.metrics, stroke_times)
+            self._fatigue_report = (key, report)
+        return self._fatigue_report[1]
+
+    def get_partial_summary(self, start_s: float = 0.0, free_swim_only: bool = True) -> "PartialSummary":
+        """
+        Mergeable sufficient statistics of this analysis (see merge_partial_summaries).
+
+        start_s is the video time the analyzed chunk starts at, when this
+        analyzer only saw part of a longer video. In a pool session with
+        detected turns, technique and breathing statistics cover free swimming
+        only - turns and push-offs would otherwise skew alignment and stroke rate
+        (free_swim_only=False keeps every frame).
+        """
+        segmentation = self.get_pool_segmentation() if free_swim_only else None
+        if segmentation is not None:
+            free = segmentation.free_mask
+            catch = (free & (self.metrics.column('phase') == "Pull")
+                     & (self.metrics.column('elbow_angle') > 100))
+            # Each breath is counted on a stored row at the same time_s
+            times = self.metrics.column('time_s')
+            breath_rows = np.searchsorted(times, [t for t, _ in self.breath_events]).clip(0, max(len(times) - 1, 0))
+            return PartialSummary(
+                accumulator=SummaryAccumulator.from_store(self.metrics, free,
+                                                          self.accumulator.conf_threshold),
+                duration_s=max(self.accumulator.last_time_s - start_s, 0.0),
+                stroke_segments=[seg for seg in segmentation.stroke_segments if seg],
+                breath_events=[e for e, row in zip(self.breath_events, breath_rows) if free[row]],
+                breaths_during_pull=int((free & self.metrics.column('breathing_during_pull')).sum()),
+                dropped_elbow_frames=int((catch & self.metrics.column('is_dropped_elbow')).sum()),
+                pull_phase_frames=int(catch.sum()),
+                glide_frames=int((free & self.metrics.column('is_gliding')).sum()),
+            )
+
+        stroke_times = self.stroke_times
+        return PartialSummary(
+            accumulator=copy.deepcopy(self.accumulator),
+            duration_s=max(self.accumulator.last_time_s - start_s, 0.0),
+            stroke_segments=[[float(t) for t in stroke_times]] if len(stroke_times) else [],
+            breath_events=list(self.breath_events),
+            breaths_during_pull=self.breaths_during_pull,
+            dropped_elbow_frames=self.dropped_elbow_frames,
+            pull_phase_frames=self.pull_phase_frames,
+            glide_frames=self.glide_frames,
+        )
+
+    def get_summary(self):
+        """
+        Session summary. The core averages come from the online accumulators
+        (O(1) in the number of frames); the stroke index, fatigue report and
+        pool segmentation are O(N) scans of the metric store, cached until
+        more frames or strokes arrive. In a pool session with turns the
+        averages are rebuilt over free-swimming rows (O(N)) as well.
+        """
+        if not self.accumulator.count:
+            return SessionSummary(0,0,0,0,0,0,0,0,0,0,0,"No data",1.0,None,None)
+
+        # Ensure video context is finalized
+        if not self.context_detector.detection_complete:
+            self.video_context = self.context_detector.get_context()
+            self.available_metrics = get_metrics_for_context(self.video_context)
+
+        return build_session_summary(
+            self.get_partial_summary(),
+            best_frame_bytes=self.best_bytes,
+            worst_frame_bytes=self.worst_bytes,
+            video_context=self.video_context,
+            available_metrics=self.available_metrics,
+            stroke_index=self.get_stroke_index(),
+            fatigue=self.get_fatigue_report(),
+            pool_segmentation=self.get_pool_segmentation()
+        )
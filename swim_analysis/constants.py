@@ -0,0 +1,115 @@
+"""Thresholds, defaults and tuning constants of the analysis engine."""
+
+# ─────────────────────────────────────────────
+# CONSTANTS & DEFAULTS - Updated thresholds
+# ─────────────────────────────────────────────
+
+DEFAULT_CONF_THRESHOLD = 0.5
+DEFAULT_YAW_THRESHOLD = 0.15
+MIN_BREATH_GAP_S = 1.0
+MIN_BREATH_HOLD_FRAMES = 4
+
+# Alignment thresholds
+DEFAULT_HORIZONTAL_DEV_GOOD = (0, 8)   # degrees - shoulder-hip-ankle alignment
+DEFAULT_HORIZONTAL_DEV_OK = (0, 15)
+
+# Torso lean thresholds
+DEFAULT_TORSO_GOOD = (4, 12)
+DEFAULT_TORSO_OK   = (0, 18)
+
+# EVF thresholds - now based on plane angle
+DEFAULT_EVF_ANGLE_GOOD = (0, 25)   # degrees from vertical plane
+DEFAULT_EVF_ANGLE_OK = (0, 40)
+
+# Legacy forearm thresholds (for display compatibility)
+DEFAULT_FOREARM_GOOD = (0, 35)
+DEFAULT_FOREARM_OK   = (0, 60)
+
+# Roll thresholds
+DEFAULT_ROLL_GOOD = (35, 55)
+DEFAULT_ROLL_OK   = (25, 65)
+
+# Kick thresholds - now relative to hip-ankle span
+DEFAULT_KICK_SYM_MAX_GOOD = 15
+DEFAULT_KICK_DEPTH_GOOD = (0.15, 0.35)  # Relative to hip-ankle span
+DEFAULT_KICK_DEPTH_OK = (0.10, 0.45)
+
+# Breathing penalty during pull
+BREATH_PULL_PENALTY = 15  # Points deducted for breathing during pull phase
+
+# Metric smoothing
+SMOOTHING_WINDOW = 7             # Frames in the moving average
+SMOOTHING_METHODS = ("mean", "one_euro")
+ONE_EURO_MIN_CUTOFF = 2.0        # Hz - jitter removal when the metric is steady
+ONE_EURO_BETA = 0.05             # Cutoff increase per unit/s of change (less lag when moving)
+ONE_EURO_D_CUTOFF = 1.0          # Hz - derivative filter cutoff
+
+# Stroke detection (elbow-angle local minima)
+STROKE_WINDOW = 9                # Frames in the local-minimum neighbourhood
+STROKE_PROMINENCE_DEG = 10       # Minimum must sit this far below every neighbour
+STROKE_REFRACTORY_S = 0.5        # Minimum time between two detected strokes
+
+# Progress reporting
+PROGRESS_MIN_INTERVAL_S = 0.25   # At most 4 UI updates per second
+PROGRESS_EMA_ALPHA = 0.2         # Weight of the newest rate sample in the fps/ETA estimate
+
+# Checkpoints (resumable analysis)
+CHECKPOINT_INTERVAL_S = 30.0      # Wall-clock seconds between analyzer state snapshots
+CHECKPOINT_VERSION = 2            # Bump when SwimAnalyzer state changes incompatibly
+
+# Live partial results
+LIVE_SUMMARY_INTERVAL_S = 5.0     # Seconds of video between live summary refreshes
+LIVE_SPARKLINE_BUCKET_S = 1.0     # Seconds of video per sparkline point
+
+# Per-frame metric storage
+FRAME_STORE_BATCH_ROWS = 4096     # Rows per columnar batch
+FRAME_STORE_MEMORY_ROWS = 54000   # Rows kept in RAM before spilling to disk (30 min at 30 fps)
+PLOT_MAX_POINTS = 4000            # Longer series are decimated for plotting
+
+# Fatigue analytics
+FATIGUE_WINDOW_S = 30.0           # Seconds per aggregation window
+FATIGUE_MIN_WINDOW_FRAMES = 15    # Sparser windows (tracking lost) are left out of the trend fit
+FATIGUE_MIN_WINDOWS = 3           # Windows needed before a trend is reported
+FATIGUE_MIN_CHANGE_PCT = 5.0      # Fitted start-to-end change that counts as a real trend
+
+# Pool length segmentation
+POOL_FACING_SMOOTH_S = 0.5        # Facing direction is averaged over this (breathing turns the head)
+POOL_MIN_LENGTH_S = 8.0           # Shorter facing reversals are noise, not a length
+POOL_TURN_WINDOW_S = 1.5          # Wall approach / turn excluded either side of a reversal
+POOL_MAX_PUSH_OFF_S = 6.0         # Push-off lasts until the first stroke, at most this long
+POOL_TURN_CUE_WINDOW_S = 3.0      # Turn cues are looked for this far either side of a reversal
+POOL_TURN_DROPOUT_S = 0.5         # Pose lost (or low confidence) this long = underwater turn
+POOL_TURN_MIN_TRAVEL = 0.03       # Hip x travel (fraction of frame width) that shows a direction of travel
+POOL_STREAMLINE_EXTENSION = 0.85  # Median lead-arm extension after the reversal that counts as streamlined
+POOL_TURN_MIN_CUES = 2            # Cues (dropout, hip reversal, streamline) that confirm a facing reversal
+
+# Key-frame gallery
+KEY_FRAME_GALLERY_K = 5          # Frames shown per criterion
+KEY_FRAME_OVERSAMPLE = 4         # Heap holds K x this, so near-duplicates can be skipped
+KEY_FRAME_MIN_GAP_S = 0.5        # Minimum time between two frames of the same criterion
+
+# Background job queue
+JOB_POLL_INTERVAL_S = 1.0         # Idle workers / the dashboard re-check the queue this often
+JOB_HEARTBEAT_S = 5.0             # Running jobs and workers touch their row this often
+JOB_STALE_S = 60.0                # No heartbeat for this long = the worker died, job is requeued
+JOB_MAX_ATTEMPTS = 3              # A job that keeps killing its worker is failed after this many tries
+JOB_PROGRESS_INTERVAL_S = 1.0     # Progress / live results written to the queue at most this often
+JOB_RETENTION_S = 24 * 3600       # Finished, failed and cancelled jobs (and their files) are pruned after this
+JOB_PRUNE_INTERVAL_S = 600.0      # The worker supervisor prunes the queue this often
+
+# Admission control (per-host worker pool sizing)
+JOB_CORES_PER_ANALYSIS = 2        # Pose model + decode + overlay encode keep about two cores busy
+JOB_MEMORY_PER_ANALYSIS_MB = 1500 # Peak RSS of one analysis (model, frame buffers, metric batches)
+JOB_ETA_HISTORY = 20              # Recently finished jobs used to estimate seconds per frame
+JOB_DEFAULT_S_PER_FRAME = 0.05    # Estimate before any job has finished (~20 fps)
+
+# Progress page (session history)
+PROGRESS_PAGE_SIZE = 25           # Sessions per table page
+PROGRESS_WEEKLY_AFTER = 60        # More sessions than this in range: trend charts use weekly means
+PROGRESS_LATENCY_BUDGET_MS = 250  # Query time per page view; slower views are flagged
+
+# Landmark track files
+LANDMARK_TRACK_VERSION = 1        # Bumped on any change to the file layout
+LANDMARK_TRACK_CHUNK_FRAMES = 256 # Frames per independently compressed chunk (~8.5 s at 30 fps)
+LANDMARK_TRACK_COORD_SCALE = 8192 # int16 steps per frame width/height: 0.0001 resolution, ±4 range
+LANDMARK_TRACK_ZLIB_LEVEL = 6     # zlib level per chunk
@@ -0,0 +1,67 @@
+"""CSV export and downloadable result bundles."""
+import os
+import pandas as pd
+import io
+import zipfile
+
+from .analyzer import SwimAnalyzer
+
+# ─────────────────────────────────────────────
+# CSV & ZIP - Enhanced
+# ─────────────────────────────────────────────
+
+# CSV column -> FrameMetrics attribute
+CSV_COLUMNS = {
+    'time_s': 'time_s',
+    'phase': 'phase',
+    'score': 'score',
+    'alignment_score': 'alignment_score',
+    'evf_score': 'evf_score',
+    'horizontal_deviation': 'horizontal_deviation',
+    'evf_plane_angle': 'evf_plane_angle',
+    'body_roll': 'body_roll',
+    'torso_lean': 'torso_lean',
+    'kick_symmetry': 'kick_symmetry',
+    'kick_depth': 'kick_depth_proxy',
+    'elbow_angle': 'elbow_angle',
+    'wrist_velocity_y': 'wrist_velocity_y',
+    'breath_state': 'breath_state',
+    'breathing_during_pull': 'breathing_during_pull',
+    'confidence': 'confidence',
+}
+
+def export_to_csv(analyzer: SwimAnalyzer):
+    """Per-frame CSV, written one store batch at a time"""
+    if not analyzer.metrics:
+        return io.BytesIO()
+    buf = io.BytesIO()
+    for i, batch in enumerate(analyzer.metrics.iter_batches(list(set(CSV_COLUMNS.values())))):
+        df = pd.DataFrame({col: batch[attr] for col, attr in CSV_COLUMNS.items()})
+        df.to_csv(buf, index=False, header=(i == 0))
+    buf.seek(0)
+    return buf
+
+def build_results_zip(video_bytes, csv_buf, pdf_buf, timestamp, fatigue_csv=None):
+    """ZIP of the report and CSVs, plus the annotated video when it has been rendered"""
+    zip_buf = io.BytesIO()
+    with zipfile.ZipFile(zip_buf, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        if video_bytes:
+            zipf.writestr(f"annotated_video_{timestamp}.mp4", video_bytes)
+        zipf.writestr(f"technique_report_{timestamp}.pdf", pdf_buf.getvalue())
+        zipf.writestr(f"frame_data_{timestamp}.csv", csv_buf.getvalue())
+        if fatigue_csv is not None:
+            zipf.writestr(f"fatigue_windows_{timestamp}.csv", fatigue_csv.getvalue())
+    zip_buf.seek(0)
+    return zip_buf
+
+def create_results_bundle(video_path, csv_buf, pdf_buf, timestamp):
+    """Create ZIP with just video, PDF report, and CSV data"""
+    zip_buf = io.BytesIO()
+    with zipfile.ZipFile(zip_buf, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        if os.path.exists(video_path):
+            with open(video_path, 'rb') as f:
+                zipf.writestr(f"annotated_video_{timestamp}.mp4", f.read())
+        zipf.writestr(f"technique_report_{timestamp}.pdf", pdf_buf.getvalue())
+        zipf.writestr(f"frame_data_{timestamp}.csv", csv_buf.getvalue())
+    zip_buf.seek(0)
+    return zip_buf
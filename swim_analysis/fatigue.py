@@ -0,0 +1,174 @@
+"""Windowed fatigue aggregates and trend fits."""
+import numpy as np
+import pandas as pd
+import io
+from dataclasses import dataclass, field
+from typing import List, Optional, Dict
+
+from .constants import (
+    DEFAULT_CONF_THRESHOLD, FATIGUE_MIN_CHANGE_PCT, FATIGUE_MIN_WINDOWS, FATIGUE_MIN_WINDOW_FRAMES,
+    FATIGUE_WINDOW_S, PLOT_MAX_POINTS,
+)
+from .store import FrameMetricStore
+
+# ─────────────────────────────────────────────
+# FATIGUE ANALYTICS - Windowed aggregates and trends
+# ─────────────────────────────────────────────
+
+# name -> (label, unit, True if a higher value is worse)
+FATIGUE_METRICS = {
+    'evf_angle': ("EVF Angle", "°", True),
+    'vertical_drop': ("Hip Drop", "°", True),
+    'stroke_rate': ("Stroke Rate", " spm", False),
+    'glide_ratio': ("Glide Ratio", "%", False),
+    'score': ("Score", "", False),
+}
+
+
+def window_sums(times: np.ndarray, values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Sum of values per [edges[i], edges[i+1]) time window, via one cumulative sum"""
+    idx = np.searchsorted(times, edges, side='left')
+    cs = np.concatenate([[0.0], np.cumsum(values, dtype=np.float64)])
+    return cs[idx[1:]] - cs[idx[:-1]]
+
+
+def rolling_mean(times: np.ndarray, values: np.ndarray, window_s: float,
+                 mask: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Trailing mean over the last window_s seconds at every frame (NaN where
+    no frame in the window passes mask), via cumulative sums.
+    """
+    mask = np.ones(len(values), dtype=bool) if mask is None else mask
+    start = np.searchsorted(times, times - window_s, side='right')
+    end = np.arange(1, len(times) + 1)
+    cs = np.concatenate([[0.0], np.cumsum(np.where(mask, values, 0.0))])
+    cn = np.concatenate([[0], np.cumsum(mask)])
+    counts = cn[end] - cn[start]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, (cs[end] - cs[start]) / counts, np.nan)
+
+
+@dataclass
+class FatigueTrend:
+    """Linear trend of one windowed metric over the session"""
+    metric: str
+    label: str
+    slope_per_min: float
+    start_value: float                 # Fitted value at the first window
+    end_value: float                   # Fitted value at the last window
+    change_pct: float
+    worsening: bool
+
+    def describe(self) -> str:
+        unit = FATIGUE_METRICS[self.metric][1]
+        return f"{self.label}: {self.start_value:.1f}{unit} → {self.end_value:.1f}{unit} ({self.change_pct:+.0f}%)"
+
+
+@dataclass
+class FatigueReport:
+    """Per-window aggregates, a rolling curve and per-metric fatigue trends"""
+    window_s: float
+    windows: pd.DataFrame              # start_s, end_s, frames + one column per FATIGUE_METRICS entry
+    rolling: pd.DataFrame              # time_s + trailing means, decimated for charts
+    trends: Dict[str, FatigueTrend] = field(default_factory=dict)
+    per_length: bool = False           # Windows are pool lengths instead of fixed window_s spans
+
+    @property
+    def window_description(self) -> str:
+        return "per pool length" if self.per_length else f"{self.window_s:.0f} s windows"
+
+    @property
+    def worsening(self) -> List[FatigueTrend]:
+        return [t for t in self.trends.values() if t.worsening]
+
+    def to_csv(self) -> io.BytesIO:
+        buf = io.BytesIO()
+        self.windows.to_csv(buf, index=False)
+        buf.seek(0)
+        return buf
+
+
+def fit_fatigue_trends(windows: pd.DataFrame) -> Dict[str, FatigueTrend]:
+    """Least-squares line per metric over the window midpoints (minutes)"""
+    trends = {}
+    valid_rows = windows['frames'].to_numpy() >= FATIGUE_MIN_WINDOW_FRAMES
+    mid_min = ((windows['start_s'] + windows['end_s']) / 120).to_numpy()
+    for name, (label, _, higher_is_worse) in FATIGUE_METRICS.items():
+        y = windows[name].to_numpy(dtype=np.float64)
+        ok = valid_rows & np.isfinite(y)
+        if ok.sum() < FATIGUE_MIN_WINDOWS:
+            continue
+        slope, intercept = np.polyfit(mid_min[ok], y[ok], 1)
+        start, end = intercept + slope * mid_min[ok][0], intercept + slope * mid_min[ok][-1]
+        change_pct = (end - start) / abs(start) * 100 if abs(start) > 1e-6 else 0.0
+        worsening = (change_pct > 0) == higher_is_worse and abs(change_pct) >= FATIGUE_MIN_CHANGE_PCT
+        trends[name] = FatigueTrend(name, label, float(slope), float(start), float(end),
+                                    float(change_pct), bool(worsening))
+    return trends
+
+
+def compute_fatigue_report(metrics: FrameMetricStore, stroke_times,
+                           window_s: float = FATIGUE_WINDOW_S,
+                           segmentation: Optional["PoolSegmentation"] = None) -> Optional["FatigueReport"]:
+    """
+    Windowed fatigue analytics over the metric columns. Everything is a
+    handful of cumulative sums and searchsorted calls, so hour-long
+    sessions take milliseconds.
+
+    With a pool segmentation the windows are the lengths, over free
+    swimming only, so turns do not show up as technique changes.
+
+    Returns:
+        - FatigueReport, or None when the session is shorter than two windows
+    """
+    if len(metrics) == 0:
+        return None
+    times = metrics.column('time_s')
+    if segmentation is None and times[-1] - times[0] < 2 * window_s:
+        return None
+
+    # Same frame selection as the session summary: high-confidence, else all
+    frame_pool = segmentation.free_mask if segmentation is not None else np.ones(len(times), dtype=bool)
+    use = (metrics.column('confidence') >= DEFAULT_CONF_THRESHOLD) & frame_pool
+    if not use.any():
+        use = frame_pool
+    pull_push = np.isin(metrics.column('phase').astype(str), ("Pull", "Push")) & use
+
+    if segmentation is None:
+        edges = np.arange(times[0], times[-1] + window_s, window_s)
+        if edges[-1] <= times[-1]:
+            edges = np.append(edges, edges[-1] + window_s)
+    else:
+        edges = np.array([s.start_s for s in segmentation.lengths] + [segmentation.lengths[-1].end_s])
+        edges[-1] = np.nextafter(edges[-1], np.inf)     # Last frame belongs to the last length
+    starts, ends = edges[:-1], np.minimum(edges[1:], times[-1])
+
+    frames = window_sums(times, use, edges)
+    pp_frames = window_sums(times, pull_push, edges)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        evf = window_sums(times, np.where(pull_push, metrics.column('evf_plane_angle'), 0.0), edges) / pp_frames
+        v_drop = window_sums(times, np.where(use, metrics.column('vertical_drop'), 0.0), edges) / frames
+        score = window_sums(times, np.where(use, metrics.column('score'), 0.0), edges) / frames
+        glide = window_sums(times, use & metrics.column('is_gliding'), edges) / frames * 100
+        stroke_times = np.asarray(stroke_times, dtype=np.float64)
+        strokes = np.diff(np.searchsorted(stroke_times, edges, side='left'))
+        stroke_rate = np.where(ends > starts, strokes / ((ends - starts) / 60), np.nan)
+    if segmentation is not None:
+        # Free-swimming rate: the push-off glide is not a slower stroke rate
+        stroke_rate = np.array([s.stroke_rate if s.strokes >= 2 else np.nan for s in segmentation.lengths])
+
+    windows = pd.DataFrame({
+        'start_s': starts, 'end_s': ends, 'frames': frames.astype(int),
+        'evf_angle': evf, 'vertical_drop': v_drop, 'stroke_rate': stroke_rate,
+        'glide_ratio': glide, 'score': score,
+    })
+
+    step = max(1, len(times) // PLOT_MAX_POINTS)
+    rolling = pd.DataFrame({
+        'time_s': times[::step],
+        'evf_angle': rolling_mean(times, metrics.column('evf_plane_angle'), window_s, pull_push)[::step],
+        'vertical_drop': rolling_mean(times, metrics.column('vertical_drop'), window_s, use)[::step],
+        'score': rolling_mean(times, metrics.column('score'), window_s, use)[::step],
+    })
+    return FatigueReport(window_s, windows, rolling, fit_fatigue_trends(windows),
+                         per_length=segmentation is not None)
@@ -0,0 +1,494 @@
+"""Vectorized landmark geometry and per-frame biomechanics (angles, EVF, phases, strokes)."""
+import numpy as np
+import math
+from typing import Optional, Dict, Tuple
+
+from .constants import STROKE_PROMINENCE_DEG, STROKE_REFRACTORY_S, STROKE_WINDOW
+
+# ─────────────────────────────────────────────
+# GEOMETRY KERNEL - Vectorized landmark math
+# ─────────────────────────────────────────────
+
+# Row order of the (13, 2) landmark array and the MediaPipe indices it is taken from
+TRACKED_LANDMARKS = [
+    "nose", "left_shoulder", "right_shoulder", "left_elbow", "right_elbow",
+    "left_wrist", "right_wrist", "left_hip", "right_hip",
+    "left_knee", "right_knee", "left_ankle", "right_ankle"
+]
+TRACKED_LANDMARK_INDICES = [0, 11, 12, 13, 14, 15, 16, 23, 24, 25, 26, 27, 28]
+LM = {name: i for i, name in enumerate(TRACKED_LANDMARKS)}
+
+# (a, b, c) rows -> angle at b: left elbow, right elbow, left knee, right knee
+_JOINT_TRIPLETS = np.array([
+    [LM["left_shoulder"], LM["left_elbow"], LM["left_wrist"]],
+    [LM["right_shoulder"], LM["right_elbow"], LM["right_wrist"]],
+    [LM["left_hip"], LM["left_knee"], LM["left_ankle"]],
+    [LM["right_hip"], LM["right_knee"], LM["right_ankle"]],
+])
+
+# Left/right pairs averaged into midpoints: shoulders, hips, ankles
+_MID_LEFT = np.array([LM["left_shoulder"], LM["left_hip"], LM["left_ankle"]])
+_MID_RIGHT = np.array([LM["right_shoulder"], LM["right_hip"], LM["right_ankle"]])
+
+
+def pose_landmarks_to_array(landmarks) -> Tuple[np.ndarray, np.ndarray]:
+    """All MediaPipe pose landmarks as a (33, 2) normalized array plus (33,) visibility"""
+    norm = np.array([(lm.x, lm.y) for lm in landmarks], dtype=np.float64)
+    vis = np.array([lm.visibility for lm in landmarks], dtype=np.float64)
+    return norm, vis
+
+
+def landmarks_to_array(landmarks, w: int, h: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Convert MediaPipe landmarks to a contiguous (13, 2) pixel array plus (13,) visibility"""
+    norm, vis = pose_landmarks_to_array(landmarks)
+    return norm[TRACKED_LANDMARK_INDICES] * (w, h), vis[TRACKED_LANDMARK_INDICES]
+
+
+def lm_array_to_dict(pts: np.ndarray) -> Dict:
+    """Name -> (x, y) view of a (13, 2) landmark array for the dict-based helpers"""
+    return {name: (x, y) for name, (x, y) in zip(TRACKED_LANDMARKS, pts.tolist())}
+
+
+def lm_dict_to_array(lm_pixel: Dict) -> np.ndarray:
+    """Inverse of lm_array_to_dict"""
+    return np.array([lm_pixel[name] for name in TRACKED_LANDMARKS], dtype=np.float64)
+
+
+def compute_geometry(pts: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Compute every per-frame geometric quantity in one vectorized pass.
+
+    Accepts a single frame (13, 2) or a batch (N, 13, 2) in TRACKED_LANDMARKS order.
+    For a single frame each value is a scalar (midpoints are (2,) arrays);
+    for a batch each value has a leading N axis.
+
+    Returns dict with:
+        - elbow_left, elbow_right, knee_left, knee_right: joint angles (degrees)
+        - mid_shoulder, mid_hip, mid_ankle: midpoints
+        - roll: shoulder-line angle (degrees, absolute)
+        - torso_lean: shoulder-hip midline angle (degrees)
+        - forearm_vertical: legacy left forearm angle from vertical (degrees)
+        - body_length: shoulder-ankle distance (pixels)
+        - lateral_deviation: hip offset from shoulder-ankle line (degrees)
+        - vertical_drop: hip/leg sinking below shoulder line (degrees)
+    """
+    p = np.asarray(pts, dtype=np.float64)
+    single = p.ndim == 2
+    if single:
+        p = p[None]
+
+    # Joint angles - all four at once
+    a = p[:, _JOINT_TRIPLETS[:, 0]]
+    b = p[:, _JOINT_TRIPLETS[:, 1]]
+    c = p[:, _JOINT_TRIPLETS[:, 2]]
+    ba = a - b
+    bc = c - b
+    cosang = np.einsum('nkj,nkj->nk', ba, bc) / (
+        np.linalg.norm(ba, axis=-1) * np.linalg.norm(bc, axis=-1) + 1e-8)
+    angles = np.degrees(np.arccos(np.clip(cosang, -1, 1)))
+
+    # Midpoints
+    mids = (p[:, _MID_LEFT] + p[:, _MID_RIGHT]) / 2
+    mid_shoulder, mid_hip, mid_ankle = mids[:, 0], mids[:, 1], mids[:, 2]
+
+    # Roll from the shoulder line
+    shoulder_vec = p[:, LM["left_shoulder"]] - p[:, LM["right_shoulder"]]
+    roll = np.abs(np.degrees(np.arctan2(shoulder_vec[:, 1], shoulder_vec[:, 0])))
+
+    # Torso lean and legacy forearm angle
+    torso_vec = mid_shoulder - mid_hip
+    torso_lean = np.degrees(np.arctan2(torso_vec[:, 1], torso_vec[:, 0]))
+    forearm_vec = p[:, LM["left_wrist"]] - p[:, LM["left_elbow"]]
+    forearm_vertical = np.abs(np.degrees(np.arctan2(forearm_vec[:, 0], -forearm_vec[:, 1])))
+
+    # Body line projections (see compute_horizontal_deviation)
+    body_line = mid_ankle - mid_shoulder
+    to_hip = mid_hip - mid_shoulder
+    body_length = np.linalg.norm(body_line, axis=-1)
+    safe_length = np.maximum(body_length, 1e-8)
+    # Perpendicular hip distance from the shoulder-ankle line
+    lateral_px = np.abs(body_line[:, 0] * to_hip[:, 1] - body_line[:, 1] * to_hip[:, 0]) / safe_length
+    lateral_deviation = np.degrees(np.arctan2(lateral_px, body_length / 2))
+    body_angle = np.degrees(np.arctan2(body_line[:, 1], np.abs(body_line[:, 0]) + 0.001))
+    hip_drop_angle = np.degrees(np.arctan2(to_hip[:, 1], np.abs(to_hip[:, 0]) + 0.001))
+    vertical_drop = np.maximum(0, np.maximum(body_angle, hip_drop_angle))
+
+    # Too short to measure alignment reliably
+    no_body = body_length < 10
+    lateral_deviation = np.where(no_body, 0.0, lateral_deviation)
+    vertical_drop = np.where(no_body, 0.0, vertical_drop)
+
+    geom = {
+        'elbow_left': angles[:, 0],
+        'elbow_right': angles[:, 1],
+        'knee_left': angles[:, 2],
+        'knee_right': angles[:, 3],
+        'mid_shoulder': mid_shoulder,
+        'mid_hip': mid_hip,
+        'mid_ankle': mid_ankle,
+        'roll': roll,
+        'torso_lean': torso_lean,
+        'forearm_vertical': forearm_vertical,
+        'body_length': body_length,
+        'lateral_deviation': lateral_deviation,
+        'vertical_drop': vertical_drop,
+    }
+    if single:
+        geom = {k: v[0] for k, v in geom.items()}
+    return geom
+
+
+def get_alignment_status(body_length: float, lateral_deviation: float, vertical_drop: float) -> str:
+    """Descriptive alignment status from kernel outputs"""
+    if body_length < 10:
+        return "No data"
+    total_deviation = lateral_deviation + vertical_drop
+    if vertical_drop > 15:
+        return "Sinking hips/legs"
+    elif vertical_drop > 8:
+        return "Slight hip drop"
+    elif lateral_deviation > 10:
+        return "Snake swimming"
+    elif total_deviation <= 8:
+        return "Good alignment"
+    return "OK alignment"
+
+# ─────────────────────────────────────────────
+# HELPERS - Enhanced calculations
+# ─────────────────────────────────────────────
+
+def calculate_angle(a, b, c):
+    """Calculate angle at point b given points a, b, c"""
+    ba = np.array(a) - np.array(b)
+    bc = np.array(c) - np.array(b)
+    cosang = np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc) + 1e-8)
+    return np.degrees(np.arccos(np.clip(cosang, -1, 1)))
+
+def compute_horizontal_deviation(lm_pixel: Dict) -> Tuple[float, float, str]:
+    """
+    Calculate body alignment including VERTICAL sinking (not just lateral).
+    
+    Measures:
+    1. Lateral deviation (snake swimming / hip sway)
+    2. Vertical drop (hip/leg sinking below shoulders)
+    
+    Returns:
+        - total_deviation: combined alignment score (lower is better)
+        - vertical_drop: how much hips sink below shoulder line (in degrees)
+        - status: descriptive status
+    """
+    geom = compute_geometry(lm_dict_to_array(lm_pixel))
+    if geom['body_length'] < 10:
+        return 0.0, 0.0, "No data"
+    
+    # Lateral deviation (snake swimming / hip sway) + vertical drop (hips/legs sinking)
+    # In image coordinates: higher Y = lower in water (sinking)
+    vertical_drop = geom['vertical_drop']
+    total_deviation = geom['lateral_deviation'] + vertical_drop
+    status = get_alignment_status(geom['body_length'], geom['lateral_deviation'], vertical_drop)
+    
+    return total_deviation, vertical_drop, status
+
+def compute_evf_plane_angle(lm_pixel: Dict) -> Tuple[float, bool, str]:
+    """
+    Calculate Early Vertical Forearm quality.
+    
+    Good EVF requires:
+    1. Forearm near vertical (pointing down)
+    2. Elbow HIGHER than wrist (high elbow catch) - CRITICAL!
+    3. Elbow staying near surface while hand reaches deep
+    
+    Returns:
+        - effective_angle: EVF quality score (lower is better, includes penalties)
+        - is_dropped_elbow: True if elbow is below wrist (bad technique!)
+        - evf_status: descriptive status string
+    """
+    # Use the arm that's more likely in the pull phase (lower wrist = catching water)
+    left_wrist_y = lm_pixel["left_wrist"][1]
+    right_wrist_y = lm_pixel["right_wrist"][1]
+    
+    if left_wrist_y > right_wrist_y:
+        shoulder = np.array(lm_pixel["left_shoulder"])
+        elbow = np.array(lm_pixel["left_elbow"])
+        wrist = np.array(lm_pixel["left_wrist"])
+    else:
+        shoulder = np.array(lm_pixel["right_shoulder"])
+        elbow = np.array(lm_pixel["right_elbow"])
+        wrist = np.array(lm_pixel["right_wrist"])
+    
+    # === CHECK 1: Is elbow HIGHER than wrist? ===
+    # In image coordinates: lower Y value = higher position in frame
+    # For good EVF, elbow.y should be LESS than wrist.y (elbow above wrist)
+    elbow_wrist_diff = wrist[1] - elbow[1]  # Positive = good (wrist below elbow)
+    elbow_above_wrist = elbow_wrist_diff > 10  # Need meaningful difference
+    
+    # === CHECK 2: Forearm angle from vertical ===
+    forearm = wrist - elbow
+    vertical = np.array([0, 1])  # Down in image coordinates
+    
+    forearm_len = np.linalg.norm(forearm)
+    if forearm_len < 1:
+        return 0.0, False, "No data"
+    
+    cos_angle = np.dot(forearm, vertical) / forearm_len
+    forearm_angle = math.degrees(math.acos(np.clip(cos_angle, -1, 1)))
+    
+    # === CHECK 3: Elbow drop relative to shoulder ===
+    # Elbow shouldn't drop too far below shoulder during catch
+    elbow_drop_from_shoulder = elbow[1] - shoulder[1]  # Positive = elbow below shoulder
+    excessive_elbow_drop = elbow_drop_from_shoulder > 80  # Threshold in pixels
+    
+    # === DETERMINE EVF QUALITY ===
+    is_dropped_elbow = not elbow_above_wrist or excessive_elbow_drop
+    
+    if is_dropped_elbow:
+        evf_status = "DROPPED ELBOW"
+        # Heavy penalty - this is the main technique flaw you identified
+        effective_angle = forearm_angle + 35
+    elif forearm_angle <= 20 and elbow_above_wrist:
+        evf_status = "Excellent EVF"
+        effective_angle = forearm_angle
+    elif forearm_angle <= 30:
+        evf_status = "Good EVF"
+        effective_angle = forearm_angle
+    elif forearm_angle <= 45:
+        evf_status = "OK EVF"
+        effective_angle = forearm_angle
+    else:
+        evf_status = "Sweeping (no catch)"
+        effective_angle = forearm_angle + 10  # Small penalty for sweep
+    
+    return effective_angle, is_dropped_elbow, evf_status
+
+def compute_kick_depth_relative(lm_pixel: Dict):
+    """
+    NEW: Calculate kick depth relative to hip-ankle span
+    This normalizes for body size and camera angle
+    """
+    # Hip-ankle span (body length reference)
+    hip_y = (lm_pixel["left_hip"][1] + lm_pixel["right_hip"][1]) / 2
+    ankle_y = (lm_pixel["left_ankle"][1] + lm_pixel["right_ankle"][1]) / 2
+    hip_ankle_span = abs(ankle_y - hip_y)
+    
+    if hip_ankle_span < 10:  # Avoid division by zero
+        return 0.0
+    
+    # Knee deviation from hip-ankle line
+    knee_l_y = lm_pixel["left_knee"][1]
+    knee_r_y = lm_pixel["right_knee"][1]
+    
+    # Expected knee position if legs were straight (midpoint of hip-ankle)
+    expected_knee_y = (hip_y + ankle_y) / 2
+    
+    # Kick depth is the deviation of knees from this expected position
+    left_dev = abs(knee_l_y - expected_knee_y)
+    right_dev = abs(knee_r_y - expected_knee_y)
+    
+    # Average deviation normalized by hip-ankle span
+    kick_depth = (left_dev + right_dev) / (2 * hip_ankle_span)
+    
+    return kick_depth
+
+def detect_phase_enhanced(lm_pixel: Dict, elbow_angle: float, prev_wrist_y: Optional[float], fps: float):
+    """
+    NEW: Enhanced phase detection using elbow angle + wrist vertical velocity
+    """
+    wrist_y = min(lm_pixel["left_wrist"][1], lm_pixel["right_wrist"][1])
+    shoulder_y = min(lm_pixel["left_shoulder"][1], lm_pixel["right_shoulder"][1])
+    
+    # Calculate wrist velocity if we have previous position
+    wrist_velocity_y = 0.0
+    if prev_wrist_y is not None:
+        wrist_velocity_y = (wrist_y - prev_wrist_y) * fps  # pixels per second
+    
+    underwater = wrist_y > shoulder_y + 20
+    
+    # Phase detection logic
+    if not underwater:
+        phase = "Recovery"
+    elif elbow_angle > 140:
+        phase = "Entry"
+    elif elbow_angle > 90:
+        # Distinguish Pull from Push using wrist velocity
+        if wrist_velocity_y > 50:  # Wrist moving down = Pull
+            phase = "Pull"
+        else:
+            phase = "Pull"  # Default to Pull in this elbow range
+    else:
+        # Low elbow angle
+        if wrist_velocity_y < -30:  # Wrist moving up = Push exit
+            phase = "Push"
+        else:
+            phase = "Push"
+    
+    return phase, wrist_velocity_y, wrist_y
+
+def compute_glide_metrics(lm_pixel: Dict, phase: str, elbow_angle: float, horizontal_dev: float,
+                          elbow_angles: Optional[Tuple[float, float]] = None) -> Tuple[bool, float, float]:
+    """
+    Compute glide metrics for freestyle swimming.
+    
+    GLIDE ASSESSMENT:
+    ================
+    Glide is the brief "catch-up" or extension phase where the lead arm is fully 
+    extended forward while the other arm completes its stroke. Good glide:
+    
+    1. Maximizes distance per stroke (DPS)
+    2. Reduces energy expenditure 
+    3. Maintains streamlined position
+    4. Allows momentary rest between strokes
+    
+    DETECTION CRITERIA:
+    - Phase: Entry or early Pull (arm extended forward)
+    - Lead arm fully extended (elbow angle > 155° - stricter)
+    - Good body alignment (low horizontal deviation)
+    - Streamlined position
+    
+    QUALITY FACTORS:
+    - Arm extension: How straight is the lead arm (elbow angle)
+    - Body alignment: Is the body streamlined during glide
+    - Duration: Longer glide (within reason) = more efficient
+    
+    Args:
+        elbow_angles: Optional (left, right) elbow angles from compute_geometry;
+                      recomputed from lm_pixel when not supplied
+    
+    Returns:
+        - is_gliding: Boolean, True if currently in glide phase
+        - glide_score: 0-100, quality of the glide position
+        - arm_extension: 0-1, how extended the lead arm is
+    """
+    
+    # Get arm measurements
+    # Find the lead arm (the one that's more extended/forward)
+    if elbow_angles is not None:
+        left_elbow_angle, right_elbow_angle = elbow_angles
+    else:
+        left_elbow_angle = calculate_angle(
+            lm_pixel["left_shoulder"], 
+            lm_pixel["left_elbow"], 
+            lm_pixel["left_wrist"]
+        )
+        right_elbow_angle = calculate_angle(
+            lm_pixel["right_shoulder"], 
+            lm_pixel["right_elbow"], 
+            lm_pixel["right_wrist"]
+        )
+    
+    # Lead arm is the one with higher elbow angle (more extended)
+    lead_elbow_angle = max(left_elbow_angle, right_elbow_angle)
+    
+    # Calculate arm extension (0-1 scale)
+    # 180° = fully extended = 1.0
+    # 90° = bent = 0.0
+    arm_extension = max(0, min(1, (lead_elbow_angle - 90) / 90))
+    
+    # Determine if in glide phase - IMPROVED
+    # Glide occurs during Entry phase or very early Pull when arm is extended
+    is_gliding = False
+    
+    if phase in ("Entry", "Pull"):
+        # Check if lead arm is sufficiently extended (>155° - stricter)
+        if lead_elbow_angle > 155:
+            # Check if body is reasonably streamlined
+            if horizontal_dev < 12:  # Stricter
+                is_gliding = True
+    
+    # Calculate glide quality score
+    glide_score = 0.0
+    
+    if is_gliding:
+        # Base score from arm extension (40 points max)
+        extension_score = arm_extension * 40
+        
+        # Body alignment score (40 points max)
+        # Lower deviation = higher score
+        if horizontal_dev <= 5:
+            alignment_score = 40
+        elif horizontal_dev <= 10:
+            alignment_score = 30
+        elif horizontal_dev <= 15:
+            alignment_score = 20
+        else:
+            alignment_score = 10
+        
+        # Elbow angle bonus (20 points max)
+        # 170°+ = excellent extension
+        if lead_elbow_angle >= 170:
+            angle_bonus = 20
+        elif lead_elbow_angle >= 160:
+            angle_bonus = 15
+        elif lead_elbow_angle >= 150:
+            angle_bonus = 10
+        else:
+            angle_bonus = 5
+        
+        glide_score = extension_score + alignment_score + angle_bonus
+    
+    return is_gliding, glide_score, arm_extension
+
+def get_zone_color(val, good, ok):
+    """Return color based on value zone"""
+    if good[0] <= val <= good[1]: 
+        return (0, 180, 0)  # Green
+    if ok[0] <= val <= ok[1]: 
+        return (0, 220, 220)  # Yellow/Amber
+    return (220, 0, 0)  # Red
+
+def get_zone_status(val, good, ok):
+    """Return status string based on value zone"""
+    if good[0] <= val <= good[1]: 
+        return "Good"
+    if ok[0] <= val <= ok[1]: 
+        return "OK"
+    return "Needs Work"
+
+def detect_strokes(elbow_angles, times, prominence: float = STROKE_PROMINENCE_DEG,
+                   window: int = STROKE_WINDOW,
+                   refractory_s: float = STROKE_REFRACTORY_S) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Batched stroke detection over a whole elbow-angle series.
+    
+    A stroke is an elbow-angle minimum at the centre of a `window`-frame
+    neighbourhood that sits at least `prominence` degrees below every
+    neighbour (the old frame-by-frame sliding-window rule, evaluated for
+    all frames at once). Candidates closer than `refractory_s` to the
+    previously accepted stroke are dropped.
+    
+    Returns:
+        - stroke_times: (K,) timestamps of the accepted strokes
+        - stroke_indices: (K,) frame indices of the strokes in the series
+    """
+    e = np.asarray(elbow_angles, dtype=np.float64)
+    t = np.asarray(times, dtype=np.float64)
+    half = window // 2
+    if len(e) < window:
+        return np.empty(0, dtype=np.float64), np.empty(0, dtype=np.intp)
+    
+    win = np.lib.stride_tricks.sliding_window_view(e, window)
+    centre = win[:, half]
+    neighbours = np.minimum(win[:, :half].min(axis=1), win[:, half + 1:].min(axis=1))
+    is_minimum = (centre < neighbours) & (centre + prominence <= neighbours)
+    candidates = np.flatnonzero(is_minimum) + half
+    
+    # Refractory rule - sequential by nature, but only loops over candidates
+    keep = []
+    last_t = -np.inf
+    for idx in candidates.tolist():
+        if t[idx] - last_t >= refractory_s:
+            keep.append(idx)
+            last_t = t[idx]
+    
+    stroke_indices = np.asarray(keep, dtype=np.intp)
+    return t[stroke_indices], stroke_indices
+
+def stroke_cycle_bounds(stroke_indices, n_frames: int) -> np.ndarray:
+    """
+    Frame range of every stroke cycle as a (K, 2) array of [start, end).
+    Each cycle runs from its stroke to the next one; the last runs to n_frames.
+    """
+    starts = np.asarray(stroke_indices, dtype=np.intp)
+    if len(starts) == 0:
+        return np.empty((0, 2), dtype=np.intp)
+    ends = np.append(starts[1:], n_frames).astype(np.intp)
+    return np.stack([starts, ends], axis=1)
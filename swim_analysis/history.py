@@ -0,0 +1,330 @@
+"""Persistent session history: athletes, sessions and their precomputed aggregates in SQLite."""
+import datetime
+import json
+import os
+import shutil
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import fields
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .models import SessionSummary
+from .strokes import StrokeCycle, StrokeIndex
+
+# ─────────────────────────────────────────────
+# SESSION HISTORY - One row per analyzed session, never per frame
+# ─────────────────────────────────────────────
+
+# Scalar SessionSummary fields stored per session (trend charts read only these)
+SUMMARY_METRICS = [
+    'avg_score', 'stroke_rate', 'total_strokes', 'breaths_per_min', 'breath_left', 'breath_right',
+    'total_breaths', 'breaths_during_pull', 'avg_body_roll', 'max_body_roll', 'avg_kick_symmetry',
+    'avg_kick_depth', 'avg_confidence', 'avg_horizontal_deviation', 'avg_vertical_drop', 'avg_evf_angle',
+    'dropped_elbow_frames', 'dropped_elbow_pct', 'avg_alignment_score', 'avg_evf_score', 'glide_ratio',
+    'avg_glide_score', 'glide_frames', 'total_analyzed_frames',
+]
+
+# Metrics offered as progress trends: label, unit, lower is better
+TREND_METRICS = {
+    'dropped_elbow_pct': ("Dropped Elbow", "%", True),
+    'avg_vertical_drop': ("Hip Drop", "°", True),
+    'glide_ratio': ("Glide Ratio", "%", False),
+    'avg_score': ("Score", "", False),
+    'stroke_rate': ("Stroke Rate", " spm", False),
+    'avg_evf_angle': ("EVF Angle", "°", True),
+    'avg_alignment_score': ("Alignment Score", "", False),
+}
+
+_SQL_TYPES = {int: 'INTEGER', bool: 'INTEGER', str: 'TEXT', float: 'REAL'}
+
+
+def _column_defs(cls, names: List[str]) -> str:
+    """SQL column definitions typed after the dataclass fields (properties such as duration_s are REAL)"""
+    types = {f.name: f.type for f in fields(cls)}
+    return ', '.join(f"{name} {_SQL_TYPES.get(types.get(name), 'REAL')}" for name in names)
+
+
+def _sql_value(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS athletes (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE COLLATE NOCASE,
+    height_cm REAL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    athlete_id INTEGER NOT NULL REFERENCES athletes(id) ON DELETE CASCADE,
+    recorded_at TEXT NOT NULL,             -- ISO date/time the session was swum
+    analyzed_at REAL NOT NULL,
+    video_name TEXT NOT NULL,
+    video_sha256 TEXT,
+    discipline TEXT,
+    camera_view TEXT,
+    water_position TEXT,
+    duration_s REAL NOT NULL,
+    n_lengths INTEGER,
+    artifact_dir TEXT,                     -- Report / CSVs of this session (None = not kept)
+    settings TEXT,
+    UNIQUE (athlete_id, video_sha256)
+);
+CREATE INDEX IF NOT EXISTS sessions_athlete_date ON sessions (athlete_id, recorded_at);
+CREATE TABLE IF NOT EXISTS session_metrics (
+    session_id INTEGER PRIMARY KEY REFERENCES sessions(id) ON DELETE CASCADE,
+    {_column_defs(SessionSummary, SUMMARY_METRICS)},
+    diagnostics TEXT
+);
+CREATE TABLE IF NOT EXISTS stroke_aggregates (
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    {_column_defs(StrokeCycle, StrokeIndex.COLUMNS)},
+    PRIMARY KEY (session_id, stroke_number)
+) WITHOUT ROWID;
+"""
+# Session ids name artifact folders, so they must never be reused: rebuild
+# sessions with AUTOINCREMENT (foreign keys off, or dropping the old table
+# would cascade into the metric tables)
+_AUTOINCREMENT_SESSIONS = """
+PRAGMA foreign_keys = OFF;
+BEGIN;
+CREATE TABLE sessions_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    athlete_id INTEGER NOT NULL REFERENCES athletes(id) ON DELETE CASCADE,
+    recorded_at TEXT NOT NULL,
+    analyzed_at REAL NOT NULL,
+    video_name TEXT NOT NULL,
+    video_sha256 TEXT,
+    discipline TEXT,
+    camera_view TEXT,
+    water_position TEXT,
+    duration_s REAL NOT NULL,
+    n_lengths INTEGER,
+    artifact_dir TEXT,
+    settings TEXT,
+    UNIQUE (athlete_id, video_sha256)
+);
+INSERT INTO sessions_new SELECT * FROM sessions;
+DROP TABLE sessions;
+ALTER TABLE sessions_new RENAME TO sessions;
+CREATE INDEX sessions_athlete_date ON sessions (athlete_id, recorded_at);
+COMMIT;
+PRAGMA foreign_keys = ON;
+"""
+_MIGRATIONS = [_SCHEMA, _AUTOINCREMENT_SESSIONS]
+
+
+class SessionHistory:
+    """
+    Embedded store of every saved analysis, for progress tracking.
+
+    root/history.db holds athletes, sessions (indexed by athlete and date),
+    one row of SUMMARY_METRICS per session and the per-stroke aggregates of
+    StrokeIndex. Artifacts handed to save_session() are written to
+    root/artifacts/<session id>/ and referenced by the session row, so
+    history queries never touch video or per-frame data.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+        self.db_path = os.path.join(self.root, "history.db")
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            version = db.execute("PRAGMA user_version").fetchone()[0]
+            for i, script in enumerate(_MIGRATIONS[version:], start=version + 1):
+                db.executescript(script)
+                db.execute(f"PRAGMA user_version = {i}")
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA foreign_keys = ON")
+        try:
+            yield db
+        finally:
+            db.close()
+
+    # ── Athletes ──
+
+    def athlete_id(self, name: str, height_cm: Optional[float] = None, create: bool = True) -> Optional[int]:
+        """Id of the athlete with this name (case-insensitive), created if missing and create=True"""
+        name = name.strip()
+        with self._connect() as db:
+            row = db.execute("SELECT id FROM athletes WHERE name = ?", (name,)).fetchone()
+            if row is not None:
+                if height_cm is not None:
+                    db.execute("UPDATE athletes SET height_cm = ? WHERE id = ?", (height_cm, row['id']))
+                return row['id']
+            if not create:
+                return None
+            return db.execute("INSERT INTO athletes (name, height_cm, created_at) VALUES (?, ?, ?)",
+                              (name, height_cm, time.time())).lastrowid
+
+    def athletes(self) -> pd.DataFrame:
+        """Every athlete with session count and date range"""
+        with self._connect() as db:
+            return pd.read_sql_query(
+                "SELECT a.id, a.name, a.height_cm, COUNT(s.id) AS sessions, "
+                "MIN(s.recorded_at) AS first_session, MAX(s.recorded_at) AS last_session "
+                "FROM athletes a LEFT JOIN sessions s ON s.athlete_id = a.id GROUP BY a.id ORDER BY a.name", db)
+
+    # ── Sessions ──
+
+    def save_session(self, athlete: str, summary: SessionSummary, video_name: str,
+                     recorded_at: Optional[datetime.datetime] = None, video_sha256: Optional[str] = None,
+                     discipline: Optional[str] = None, height_cm: Optional[float] = None,
+                     artifacts: Optional[Dict[str, bytes]] = None, artifact_dir: Optional[str] = None,
+                     settings: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Store a finished analysis. Saving the same video (by hash) for the
+        same athlete again replaces the earlier session.
+
+        artifacts ({file name: bytes}) are copied into the history folder;
+        artifact_dir instead points at files that already live elsewhere
+        (e.g. a batch_analyze output folder).
+
+        Returns:
+            - the session id
+        """
+        athlete_id = self.athlete_id(athlete, height_cm)
+        recorded_at = recorded_at or datetime.datetime.now()
+        context = summary.video_context
+        seg = summary.pool_segmentation
+        stroke_rows = []
+        if summary.stroke_index is not None and len(summary.stroke_index):
+            columns = [summary.stroke_index.column(name).tolist() for name in StrokeIndex.COLUMNS]
+            stroke_rows = list(zip(*columns))
+
+        replaced = None
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                if video_sha256 is not None:
+                    replaced = db.execute(
+                        "SELECT id, artifact_dir FROM sessions WHERE athlete_id = ? AND video_sha256 = ?",
+                        (athlete_id, video_sha256)).fetchone()
+                    if replaced is not None:
+                        db.execute("DELETE FROM sessions WHERE id = ?", (replaced['id'],))
+                session_id = db.execute(
+                    "INSERT INTO sessions (athlete_id, recorded_at, analyzed_at, video_name, video_sha256, discipline, "
+                    "camera_view, water_position, duration_s, n_lengths, artifact_dir, settings) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (athlete_id, recorded_at.isoformat(timespec="seconds"), time.time(), video_name, video_sha256,
+                     discipline, context.camera_view.value if context else None,
+                     context.water_position.value if context else None, summary.duration_s,
+                     len(seg.lengths) if seg is not None else None, artifact_dir,
+                     json.dumps(settings) if settings is not None else None)).lastrowid
+                db.execute(f"INSERT INTO session_metrics (session_id, {', '.join(SUMMARY_METRICS)}, diagnostics) "
+                           f"VALUES ({', '.join('?' * (len(SUMMARY_METRICS) + 2))})",
+                           (session_id, *(_sql_value(getattr(summary, name)) for name in SUMMARY_METRICS),
+                            json.dumps(list(summary.diagnostics))))
+                db.executemany(f"INSERT INTO stroke_aggregates (session_id, {', '.join(StrokeIndex.COLUMNS)}) "
+                               f"VALUES ({', '.join('?' * (len(StrokeIndex.COLUMNS) + 1))})",
+                               [(session_id, *row) for row in stroke_rows])
+                if artifacts:
+                    artifact_dir = os.path.join(self.root, "artifacts", str(session_id))
+                    os.makedirs(artifact_dir, exist_ok=True)
+                    for name, data in artifacts.items():
+                        with open(os.path.join(artifact_dir, name), 'wb') as f:
+                            f.write(data)
+                    db.execute("UPDATE sessions SET artifact_dir = ? WHERE id = ?", (artifact_dir, session_id))
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+        if replaced is not None:
+            self._remove_artifacts(replaced['id'], replaced['artifact_dir'])
+        return session_id
+
+    def _remove_artifacts(self, session_id: int, artifact_dir: Optional[str]) -> None:
+        # Only folders the history created itself; external artifact_dirs are left alone
+        own_dir = os.path.join(self.root, "artifacts", str(session_id))
+        if artifact_dir == own_dir:
+            shutil.rmtree(own_dir, ignore_errors=True)
+
+    def _session_filter(self, athlete: str, start: Optional[datetime.date], end: Optional[datetime.date]):
+        where, params = ["a.name = ?"], [athlete.strip()]
+        if start is not None:
+            where.append("s.recorded_at >= ?")
+            params.append(start.isoformat())
+        if end is not None:
+            # Dates are inclusive: everything before the following day
+            where.append("s.recorded_at < ?")
+            params.append((end + datetime.timedelta(days=1)).isoformat())
+        return " AND ".join(where), params
+
+    def count_sessions(self, athlete: str, start: Optional[datetime.date] = None,
+                       end: Optional[datetime.date] = None) -> int:
+        where, params = self._session_filter(athlete, start, end)
+        with self._connect() as db:
+            return db.execute(f"SELECT COUNT(*) FROM sessions s JOIN athletes a ON a.id = s.athlete_id WHERE {where}",
+                              params).fetchone()[0]
+
+    def sessions(self, athlete: str, start: Optional[datetime.date] = None, end: Optional[datetime.date] = None,
+                 metrics: Optional[List[str]] = None, limit: Optional[int] = None, offset: int = 0,
+                 newest_first: bool = False) -> pd.DataFrame:
+        """
+        One row per session of the athlete (optionally within [start, end]),
+        with the requested SUMMARY_METRICS (default: all), oldest first.
+        Served from the (athlete_id, recorded_at) index; limit/offset page through it.
+        """
+        metrics = SUMMARY_METRICS if metrics is None else [m for m in metrics if m in SUMMARY_METRICS]
+        where, params = self._session_filter(athlete, start, end)
+        sql = (f"SELECT s.id AS session_id, s.recorded_at, s.video_name, s.discipline, s.camera_view, "
+               f"s.water_position, s.duration_s, s.n_lengths, s.artifact_dir"
+               f"{''.join(f', m.{name}' for name in metrics)} "
+               f"FROM sessions s JOIN athletes a ON a.id = s.athlete_id "
+               f"JOIN session_metrics m ON m.session_id = s.id WHERE {where} "
+               f"ORDER BY s.recorded_at {'DESC' if newest_first else 'ASC'}, s.id")
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        with self._connect() as db:
+            df = pd.read_sql_query(sql, db, params=params)
+        df['recorded_at'] = pd.to_datetime(df['recorded_at'])
+        return df
+
+    def weekly_trends(self, athlete: str, metrics: List[str], start: Optional[datetime.date] = None,
+                      end: Optional[datetime.date] = None) -> pd.DataFrame:
+        """
+        Mean of each metric per calendar week (Monday start) plus the
+        session count, aggregated inside SQLite: one row per week however
+        many sessions the athlete has.
+        """
+        metrics = [m for m in metrics if m in SUMMARY_METRICS]
+        where, params = self._session_filter(athlete, start, end)
+        sql = (f"SELECT date(s.recorded_at, 'weekday 0', '-6 days') AS week_start, COUNT(*) AS sessions"
+               f"{''.join(f', AVG(m.{name}) AS {name}' for name in metrics)} "
+               f"FROM sessions s JOIN athletes a ON a.id = s.athlete_id "
+               f"JOIN session_metrics m ON m.session_id = s.id WHERE {where} "
+               f"GROUP BY week_start ORDER BY week_start")
+        with self._connect() as db:
+            df = pd.read_sql_query(sql, db, params=params)
+        df['week_start'] = pd.to_datetime(df['week_start'])
+        return df
+
+    def strokes(self, session_id: int) -> pd.DataFrame:
+        """Per-stroke aggregates of one session (StrokeIndex.COLUMNS)"""
+        with self._connect() as db:
+            return pd.read_sql_query(f"SELECT {', '.join(StrokeIndex.COLUMNS)} FROM stroke_aggregates "
+                                     f"WHERE session_id = ? ORDER BY stroke_number", db, params=(session_id,))
+
+    def diagnostics(self, session_id: int) -> List[str]:
+        with self._connect() as db:
+            row = db.execute("SELECT diagnostics FROM session_metrics WHERE session_id = ?", (session_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else []
+
+    def delete_session(self, session_id: int) -> None:
+        """Remove a session, its aggregates and any artifacts copied into the history folder"""
+        with self._connect() as db:
+            row = db.execute("SELECT artifact_dir FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+        if row is not None:
+            self._remove_artifacts(session_id, row['artifact_dir'])
@@ -0,0 +1,582 @@
+"""Local job queue: the dashboard submits videos, worker processes analyze them."""
+import hashlib
+import heapq
+import json
+import logging
+import os
+import pickle
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional
+
+import cv2
+
+from .constants import (
+    JOB_DEFAULT_S_PER_FRAME, JOB_ETA_HISTORY, JOB_HEARTBEAT_S, JOB_MAX_ATTEMPTS, JOB_PROGRESS_INTERVAL_S,
+    JOB_RETENTION_S, JOB_STALE_S,
+)
+from .models import AthleteProfile, CameraView, WaterPosition
+from .analyzer import SwimAnalyzer
+from .pipeline import (
+    AnalysisCancelled, AnalysisCheckpoint, ProgressReporter, analyze_video, build_analysis_results, probe_video,
+)
+from .video import encode_web_mp4, extract_key_frames, render_annotated_video
+
+logger = logging.getLogger(__name__)
+
+# ─────────────────────────────────────────────
+# JOB QUEUE - SQLite table + one directory per job
+# ─────────────────────────────────────────────
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"     # Stopped by the user; resumable from its checkpoint
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    name TEXT NOT NULL,
+    settings TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    heartbeat_at REAL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT NOT NULL DEFAULT '',
+    live TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker_id TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    host TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+"""
+# Applied in order on open; PRAGMA user_version = number applied
+_MIGRATIONS = [
+    _SCHEMA,
+    # v2: fair scheduling by owner (dashboard session), frame count for queue ETAs
+    """
+    ALTER TABLE jobs ADD COLUMN owner TEXT NOT NULL DEFAULT '';
+    ALTER TABLE jobs ADD COLUMN frames INTEGER NOT NULL DEFAULT 0;
+    """,
+    # v3: cancellation requested by the dashboard, acted on by the worker
+    "ALTER TABLE jobs ADD COLUMN cancel_requested INTEGER NOT NULL DEFAULT 0;",
+    # v4: upload hash, so a new dashboard session finds the job an earlier one submitted
+    """
+    ALTER TABLE jobs ADD COLUMN video_sha256 TEXT;
+    CREATE INDEX IF NOT EXISTS jobs_owner_video ON jobs (owner, video_sha256);
+    """,
+]
+
+RESULTS_NAME = "results.pkl"
+CHECKPOINT_NAME = "checkpoint.pkl"
+
+
+@dataclass
+class Job:
+    """One row of the queue; settings is the analyzer configuration (see analyzer_from_settings)"""
+    id: str
+    status: str
+    name: str
+    settings: Dict[str, Any]
+    job_dir: str
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    progress: float = 0.0
+    message: str = ""
+    live: Optional[Dict[str, Any]] = None   # asdict(LiveSummary) of the latest partial results
+    error: Optional[str] = None
+    attempts: int = 0
+    worker_id: Optional[str] = None
+    owner: str = ""                          # Submitting session; running jobs are shared fairly between owners
+    frames: int = 0                          # Frame count of the input (0 if unknown)
+    cancel_requested: bool = False
+    video_sha256: Optional[str] = None
+
+    @property
+    def input_path(self) -> str:
+        return os.path.join(self.job_dir, "input" + (os.path.splitext(self.name)[1] or ".mp4"))
+
+    @property
+    def results_path(self) -> str:
+        return os.path.join(self.job_dir, RESULTS_NAME)
+
+    @property
+    def checkpoint_path(self) -> str:
+        return os.path.join(self.job_dir, CHECKPOINT_NAME)
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (JOB_DONE, JOB_FAILED)
+
+
+@dataclass
+class QueueEstimate:
+    """Where a queued job stands: 1-based position in scheduling order and predicted timing"""
+    position: int
+    queued: int                # Jobs waiting in total
+    wait_s: float              # Until a worker picks it up
+    eta_s: float               # Until its results are ready
+
+
+class JobQueue:
+    """
+    Persistent queue of analysis jobs shared by the dashboard and worker processes.
+
+    State lives in root/jobs.db (SQLite in WAL mode, one short connection
+    per operation so any thread or process can use the same JobQueue);
+    each job's input video, spilled metrics and pickled results live in
+    root/<job id>/. Workers claim jobs atomically and heartbeat while they
+    run; a job whose worker stops heartbeating is requeued, up to
+    JOB_MAX_ATTEMPTS times.
+
+    Scheduling is fair between owners: the next job goes to the owner with
+    the fewest jobs running, oldest submission first among equals, so one
+    session queueing ten videos cannot starve another's single upload.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+        self.db_path = os.path.join(self.root, "jobs.db")
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            version = db.execute("PRAGMA user_version").fetchone()[0]
+            for i, script in enumerate(_MIGRATIONS[version:], start=version + 1):
+                db.executescript(script)
+                db.execute(f"PRAGMA user_version = {i}")
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction that takes the lock up front (claim/requeue must not interleave)"""
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+
+    def _job(self, row: sqlite3.Row) -> Job:
+        return Job(id=row['id'], status=row['status'], name=row['name'], settings=json.loads(row['settings']),
+                   job_dir=os.path.join(self.root, row['id']), created_at=row['created_at'],
+                   started_at=row['started_at'], finished_at=row['finished_at'], progress=row['progress'],
+                   message=row['message'], live=json.loads(row['live']) if row['live'] else None,
+                   error=row['error'], attempts=row['attempts'], worker_id=row['worker_id'],
+                   owner=row['owner'], frames=row['frames'], cancel_requested=bool(row['cancel_requested']),
+                   video_sha256=row['video_sha256'])
+
+    # ── Dashboard side ──
+
+    def submit(self, name: str, video_bytes: bytes, settings: Dict[str, Any], owner: str = "",
+               video_sha256: Optional[str] = None) -> Job:
+        """Store the video in a new job directory and queue it (video_sha256 is computed if not given)"""
+        job_id = uuid.uuid4().hex
+        job = Job(id=job_id, status=JOB_QUEUED, name=name, settings=settings,
+                  job_dir=os.path.join(self.root, job_id), created_at=time.time(), message="🕒 Waiting for a worker",
+                  owner=owner, video_sha256=video_sha256 or hashlib.sha256(video_bytes).hexdigest())
+        os.makedirs(job.job_dir)
+        with open(job.input_path, 'wb') as f:
+            f.write(video_bytes)
+        job.frames = probe_video(job.input_path)[3]
+        with self._connect() as db:
+            db.execute("INSERT INTO jobs (id, status, name, settings, created_at, message, owner, frames, video_sha256) "
+                       "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                       (job.id, job.status, name, json.dumps(settings), job.created_at, job.message, owner, job.frames,
+                        job.video_sha256))
+        return job
+
+    def find(self, video_sha256: str, settings: Dict[str, Any], owner: str = "") -> Optional[Job]:
+        """
+        Newest job of this owner for the same video and settings, in any
+        state: a browser refresh starts a new dashboard session, which
+        re-attaches to it instead of submitting the upload again.
+        """
+        with self._connect() as db:
+            rows = db.execute("SELECT * FROM jobs WHERE owner = ? AND video_sha256 = ? ORDER BY created_at DESC",
+                              (owner, video_sha256)).fetchall()
+        # Compared decoded: the stored JSON may order keys differently
+        settings = json.loads(json.dumps(settings))
+        return next((self._job(r) for r in rows if json.loads(r['settings']) == settings), None)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row else None
+
+    def list_jobs(self, status: Optional[str] = None) -> List[Job]:
+        """Jobs in submission order, optionally only those with the given status"""
+        with self._connect() as db:
+            if status is None:
+                rows = db.execute("SELECT * FROM jobs ORDER BY created_at").fetchall()
+            else:
+                rows = db.execute("SELECT * FROM jobs WHERE status = ? ORDER BY created_at", (status,)).fetchall()
+        return [self._job(r) for r in rows]
+
+    def cancel(self, job_id: str) -> None:
+        """Cancel a queued job at once; a running one stops at its worker's next heartbeat"""
+        with self._transaction() as db:
+            db.execute("UPDATE jobs SET status = ?, finished_at = ?, message = ? WHERE id = ? AND status = ?",
+                       (JOB_CANCELLED, time.time(), "⏹️ Cancelled", job_id, JOB_QUEUED))
+            db.execute("UPDATE jobs SET cancel_requested = 1, message = ? WHERE id = ? AND status = ?",
+                       ("⏹️ Cancelling...", job_id, JOB_RUNNING))
+
+    def resume(self, job_id: str) -> bool:
+        """
+        Queue a cancelled or failed job again; its worker continues from the
+        last checkpoint if there is one.
+
+        Returns:
+            - False if the job is not cancelled or failed
+        """
+        with self._connect() as db:
+            return db.execute(
+                "UPDATE jobs SET status = ?, error = NULL, finished_at = NULL, attempts = 0, cancel_requested = 0, "
+                "message = ? WHERE id = ? AND status IN (?, ?)",
+                (JOB_QUEUED, "🕒 Waiting for a worker", job_id, JOB_CANCELLED, JOB_FAILED)).rowcount > 0
+
+    def schedule(self) -> List[Job]:
+        """Queued jobs in the order workers will claim them (see claim)"""
+        with self._connect() as db:
+            queued = [self._job(r) for r in db.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at", (JOB_QUEUED,)).fetchall()]
+            running = dict(db.execute("SELECT owner, COUNT(*) FROM jobs WHERE status = ? GROUP BY owner",
+                                      (JOB_RUNNING,)).fetchall())
+        order = []
+        while queued:
+            nxt = min(queued, key=lambda j: (running.get(j.owner, 0), j.created_at))
+            queued.remove(nxt)
+            running[nxt.owner] = running.get(nxt.owner, 0) + 1
+            order.append(nxt)
+        return order
+
+    def seconds_per_frame(self) -> float:
+        """Median wall time per frame of the last JOB_ETA_HISTORY finished jobs"""
+        with self._connect() as db:
+            rows = db.execute("SELECT (finished_at - started_at) / frames FROM jobs "
+                              "WHERE status = ? AND frames > 0 AND started_at IS NOT NULL "
+                              "ORDER BY finished_at DESC LIMIT ?", (JOB_DONE, JOB_ETA_HISTORY)).fetchall()
+        rates = sorted(r[0] for r in rows)
+        return rates[len(rates) // 2] if rates else JOB_DEFAULT_S_PER_FRAME
+
+    def estimate(self, job_id: str) -> Optional[QueueEstimate]:
+        """
+        Position and ETA of a queued job, simulating the workers draining the
+        running jobs and then the schedule ahead of it.
+
+        Returns:
+            - None if the job is not queued
+        """
+        order = self.schedule()
+        position = next((i for i, j in enumerate(order) if j.id == job_id), None)
+        if position is None:
+            return None
+        spf = self.seconds_per_frame()
+        running = self.list_jobs(JOB_RUNNING)
+        # Each heap entry is the time at which one worker slot becomes free
+        slots = [j.frames * (1.0 - j.progress) * spf for j in running]
+        slots += [0.0] * max(self.active_workers() - len(slots), 0)
+        if not slots:
+            slots = [0.0]
+        heapq.heapify(slots)
+        for job in order[:position + 1]:
+            start = heapq.heappop(slots)
+            heapq.heappush(slots, start + job.frames * spf)
+        return QueueEstimate(position=position + 1, queued=len(order), wait_s=start, eta_s=start + job.frames * spf)
+
+    def load_results(self, job_id: str) -> Dict:
+        """Results dict of a finished job (same shape as build_analysis_results)"""
+        job = self.get(job_id)
+        if job is None or job.status != JOB_DONE:
+            raise RuntimeError(f"Job {job_id} has no results")
+        with open(job.results_path, 'rb') as f:
+            return pickle.load(f)
+
+    def delete(self, job_id: str) -> None:
+        """Forget a job and delete its directory (input, spilled metrics, results)"""
+        with self._connect() as db:
+            db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        shutil.rmtree(os.path.join(self.root, job_id), ignore_errors=True)
+
+    def prune(self, max_age_s: float = JOB_RETENTION_S) -> int:
+        """
+        Delete done, failed and cancelled jobs that finished more than
+        max_age_s ago, with their directories. Jobs whose session never
+        came back (tab closed) would otherwise keep their input and
+        results forever.
+
+        Returns:
+            - number of jobs deleted
+        """
+        with self._connect() as db:
+            ids = [r['id'] for r in db.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?, ?) AND finished_at < ?",
+                (JOB_DONE, JOB_FAILED, JOB_CANCELLED, time.time() - max_age_s)).fetchall()]
+        for job_id in ids:
+            self.delete(job_id)
+        return len(ids)
+
+    # ── Worker side ──
+
+    def claim(self, worker_id: str, max_running: Optional[int] = None) -> Optional[Job]:
+        """
+        Requeue jobs of dead workers, then atomically take the next queued job:
+        the owner with the fewest running jobs first, oldest job among equals.
+        Nothing is claimed while this host already runs max_running jobs.
+        """
+        now = time.time()
+        with self._transaction() as db:
+            self._requeue(db, "heartbeat_at < ?", (now - JOB_STALE_S,), "worker stopped responding")
+            if max_running is not None:
+                host_running = db.execute(
+                    "SELECT COUNT(*) FROM jobs JOIN workers ON jobs.worker_id = workers.id "
+                    "WHERE jobs.status = ? AND workers.host = ?", (JOB_RUNNING, socket.gethostname())).fetchone()[0]
+                if host_running >= max_running:
+                    return None
+            row = db.execute("SELECT * FROM jobs AS j WHERE status = ? ORDER BY "
+                             "(SELECT COUNT(*) FROM jobs AS r WHERE r.status = ? AND r.owner = j.owner), created_at "
+                             "LIMIT 1", (JOB_QUEUED, JOB_RUNNING)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE jobs SET status = ?, worker_id = ?, started_at = ?, heartbeat_at = ?, "
+                       "attempts = attempts + 1, progress = 0, message = ?, live = NULL WHERE id = ?",
+                       (JOB_RUNNING, worker_id, now, now, "🎬 Starting analysis", row['id']))
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (row['id'],)).fetchone()
+        return self._job(row)
+
+    def _requeue(self, db, where: str, params: tuple, reason: str) -> None:
+        rows = db.execute(f"SELECT id, attempts, cancel_requested FROM jobs WHERE status = ? AND {where}",
+                          (JOB_RUNNING,) + params).fetchall()
+        for row in rows:
+            if row['cancel_requested']:
+                db.execute("UPDATE jobs SET status = ?, message = ?, finished_at = ?, worker_id = NULL, "
+                           "cancel_requested = 0 WHERE id = ?", (JOB_CANCELLED, "⏹️ Cancelled", time.time(), row['id']))
+            elif row['attempts'] >= JOB_MAX_ATTEMPTS:
+                db.execute("UPDATE jobs SET status = ?, error = ?, finished_at = ?, worker_id = NULL WHERE id = ?",
+                           (JOB_FAILED, f"{reason} ({row['attempts']} attempts)", time.time(), row['id']))
+            else:
+                db.execute("UPDATE jobs SET status = ?, worker_id = NULL, progress = 0, message = ?, live = NULL "
+                           "WHERE id = ?", (JOB_QUEUED, f"🔁 Requeued: {reason}", row['id']))
+            logger.warning("Job %s: %s", row['id'], reason)
+
+    def release_worker_jobs(self, worker_id: str, reason: str = "worker exited") -> None:
+        """Requeue (or fail, after too many attempts) every job a dead worker was running"""
+        with self._transaction() as db:
+            self._requeue(db, "worker_id = ?", (worker_id,), reason)
+            db.execute("DELETE FROM workers WHERE id = ?", (worker_id,))
+
+    def heartbeat(self, job_id: str, progress: Optional[float] = None, message: Optional[str] = None,
+                  live: Optional[Dict[str, Any]] = None) -> None:
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET heartbeat_at = ?, progress = COALESCE(?, progress), "
+                       "message = COALESCE(?, message), live = COALESCE(?, live) WHERE id = ?",
+                       (time.time(), progress, message, json.dumps(live) if live is not None else None, job_id))
+
+    def complete(self, job_id: str) -> None:
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET status = ?, progress = 1, message = ?, finished_at = ? WHERE id = ?",
+                       (JOB_DONE, "✅ Analysis complete!", time.time(), job_id))
+
+    def mark_cancelled(self, job_id: str, message: str = "⏹️ Cancelled") -> None:
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET status = ?, message = ?, finished_at = ?, worker_id = NULL, "
+                       "cancel_requested = 0 WHERE id = ?", (JOB_CANCELLED, message, time.time(), job_id))
+
+    def cancel_requested(self, job_id: str) -> bool:
+        with self._connect() as db:
+            row = db.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def fail(self, job_id: str, error: str) -> None:
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                       (JOB_FAILED, error, time.time(), job_id))
+
+    def worker_heartbeat(self, worker_id: str) -> None:
+        now = time.time()
+        with self._connect() as db:
+            db.execute("INSERT INTO workers (id, pid, host, started_at, last_seen) VALUES (?, ?, ?, ?, ?) "
+                       "ON CONFLICT(id) DO UPDATE SET last_seen = excluded.last_seen",
+                       (worker_id, os.getpid(), socket.gethostname(), now, now))
+
+    def active_workers(self) -> int:
+        """Workers seen within JOB_STALE_S (0 = nobody will pick up a submitted job)"""
+        with self._connect() as db:
+            return db.execute("SELECT COUNT(*) FROM workers WHERE last_seen >= ?",
+                              (time.time() - JOB_STALE_S,)).fetchone()[0]
+
+# ─────────────────────────────────────────────
+# JOB EXECUTION
+# ─────────────────────────────────────────────
+
+def analyzer_from_settings(settings: Dict[str, Any], **kwargs) -> SwimAnalyzer:
+    """
+    SwimAnalyzer for a job's settings: height_cm, discipline, conf_thresh,
+    yaw_thresh, camera_view / water_position (enum values or None = auto),
+    smoothing, heavy_model and analysis_only.
+    """
+    camera = settings.get("camera_view")
+    water = settings.get("water_position")
+    return SwimAnalyzer(AthleteProfile(settings["height_cm"], settings["discipline"]),
+                        settings["conf_thresh"], settings["yaw_thresh"],
+                        manual_camera_view=CameraView(camera) if camera else None,
+                        manual_water_position=WaterPosition(water) if water else None,
+                        use_heavy_model=settings.get("heavy_model", False),
+                        smoothing=settings.get("smoothing", "mean"),
+                        render_overlays=not settings.get("analysis_only", False),
+                        **kwargs)
+
+
+def _heartbeat_loop(queue: JobQueue, job_id: str, stop: threading.Event, cancel: threading.Event) -> None:
+    # Keeps the job alive through slow stretches with no progress (model download, encoding)
+    # and relays cancellation to the frame loop without a database read per frame
+    while not stop.wait(JOB_HEARTBEAT_S):
+        try:
+            queue.heartbeat(job_id)
+            if queue.cancel_requested(job_id):
+                cancel.set()
+        except sqlite3.Error as e:
+            logger.warning("Heartbeat for job %s failed: %s", job_id, e)
+
+
+def _remove_files(*paths: str) -> None:
+    for path in paths:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def run_job(queue: JobQueue, job: Job, threads: Optional[int] = None) -> None:
+    """
+    Analyze a claimed job and pickle its results dict into the job directory.
+    Errors fail the job; the worker process itself keeps running.
+
+    The analyzer is checkpointed every CHECKPOINT_INTERVAL_S into the job
+    directory, and a job that has a checkpoint (requeued after a crash,
+    resumed after cancel) continues from it instead of frame zero. A resumed
+    job that wants the annotated video re-renders it from the stored track,
+    since the frames written before the interruption are gone.
+
+    threads is the job's share of the host's cores, passed on to ffmpeg.
+    The raw video writer is always released, and a cancelled or failed job
+    deletes its partial annotated video.
+    """
+    stop, cancel = threading.Event(), threading.Event()
+    beat = threading.Thread(target=_heartbeat_loop, args=(queue, job.id, stop, cancel), daemon=True)
+    beat.start()
+    analyzer = writer = None
+    raw_path = os.path.join(job.job_dir, "annotated_raw.avi")
+    out_path = os.path.join(job.job_dir, "annotated.mp4")
+
+    def on_status(message: str) -> None:
+        queue.heartbeat(job.id, message=message)
+
+    def discard_video() -> None:
+        # Output of a cancelled or failed attempt; a resume re-renders from the track
+        nonlocal writer
+        if writer is not None:
+            writer.release()
+            writer = None
+        _remove_files(raw_path, out_path)
+
+    try:
+        analysis_only = job.settings.get("analysis_only", False)
+        checkpoint = AnalysisCheckpoint.load(job.checkpoint_path)
+        if checkpoint is not None:
+            analyzer = checkpoint.analyzer
+            analyzer.reopen(on_status=on_status)
+            start_frame = checkpoint.frame_idx
+            queue.heartbeat(job.id, message=f"⏩ Resuming from frame {start_frame}")
+        else:
+            metrics_dir = os.path.join(job.job_dir, "metrics")
+            shutil.rmtree(metrics_dir, ignore_errors=True)   # Left over from an attempt that never checkpointed
+            os.makedirs(metrics_dir)
+            analyzer = analyzer_from_settings(job.settings, metrics_dir=metrics_dir, on_status=on_status)
+            start_frame = 0
+
+        fps, w, h, total = probe_video(job.input_path)
+        if not analysis_only and start_frame == 0:
+            writer = cv2.VideoWriter(raw_path, cv2.VideoWriter_fourcc(*'XVID'), fps, (w, h))
+
+        reporter = ProgressReporter(total, lambda fraction, text: queue.heartbeat(job.id, fraction, text),
+                                    min_interval_s=JOB_PROGRESS_INTERVAL_S, initial=start_frame)
+        frames = analyze_video(job.input_path, analyzer,
+                               progress_callback=lambda done, _total: reporter.tick(done),
+                               live_callback=lambda live: queue.heartbeat(job.id, live=asdict(live)),
+                               frame_callback=writer.write if writer is not None else None,
+                               start_frame=start_frame, checkpoint_path=job.checkpoint_path,
+                               should_cancel=cancel.is_set)
+        if frames == 0:
+            raise RuntimeError("cannot read video")
+        analyzer.close()
+        queue.heartbeat(job.id, message="🖼️ Building report")
+
+        gallery = extract_key_frames(job.input_path, analyzer)
+        video_bytes = None
+        input_path = job.input_path
+        if writer is not None:
+            writer.release()
+            writer = None
+            error = encode_web_mp4(raw_path, out_path, threads=threads)
+            if error:
+                logger.warning("Job %s: FFmpeg conversion failed: %s", job.id, error)
+            with open(out_path, 'rb') as f:
+                video_bytes = f.read()
+        elif not analysis_only:
+            queue.heartbeat(job.id, message="🎬 Rendering annotated video")
+            video_bytes = render_annotated_video(job.input_path, analyzer)
+        if not analysis_only:
+            input_path = None   # The input is only kept for deferred rendering
+
+        results = build_analysis_results(analyzer, job.name, total, fps, gallery, video_bytes, input_path)
+        tmp_path = job.results_path + ".part"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(results, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, job.results_path)
+        queue.complete(job.id)
+
+        # Only after completion: a requeued attempt still needs the input and checkpoint
+        _remove_files(raw_path, out_path, job.checkpoint_path, *(() if analysis_only else (job.input_path,)))
+    except AnalysisCancelled:
+        logger.info("Job %s cancelled", job.id)
+        analyzer.close()
+        discard_video()
+        queue.mark_cancelled(job.id, f"⏹️ Cancelled at {reporter.done / total:.0%}" if total else "⏹️ Cancelled")
+    except Exception as e:
+        logger.exception("Job %s failed", job.id)
+        if analyzer is not None:
+            analyzer.close()
+        discard_video()
+        queue.fail(job.id, str(e) or type(e).__name__)
+    finally:
+        if writer is not None:
+            writer.release()
+        stop.set()
+        beat.join()
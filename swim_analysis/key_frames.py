@@ -0,0 +1,92 @@
+"""Top-k key-frame candidates per technique criterion."""
+import heapq
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Tuple
+
+from .constants import KEY_FRAME_GALLERY_K, KEY_FRAME_MIN_GAP_S, KEY_FRAME_OVERSAMPLE
+from .models import FrameMetrics
+
+# ─────────────────────────────────────────────
+# KEY FRAME GALLERY
+# ─────────────────────────────────────────────
+
+@dataclass
+class KeyFrameCandidate:
+    """One gallery candidate: where it is in the video and why it was picked"""
+    criterion: str
+    value: float          # Criterion value (larger = more representative)
+    frame_idx: int        # Frame in the source video
+    row: int              # Index into analyzer.metrics
+    time_s: float
+
+
+class KeyFrameTracker:
+    """
+    Top-k frames per criterion, collected during the analysis pass.
+
+    Each criterion keeps a bounded min-heap of (value, frame_idx, row), so
+    memory is O(k) and no pixels are held; the frames themselves are decoded
+    afterwards by extract_key_frames().
+
+    Qualifying frames closer than min_gap_s form one event, of which only
+    the peak reaches the heap: a sustained event (a dropped elbow held for
+    a second) takes one slot instead of crowding out separate events.
+    """
+
+    # name -> (label, value of a FrameMetrics, or None when the frame does not qualify)
+    CRITERIA = {
+        'dropped_elbow': ("Worst Dropped Elbow",
+                          lambda m: m.evf_plane_angle if m.is_dropped_elbow else None),
+        'hip_drop': ("Deepest Hip Drop",
+                     lambda m: m.vertical_drop if m.vertical_drop > 0 else None),
+        'best_glide': ("Best Glide",
+                       lambda m: m.glide_score if m.is_gliding else None),
+    }
+
+    def __init__(self, k: int = KEY_FRAME_GALLERY_K, oversample: int = KEY_FRAME_OVERSAMPLE,
+                 min_gap_s: float = KEY_FRAME_MIN_GAP_S):
+        self.k = k
+        self.capacity = k * oversample
+        self.min_gap_s = min_gap_s
+        self.heaps: Dict[str, List[Tuple[float, int, int, float]]] = {name: [] for name in self.CRITERIA}
+        # Peak of the event still in progress per criterion (pushed once the next frame is min_gap_s away)
+        self.pending: Dict[str, Optional[Tuple[float, int, int, float]]] = dict.fromkeys(self.CRITERIA)
+
+    def update(self, m: FrameMetrics, row: int) -> None:
+        for name, (_, value_of) in self.CRITERIA.items():
+            value = value_of(m)
+            if value is None:
+                continue
+            item = (float(value), m.frame_idx, row, m.time_s)
+            peak = self.pending[name]
+            if peak is not None and m.time_s - peak[3] < self.min_gap_s:
+                # Same event: keep its strongest frame (which only ever moves later in time)
+                if item > peak:
+                    self.pending[name] = item
+                continue
+            if peak is not None:
+                self._push(name, peak)
+            self.pending[name] = item
+
+    def _push(self, name: str, item: Tuple[float, int, int, float]) -> None:
+        heap = self.heaps[name]
+        if len(heap) < self.capacity:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    def top(self, name: str) -> List[KeyFrameCandidate]:
+        """Best k candidates of a criterion, at least min_gap_s apart, strongest first"""
+        candidates = list(self.heaps[name])
+        if self.pending[name] is not None:
+            candidates.append(self.pending[name])
+        picked: List[KeyFrameCandidate] = []
+        for value, frame_idx, row, time_s in sorted(candidates, reverse=True):
+            if all(abs(time_s - c.time_s) >= self.min_gap_s for c in picked):
+                picked.append(KeyFrameCandidate(name, value, frame_idx, row, time_s))
+                if len(picked) == self.k:
+                    break
+        return picked
+
+    def label(self, name: str) -> str:
+        return self.CRITERIA[name][0]
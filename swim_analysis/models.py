@@ -0,0 +1,169 @@
+"""Enums and dataclasses shared across the engine: per-frame metrics, video context, summaries."""
+from enum import Enum
+from dataclasses import dataclass, field
+from typing import List, Optional, Dict
+
+# ─────────────────────────────────────────────
+# DATA MODELS - Enhanced
+# ─────────────────────────────────────────────
+
+class SwimPhase(Enum):
+    ENTRY = "Entry"
+    PULL = "Pull"
+    PUSH = "Push"
+    RECOVERY = "Recovery"
+
+class CameraView(Enum):
+    SIDE = "Side View"
+    FRONT = "Front View"
+    TOP = "Top View"
+    UNKNOWN = "Unknown"
+
+class WaterPosition(Enum):
+    UNDERWATER = "Underwater"
+    ABOVE_WATER = "Above Water"
+    MIXED = "Mixed/Waterline"
+    UNKNOWN = "Unknown"
+
+@dataclass
+class VideoContext:
+    """Detected video context for adaptive analysis"""
+    camera_view: CameraView = CameraView.UNKNOWN
+    water_position: WaterPosition = WaterPosition.UNKNOWN
+    swimming_direction: str = "left_to_right"  # or "right_to_left"
+    confidence: float = 0.0
+    detection_frames: int = 0
+    
+    # Color analysis results
+    avg_blue_ratio: float = 0.0
+    has_lane_lines: bool = False
+    has_splash: bool = False
+    
+    # Landmark visibility stats
+    upper_body_visible_pct: float = 0.0
+    lower_body_visible_pct: float = 0.0
+    
+    def get_available_metrics(self) -> List[str]:
+        """Return list of metrics available for this view"""
+        metrics = []
+        
+        if self.camera_view == CameraView.SIDE:
+            if self.water_position == WaterPosition.UNDERWATER:
+                metrics = ["evf", "body_alignment", "kick_depth", "stroke_phase", "torso_lean"]
+            else:  # Above water
+                metrics = ["recovery_arm", "breathing", "head_position", "stroke_rate"]
+        
+        elif self.camera_view == CameraView.FRONT:
+            if self.water_position == WaterPosition.UNDERWATER:
+                metrics = ["body_roll", "hand_entry_width", "kick_symmetry", "streamline"]
+            else:
+                metrics = ["entry_angle", "breathing_side", "catch_width"]
+        
+        elif self.camera_view == CameraView.TOP:
+            metrics = ["body_roll", "stroke_symmetry", "kick_width", "streamline"]
+        
+        else:
+            # Unknown - provide basic metrics
+            metrics = ["body_roll", "stroke_rate", "breathing"]
+        
+        return metrics
+    
+    def get_description(self) -> str:
+        """Get human-readable description of detected context"""
+        return f"{self.camera_view.value} • {self.water_position.value}"
+
+@dataclass
+class AthleteProfile:
+    height_cm: float
+    discipline: str
+
+@dataclass
+class FrameMetrics:
+    time_s: float
+    elbow_angle: float
+    knee_left: float
+    knee_right: float
+    kick_symmetry: float
+    kick_depth_proxy: float  # Now relative to hip-ankle span
+    symmetry_hips: float
+    score: float
+    body_roll: float
+    torso_lean: float
+    forearm_vertical: float
+    phase: str
+    breath_state: str
+    confidence: float = 1.0
+    # New metrics
+    horizontal_deviation: float = 0.0  # Combined alignment score
+    vertical_drop: float = 0.0         # Hip/leg sinking angle
+    evf_plane_angle: float = 0.0       # EVF quality score
+    is_dropped_elbow: bool = False     # True if elbow below wrist (bad!)
+    evf_status: str = ""               # Descriptive EVF status
+    alignment_status: str = ""         # Descriptive alignment status
+    wrist_velocity_y: float = 0.0      # For phase detection
+    alignment_score: float = 100.0     # Sub-score for alignment
+    evf_score: float = 100.0           # Sub-score for EVF
+    breathing_during_pull: bool = False
+    # Glide metrics
+    is_gliding: bool = False           # True if in glide phase
+    glide_score: float = 100.0         # Quality of glide (streamline)
+    arm_extension: float = 0.0         # How extended the lead arm is (0-1)
+    # Source frame (for deferred rendering and key-frame extraction)
+    frame_idx: int = -1
+    is_inverted: bool = False          # Frame was flipped before analysis
+
+@dataclass
+class SessionSummary:
+    duration_s: float
+    avg_score: float
+    avg_body_roll: float
+    max_body_roll: float
+    stroke_rate: float
+    breaths_per_min: float
+    breath_left: int
+    breath_right: int
+    total_strokes: int
+    avg_kick_symmetry: float
+    avg_kick_depth: float
+    kick_status: str
+    avg_confidence: float
+    best_frame_bytes: Optional[bytes] = None
+    worst_frame_bytes: Optional[bytes] = None
+    # New summary metrics
+    avg_horizontal_deviation: float = 0.0
+    avg_vertical_drop: float = 0.0      # Hip/leg sinking
+    avg_evf_angle: float = 0.0
+    dropped_elbow_frames: int = 0       # Count of frames with dropped elbow
+    dropped_elbow_pct: float = 0.0      # Percentage of pull frames with dropped elbow
+    avg_alignment_score: float = 100.0
+    avg_evf_score: float = 100.0
+    breaths_during_pull: int = 0
+    total_breaths: int = 0
+    diagnostics: List[str] = field(default_factory=list)
+    # Video context
+    video_context: Optional[VideoContext] = None
+    available_metrics: Dict = field(default_factory=dict)
+    # Glide metrics
+    glide_ratio: float = 0.0           # Percentage of stroke cycle spent gliding
+    avg_glide_score: float = 0.0       # Average quality of glide phases
+    glide_frames: int = 0              # Number of frames in glide
+    total_analyzed_frames: int = 0     # Total frames analyzed
+    # Per-stroke drilldown
+    stroke_index: Optional["StrokeIndex"] = None
+    # Windowed fatigue trends
+    fatigue: Optional["FatigueReport"] = None
+    # Pool lengths / turns (pool sessions only)
+    pool_segmentation: Optional["PoolSegmentation"] = None
+
+@dataclass
+class LiveSummary:
+    """Running snapshot published while a video is still being analyzed"""
+    time_s: float                      # Video time reached
+    analyzed_frames: int
+    avg_score: float
+    stroke_rate: float
+    total_strokes: int
+    breath_left: int
+    breath_right: int
+    dropped_elbow_pct: float
+    score_sparkline: List[float] = field(default_factory=list)  # Mean score per LIVE_SPARKLINE_BUCKET_S
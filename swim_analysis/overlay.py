@@ -0,0 +1,332 @@
+"""Technique panels and landmark overlays drawn onto video frames."""
+import cv2
+import numpy as np
+import math
+from typing import Tuple
+
+from .constants import (
+    DEFAULT_EVF_ANGLE_GOOD, DEFAULT_EVF_ANGLE_OK, DEFAULT_HORIZONTAL_DEV_GOOD,
+    DEFAULT_HORIZONTAL_DEV_OK, DEFAULT_KICK_DEPTH_GOOD, DEFAULT_KICK_DEPTH_OK,
+    DEFAULT_KICK_SYM_MAX_GOOD, DEFAULT_ROLL_GOOD, DEFAULT_ROLL_OK, DEFAULT_TORSO_GOOD,
+    DEFAULT_TORSO_OK,
+)
+from .geometry import TRACKED_LANDMARK_INDICES, get_zone_color, lm_array_to_dict
+
+# ─────────────────────────────────────────────
+# VISUAL PANELS - Enhanced
+# ─────────────────────────────────────────────
+
+def draw_simplified_silhouette(frame, x, y, color=(180,180,180), th=3):
+    """Draw a simple stick figure silhouette"""
+    cv2.circle(frame, (x, y-50), 18, color, th)
+    cv2.line(frame, (x, y-32), (x, y+70), color, th+2)
+    cv2.line(frame, (x, y-10), (x-45, y+30), color, th)
+    cv2.line(frame, (x, y-10), (x+45, y+30), color, th)
+    cv2.line(frame, (x, y+70), (x-35, y+130), color, th)
+    cv2.line(frame, (x, y+70), (x+35, y+130), color, th)
+
+# Panel geometry (reduced height since silhouette removed)
+PANEL_WIDTH, PANEL_HEIGHT, PANEL_TOP = 320, 380, 30
+PANEL_BG_ALPHA = 0.65            # Opacity of the black panel background
+LANDMARK_COLOR = (0, 255, 128)
+LANDMARK_RADIUS = 3
+
+# Values shown on the static "IDEAL REFERENCE" panel
+IDEAL_REFERENCE_METRICS = {
+    'horizontal_deviation': 3.0,
+    'evf_plane_angle': 15.0,
+    'torso_lean': 8.0,
+    'body_roll': 45.0,
+    'kick_depth': 0.25,
+    'kick_symmetry': 5.0,
+    'breathing_during_pull': False,
+    'score': 95,
+    'is_gliding': True,
+    'glide_score': 90
+}
+
+def _panel_bounds(origin_x, frame_w, frame_h):
+    """Panel rectangle (inclusive, as cv2.rectangle draws it) clipped to the frame"""
+    px, py = origin_x - PANEL_WIDTH // 2, PANEL_TOP
+    x0, y0 = max(px, 0), max(py, 0)
+    x1, y1 = min(px + PANEL_WIDTH + 1, frame_w), min(py + PANEL_HEIGHT + 1, frame_h)
+    return px, py, x0, y0, x1, y1
+
+def darken_region(frame, x0, y0, x1, y1, alpha=PANEL_BG_ALPHA):
+    """Blend a black rectangle over frame[y0:y1, x0:x1] in place (no full-frame copy)"""
+    if x1 <= x0 or y1 <= y0:
+        return
+    roi = frame[y0:y1, x0:x1]
+    roi[:] = cv2.convertScaleAbs(roi, alpha=1.0 - alpha)
+
+def draw_technique_panel_enhanced(frame, origin_x, title, metrics_dict, phase, is_ideal=False, breath_side='N'):
+    """
+    Enhanced technique panel with separate alignment and EVF indicators
+    (Silhouette removed for cleaner video output)
+    """
+    h, w = frame.shape[:2]
+    px, py, x0, y0, x1, y1 = _panel_bounds(origin_x, w, h)
+    
+    # Semi-transparent background - blended over the panel region only
+    darken_region(frame, x0, y0, x1, y1)
+    _draw_panel_content(frame, px, py, title, metrics_dict, phase, is_ideal, breath_side)
+
+def _draw_panel_content(frame, px, py, title, metrics_dict, phase, is_ideal=False, breath_side='N'):
+    """Text, bars and indicator lines of a technique panel (background drawn separately)"""
+    pw, ph = PANEL_WIDTH, PANEL_HEIGHT
+
+    # Title
+    cv2.putText(frame, title.upper(), (px+10, py+30), cv2.FONT_HERSHEY_SIMPLEX, 0.8,
+                (255,255,255) if not is_ideal else (200,200,255), 2)
+
+    y_offset = py + 55
+    
+    # 1. Horizontal Alignment Score
+    h_dev = metrics_dict.get('horizontal_deviation', 0)
+    h_color = get_zone_color(h_dev, DEFAULT_HORIZONTAL_DEV_GOOD, DEFAULT_HORIZONTAL_DEV_OK)
+    cv2.putText(frame, f"Alignment: {h_dev:.1f}°", (px+10, y_offset), 
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, h_color, 2)
+    # Visual indicator bar
+    bar_len = int(min(h_dev / 20, 1.0) * 100)
+    cv2.rectangle(frame, (px+180, y_offset-12), (px+180+bar_len, y_offset-2), h_color, -1)
+    y_offset += 30
+
+    # 2. EVF Score (during Pull/Push phases)
+    evf_angle = metrics_dict.get('evf_plane_angle', 0)
+    if phase in ("Pull", "Push"):
+        evf_color = get_zone_color(evf_angle, DEFAULT_EVF_ANGLE_GOOD, DEFAULT_EVF_ANGLE_OK)
+        cv2.putText(frame, f"EVF Angle: {evf_angle:.1f}°", (px+10, y_offset), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, evf_color, 2)
+        bar_len = int(min(evf_angle / 60, 1.0) * 100)
+        cv2.rectangle(frame, (px+180, y_offset-12), (px+180+bar_len, y_offset-2), evf_color, -1)
+    else:
+        cv2.putText(frame, "EVF: n/a (Recovery)", (px+10, y_offset), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (128, 128, 128), 2)
+    y_offset += 30
+
+    # 3. Torso Lean
+    torso = metrics_dict.get('torso_lean', 8)
+    tc = get_zone_color(abs(torso), DEFAULT_TORSO_GOOD, DEFAULT_TORSO_OK)
+    cv2.putText(frame, f"Torso Lean: {torso:.1f}°", (px+10, y_offset), 
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, tc, 2)
+    # Visual torso line
+    tlen = 60
+    tdx = tlen * math.sin(math.radians(torso))
+    tdy = tlen * math.cos(math.radians(torso))
+    cv2.line(frame, (px+250, y_offset+20), (int(px+250+tdx), int(py+y_offset+20+tdy)), tc, 4)
+    y_offset += 35
+
+    # 4. Body Roll
+    roll = metrics_dict.get('body_roll', 45)
+    rc = get_zone_color(roll, DEFAULT_ROLL_GOOD, DEFAULT_ROLL_OK)
+    cv2.putText(frame, f"Body Roll: {roll:.1f}°", (px+10, y_offset), 
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, rc, 2)
+    # Visual roll indicator
+    rdx = 50 * math.cos(math.radians(roll))
+    rdy = 50 * math.sin(math.radians(roll))
+    cv2.line(frame, (px+250, y_offset+10), (int(px+250+rdx), int(y_offset+10+rdy)), rc, 4)
+    y_offset += 35
+
+    # 5. Kick Depth (relative to hip-ankle span)
+    kick_depth = metrics_dict.get('kick_depth', 0.25)
+    kdc = get_zone_color(kick_depth, DEFAULT_KICK_DEPTH_GOOD, DEFAULT_KICK_DEPTH_OK)
+    cv2.putText(frame, f"Kick Depth: {kick_depth:.2f}", (px+10, y_offset), 
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, kdc, 2)
+    # Visual bar
+    bar_len = int(min(kick_depth / 0.5, 1.0) * 100)
+    cv2.rectangle(frame, (px+180, y_offset-12), (px+180+bar_len, y_offset-2), kdc, -1)
+    y_offset += 35
+
+    # 6. Kick Symmetry
+    kick_sym = metrics_dict.get('kick_symmetry', 0)
+    ksc = get_zone_color(kick_sym, (0, DEFAULT_KICK_SYM_MAX_GOOD), (0, 25))
+    cv2.putText(frame, f"Kick Sym: {kick_sym:.1f}°", (px+10, y_offset), 
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, ksc, 2)
+    y_offset += 35
+
+    # 7. Phase indicator with color coding
+    phase_colors = {
+        "Entry": (59, 130, 246),    # Blue
+        "Pull": (34, 197, 94),      # Green
+        "Push": (245, 158, 11),     # Amber
+        "Recovery": (107, 114, 128) # Gray
+    }
+    phase_color = phase_colors.get(phase, (200, 200, 200))
+    cv2.putText(frame, f"Phase: {phase}", (px+10, y_offset), 
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, phase_color, 2)
+    y_offset += 35
+
+    # 8. Breathing indicator with warning if during pull
+    breathing_during_pull = metrics_dict.get('breathing_during_pull', False)
+    if breath_side != 'N':
+        if breathing_during_pull:
+            bcolor = (0, 0, 255)  # Red warning
+            btxt = f"⚠ BREATH DURING PULL ({breath_side})"
+        else:
+            bcolor = (255,165,0) if breath_side == 'L' else (0,191,255)
+            btxt = f"Breath: {'Left' if breath_side == 'L' else 'Right'}"
+        cv2.putText(frame, btxt, (px+10, y_offset), cv2.FONT_HERSHEY_SIMPLEX, 0.55, bcolor, 2)
+    else:
+        cv2.putText(frame, "Breath: Neutral", (px+10, y_offset), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (180,180,180), 2)
+    y_offset += 35
+
+    # Overall score at bottom
+    score = metrics_dict.get('score', 0)
+    score_color = (0, 255, 0) if score >= 70 else (0, 220, 220) if score >= 50 else (0, 0, 255)
+    cv2.putText(frame, f"Score: {score:.0f}/100", (px+10, y_offset), 
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, score_color, 2)
+
+    # Footer
+    stxt = "IDEAL REFERENCE" if is_ideal else "YOUR STROKE"
+    cv2.putText(frame, stxt, (px+10, py+ph-15), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (180,180,180), 1)
+
+class OverlayCompositor:
+    """
+    Draws the per-frame overlay for one frame size without full-frame copies.
+    
+    - Panel backgrounds are blended only inside their rectangles, in place
+    - The static "IDEAL REFERENCE" panel is rendered once into a BGRA sprite
+      and composited with the background darkening in a single ROI pass
+    - Landmark dots are written in one fancy-indexing assignment using a
+      precomputed disc stencil instead of one cv2.circle call per landmark
+    """
+
+    def __init__(self, frame_w: int, frame_h: int):
+        self.size = (frame_w, frame_h)
+        self._dot_dy, self._dot_dx = self._circle_stencil(LANDMARK_RADIUS)
+        self._ideal_origin_x = 180
+        self._ideal_sprite = self._render_panel_sprite(
+            "IDEAL REFERENCE", IDEAL_REFERENCE_METRICS, "Pull", True, 'N')
+        # Per-pixel factor applied to the frame under the sprite: panel darkening x (1 - ink)
+        alpha = self._ideal_sprite[..., 3:].astype(np.float32) / 255
+        self._ideal_keep = np.repeat((1.0 - PANEL_BG_ALPHA) * (1.0 - alpha), 3, axis=2)
+        self._ideal_ink = self._ideal_sprite[..., :3].astype(np.float32)
+
+    @staticmethod
+    def _circle_stencil(radius: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Pixel offsets cv2.circle fills for a filled disc of this radius"""
+        c = radius + 1
+        canvas = np.zeros((2 * c + 1, 2 * c + 1), dtype=np.uint8)
+        cv2.circle(canvas, (c, c), radius, 255, -1)
+        dy, dx = np.nonzero(canvas)
+        return dy - c, dx - c
+
+    @staticmethod
+    def _render_panel_sprite(title, metrics_dict, phase, is_ideal, breath_side) -> np.ndarray:
+        """
+        Render a panel's content once into a (PANEL_HEIGHT+1, PANEL_WIDTH+1, 4) BGRA sprite.
+        BGR is premultiplied by alpha; alpha is ink coverage (anti-aliased text included).
+        """
+        # Draw on black and on white: the difference gives per-pixel coverage
+        canvas_h = PANEL_TOP + PANEL_HEIGHT + 1
+        on_black = np.zeros((canvas_h, PANEL_WIDTH + 1, 3), dtype=np.uint8)
+        on_white = np.full_like(on_black, 255)
+        _draw_panel_content(on_black, 0, PANEL_TOP, title, metrics_dict, phase, is_ideal, breath_side)
+        _draw_panel_content(on_white, 0, PANEL_TOP, title, metrics_dict, phase, is_ideal, breath_side)
+        coverage = 255 - (on_white.astype(np.int16) - on_black).mean(axis=2)
+        sprite = np.empty((PANEL_HEIGHT + 1, PANEL_WIDTH + 1, 4), dtype=np.uint8)
+        sprite[..., :3] = on_black[PANEL_TOP:]
+        sprite[..., 3] = np.clip(np.rint(coverage[PANEL_TOP:]), 0, 255)
+        return sprite
+
+    def draw_landmarks(self, frame, landmarks_norm: np.ndarray) -> None:
+        """Draw every pose landmark ((N, 2) normalized array) as a filled dot in one vectorized write"""
+        h, w = frame.shape[:2]
+        pts = (np.asarray(landmarks_norm, dtype=np.float64) * (w, h)).astype(np.intp)
+        ys = (pts[:, 1, None] + self._dot_dy).ravel()
+        xs = (pts[:, 0, None] + self._dot_dx).ravel()
+        inside = (ys >= 0) & (ys < h) & (xs >= 0) & (xs < w)
+        frame[ys[inside], xs[inside]] = LANDMARK_COLOR
+
+    def draw_panel(self, frame, origin_x, title, metrics_dict, phase, breath_side='N') -> None:
+        """Dynamic panel: in-place ROI blend, then text drawn straight onto the frame"""
+        draw_technique_panel_enhanced(frame, origin_x, title, metrics_dict, phase, False, breath_side)
+
+    def draw_ideal_panel(self, frame) -> None:
+        """Stamp the cached IDEAL REFERENCE sprite"""
+        h, w = frame.shape[:2]
+        px, py, x0, y0, x1, y1 = _panel_bounds(self._ideal_origin_x, w, h)
+        if x1 <= x0 or y1 <= y0:
+            return
+        sy, sx = slice(y0 - py, y1 - py), slice(x0 - px, x1 - px)
+        roi = frame[y0:y1, x0:x1]
+        blended = roi.astype(np.float32)
+        blended *= self._ideal_keep[sy, sx]
+        blended += self._ideal_ink[sy, sx]
+        roi[:] = cv2.convertScaleAbs(blended)
+
+def draw_overlay_zones(frame, lm_pixel, horizontal_dev, evf_angle, phase):
+    """
+    Draw color-coded overlay zones on the swimmer
+    Green = Good, Amber = OK, Red = Needs Work
+    """
+    h, w = frame.shape[:2]
+    
+    # Draw alignment line (shoulder-hip-ankle)
+    mid_shoulder = (
+        int((lm_pixel["left_shoulder"][0] + lm_pixel["right_shoulder"][0]) / 2),
+        int((lm_pixel["left_shoulder"][1] + lm_pixel["right_shoulder"][1]) / 2)
+    )
+    mid_hip = (
+        int((lm_pixel["left_hip"][0] + lm_pixel["right_hip"][0]) / 2),
+        int((lm_pixel["left_hip"][1] + lm_pixel["right_hip"][1]) / 2)
+    )
+    mid_ankle = (
+        int((lm_pixel["left_ankle"][0] + lm_pixel["right_ankle"][0]) / 2),
+        int((lm_pixel["left_ankle"][1] + lm_pixel["right_ankle"][1]) / 2)
+    )
+    
+    # Color based on alignment
+    align_color = get_zone_color(horizontal_dev, DEFAULT_HORIZONTAL_DEV_GOOD, DEFAULT_HORIZONTAL_DEV_OK)
+    # Draw body line
+    cv2.line(frame, mid_shoulder, mid_hip, align_color, 3)
+    cv2.line(frame, mid_hip, mid_ankle, align_color, 3)
+    
+    # Draw EVF indicator during pull/push
+    if phase in ("Pull", "Push"):
+        # Find the pulling arm (lower wrist)
+        if lm_pixel["left_wrist"][1] > lm_pixel["right_wrist"][1]:
+            elbow = (int(lm_pixel["left_elbow"][0]), int(lm_pixel["left_elbow"][1]))
+            wrist = (int(lm_pixel["left_wrist"][0]), int(lm_pixel["left_wrist"][1]))
+        else:
+            elbow = (int(lm_pixel["right_elbow"][0]), int(lm_pixel["right_elbow"][1]))
+            wrist = (int(lm_pixel["right_wrist"][0]), int(lm_pixel["right_wrist"][1]))
+        
+        evf_color = get_zone_color(evf_angle, DEFAULT_EVF_ANGLE_GOOD, DEFAULT_EVF_ANGLE_OK)
+        cv2.line(frame, elbow, wrist, evf_color, 4)
+        
+        # Draw ideal vertical line from elbow for reference
+        cv2.line(frame, elbow, (elbow[0], elbow[1] + 80), (100, 100, 100), 2, cv2.LINE_AA)
+
+def draw_frame_overlay(frame, landmarks_norm: np.ndarray, m: "FrameMetrics",
+                       compositor: OverlayCompositor) -> None:
+    """
+    Draw the complete annotation for one analyzed frame from its stored
+    landmarks ((33, 2) normalized) and metrics. Used both live and for
+    deferred rendering, so both produce the same video.
+    """
+    h, w = frame.shape[:2]
+    compositor.draw_landmarks(frame, landmarks_norm)
+
+    # NEW: Draw color-coded overlay zones
+    lm_pixel = lm_array_to_dict(np.asarray(landmarks_norm, dtype=np.float64)[TRACKED_LANDMARK_INDICES] * (w, h))
+    draw_overlay_zones(frame, lm_pixel, m.horizontal_deviation, m.evf_plane_angle, m.phase)
+
+    metrics_dict = {
+        'horizontal_deviation': m.horizontal_deviation,
+        'evf_plane_angle': m.evf_plane_angle,
+        'torso_lean': m.torso_lean,
+        'body_roll': m.body_roll,
+        'kick_depth': m.kick_depth_proxy,
+        'kick_symmetry': m.kick_symmetry,
+        'breathing_during_pull': m.breathing_during_pull,
+        'score': m.score,
+        'is_gliding': m.is_gliding,
+        'glide_score': m.glide_score
+    }
+    breath_side = m.breath_state if m.breath_state != "-" else 'N'
+
+    # Draw enhanced technique panels (ideal reference is a cached sprite)
+    compositor.draw_panel(frame, w-180, "YOUR STROKE", metrics_dict, m.phase, breath_side)
+    compositor.draw_ideal_panel(frame)
@@ -0,0 +1,308 @@
+"""Headless analysis loop: progress and live results are reported through callbacks."""
+import cv2
+import numpy as np
+import datetime
+import logging
+import os
+import pickle
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional, Dict, Tuple
+
+from .constants import (
+    CHECKPOINT_INTERVAL_S, CHECKPOINT_VERSION, LIVE_SUMMARY_INTERVAL_S, PROGRESS_EMA_ALPHA, PROGRESS_MIN_INTERVAL_S,
+)
+from .models import LiveSummary
+from .analyzer import SwimAnalyzer
+from .plots import generate_plots
+from .report import generate_pdf_report
+from .video import build_overlay_track
+from .export import build_results_zip, export_to_csv
+from .tracks import LandmarkFrames, LandmarkTrack, LandmarkTrackWriter
+
+logger = logging.getLogger(__name__)
+
+# ─────────────────────────────────────────────
+# ANALYSIS PIPELINE - Headless frame loop with callbacks
+# ─────────────────────────────────────────────
+
+class ProgressReporter:
+    """
+    Rate-limited progress for long frame loops.
+
+    tick() is cheap and can be called every frame; the update callback
+    (fraction, text) only fires every min_interval_s, with the processing
+    rate and an ETA smoothed by an exponential moving average. initial is
+    the count already done before this run (resuming from a checkpoint).
+    """
+
+    def __init__(self, total: int, update, label: str = "🎬 Analyzing frame",
+                 min_interval_s: float = PROGRESS_MIN_INTERVAL_S, ema_alpha: float = PROGRESS_EMA_ALPHA,
+                 initial: int = 0):
+        self.total = total
+        self.update = update
+        self.label = label
+        self.min_interval_s = min_interval_s
+        self.ema_alpha = ema_alpha
+        self.fps_ema: Optional[float] = None
+        self.start = self.last_t = time.monotonic()
+        self.initial = initial
+        self.last_done = self.done = initial
+        self.updates = 0
+
+    def tick(self, done: int) -> None:
+        self.done = done
+        now = time.monotonic()
+        dt = now - self.last_t
+        if dt < self.min_interval_s:
+            return
+        rate = (done - self.last_done) / dt
+        self.fps_ema = rate if self.fps_ema is None else self.ema_alpha * rate + (1 - self.ema_alpha) * self.fps_ema
+        self.last_t, self.last_done = now, done
+        self._emit(done)
+
+    def finish(self, text: str = "✅ Analysis complete!") -> None:
+        elapsed = time.monotonic() - self.start
+        fps = (self.done - self.initial) / elapsed if elapsed > 0 else 0.0
+        self.updates += 1
+        self.update(1.0, f"{text} ({fps:.1f} fps)")
+
+    def _emit(self, done: int) -> None:
+        text = f"{self.label} {done}/{self.total} • {self.fps_ema:.1f} fps"
+        if self.total > 0 and self.fps_ema > 0:
+            eta = max(self.total - done, 0) / self.fps_ema
+            text += f" • ETA {int(eta // 60)}:{int(eta % 60):02d}"
+        self.updates += 1
+        self.update(min(done / self.total, 1.0) if self.total > 0 else 0.0, text)
+
+
+def probe_video(input_path: str) -> Tuple[float, int, int, int]:
+    """
+    Returns:
+        - fps (30 if unknown), width, height, frame count (0 if unknown)
+    """
+    cap = cv2.VideoCapture(input_path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        return (fps, int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+    finally:
+        cap.release()
+
+
+class AnalysisCancelled(Exception):
+    """Raised by analyze_video when should_cancel() returns True (after a final checkpoint)"""
+
+
+@dataclass
+class AnalysisCheckpoint:
+    """
+    Resumable state of a partly analyzed video: the whole analyzer (pose
+    model excluded - see SwimAnalyzer.__getstate__) and the next frame to
+    read. Spilled per-frame metrics stay in the analyzer's metrics_dir;
+    the pickled store remembers how many rows of them are valid.
+    """
+    frame_idx: int
+    analyzer: SwimAnalyzer
+    version: int = CHECKPOINT_VERSION
+
+    def save(self, path: str) -> None:
+        # Written next to the target and renamed: a crash mid-write keeps the previous checkpoint
+        tmp_path = path + ".part"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path: str) -> Optional['AnalysisCheckpoint']:
+        """
+        Returns:
+            - the checkpoint, or None if there is none or it cannot be used (corrupt, other version)
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                checkpoint = pickle.load(f)
+        except Exception as e:
+            logger.warning("Ignoring unreadable checkpoint %s: %s", path, e)
+            return None
+        if getattr(checkpoint, 'version', None) != CHECKPOINT_VERSION:
+            logger.warning("Ignoring checkpoint %s from another version", path)
+            return None
+        return checkpoint
+
+
+def analyze_video(input_path: str, analyzer: SwimAnalyzer,
+                  progress_callback: Optional[Callable[[int, int], None]] = None,
+                  live_callback: Optional[Callable[[LiveSummary], None]] = None,
+                  frame_callback: Optional[Callable[[np.ndarray], None]] = None,
+                  live_interval_s: float = LIVE_SUMMARY_INTERVAL_S,
+                  start_frame: int = 0,
+                  checkpoint_path: Optional[str] = None,
+                  checkpoint_interval_s: float = CHECKPOINT_INTERVAL_S,
+                  should_cancel: Optional[Callable[[], bool]] = None,
+                  track_path: Optional[str] = None) -> int:
+    """
+    Run every frame of a video through the analyzer. No UI is touched: the
+    caller observes the run through callbacks.
+
+    progress_callback(done, total) is called once per frame,
+    live_callback(LiveSummary) every live_interval_s of video once a pose
+    has been seen, and frame_callback(frame) with each processed (annotated,
+    when the analyzer renders overlays) frame.
+
+    With checkpoint_path, an AnalysisCheckpoint is saved every
+    checkpoint_interval_s of wall time; resume by loading it and passing its
+    analyzer (reopened) and frame_idx as start_frame. should_cancel() is
+    polled every frame; when it returns True a checkpoint is saved and
+    AnalysisCancelled raised.
+
+    With track_path, every pose MediaPipe returns (all 33 landmarks, before
+    validation) is written to a landmark track file (see tracks.py), which
+    is complete once this returns or raises. A track is always written from
+    frame zero: combining track_path with a resume (start_frame > 0) raises
+    ValueError rather than truncating the poses of the earlier attempt.
+
+    Returns:
+        - number of frames read (including the start_frame skipped ones)
+    """
+    if track_path is not None and start_frame > 0:
+        raise ValueError("track_path cannot be combined with start_frame > 0: "
+                         "the track would only hold the resumed part of the video")
+    cap = cv2.VideoCapture(input_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if track_path is not None:
+        analyzer.track_writer = LandmarkTrackWriter(track_path, fps, int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                                                    int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    try:
+        # grab() without decoding: exact frame positions, unlike seeking with CAP_PROP_POS_FRAMES
+        frame_idx = 0
+        while frame_idx < start_frame and cap.grab():
+            frame_idx += 1
+        next_live_t = frame_idx / fps + live_interval_s
+        next_checkpoint = time.monotonic() + checkpoint_interval_s
+
+        while cap.isOpened():
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            timestamp_ms = frame_idx * 33 + 1
+            real_t = frame_idx / fps
+
+            annotated, _ = analyzer.process(frame, real_t, timestamp_ms, fps, frame_idx=frame_idx)
+            if frame_callback is not None:
+                frame_callback(annotated)
+
+            frame_idx += 1
+            if progress_callback is not None:
+                progress_callback(frame_idx, total)
+            if live_callback is not None and real_t >= next_live_t:
+                next_live_t = real_t + live_interval_s
+                if analyzer.metrics:
+                    live_callback(analyzer.live_snapshot())
+
+            if should_cancel is not None and should_cancel():
+                if checkpoint_path is not None:
+                    AnalysisCheckpoint(frame_idx, analyzer).save(checkpoint_path)
+                raise AnalysisCancelled(f"cancelled at frame {frame_idx}")
+            if checkpoint_path is not None and time.monotonic() >= next_checkpoint:
+                AnalysisCheckpoint(frame_idx, analyzer).save(checkpoint_path)
+                next_checkpoint = time.monotonic() + checkpoint_interval_s
+    finally:
+        cap.release()
+        if analyzer.track_writer is not None:
+            analyzer.track_writer.close()
+            analyzer.track_writer = None
+    return frame_idx
+
+
+def replay_landmarks(chunks: Iterable[LandmarkFrames], analyzer: SwimAnalyzer, frame_size: Tuple[int, int],
+                     fps: float = 30.0, total: int = 0,
+                     progress_callback: Optional[Callable[[int, int], None]] = None,
+                     live_callback: Optional[Callable[[LiveSummary], None]] = None,
+                     live_interval_s: float = LIVE_SUMMARY_INTERVAL_S) -> int:
+    """
+    Run precomputed poses through the analyzer instead of a video: no
+    decoding and no pose model, only the metric, phase, breathing and
+    scoring path (SwimAnalyzer.process_landmark_batch, once per chunk).
+    The analyzer needs render_overlays=False; create it with replay=True
+    to skip loading the model.
+
+    chunks are LandmarkFrames (LandmarkTrack.iter_chunks() or
+    tracks.synthetic_landmarks()); frame_size is the (width, height) the
+    normalized coordinates refer to. progress_callback(done, total) is
+    called once per chunk, live_callback as in analyze_video. Without
+    frames the camera view is not detected: pass manual_camera_view (and
+    manual_water_position) to the analyzer for context-dependent results
+    such as pool length segmentation.
+
+    Returns:
+        - number of poses replayed
+    """
+    done = 0
+    next_live_t = live_interval_s
+    for chunk in chunks:
+        times = (chunk.time_ms / 1000.0).tolist()
+        analyzer.process_landmark_batch(chunk.landmarks[:, :, :2].astype(np.float64),
+                                        chunk.visibility.astype(np.float64), times, chunk.frame_idx.tolist(),
+                                        frame_size, fps)
+        done += len(chunk)
+        if progress_callback is not None:
+            progress_callback(done, total)
+        if live_callback is not None and times and times[-1] >= next_live_t:
+            next_live_t = times[-1] + live_interval_s
+            if analyzer.metrics:
+                live_callback(analyzer.live_snapshot())
+    return done
+
+
+def replay_track(track_path: str, analyzer: SwimAnalyzer, start_frame: int = 0, stop_frame: Optional[int] = None,
+                 progress_callback: Optional[Callable[[int, int], None]] = None,
+                 live_callback: Optional[Callable[[LiveSummary], None]] = None) -> int:
+    """
+    replay_landmarks over a landmark track file (see analyze_video's
+    track_path), optionally limited to video frames [start_frame, stop_frame).
+
+    Returns:
+        - number of poses replayed
+    """
+    with LandmarkTrack(track_path) as track:
+        if not (track.width and track.height):
+            raise ValueError(f"{track_path} does not record the frame size; use replay_landmarks")
+        return replay_landmarks(track.iter_chunks(start_frame, stop_frame), analyzer, (track.width, track.height),
+                                track.fps or 30.0, len(track), progress_callback, live_callback)
+
+
+def build_analysis_results(analyzer: SwimAnalyzer, name: str, n_frames: int, fps: float,
+                           gallery: Dict, video_bytes: Optional[bytes] = None,
+                           input_path: Optional[str] = None) -> Dict:
+    """
+    Summary and every downloadable artifact of a finished analysis.
+
+    Returns:
+        - dict with analyzer, summary, report/CSV/ZIP buffers, video_bytes, input_path (kept
+          for deferred rendering), the overlay_track for the browser player and the gallery
+    """
+    summary = analyzer.get_summary()
+    plot_buf = generate_plots(analyzer)
+    pdf_buf = generate_pdf_report(summary, name, plot_buf)
+    csv_buf = export_to_csv(analyzer)
+    fatigue_csv = summary.fatigue.to_csv() if summary.fatigue is not None else None
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    return {
+        'analyzer': analyzer,
+        'summary': summary,
+        'pdf_buf': pdf_buf,
+        'csv_buf': csv_buf,
+        'fatigue_csv': fatigue_csv,
+        'zip_buf': build_results_zip(video_bytes, csv_buf, pdf_buf, timestamp, fatigue_csv),
+        'timestamp': timestamp,
+        'video_bytes': video_bytes,
+        'input_path': input_path,
+        'overlay_track': build_overlay_track(analyzer, n_frames, fps),
+        'gallery': gallery,
+    }
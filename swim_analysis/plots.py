@@ -0,0 +1,103 @@
+"""Matplotlib charts of an analyzed session."""
+import numpy as np
+import matplotlib.pyplot as plt
+import io
+
+from .constants import (
+    DEFAULT_EVF_ANGLE_GOOD, DEFAULT_EVF_ANGLE_OK, DEFAULT_HORIZONTAL_DEV_GOOD,
+    DEFAULT_HORIZONTAL_DEV_OK, DEFAULT_KICK_DEPTH_GOOD, DEFAULT_KICK_SYM_MAX_GOOD, DEFAULT_ROLL_GOOD,
+    PLOT_MAX_POINTS,
+)
+from .analyzer import SwimAnalyzer
+
+# ─────────────────────────────────────────────
+# PLOTS - Enhanced with new metrics
+# ─────────────────────────────────────────────
+
+def generate_plots(analyzer: SwimAnalyzer):
+    metrics = analyzer.metrics
+    if not metrics:
+        return io.BytesIO()
+
+    # Columns read straight from the store; long sessions are decimated for plotting
+    step = max(1, len(metrics) // PLOT_MAX_POINTS)
+    col = lambda name: metrics.column(name, step)
+    times = col('time_s')
+    plt.style.use('dark_background')
+    fig, axs = plt.subplots(5, 1, figsize=(10, 14), sharex=True)
+
+    # 1. Body Alignment (Horizontal Deviation)
+    axs[0].plot(times, col('horizontal_deviation'), 
+                label="Horizontal Deviation", color='#06b6d4', linewidth=1.5)
+    axs[0].axhspan(0, DEFAULT_HORIZONTAL_DEV_GOOD[1], color='green', alpha=0.2, label='Good Zone')
+    axs[0].axhspan(DEFAULT_HORIZONTAL_DEV_GOOD[1], DEFAULT_HORIZONTAL_DEV_OK[1], 
+                   color='yellow', alpha=0.2, label='OK Zone')
+    axs[0].set_ylabel("Degrees")
+    axs[0].set_title("Body Alignment (Shoulder-Hip-Ankle Deviation)")
+    axs[0].legend(loc='upper right')
+    axs[0].set_ylim(0, 30)
+
+    # 2. EVF Angle
+    pull_push = np.isin(col('phase').astype(str), ("Pull", "Push"))
+    pull_push_times = times[pull_push]
+    pull_push_evf = col('evf_plane_angle')[pull_push]
+    axs[1].scatter(pull_push_times, pull_push_evf, label="EVF Angle (Pull/Push)", 
+                   color='#a855f7', s=10, alpha=0.7)
+    axs[1].axhspan(0, DEFAULT_EVF_ANGLE_GOOD[1], color='green', alpha=0.2)
+    axs[1].axhspan(DEFAULT_EVF_ANGLE_GOOD[1], DEFAULT_EVF_ANGLE_OK[1], color='yellow', alpha=0.2)
+    axs[1].set_ylabel("Degrees")
+    axs[1].set_title("Early Vertical Forearm Angle (lower is better)")
+    axs[1].legend(loc='upper right')
+    axs[1].set_ylim(0, 60)
+
+    # 3. Body Roll
+    axs[2].plot(times, col('body_roll'), 
+                label="Body Roll", color='#f59e0b', linewidth=1.5)
+    axs[2].axhspan(DEFAULT_ROLL_GOOD[0], DEFAULT_ROLL_GOOD[1], color='green', alpha=0.2)
+    axs[2].axhline(45, color='white', linestyle='--', alpha=0.5, label='Ideal (45°)')
+    axs[2].set_ylabel("Degrees")
+    axs[2].set_title("Body Roll Over Time")
+    axs[2].legend(loc='upper right')
+
+    # 4. Kick Metrics
+    ax4 = axs[3]
+    ax4.plot(times, col('kick_symmetry'), 
+             label="Kick Symmetry", color='#ef4444', linewidth=1.5)
+    ax4.axhline(DEFAULT_KICK_SYM_MAX_GOOD, color='red', linestyle='--', alpha=0.5)
+    ax4.set_ylabel("Symmetry (°)", color='#ef4444')
+    ax4.tick_params(axis='y', labelcolor='#ef4444')
+    
+    ax4b = ax4.twinx()
+    ax4b.plot(times, col('kick_depth_proxy'), 
+              label="Kick Depth", color='#22c55e', linewidth=1.5, alpha=0.7)
+    ax4b.axhspan(DEFAULT_KICK_DEPTH_GOOD[0], DEFAULT_KICK_DEPTH_GOOD[1], 
+                 color='green', alpha=0.1)
+    ax4b.set_ylabel("Depth (normalized)", color='#22c55e')
+    ax4b.tick_params(axis='y', labelcolor='#22c55e')
+    ax4.set_title("Kick Metrics")
+    
+    # Combined legend
+    lines1, labels1 = ax4.get_legend_handles_labels()
+    lines2, labels2 = ax4b.get_legend_handles_labels()
+    ax4.legend(lines1 + lines2, labels1 + labels2, loc='upper right')
+
+    # 5. Overall Score with sub-scores
+    axs[4].plot(times, col('score'), 
+                label="Overall Score", color='#22c55e', linewidth=2)
+    axs[4].plot(times, col('alignment_score'), 
+                label="Alignment Score", color='#06b6d4', linewidth=1, alpha=0.7)
+    axs[4].plot(times, col('evf_score'), 
+                label="EVF Score", color='#a855f7', linewidth=1, alpha=0.7)
+    axs[4].axhline(70, color='yellow', linestyle='--', alpha=0.5, label='Good threshold')
+    axs[4].set_xlabel("Time (seconds)")
+    axs[4].set_ylabel("Score")
+    axs[4].set_title("Technique Scores Over Time")
+    axs[4].legend(loc='lower right')
+    axs[4].set_ylim(0, 105)
+
+    plt.tight_layout()
+    buf = io.BytesIO()
+    plt.savefig(buf, format="png", dpi=150, bbox_inches="tight")
+    plt.close(fig)
+    buf.seek(0)
+    return buf
@@ -0,0 +1,262 @@
+"""Pool length, turn and push-off segmentation."""
+import numpy as np
+import pandas as pd
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+
+from .constants import (
+    DEFAULT_CONF_THRESHOLD, POOL_FACING_SMOOTH_S, POOL_MAX_PUSH_OFF_S, POOL_MIN_LENGTH_S,
+    POOL_STREAMLINE_EXTENSION, POOL_TURN_CUE_WINDOW_S, POOL_TURN_DROPOUT_S, POOL_TURN_MIN_CUES,
+    POOL_TURN_MIN_TRAVEL, POOL_TURN_WINDOW_S,
+)
+from .store import FrameMetricStore
+from .fatigue import rolling_mean
+
+# ─────────────────────────────────────────────
+# POOL SEGMENTATION - Lengths, turns and push-offs
+# ─────────────────────────────────────────────
+
+@dataclass
+class PoolSegment:
+    """Contiguous stretch of a pool session"""
+    kind: str                          # 'swim', 'turn' or 'push_off'
+    start_s: float
+    end_s: float
+    length_number: int                 # Length the segment belongs to (turns: the one being finished)
+
+
+@dataclass
+class LengthSplit:
+    """Split time and free-swimming technique of one pool length"""
+    length_number: int
+    start_s: float                     # Turn midpoint (or first frame) to turn midpoint (or last frame)
+    end_s: float
+    duration_s: float
+    push_off_s: float
+    strokes: int
+    stroke_rate: float
+    avg_score: float
+    glide_ratio: float
+    avg_evf_angle: float
+    avg_vertical_drop: float
+    complete: bool                     # Started and ended at a detected turn
+
+
+@dataclass
+class PoolSegmentation:
+    """Lengths of a pool session and the frames that are free swimming"""
+    segments: List[PoolSegment]
+    lengths: List[LengthSplit]
+    free_mask: np.ndarray              # Per stored row: True outside turns and push-offs
+    turn_times: List[float]
+    stroke_segments: List[List[float]] # Free-swimming stroke times, one list per length
+
+    @property
+    def n_turns(self) -> int:
+        return len(self.turn_times)
+
+    def splits_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame([asdict(s) for s in self.lengths])
+
+
+def facing_direction(metrics: FrameMetricStore) -> np.ndarray:
+    """
+    +1 / -1 per stored row: which way along the pool the head points
+    (nose left or right of the hip midpoint), smoothed over
+    POOL_FACING_SMOOTH_S so head turns for breathing do not flip it.
+    """
+    times = metrics.column('time_s')
+    facing = np.concatenate([
+        b['landmarks'][:, 0, 0] - (b['landmarks'][:, 23, 0] + b['landmarks'][:, 24, 0]) / 2
+        for b in metrics.iter_batches(['landmarks'])
+    ]).astype(np.float64)
+    # Inverted frames were analyzed rotated by 180°, which mirrors x
+    facing = np.where(metrics.column('is_inverted'), -facing, facing)
+    direction = np.sign(rolling_mean(times, facing, POOL_FACING_SMOOTH_S))
+    direction[~np.isfinite(direction) | (direction == 0)] = 1
+    return direction.astype(np.int8)
+
+
+def hip_position(metrics: FrameMetricStore) -> np.ndarray:
+    """Hip midpoint x per stored row (normalized, in the orientation of the raw video)"""
+    hip_x = np.concatenate([
+        (b['landmarks'][:, 23, 0] + b['landmarks'][:, 24, 0]) / 2
+        for b in metrics.iter_batches(['landmarks'])
+    ]).astype(np.float64)
+    # Inverted frames were analyzed rotated by 180°, which mirrors x
+    return np.where(metrics.column('is_inverted'), 1 - hip_x, hip_x)
+
+
+def turn_cues(times: np.ndarray, confident: np.ndarray, hip_x: np.ndarray,
+              arm_extension: np.ndarray, reversal: int) -> List[str]:
+    """
+    Which wall-turn cues surround a facing reversal at stored row `reversal`
+    (the first row facing the new way), within POOL_TURN_CUE_WINDOW_S:
+
+    - 'dropout': no confident pose (rows missing or low confidence) for
+      POOL_TURN_DROPOUT_S - the swimmer tumbles underwater
+    - 'hip_reversal': the hip travels at least POOL_TURN_MIN_TRAVEL one way
+      before and the other way after (a fixed side camera sees the swimmer
+      come back; a panning camera does not, so this cue alone is not required)
+    - 'streamline': the arms are extended overhead (median arm_extension of
+      POOL_STREAMLINE_EXTENSION) in the push-off after the reversal
+    """
+    t = times[reversal]
+    before = (times >= t - POOL_TURN_CUE_WINDOW_S) & (np.arange(len(times)) < reversal)
+    after = (times >= t) & (times <= t + POOL_TURN_CUE_WINDOW_S)
+    window = before | after
+    cues = []
+
+    # Longest stretch without a confident pose (missing rows or low confidence)
+    posed = times[window & confident]
+    gap = float(np.diff(posed).max()) if len(posed) > 1 else 2 * POOL_TURN_CUE_WINDOW_S
+    if gap >= POOL_TURN_DROPOUT_S:
+        cues.append('dropout')
+
+    x_before, x_after = hip_x[before], hip_x[after]
+    if len(x_before) > 1 and len(x_after) > 1:
+        travel_before = x_before[-1] - x_before[0]
+        travel_after = x_after[-1] - x_after[0]
+        if (min(abs(travel_before), abs(travel_after)) >= POOL_TURN_MIN_TRAVEL
+                and np.sign(travel_before) != np.sign(travel_after)):
+            cues.append('hip_reversal')
+
+    if after.any() and np.median(arm_extension[after]) >= POOL_STREAMLINE_EXTENSION:
+        cues.append('streamline')
+    return cues
+
+
+def _direction_runs(times: np.ndarray, direction: np.ndarray) -> List[List[int]]:
+    """
+    [start, end) row ranges of constant facing direction, with runs shorter
+    than POOL_MIN_LENGTH_S absorbed into their neighbour.
+    """
+    change = np.flatnonzero(np.diff(direction) != 0) + 1
+    bounds = np.concatenate([[0], change, [len(direction)]])
+    runs: List[List[int]] = []
+    for s, e in zip(bounds[:-1], bounds[1:]):
+        short = times[e - 1] - times[s] < POOL_MIN_LENGTH_S
+        if runs and (short or direction[s] == direction[runs[-1][0]]):
+            runs[-1][1] = e
+        else:
+            runs.append([int(s), int(e)])
+    # A short leading run has no previous run to join
+    if len(runs) > 1 and times[runs[0][1] - 1] - times[runs[0][0]] < POOL_MIN_LENGTH_S:
+        runs[1][0] = runs[0][0]
+        runs.pop(0)
+    # Absorbing a short run can leave two neighbours facing the same way
+    merged: List[List[int]] = []
+    for run in runs:
+        if merged and direction[run[0]] == direction[merged[-1][0]]:
+            merged[-1][1] = run[1]
+        else:
+            merged.append(run)
+    return merged
+
+
+def _confirmed_runs(metrics: FrameMetricStore, times: np.ndarray, runs: List[List[int]]) -> List[List[int]]:
+    """Merge runs whose facing reversal is not confirmed by POOL_TURN_MIN_CUES turn cues"""
+    confident = metrics.column('confidence') >= DEFAULT_CONF_THRESHOLD
+    hip_x = hip_position(metrics)
+    arm_extension = metrics.column('arm_extension')
+    confirmed = [runs[0]]
+    for run in runs[1:]:
+        if len(turn_cues(times, confident, hip_x, arm_extension, run[0])) >= POOL_TURN_MIN_CUES:
+            confirmed.append(run)
+        else:
+            confirmed[-1][1] = run[1]
+    return confirmed
+
+
+def segment_pool_lengths(metrics: FrameMetricStore, stroke_times) -> Optional[PoolSegmentation]:
+    """
+    Split a side-view pool session into lengths at wall turns.
+
+    A turn candidate is a reversal of facing direction that lasts at least
+    POOL_MIN_LENGTH_S. It is only taken as a wall turn when at least
+    POOL_TURN_MIN_CUES of the cues in turn_cues() back it up (pose dropout,
+    hip travel reversal, streamlined push-off), so a head turn or a camera
+    pan does not split a length. POOL_TURN_WINDOW_S either side of the
+    reversal is the turn, and the glide after it until the first stroke (at
+    most POOL_MAX_PUSH_OFF_S) is the push-off; neither counts as free
+    swimming.
+
+    Facing and hip position are only meaningful along the pool in a side
+    view - callers skip segmentation for other camera views.
+
+    Returns:
+        - PoolSegmentation, or None when no turn is detected
+    """
+    if len(metrics) < 2:
+        return None
+    times = metrics.column('time_s')
+    runs = _direction_runs(times, facing_direction(metrics))
+    if len(runs) < 2:
+        return None
+    runs = _confirmed_runs(metrics, times, runs)
+    if len(runs) < 2:
+        return None
+
+    stroke_times = np.asarray(stroke_times, dtype=np.float64)
+    free = np.ones(len(times), dtype=bool)
+    segments: List[PoolSegment] = []
+    turn_times: List[float] = []
+
+    # Length boundaries: the middle of the (possibly untracked) turn
+    for prev, nxt in zip(runs[:-1], runs[1:]):
+        turn_times.append(float((times[prev[1] - 1] + times[nxt[0]]) / 2))
+    edges = [float(times[0])] + turn_times + [float(times[-1])]
+
+    splits: List[LengthSplit] = []
+    stroke_segments: List[List[float]] = []
+    is_gliding = metrics.column('is_gliding')
+    score = metrics.column('score')
+    use = metrics.column('confidence') >= DEFAULT_CONF_THRESHOLD
+    pull_push = np.isin(metrics.column('phase').astype(str), ("Pull", "Push"))
+    evf = metrics.column('evf_plane_angle')
+    v_drop = metrics.column('vertical_drop')
+
+    for n, (run, start_s, end_s) in enumerate(zip(runs, edges[:-1], edges[1:]), start=1):
+        swim_start = float(times[run[0]])
+        swim_end = float(times[run[1] - 1])
+        push_off_s = 0.0
+        if n > 1:
+            turn_end = swim_start + POOL_TURN_WINDOW_S
+            segments.append(PoolSegment('turn', float(times[runs[n - 2][1] - 1]) - POOL_TURN_WINDOW_S,
+                                        turn_end, n - 1))
+            first_stroke = stroke_times[(stroke_times > turn_end) & (stroke_times <= swim_end)]
+            push_off_end = min(first_stroke[0] if len(first_stroke) else swim_end,
+                               turn_end + POOL_MAX_PUSH_OFF_S)
+            if push_off_end > turn_end:
+                segments.append(PoolSegment('push_off', turn_end, float(push_off_end), n))
+                push_off_s = float(push_off_end) - turn_end
+            swim_start = max(swim_start, float(push_off_end))
+        if n < len(runs):
+            swim_end -= POOL_TURN_WINDOW_S
+        segments.append(PoolSegment('swim', swim_start, swim_end, n))
+
+        in_length = (times >= start_s) & (times <= end_s)
+        in_swim = (times >= swim_start) & (times <= swim_end)
+        free[in_length & ~in_swim] = False
+        rows = in_swim & use if (in_swim & use).any() else in_swim
+
+        length_strokes = stroke_times[(stroke_times >= swim_start) & (stroke_times <= swim_end)]
+        stroke_segments.append(length_strokes.tolist())
+        span = length_strokes[-1] - length_strokes[0] if len(length_strokes) >= 2 else 0.0
+        pp_rows = rows & pull_push
+        splits.append(LengthSplit(
+            length_number=n,
+            start_s=start_s,
+            end_s=end_s,
+            duration_s=end_s - start_s,
+            push_off_s=push_off_s,
+            strokes=len(length_strokes),
+            stroke_rate=60 * (len(length_strokes) - 1) / span if span > 0.1 else 0.0,
+            avg_score=float(score[rows].mean()) if rows.any() else 0.0,
+            glide_ratio=float(is_gliding[rows].mean() * 100) if rows.any() else 0.0,
+            avg_evf_angle=float(evf[pp_rows].mean()) if pp_rows.any() else 0.0,
+            avg_vertical_drop=float(v_drop[rows].mean()) if rows.any() else 0.0,
+            complete=1 < n < len(runs),
+        ))
+
+    return PoolSegmentation(segments, splits, free, turn_times, stroke_segments)
@@ -0,0 +1,218 @@
+"""PDF session report."""
+import datetime
+import io
+
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak, Image as RLImage
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.pagesizes import letter
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+
+from .constants import (
+    DEFAULT_EVF_ANGLE_GOOD, DEFAULT_EVF_ANGLE_OK, DEFAULT_HORIZONTAL_DEV_GOOD,
+    DEFAULT_HORIZONTAL_DEV_OK, DEFAULT_ROLL_GOOD, DEFAULT_ROLL_OK,
+)
+from .models import SessionSummary
+from .geometry import get_zone_status
+from .fatigue import FATIGUE_METRICS
+
+# ─────────────────────────────────────────────
+# PDF REPORT - Enhanced
+# ─────────────────────────────────────────────
+
+def generate_pdf_report(summary: SessionSummary, filename: str, plot_buffer: io.BytesIO) -> io.BytesIO:
+    buffer = io.BytesIO()
+    pdf = SimpleDocTemplate(
+        buffer, 
+        pagesize=letter, 
+        topMargin=0.75*inch, 
+        bottomMargin=0.5*inch,
+        leftMargin=0.75*inch,
+        rightMargin=0.75*inch
+    )
+    styles = getSampleStyleSheet()
+    
+    # Custom styles with proper spacing
+    styles.add(ParagraphStyle(
+        name='CustomTitle', 
+        fontSize=20,  # Reduced from 24 to prevent overlap
+        textColor=colors.HexColor('#06b6d4'), 
+        spaceAfter=12,
+        spaceBefore=0,
+        alignment=1  # Center alignment
+    ))
+    styles.add(ParagraphStyle(
+        name='ReportSubtitle', 
+        fontSize=12, 
+        textColor=colors.HexColor('#64748b'), 
+        spaceAfter=20,
+        alignment=1  # Center alignment
+    ))
+    styles.add(ParagraphStyle(name='DiagnosticGood', fontSize=10, textColor=colors.HexColor('#22c55e'), leftIndent=15, spaceAfter=6))
+    styles.add(ParagraphStyle(name='DiagnosticWarn', fontSize=10, textColor=colors.HexColor('#f59e0b'), leftIndent=15, spaceAfter=6))
+    styles.add(ParagraphStyle(name='DiagnosticError', fontSize=10, textColor=colors.HexColor('#ef4444'), leftIndent=15, spaceAfter=6))
+
+    story = []
+    
+    # Title - centered and properly sized
+    story.append(Paragraph("Freestyle Swimming Technique Analysis", styles['CustomTitle']))
+    story.append(Paragraph(f"Analysis Report • {datetime.datetime.now().strftime('%B %d, %Y')}", styles['ReportSubtitle']))
+    story.append(Spacer(1, 0.15*inch))
+
+    # Session Information
+    story.append(Paragraph("Session Information", styles['Heading2']))
+    session_data = [
+        ['File', filename[:40] + '...' if len(filename) > 40 else filename],  # Truncate long filenames
+        ['Duration', f"{summary.duration_s:.1f} seconds"],
+        ['Analyzed', datetime.datetime.now().strftime("%Y-%m-%d %H:%M")],
+        ['Detection Confidence', f"{summary.avg_confidence*100:.1f}%"]
+    ]
+    t = Table(session_data, colWidths=[1.8*inch, 4.2*inch])
+    t.setStyle(TableStyle([
+        ('FONTSIZE', (0,0), (-1,-1), 10),
+        ('TEXTCOLOR', (0,0), (0,-1), colors.HexColor('#64748b')),
+        ('ALIGN', (0,0), (0,-1), 'RIGHT'),
+        ('RIGHTPADDING', (0,0), (0,-1), 12),
+    ]))
+    story.append(t)
+    story.append(Spacer(1, 0.25*inch))
+
+    # Overall Score Card
+    story.append(Paragraph("Overall Performance", styles['Heading2']))
+    score_color = colors.HexColor('#22c55e') if summary.avg_score >= 70 else colors.HexColor('#f59e0b') if summary.avg_score >= 50 else colors.HexColor('#ef4444')
+    story.append(Paragraph(f"<font size='32' color='{score_color}'><b>{summary.avg_score:.1f}/100</b></font>", styles['Normal']))
+    story.append(Spacer(1, 0.15*inch))
+
+    # Sub-Scores
+    story.append(Paragraph("Component Scores", styles['Heading3']))
+    subscore_data = [
+        ['Component', 'Score', 'Status'],
+        ['Body Alignment', f"{summary.avg_alignment_score:.1f}", get_zone_status(summary.avg_horizontal_deviation, DEFAULT_HORIZONTAL_DEV_GOOD, DEFAULT_HORIZONTAL_DEV_OK)],
+        ['EVF (Pull Phase)', f"{summary.avg_evf_score:.1f}", f"Dropped: {summary.dropped_elbow_pct:.0f}%" if summary.dropped_elbow_pct > 10 else get_zone_status(summary.avg_evf_angle, DEFAULT_EVF_ANGLE_GOOD, DEFAULT_EVF_ANGLE_OK)],
+        ['Body Roll', f"{summary.avg_body_roll:.1f}°", get_zone_status(summary.avg_body_roll, DEFAULT_ROLL_GOOD, DEFAULT_ROLL_OK)],
+        ['Kick', summary.kick_status, summary.kick_status],
+        ['Glide Ratio', f"{summary.glide_ratio:.0f}%", "Good" if summary.glide_ratio > 20 else "Low"],
+    ]
+    t = Table(subscore_data, colWidths=[2*inch, 1.3*inch, 1.7*inch])
+    t.setStyle(TableStyle([
+        ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
+        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#1e3a5f')),
+        ('TEXTCOLOR', (0,0), (-1,0), colors.white),
+        ('FONTSIZE', (0,0), (-1,-1), 10),
+        ('ALIGN', (1,0), (-1,-1), 'CENTER'),
+    ]))
+    story.append(t)
+    story.append(Spacer(1, 0.25*inch))
+
+    # Performance Metrics
+    story.append(Paragraph("Performance Metrics", styles['Heading2']))
+    metrics_data = [
+        ['Metric', 'Value', 'Notes'],
+        ['Stroke Rate', f"{summary.stroke_rate:.1f} spm", 'strokes per minute'],
+        ['Total Strokes', f"{summary.total_strokes}", ''],
+        ['Breaths/min', f"{summary.breaths_per_min:.1f}", f"Left: {summary.breath_left}  Right: {summary.breath_right}"],
+        ['Breaths During Pull', f"{summary.breaths_during_pull}", 'Ideally 0'],
+        ['Dropped Elbow', f"{summary.dropped_elbow_pct:.0f}%", 'of catch frames'],
+        ['Vertical Drop', f"{summary.avg_vertical_drop:.1f}°", 'hip sink angle'],
+        ['Max Body Roll', f"{summary.max_body_roll:.1f}°", 'peak rotation'],
+        ['Avg EVF Angle', f"{summary.avg_evf_angle:.1f}°", 'lower is better'],
+        ['Kick Depth', f"{summary.avg_kick_depth:.2f}", 'relative to hip-ankle'],
+        ['Kick Symmetry', f"{summary.avg_kick_symmetry:.1f}°", 'L-R difference'],
+        ['Glide Ratio', f"{summary.glide_ratio:.0f}%", 'time in glide phase'],
+    ]
+    t = Table(metrics_data, colWidths=[1.8*inch, 1.2*inch, 2*inch])
+    t.setStyle(TableStyle([
+        ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
+        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#1e3a5f')),
+        ('TEXTCOLOR', (0,0), (-1,0), colors.white),
+        ('FONTSIZE', (0,0), (-1,-1), 9),
+        ('ALIGN', (1,0), (1,-1), 'CENTER'),
+    ]))
+    story.append(t)
+    story.append(Spacer(1, 0.25*inch))
+
+    # Diagnostics
+    story.append(Paragraph("Coaching Insights", styles['Heading2']))
+    for diag in summary.diagnostics:
+        if diag.startswith("✅"):
+            style = styles['DiagnosticGood']
+        elif diag.startswith("⚠️"):
+            style = styles['DiagnosticError']
+        else:
+            style = styles['DiagnosticWarn']
+        story.append(Paragraph(diag, style))
+        story.append(Spacer(1, 0.1*inch))
+
+    # Per-length splits (pool)
+    pool = summary.pool_segmentation
+    if pool is not None:
+        story.append(Spacer(1, 0.2*inch))
+        story.append(Paragraph(f"Per-Length Splits ({pool.n_turns} turns, free-swimming technique)",
+                               styles['Heading2']))
+        split_data = [['Length', 'Split', 'Push-off', 'Strokes', 'Rate', 'Score', 'EVF']]
+        for split in pool.lengths:
+            split_data.append([f"{split.length_number}" + ("" if split.complete else "*"),
+                               f"{split.duration_s:.1f}s", f"{split.push_off_s:.1f}s", str(split.strokes),
+                               f"{split.stroke_rate:.0f}", f"{split.avg_score:.0f}", f"{split.avg_evf_angle:.0f}°"])
+        t = Table(split_data, colWidths=[0.8*inch, 0.9*inch, 0.9*inch, 0.8*inch, 0.8*inch, 0.8*inch, 0.8*inch])
+        t.setStyle(TableStyle([
+            ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
+            ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#1e3a5f')),
+            ('TEXTCOLOR', (0,0), (-1,0), colors.white),
+            ('FONTSIZE', (0,0), (-1,-1), 9),
+            ('ALIGN', (1,0), (-1,-1), 'CENTER'),
+        ]))
+        story.append(t)
+        story.append(Paragraph("* partial length (video starts or ends mid-pool)", styles['Normal']))
+
+    # Fatigue trends
+    fatigue = summary.fatigue
+    if fatigue is not None and fatigue.trends:
+        story.append(Spacer(1, 0.2*inch))
+        story.append(Paragraph(f"Fatigue Trends ({fatigue.window_description})", styles['Heading2']))
+        fatigue_data = [['Metric', 'Start', 'End', 'Change', 'Trend']]
+        for trend in fatigue.trends.values():
+            unit = FATIGUE_METRICS[trend.metric][1]
+            fatigue_data.append([trend.label, f"{trend.start_value:.1f}{unit}", f"{trend.end_value:.1f}{unit}",
+                                 f"{trend.change_pct:+.0f}%", "Worsening" if trend.worsening else "Stable"])
+        t = Table(fatigue_data, colWidths=[1.6*inch, 1.1*inch, 1.1*inch, 0.9*inch, 1.1*inch])
+        t.setStyle(TableStyle([
+            ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
+            ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#1e3a5f')),
+            ('TEXTCOLOR', (0,0), (-1,0), colors.white),
+            ('FONTSIZE', (0,0), (-1,-1), 9),
+            ('ALIGN', (1,0), (-1,-1), 'CENTER'),
+        ]))
+        story.append(t)
+
+    # Best & Worst Frames
+    if summary.best_frame_bytes or summary.worst_frame_bytes:
+        story.append(Spacer(1, 0.3*inch))
+        story.append(Paragraph("Best & Worst Frames (Pull Phase)", styles['Heading2']))
+        if summary.best_frame_bytes:
+            img = RLImage(io.BytesIO(summary.best_frame_bytes))
+            img.drawWidth = 3*inch
+            img.drawHeight = 2*inch
+            story.append(Paragraph("Best Pull Frame:", styles['Normal']))
+            story.append(img)
+        if summary.worst_frame_bytes:
+            img = RLImage(io.BytesIO(summary.worst_frame_bytes))
+            img.drawWidth = 3*inch
+            img.drawHeight = 2*inch
+            story.append(Paragraph("Worst Pull Frame:", styles['Normal']))
+            story.append(img)
+
+    # Charts
+    if plot_buffer.getvalue():
+        story.append(PageBreak())
+        story.append(Paragraph("Analysis Charts", styles['Heading2']))
+        plot_buffer.seek(0)
+        img = RLImage(plot_buffer)
+        # Scale to fit page (letter is 8.5x11, with margins we have ~7x9 usable)
+        img.drawWidth = 6.5*inch
+        img.drawHeight = 8.5*inch
+        story.append(img)
+
+    pdf.build(story)
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,85 @@
+"""Per-metric smoothing filters (moving average and One-Euro)."""
+import numpy as np
+import math
+from typing import Optional
+
+from .constants import (
+    ONE_EURO_BETA, ONE_EURO_D_CUTOFF, ONE_EURO_MIN_CUTOFF, SMOOTHING_METHODS, SMOOTHING_WINDOW,
+)
+
+# ─────────────────────────────────────────────
+# SMOOTHING FILTERS
+# ─────────────────────────────────────────────
+
+class MetricSmoother:
+    """
+    Smooths several metric channels at once with O(1) work per frame.
+    
+    Methods:
+        - "mean": moving average over the last `window` samples, kept as a
+          running sum over a (window, channels) ring buffer
+        - "one_euro": One-Euro filter (adaptive low-pass); less lag than the
+          moving average when metrics change quickly, at high fps especially
+    """
+
+    def __init__(self, channels: int, method: str = "mean", window: int = SMOOTHING_WINDOW,
+                 min_cutoff: float = ONE_EURO_MIN_CUTOFF, beta: float = ONE_EURO_BETA,
+                 d_cutoff: float = ONE_EURO_D_CUTOFF):
+        if method not in SMOOTHING_METHODS:
+            raise ValueError(f"Unknown smoothing method: {method}")
+        self.channels = channels
+        self.method = method
+        self.window = window
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self) -> None:
+        # Moving-average state
+        self._ring = np.zeros((self.window, self.channels), dtype=np.float64)
+        self._sums = np.zeros(self.channels, dtype=np.float64)
+        self._pos = 0
+        self._count = 0
+        # One-Euro state
+        self._x_hat: Optional[np.ndarray] = None
+        self._dx_hat = np.zeros(self.channels, dtype=np.float64)
+        self._last_t: Optional[float] = None
+
+    def update(self, values, t: Optional[float] = None) -> np.ndarray:
+        """Push one sample per channel and return the smoothed values"""
+        x = np.asarray(values, dtype=np.float64)
+        if self.method == "one_euro":
+            return self._update_one_euro(x, t)
+        return self._update_mean(x)
+
+    def _update_mean(self, x: np.ndarray) -> np.ndarray:
+        self._sums += x - self._ring[self._pos]
+        self._ring[self._pos] = x
+        self._pos += 1
+        if self._pos == self.window:
+            self._pos = 0
+            # Re-sum once per lap so floating-point drift never accumulates
+            self._sums = self._ring.sum(axis=0)
+        self._count = min(self._count + 1, self.window)
+        return self._sums / self._count
+
+    @staticmethod
+    def _alpha(cutoff, dt: float):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def _update_one_euro(self, x: np.ndarray, t: Optional[float]) -> np.ndarray:
+        if self._x_hat is None:
+            self._x_hat = x.copy()
+            self._last_t = t
+            return self._x_hat.copy()
+        dt = t - self._last_t if t is not None and self._last_t is not None else 0.0
+        if dt <= 0:
+            dt = 1.0 / 30  # Missing or repeated timestamp - assume one frame at 30 fps
+        self._last_t = t
+        dx = (x - self._x_hat) / dt
+        self._dx_hat += self._alpha(self.d_cutoff, dt) * (dx - self._dx_hat)
+        cutoff = self.min_cutoff + self.beta * np.abs(self._dx_hat)
+        self._x_hat += self._alpha(cutoff, dt) * (x - self._x_hat)
+        return self._x_hat.copy()
@@ -0,0 +1,219 @@
+"""Columnar per-frame metric store that spills to disk on long videos."""
+import numpy as np
+import tempfile
+import os
+import shutil
+from dataclasses import fields
+from typing import List, Optional, Dict, Tuple
+
+from .constants import FRAME_STORE_BATCH_ROWS, FRAME_STORE_MEMORY_ROWS
+from .models import FrameMetrics
+
+# ─────────────────────────────────────────────
+# FRAME METRIC STORE - Columnar, spills to disk
+# ─────────────────────────────────────────────
+
+_STORE_DTYPES = {float: np.float64, int: np.int64, bool: np.bool_, str: np.uint8}
+LANDMARK_SHAPE = (33, 2)
+
+
+class FrameMetricStore:
+    """
+    Per-frame metrics and (33, 2) normalized landmarks, stored by column.
+
+    Rows are buffered as FrameMetrics until a batch of batch_rows is full,
+    then converted to one array per column (strings as uint8 category
+    codes). Batches stay in memory until the store exceeds max_memory_rows;
+    after that every batch is appended to one raw file per column and read
+    back through np.memmap, so memory stays flat however long the video is.
+
+    Behaves like a read-only list of FrameMetrics (len, indexing, iteration);
+    bulk consumers should use column() / iter_batches() instead.
+    """
+
+    def __init__(self, batch_rows: int = FRAME_STORE_BATCH_ROWS,
+                 max_memory_rows: Optional[int] = FRAME_STORE_MEMORY_ROWS,
+                 spill_dir: Optional[str] = None):
+        self.batch_rows = batch_rows
+        self.max_memory_rows = max_memory_rows
+        self.spill_dir = spill_dir          # Set: spill from the first batch
+        self._owns_dir = False
+        self.spilled = False
+
+        self.schema: Dict[str, Tuple[type, tuple]] = {
+            f.name: (_STORE_DTYPES[f.type], ()) for f in fields(FrameMetrics)}
+        self.schema['landmarks'] = (np.float32, LANDMARK_SHAPE)
+        self.vocab: Dict[str, List[str]] = {
+            f.name: [] for f in fields(FrameMetrics) if f.type is str}
+        self._vocab_codes: Dict[str, Dict[str, int]] = {name: {} for name in self.vocab}
+
+        self._pending: List[FrameMetrics] = []
+        self._pending_landmarks: List[np.ndarray] = []
+        self._batches: List[Dict[str, np.ndarray]] = []
+        self._flushed = 0
+
+    def __len__(self) -> int:
+        return self._flushed + len(self._pending)
+
+    def append(self, m: FrameMetrics, landmarks: np.ndarray) -> None:
+        self._pending.append(m)
+        self._pending_landmarks.append(np.asarray(landmarks, dtype=np.float32))
+        if len(self._pending) >= self.batch_rows:
+            self._flush()
+
+    def _encode(self, name: str, values) -> np.ndarray:
+        codes = self._vocab_codes[name]
+        out = np.empty(len(values), dtype=np.uint8)
+        for i, v in enumerate(values):
+            code = codes.get(v)
+            if code is None:
+                code = codes[v] = len(self.vocab[name])
+                self.vocab[name].append(v)
+            out[i] = code
+        return out
+
+    def _flush(self) -> None:
+        rows = self._pending
+        batch = {}
+        for name, (dtype, _) in self.schema.items():
+            if name == 'landmarks':
+                batch[name] = np.stack(self._pending_landmarks)
+            elif name in self.vocab:
+                batch[name] = self._encode(name, [getattr(m, name) for m in rows])
+            else:
+                batch[name] = np.fromiter((getattr(m, name) for m in rows), dtype=dtype, count=len(rows))
+
+        if not self.spilled and (self.spill_dir is not None or (
+                self.max_memory_rows is not None and self._flushed + len(rows) > self.max_memory_rows)):
+            self._start_spill()
+        if self.spilled:
+            self._write(batch)
+        else:
+            self._batches.append(batch)
+        self._flushed += len(rows)
+        self._pending, self._pending_landmarks = [], []
+
+    def _start_spill(self) -> None:
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix="swim_metrics_")
+            self._owns_dir = True
+        self.spilled = True
+        for batch in self._batches:
+            self._write(batch)
+        self._batches = []
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.spill_dir, f"{name}.bin")
+
+    def _write(self, batch: Dict[str, np.ndarray]) -> None:
+        for name, arr in batch.items():
+            with open(self._path(name), 'ab') as f:
+                f.write(np.ascontiguousarray(arr).tobytes())
+
+    def _flushed_column(self, name: str) -> np.ndarray:
+        """Raw (encoded) values of the flushed rows - a memmap once spilled"""
+        dtype, shape = self.schema[name]
+        if self._flushed == 0:
+            return np.empty((0,) + shape, dtype=dtype)
+        if self.spilled:
+            return np.memmap(self._path(name), dtype=dtype, mode='r', shape=(self._flushed,) + shape)
+        return np.concatenate([b[name] for b in self._batches])
+
+    def _decode(self, name: str, raw: np.ndarray) -> np.ndarray:
+        if name in self.vocab:
+            return np.asarray(self.vocab[name], dtype=object)[raw]
+        return raw
+
+    def column(self, name: str, step: int = 1) -> np.ndarray:
+        """Whole column as an array (every step-th row); strings come back as an object array"""
+        dtype, _ = self.schema[name]
+        flushed = np.array(self._flushed_column(name)[::step])
+        first_pending = (-self._flushed) % step
+        if name == 'landmarks':
+            tail = self._pending_landmarks[first_pending::step]
+            pending = np.stack(tail) if tail else np.empty((0,) + LANDMARK_SHAPE, dtype=np.float32)
+        elif name in self.vocab:
+            pending = self._encode(name, [getattr(m, name) for m in self._pending[first_pending::step]])
+        else:
+            pending = np.array([getattr(m, name) for m in self._pending[first_pending::step]], dtype=dtype)
+        return self._decode(name, np.concatenate([flushed, pending]))
+
+    def iter_batches(self, names: Optional[List[str]] = None):
+        """Yield {column: array} one batch at a time (bounded memory); strings decoded"""
+        names = names or [n for n in self.schema if n != 'landmarks']
+        if self.spilled:
+            cols = {name: self._flushed_column(name) for name in names}
+            for start in range(0, self._flushed, self.batch_rows):
+                yield {name: self._decode(name, np.array(col[start:start + self.batch_rows]))
+                       for name, col in cols.items()}
+        else:
+            for batch in self._batches:
+                yield {name: self._decode(name, batch[name]) for name in names}
+        if self._pending:
+            yield {name: self._pending_column(name) for name in names}
+
+    def _pending_column(self, name: str) -> np.ndarray:
+        if name == 'landmarks':
+            return np.stack(self._pending_landmarks)
+        if name in self.vocab:
+            return np.asarray([getattr(m, name) for m in self._pending], dtype=object)
+        return np.array([getattr(m, name) for m in self._pending], dtype=self.schema[name][0])
+
+    def _value(self, name: str, i: int):
+        """Single flushed value (Python scalar, decoded)"""
+        if self.spilled:
+            raw = self._flushed_column(name)[i]
+        else:
+            raw = self._batches[i // self.batch_rows][name][i % self.batch_rows]
+        if name in self.vocab:
+            return self.vocab[name][raw]
+        return np.array(raw) if name == 'landmarks' else raw.tolist()
+
+    def _normalize_index(self, i: int) -> int:
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("frame metric index out of range")
+        return i
+
+    def __getitem__(self, i: int) -> FrameMetrics:
+        i = self._normalize_index(i)
+        if i >= self._flushed:
+            return self._pending[i - self._flushed]
+        return FrameMetrics(**{name: self._value(name, i) for name in self.schema if name != 'landmarks'})
+
+    def landmarks(self, i: int) -> np.ndarray:
+        i = self._normalize_index(i)
+        if i >= self._flushed:
+            return self._pending_landmarks[i - self._flushed]
+        return self._value('landmarks', i)
+
+    def iter_rows(self):
+        """Yield (FrameMetrics, landmarks) in order, one batch in memory at a time"""
+        names = [n for n in self.schema if n != 'landmarks']
+        for batch in self.iter_batches(names + ['landmarks']):
+            columns = [batch[name].tolist() for name in names]
+            for j, values in enumerate(zip(*columns)):
+                yield FrameMetrics(**dict(zip(names, values))), batch['landmarks'][j]
+
+    def __iter__(self):
+        for m, _ in self.iter_rows():
+            yield m
+
+    def __setstate__(self, state):
+        # A checkpointed store can be older than its spill files: rows flushed after the
+        # snapshot are cut off so appends continue exactly where the snapshot left off
+        self.__dict__.update(state)
+        if self.spilled:
+            for name, (dtype, shape) in self.schema.items():
+                size = self._flushed * int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize
+                path = self._path(name)
+                if os.path.exists(path) and os.path.getsize(path) > size:
+                    os.truncate(path, size)
+
+    def close(self) -> None:
+        """Delete spilled files (if the store created the directory)"""
+        if self._owns_dir and self.spill_dir and os.path.isdir(self.spill_dir):
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+        self._owns_dir = False
@@ -0,0 +1,198 @@
+"""Per-stroke index of stroke-cycle aggregates."""
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import List, Optional, Dict, Tuple
+
+from .models import SwimPhase
+from .geometry import stroke_cycle_bounds
+from .store import FrameMetricStore
+
+# ─────────────────────────────────────────────
+# STROKE CYCLE INDEX - Per-stroke metric tables
+# ─────────────────────────────────────────────
+
+PHASE_NAMES = [p.value for p in SwimPhase]
+
+@dataclass
+class StrokeCycle:
+    """One stroke cycle (detected stroke up to the next one) with precomputed aggregates"""
+    stroke_number: int
+    start_idx: int                     # First frame (index into analyzer.metrics)
+    end_idx: int                       # One past the last frame
+    start_time_s: float
+    end_time_s: float
+    phase_ranges: Dict[str, List[Tuple[int, int]]] = field(default_factory=dict)  # Phase -> [start, end) runs
+    avg_score: float = 0.0
+    min_score: float = 0.0
+    avg_evf_angle: float = 0.0         # Pull/Push frames only
+    avg_evf_score: float = 100.0
+    dropped_elbow_frames: int = 0      # Catch frames (Pull, elbow > 100°) with dropped elbow
+    avg_alignment_score: float = 100.0
+    avg_horizontal_deviation: float = 0.0
+    avg_vertical_drop: float = 0.0
+    glide_time_s: float = 0.0
+    glide_ratio: float = 0.0           # Percentage of cycle frames gliding
+    breath_side: str = "-"             # 'L'/'R' if a breath was counted in this cycle
+    breathing_during_pull: bool = False
+
+    @property
+    def duration_s(self) -> float:
+        return self.end_time_s - self.start_time_s
+
+    @property
+    def has_dropped_elbow(self) -> bool:
+        return self.dropped_elbow_frames > 0
+
+
+class StrokeIndex:
+    """
+    Index of detected stroke cycles, built once after analysis.
+    
+    Holds one StrokeCycle per stroke plus column arrays of the per-stroke
+    aggregates, so drilldowns, fatigue trends and worst-stroke lookups
+    never rescan the per-frame metrics.
+    """
+
+    COLUMNS = [
+        'stroke_number', 'start_time_s', 'duration_s', 'avg_score', 'min_score',
+        'avg_evf_angle', 'avg_evf_score', 'dropped_elbow_frames', 'avg_alignment_score',
+        'avg_horizontal_deviation', 'avg_vertical_drop', 'glide_time_s', 'glide_ratio',
+        'breath_side', 'breathing_during_pull',
+    ]
+
+    def __init__(self, cycles: List[StrokeCycle], frame_to_cycle: np.ndarray):
+        self.cycles = cycles
+        self.frame_to_cycle = frame_to_cycle  # Per-frame cycle position, -1 before the first stroke
+        self._columns = {
+            name: np.array([getattr(c, name) for c in cycles]) for name in self.COLUMNS
+        }
+        self._order: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.cycles)
+
+    def __getitem__(self, i: int) -> StrokeCycle:
+        return self.cycles[i]
+
+    @classmethod
+    def build(cls, metrics: FrameMetricStore, stroke_indices,
+              breath_events: List[Tuple[float, str]] = ()) -> "StrokeIndex":
+        """Build the index from per-frame metrics and detect_strokes() frame indices"""
+        n = len(metrics)
+        bounds = stroke_cycle_bounds(stroke_indices, n)
+        if len(bounds) == 0:
+            return cls([], np.full(n, -1, dtype=np.intp))
+
+        def col(attr, dtype=np.float64):
+            return metrics.column(attr).astype(dtype, copy=False)
+
+        times = col('time_s')
+        scores = col('score')
+        evf = col('evf_plane_angle')
+        evf_scores = col('evf_score')
+        align = col('alignment_score')
+        h_dev = col('horizontal_deviation')
+        v_drop = col('vertical_drop')
+        elbow = col('elbow_angle')
+        gliding = col('is_gliding', bool)
+        dropped = col('is_dropped_elbow', bool)
+        breath_pull = col('breathing_during_pull', bool)
+        phase_names, phase_inverse = np.unique(metrics.column('phase').astype(str), return_inverse=True)
+        phase_codes = np.array([PHASE_NAMES.index(p) for p in phase_names], dtype=np.intp)[phase_inverse]
+        pull_push = (phase_codes == PHASE_NAMES.index("Pull")) | (phase_codes == PHASE_NAMES.index("Push"))
+        catch = (phase_codes == PHASE_NAMES.index("Pull")) & (elbow > 100)
+
+        # Per-cycle sums over contiguous [start, end) ranges
+        starts, ends = bounds[:, 0], bounds[:, 1]
+        counts = ends - starts
+        def per_cycle_sum(x):
+            return np.add.reduceat(x.astype(np.float64), starts)
+
+        pp_counts = per_cycle_sum(pull_push)
+        avg_score = per_cycle_sum(scores) / counts
+        min_score = np.minimum.reduceat(scores, starts)
+        avg_evf = np.where(pp_counts > 0, per_cycle_sum(evf * pull_push) / np.maximum(pp_counts, 1), 0.0)
+        avg_evf_score = np.where(pp_counts > 0, per_cycle_sum(evf_scores * pull_push) / np.maximum(pp_counts, 1), 100.0)
+        dropped_frames = per_cycle_sum(dropped & catch).astype(int)
+        avg_align = per_cycle_sum(align) / counts
+        avg_h_dev = per_cycle_sum(h_dev) / counts
+        avg_v_drop = per_cycle_sum(v_drop) / counts
+        glide_counts = per_cycle_sum(gliding)
+        breath_pull_any = per_cycle_sum(breath_pull) > 0
+        start_times = times[starts]
+        end_times = times[np.minimum(ends, n - 1)]
+        glide_ratio = glide_counts / counts * 100
+        glide_time = glide_counts / counts * (end_times - start_times)
+
+        # First counted breath inside each cycle's time span
+        breath_sides = ["-"] * len(bounds)
+        if breath_events:
+            event_times = np.array([e[0] for e in breath_events])
+            first = np.searchsorted(event_times, start_times, side='left')
+            limits = end_times.copy()
+            limits[-1] = np.inf  # Last cycle keeps breaths up to the final frame
+            for i, j in enumerate(first.tolist()):
+                if j < len(event_times) and event_times[j] < limits[i]:
+                    breath_sides[i] = breath_events[j][1]
+
+        # Contiguous phase runs, split at cycle boundaries
+        change = np.flatnonzero(np.diff(phase_codes)) + 1
+        run_starts = np.union1d(change, starts)
+        run_starts = run_starts[run_starts >= starts[0]]
+        run_ends = np.append(run_starts[1:], n)
+        run_cycle = np.searchsorted(starts, run_starts, side='right') - 1
+
+        cycles = []
+        for i in range(len(bounds)):
+            cycles.append(StrokeCycle(
+                stroke_number=i + 1,
+                start_idx=int(starts[i]),
+                end_idx=int(ends[i]),
+                start_time_s=float(start_times[i]),
+                end_time_s=float(end_times[i]),
+                phase_ranges={name: [] for name in PHASE_NAMES},
+                avg_score=float(avg_score[i]),
+                min_score=float(min_score[i]),
+                avg_evf_angle=float(avg_evf[i]),
+                avg_evf_score=float(avg_evf_score[i]),
+                dropped_elbow_frames=int(dropped_frames[i]),
+                avg_alignment_score=float(avg_align[i]),
+                avg_horizontal_deviation=float(avg_h_dev[i]),
+                avg_vertical_drop=float(avg_v_drop[i]),
+                glide_time_s=float(glide_time[i]),
+                glide_ratio=float(glide_ratio[i]),
+                breath_side=breath_sides[i],
+                breathing_during_pull=bool(breath_pull_any[i]),
+            ))
+        for rs, re_, ci in zip(run_starts.tolist(), run_ends.tolist(), run_cycle.tolist()):
+            cycles[ci].phase_ranges[PHASE_NAMES[phase_codes[rs]]].append((rs, re_))
+
+        frame_to_cycle = np.full(n, -1, dtype=np.intp)
+        frame_to_cycle[starts[0]:] = np.repeat(np.arange(len(bounds)), counts)
+        return cls(cycles, frame_to_cycle)
+
+    def column(self, name: str) -> np.ndarray:
+        """Per-stroke values of one aggregate, in stroke order"""
+        return self._columns[name]
+
+    def cycle_for_frame(self, frame_idx: int) -> Optional[StrokeCycle]:
+        """Stroke cycle containing a frame, or None before the first stroke"""
+        ci = self.frame_to_cycle[frame_idx]
+        return self.cycles[ci] if ci >= 0 else None
+
+    def worst(self, name: str = 'avg_score', k: int = 5, largest: bool = False) -> List[StrokeCycle]:
+        """k worst strokes by an aggregate (lowest by default, highest if largest=True)"""
+        if name not in self._order:
+            self._order[name] = np.argsort(self._columns[name], kind='stable')
+        order = self._order[name]
+        picked = order[::-1][:k] if largest else order[:k]
+        return [self.cycles[i] for i in picked]
+
+    def dropped_elbow_strokes(self) -> List[StrokeCycle]:
+        """Strokes whose catch had at least one dropped-elbow frame"""
+        return [self.cycles[i] for i in np.flatnonzero(self._columns['dropped_elbow_frames'] > 0)]
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Per-stroke table for display and export"""
+        return pd.DataFrame({name: self._columns[name] for name in self.COLUMNS})
@@ -0,0 +1,372 @@
+"""Compact, quantized landmark track files (all 33 MediaPipe pose landmarks per frame)."""
+import mmap
+import struct
+import zlib
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .constants import (
+    LANDMARK_TRACK_CHUNK_FRAMES, LANDMARK_TRACK_COORD_SCALE, LANDMARK_TRACK_VERSION, LANDMARK_TRACK_ZLIB_LEVEL,
+)
+
+# ─────────────────────────────────────────────
+# LANDMARK TRACK FILES - Quantized, chunked, memory-mapped
+# ─────────────────────────────────────────────
+#
+# Layout (little-endian):
+#   header   64 bytes: magic, version, landmark count, chunk size, coordinate scale,
+#            fps, frame size, frame count, chunk index offset and count
+#   chunks   up to chunk_frames frames each, stored column by column:
+#              frame index deltas  int32  (n,)
+#              timestamp deltas    int32  (n,)        milliseconds
+#              x, y, z             int16  (n, 33, 3)  normalized * coord_scale, deltas along time,
+#                                                     low bytes then high bytes (compresses better)
+#              visibility          uint8  (n, 33)     visibility * 255
+#            then zlib-compressed (or stored raw)
+#   index    one _INDEX_DTYPE record per chunk, written on close
+#
+# Deltas are taken within a chunk only, so any chunk decodes on its own:
+# reading a frame range decompresses just the chunks that overlap it.
+
+TRACK_MAGIC = b"SWIMLMK\x00"
+TRACK_LANDMARKS = 33
+TRACK_DIMS = 3
+
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+_CODECS = {'raw': CODEC_RAW, 'zlib': CODEC_ZLIB}
+
+_HEADER = struct.Struct("<8sHHHHIfdIIQQI")
+_HEADER_SIZE = 64
+_INDEX_DTYPE = np.dtype([
+    ('offset', '<u8'), ('nbytes', '<u4'), ('n_frames', '<u4'),
+    ('first_frame', '<i8'), ('first_time_ms', '<i8'), ('codec', 'u1'),
+])
+
+
+@dataclass
+class LandmarkFrames:
+    """A run of decoded track frames (only frames in which a pose was detected)"""
+    frame_idx: np.ndarray              # (n,) int64 index in the source video
+    time_ms: np.ndarray                # (n,) int64 video time
+    landmarks: np.ndarray              # (n, 33, 3) float32 normalized x, y, z
+    visibility: np.ndarray             # (n, 33) float32 0-1
+
+    def __len__(self) -> int:
+        return len(self.frame_idx)
+
+    @staticmethod
+    def concatenate(parts: List['LandmarkFrames']) -> 'LandmarkFrames':
+        if not parts:
+            return LandmarkFrames(np.empty(0, np.int64), np.empty(0, np.int64),
+                                  np.empty((0, TRACK_LANDMARKS, TRACK_DIMS), np.float32),
+                                  np.empty((0, TRACK_LANDMARKS), np.float32))
+        return LandmarkFrames(*(np.concatenate([getattr(p, name) for p in parts])
+                                for name in ('frame_idx', 'time_ms', 'landmarks', 'visibility')))
+
+
+def _chunk_nbytes(n: int) -> int:
+    return n * (4 + 4 + TRACK_LANDMARKS * TRACK_DIMS * 2 + TRACK_LANDMARKS)
+
+
+class LandmarkTrackWriter:
+    """
+    Streams pose landmarks into a track file, one chunk at a time.
+
+    Coordinates are stored as int16 fixed point (1 / coord_scale of the
+    frame, range ±32768 / coord_scale) and visibility as uint8, so a frame
+    costs 235 bytes before compression instead of 528 as float32. The
+    file is only valid once close() has written the chunk index.
+    """
+
+    def __init__(self, path: str, fps: float = 0.0, width: int = 0, height: int = 0,
+                 chunk_frames: int = LANDMARK_TRACK_CHUNK_FRAMES, codec: str = 'zlib',
+                 coord_scale: int = LANDMARK_TRACK_COORD_SCALE):
+        if codec not in _CODECS:
+            raise ValueError(f"Unknown codec {codec!r} (expected one of {sorted(_CODECS)})")
+        self.path = path
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.chunk_frames = chunk_frames
+        self.codec = _CODECS[codec]
+        self.coord_scale = coord_scale
+        self.n_frames = 0
+        self._index: List[tuple] = []
+        self._frame_idx: List[int] = []
+        self._time_ms: List[int] = []
+        self._landmarks: List[np.ndarray] = []
+        self._visibility: List[np.ndarray] = []
+        self._file = open(path, 'wb')
+        self._write_header(index_offset=0)   # 0 = incomplete until close() writes the index
+        self._file.seek(_HEADER_SIZE)
+
+    def append(self, frame_idx: int, time_s: float, landmarks: np.ndarray, visibility: np.ndarray) -> None:
+        """One frame: (33, 3) normalized x, y, z (a (33, 2) array is stored with z = 0) and (33,) visibility"""
+        landmarks = np.asarray(landmarks, dtype=np.float64)
+        if landmarks.shape[1] < TRACK_DIMS:
+            landmarks = np.pad(landmarks, ((0, 0), (0, TRACK_DIMS - landmarks.shape[1])))
+        self._frame_idx.append(int(frame_idx))
+        self._time_ms.append(int(round(time_s * 1000)))
+        self._landmarks.append(landmarks)
+        self._visibility.append(np.asarray(visibility, dtype=np.float64))
+        if len(self._frame_idx) >= self.chunk_frames:
+            self._flush()
+
+    def append_pose(self, frame_idx: int, time_s: float, pose_landmarks) -> None:
+        """One frame from a MediaPipe result.pose_landmarks[i] list"""
+        values = np.array([(lm.x, lm.y, lm.z, lm.visibility) for lm in pose_landmarks], dtype=np.float64)
+        self.append(frame_idx, time_s, values[:, :3], values[:, 3])
+
+    def _flush(self) -> None:
+        if not self._frame_idx:
+            return
+        frame_idx = np.array(self._frame_idx, dtype=np.int64)
+        time_ms = np.array(self._time_ms, dtype=np.int64)
+        coords = np.clip(np.rint(np.stack(self._landmarks) * self.coord_scale), -32768, 32767).astype(np.int16)
+        vis = np.clip(np.rint(np.stack(self._visibility) * 255), 0, 255).astype(np.uint8)
+
+        # int16 deltas wrap around and undo exactly with cumsum in int16
+        coord_deltas = np.diff(coords, axis=0, prepend=np.zeros_like(coords[:1])).astype('<i2')
+        raw = b"".join([
+            np.diff(frame_idx, prepend=frame_idx[0]).astype('<i4').tobytes(),
+            np.diff(time_ms, prepend=time_ms[0]).astype('<i4').tobytes(),
+            coord_deltas.view(np.uint8).reshape(-1, 2).T.tobytes(),
+            vis.tobytes(),
+        ])
+        data = zlib.compress(raw, LANDMARK_TRACK_ZLIB_LEVEL) if self.codec == CODEC_ZLIB else raw
+        self._index.append((self._file.tell(), len(data), len(frame_idx), frame_idx[0], time_ms[0], self.codec))
+        self._file.write(data)
+        self.n_frames += len(frame_idx)
+        self._frame_idx, self._time_ms, self._landmarks, self._visibility = [], [], [], []
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self._flush()
+        index_offset = self._file.tell()
+        self._file.write(np.array(self._index, dtype=_INDEX_DTYPE).tobytes())
+        self._write_header(index_offset)
+        self._file.close()
+
+    def _write_header(self, index_offset: int) -> None:
+        self._file.seek(0)
+        self._file.write(_HEADER.pack(TRACK_MAGIC, LANDMARK_TRACK_VERSION, _HEADER_SIZE, TRACK_LANDMARKS,
+                                      TRACK_DIMS, self.chunk_frames, float(self.coord_scale), float(self.fps),
+                                      int(self.width), int(self.height), self.n_frames, index_offset,
+                                      len(self._index)).ljust(_HEADER_SIZE, b"\x00"))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LandmarkTrack:
+    """
+    Read access to a track file through a memory map.
+
+    Only the header and the chunk index are parsed on open; read() and
+    read_frames() decode just the chunks overlapping the requested range
+    (the most recent one is cached for sequential access). Rows are the
+    stored frames in order; frame_idx maps them back to the video.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path} is not a landmark track (empty file)")
+        try:
+            self._read_header()
+        except ValueError:
+            self.close()
+            raise
+        self._cache = (-1, None)
+
+    def _read_header(self) -> None:
+        if len(self._map) < _HEADER.size:
+            raise ValueError(f"{self.path} is not a landmark track (too short)")
+        (magic, version, header_size, n_landmarks, dims, self.chunk_frames, self.coord_scale, self.fps,
+         self.width, self.height, self.n_frames, index_offset, n_chunks) = _HEADER.unpack_from(self._map)
+        if magic != TRACK_MAGIC:
+            raise ValueError(f"{self.path} is not a landmark track")
+        if version != LANDMARK_TRACK_VERSION:
+            raise ValueError(f"{self.path}: track format version {version} is not supported "
+                             f"(expected {LANDMARK_TRACK_VERSION})")
+        if index_offset == 0:
+            raise ValueError(f"{self.path}: incomplete track (the writer was not closed)")
+        if (n_landmarks, dims) != (TRACK_LANDMARKS, TRACK_DIMS):
+            raise ValueError(f"{self.path}: unexpected landmark layout {n_landmarks}x{dims}")
+        self.version = version
+        # Copied out of the map (a few bytes per chunk): no view may outlive close()
+        self.index = np.frombuffer(self._map, dtype=_INDEX_DTYPE, count=n_chunks, offset=index_offset).copy()
+        # Row number of each chunk's first frame
+        self._chunk_rows = np.concatenate([[0], np.cumsum(self.index['n_frames'], dtype=np.int64)])
+
+    def __len__(self) -> int:
+        return self.n_frames
+
+    def _chunk_bytes(self, i: int):
+        entry = self.index[i]
+        data = memoryview(self._map)[entry['offset']:entry['offset'] + entry['nbytes']]
+        if entry['codec'] == CODEC_ZLIB:
+            return zlib.decompress(data)
+        if entry['codec'] == CODEC_RAW:
+            return data
+        raise ValueError(f"{self.path}: chunk {i} uses unknown codec {entry['codec']}")
+
+    def _chunk(self, i: int) -> LandmarkFrames:
+        if self._cache[0] == i:
+            return self._cache[1]
+        entry = self.index[i]
+        n = int(entry['n_frames'])
+        raw = self._chunk_bytes(i)
+        if len(raw) != _chunk_nbytes(n):
+            raise ValueError(f"{self.path}: chunk {i} is corrupt")
+        pos = 0
+
+        def take(dtype, count):
+            nonlocal pos
+            arr = np.frombuffer(raw, dtype=dtype, count=count, offset=pos)
+            pos += arr.nbytes
+            return arr
+
+        frame_idx = entry['first_frame'] + np.cumsum(take('<i4', n), dtype=np.int64)
+        time_ms = entry['first_time_ms'] + np.cumsum(take('<i4', n), dtype=np.int64)
+        n_coords = n * TRACK_LANDMARKS * TRACK_DIMS
+        deltas = take('u1', 2 * n_coords).reshape(2, n_coords).T.copy().view('<i2')
+        coords = np.cumsum(deltas.reshape(n, TRACK_LANDMARKS, TRACK_DIMS), axis=0, dtype=np.int16)
+        vis = take('u1', n * TRACK_LANDMARKS).reshape(n, TRACK_LANDMARKS)
+        frames = LandmarkFrames(frame_idx, time_ms, coords.astype(np.float32) / np.float32(self.coord_scale),
+                                vis.astype(np.float32) / np.float32(255))
+        self._cache = (i, frames)
+        return frames
+
+    def read(self, start: int = 0, stop: Optional[int] = None) -> LandmarkFrames:
+        """Stored frames [start, stop) by row"""
+        start, stop, _ = slice(start, stop).indices(self.n_frames)
+        if start >= stop:
+            return LandmarkFrames.concatenate([])
+        first = int(np.searchsorted(self._chunk_rows, start, side='right')) - 1
+        last = int(np.searchsorted(self._chunk_rows, stop, side='left')) - 1
+        parts = []
+        for i in range(first, last + 1):
+            chunk = self._chunk(i)
+            lo = max(start - self._chunk_rows[i], 0)
+            hi = min(stop - self._chunk_rows[i], len(chunk))
+            parts.append(LandmarkFrames(chunk.frame_idx[lo:hi], chunk.time_ms[lo:hi],
+                                        chunk.landmarks[lo:hi], chunk.visibility[lo:hi]))
+        return parts[0] if len(parts) == 1 else LandmarkFrames.concatenate(parts)
+
+    def read_frames(self, start_frame: int, stop_frame: Optional[int] = None) -> LandmarkFrames:
+        """Stored frames whose video frame index is in [start_frame, stop_frame)"""
+        return LandmarkFrames.concatenate(list(self.iter_chunks(start_frame, stop_frame)))
+
+    def iter_chunks(self, start_frame: int = 0, stop_frame: Optional[int] = None):
+        """Yield LandmarkFrames one chunk at a time (bounded memory) within video frames [start_frame, stop_frame)"""
+        first_frames = self.index['first_frame']
+        first = max(int(np.searchsorted(first_frames, start_frame, side='right')) - 1, 0)
+        last = len(first_frames) if stop_frame is None else int(np.searchsorted(first_frames, stop_frame))
+        for i in range(first, last):
+            chunk = self._chunk(i)
+            keep = chunk.frame_idx >= start_frame
+            if stop_frame is not None:
+                keep &= chunk.frame_idx < stop_frame
+            if keep.all():
+                yield chunk
+            elif keep.any():
+                yield LandmarkFrames(chunk.frame_idx[keep], chunk.time_ms[keep],
+                                     chunk.landmarks[keep], chunk.visibility[keep])
+
+    def close(self) -> None:
+        self._cache = (-1, None)
+        self.index = None
+        if getattr(self, '_map', None) is not None and not self._map.closed:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ─────────────────────────────────────────────
+# SYNTHETIC TRACKS - Load tests without video
+# ─────────────────────────────────────────────
+
+def synthetic_landmarks(n_frames: int, fps: float = 30.0, stroke_period_s: float = 1.5,
+                        chunk_frames: int = LANDMARK_TRACK_CHUNK_FRAMES, seed: int = 0,
+                        frame_size: Tuple[int, int] = (1920, 1080)):
+    """
+    Yield LandmarkFrames chunks of a side-view freestyle swimmer (head to the
+    left, normalized to a frame of frame_size): arms circling out of phase, a
+    flutter kick, bilateral breathing every third stroke and some tracking
+    jitter. Deterministic for a seed; meant for replay_landmarks() load tests.
+
+    The poses are built so that the analyzer's detectors see the intended
+    cadence when replayed with the same frame_size: one stroke every
+    stroke_period_s, alternating arms (a sharp elbow bend to 90° under the
+    shoulder), and a head turn held for 0.4 s after every third
+    stroke, alternating sides. Between breaths the nose stays between the
+    shoulders, so the breathing yaw stays near zero.
+    """
+    rng = np.random.default_rng(seed)
+    aspect = frame_size[0] / frame_size[1]
+    base = np.full((TRACK_LANDMARKS, TRACK_DIMS), 0.5)
+    base[:, 2] = 0.0
+    base[0, :2] = (0.36, 0.45)                                       # Nose, between the shoulders
+    base[1:11, 0] = 0.36 + 0.002 * np.arange(1, 11)                  # Eyes, ears, mouth
+    base[1:11, 1] = 0.44
+    base[[11, 12], :2] = [(0.32, 0.40), (0.40, 0.50)]                # Shoulders
+    base[[23, 24], :2] = [(0.60, 0.42), (0.62, 0.52)]                # Hips
+    base[[25, 26], :2] = [(0.72, 0.48), (0.73, 0.50)]                # Knees
+    base[[27, 28], :2] = [(0.84, 0.48), (0.85, 0.50)]                # Ankles
+    base[29:33, :2] = base[[27, 28, 27, 28], :2] + (0.02, 0.0)       # Heels, feet
+    upper_arm, forearm = 0.14, 0.15                                  # Fractions of the frame height
+
+    for start in range(0, n_frames, chunk_frames):
+        frame_idx = np.arange(start, min(start + chunk_frames, n_frames), dtype=np.int64)
+        t = frame_idx / fps
+        lm = np.repeat(base[None], len(frame_idx), axis=0)
+        # Stroke k is at (k + 0.5) * stroke_period_s, by arm k % 2, with the upper arm straight down
+        strokes = t / stroke_period_s - 0.5
+        for arm, (shoulder, elbow) in enumerate(((11, 13), (12, 14))):
+            angle = np.pi * (strokes - arm) + np.pi / 2
+            direction = np.stack([-np.cos(angle), np.sin(angle)], axis=1)
+            # Elbow angle: 170° while reaching and recovering, down to 90° over 3 frames either side
+            # of the stroke frame, so the dip stands out of STROKE_WINDOW by more than the jitter
+            nearest = 2 * np.round((strokes - arm) / 2) + arm
+            gap = np.min([np.abs(frame_idx - np.rint((nearest + k + 0.5) * stroke_period_s * fps))
+                          for k in (-2, 0, 2)], axis=0)
+            bend = np.radians(90 + 80 * np.minimum(gap, 3) / 3)
+            forearm_dir = direction * np.cos(np.pi - bend)[:, None] + \
+                np.stack([-direction[:, 1], direction[:, 0]], axis=1) * np.sin(np.pi - bend)[:, None]
+            # Built in frame-height units so the angles hold in pixels, then normalized
+            shoulder_xy = lm[:, shoulder, :2] * (aspect, 1.0)
+            elbow_xy = shoulder_xy + upper_arm * direction
+            wrist_xy = elbow_xy + forearm * forearm_dir
+            lm[:, elbow, :2] = elbow_xy / (aspect, 1.0)
+            lm[:, elbow + 2, :2] = wrist_xy / (aspect, 1.0)
+            lm[:, elbow + 4, :2] = lm[:, elbow + 2, :2] - (0.01, 0.0)        # Hands follow the wrists
+            lm[:, elbow + 6, :2] = lm[:, elbow + 2, :2] - (0.015, 0.0)
+            lm[:, elbow + 8, :2] = lm[:, elbow + 2, :2] - (0.01, -0.005)
+        kick = 0.02 * np.sin(2 * np.pi * t * 3 / stroke_period_s)
+        lm[:, [27, 29, 31], 1] += kick[:, None]
+        lm[:, [28, 30, 32], 1] -= kick[:, None]
+        # Breath m starts half a period after stroke 3m, to the right for even m and the left for odd m
+        breath, into_breath = np.divmod(t / stroke_period_s - 1.0, 3.0)
+        breathing = (into_breath * stroke_period_s < 0.4) & (breath >= 0)
+        lm[breathing, 0:11, 0] += np.where(breath[breathing] % 2 == 0, 0.06, -0.06)[:, None]
+        lm[:, :, :2] += rng.normal(0.0, 0.002, (len(frame_idx), TRACK_LANDMARKS, 2))
+        visibility = np.clip(rng.normal(0.95, 0.03, (len(frame_idx), TRACK_LANDMARKS)), 0.0, 1.0)
+        yield LandmarkFrames(frame_idx, np.rint(t * 1000).astype(np.int64),
+                             lm.astype(np.float32), visibility.astype(np.float32))
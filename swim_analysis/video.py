@@ -0,0 +1,243 @@
+"""Annotated video rendering, key-frame extraction and browser overlay tracks."""
+import cv2
+import numpy as np
+import tempfile
+import os
+import shutil
+import subprocess
+from typing import List, Optional, Dict, Tuple
+
+from .constants import (
+    DEFAULT_EVF_ANGLE_GOOD, DEFAULT_EVF_ANGLE_OK, DEFAULT_HORIZONTAL_DEV_GOOD,
+    DEFAULT_HORIZONTAL_DEV_OK, DEFAULT_KICK_DEPTH_GOOD, DEFAULT_KICK_DEPTH_OK,
+    DEFAULT_KICK_SYM_MAX_GOOD, DEFAULT_ROLL_GOOD, DEFAULT_ROLL_OK, DEFAULT_TORSO_GOOD,
+    DEFAULT_TORSO_OK,
+)
+from .geometry import LM, TRACKED_LANDMARKS, TRACKED_LANDMARK_INDICES
+from .key_frames import KeyFrameCandidate
+from .overlay import OverlayCompositor, draw_frame_overlay
+from .strokes import PHASE_NAMES
+from .analyzer import SwimAnalyzer
+
+# ─────────────────────────────────────────────
+# VIDEO RENDERING
+# ─────────────────────────────────────────────
+
+def encode_web_mp4(raw_path: str, out_path: str, threads: Optional[int] = None) -> Optional[str]:
+    """
+    Re-encode an intermediate video to H.264 for web playback.
+    threads caps ffmpeg's encoder threads (None = one per core).
+
+    Returns:
+        - None on success, otherwise the error message (the raw video is copied as fallback)
+    """
+    try:
+        # Try using ffmpeg via subprocess (most reliable)
+        ffmpeg_cmd = [
+            'ffmpeg', '-i', raw_path,
+            '-c:v', 'libx264',  # H.264 codec
+            '-preset', 'fast',
+            '-crf', '23',  # Quality (lower = better, 18-28 is good range)
+            '-pix_fmt', 'yuv420p',  # Ensure compatibility
+            '-y',  # Overwrite output
+            out_path
+        ]
+        if threads:
+            ffmpeg_cmd[-1:-1] = ['-threads', str(threads)]
+
+        result = subprocess.run(
+            ffmpeg_cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=300  # 5 minute timeout
+        )
+
+        if result.returncode != 0:
+            raise Exception(f"FFmpeg failed: {result.stderr.decode()}")
+        return None
+
+    except Exception as e:
+        # Fallback: just copy the original
+        shutil.copy(raw_path, out_path)
+        return str(e)
+
+
+def _temp_path(suffix: str) -> str:
+    """Path of a new empty temp file (created atomically, unlike tempfile.mktemp)"""
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    return path
+
+
+def _remove_files(*paths: str) -> None:
+    for path in paths:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def render_annotated_video(input_path: str, analyzer: SwimAnalyzer, progress_callback=None) -> bytes:
+    """
+    Render the annotated video after an analysis-only pass, from the stored
+    per-frame metrics and landmarks (no pose detection is re-run).
+
+    progress_callback(done, total) is called once per frame. The decoder
+    and writer are released and the temp files deleted even if rendering
+    fails; input_path belongs to the caller and is left alone.
+
+    Returns:
+        - bytes: web-compatible MP4
+    """
+    # Records are in frame order: walk them in lockstep with the decoder
+    records = analyzer.metrics.iter_rows()
+    record = next(records, None)
+
+    cap = cv2.VideoCapture(input_path)
+    writer = None
+    raw_path = _temp_path(".avi")
+    out_path = _temp_path(".mp4")
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        writer = cv2.VideoWriter(raw_path, cv2.VideoWriter_fourcc(*'XVID'), fps, (w, h))
+        compositor = OverlayCompositor(w, h)
+
+        frame_idx = 0
+        while cap.isOpened():
+            ret, frame = cap.read()
+            if not ret: break
+
+            while record is not None and record[0].frame_idx < frame_idx:
+                record = next(records, None)
+            if record is not None and record[0].frame_idx == frame_idx:
+                m, landmarks_norm = record
+                if m.is_inverted:
+                    frame = cv2.flip(frame, -1)
+                draw_frame_overlay(frame, landmarks_norm, m, compositor)
+            writer.write(frame)
+
+            frame_idx += 1
+            if progress_callback is not None:
+                progress_callback(frame_idx, total)
+
+        writer.release()
+        writer = None
+        encode_web_mp4(raw_path, out_path)
+        with open(out_path, 'rb') as f:
+            return f.read()
+    finally:
+        cap.release()
+        if writer is not None:
+            writer.release()
+        _remove_files(raw_path, out_path)
+
+KEY_FRAME_SEEK_GAP = 30   # Frames; closer targets are reached by grab() instead of a seek
+
+
+def extract_key_frames(input_path: str, analyzer: SwimAnalyzer) -> Dict[str, List[Tuple[KeyFrameCandidate, bytes]]]:
+    """
+    Decode only the gallery frames chosen during analysis, re-apply their
+    overlays and JPEG-encode them.
+
+    Targets are visited in file order: short gaps are skipped with grab()
+    (no decode), long gaps with a seek.
+
+    Returns:
+        - dict: criterion -> [(candidate, jpeg bytes)], strongest first
+    """
+    tracker = analyzer.key_frame_tracker
+    picks = {name: tracker.top(name) for name in tracker.CRITERIA}
+    targets = sorted({c.frame_idx for cands in picks.values() for c in cands})
+    if not targets:
+        return {name: [] for name in picks}
+
+    rows = {c.frame_idx: c.row for cands in picks.values() for c in cands}
+    jpegs: Dict[int, bytes] = {}
+    cap = cv2.VideoCapture(input_path)
+    pos = 0
+    for target in targets:
+        if target - pos > KEY_FRAME_SEEK_GAP:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+            pos = target
+        while pos < target and cap.grab():
+            pos += 1
+        ret, frame = cap.read()
+        if not ret:
+            break
+        pos += 1
+
+        row = rows[target]
+        m = analyzer.metrics[row]
+        if m.is_inverted:
+            frame = cv2.flip(frame, -1)
+        h, w = frame.shape[:2]
+        draw_frame_overlay(frame, analyzer.metrics.landmarks(row), m, analyzer._get_compositor(w, h))
+        _, buf = cv2.imencode('.jpg', frame)
+        jpegs[target] = buf.tobytes()
+    cap.release()
+
+    return {name: [(c, jpegs[c.frame_idx]) for c in cands if c.frame_idx in jpegs]
+            for name, cands in picks.items()}
+
+
+OVERLAY_TRACK_SCALE = 10000   # landmarks sent as fixed-point ints (1e-4 of the frame)
+OVERLAY_SKELETON = [
+    ("left_shoulder", "right_shoulder"), ("left_hip", "right_hip"),
+    ("left_shoulder", "left_elbow"), ("left_elbow", "left_wrist"),
+    ("right_shoulder", "right_elbow"), ("right_elbow", "right_wrist"),
+    ("left_shoulder", "left_hip"), ("right_shoulder", "right_hip"),
+    ("left_hip", "left_knee"), ("left_knee", "left_ankle"),
+    ("right_hip", "right_knee"), ("right_knee", "right_ankle"),
+]
+
+
+def build_overlay_track(analyzer: SwimAnalyzer, n_frames: int, fps: float) -> Dict:
+    """
+    Compact per-frame landmark/metric track for the browser overlay player.
+
+    Only the tracked landmarks are sent, as fixed-point ints; metrics are
+    column arrays parallel to frame_idx.
+    """
+    metrics = analyzer.metrics
+    lms = metrics.column('landmarks')[:, TRACKED_LANDMARK_INDICES]
+    frame_idx = metrics.column('frame_idx')
+    phase_code = {name: i for i, name in enumerate(PHASE_NAMES)}
+
+    def column(attr, digits=1):
+        return np.round(metrics.column(attr).astype(np.float64), digits).tolist()
+
+    return {
+        'fps': fps,
+        'n_frames': max(n_frames, int(frame_idx.max()) + 1 if len(frame_idx) else 0),
+        'scale': OVERLAY_TRACK_SCALE,
+        'n_landmarks': len(TRACKED_LANDMARKS),
+        'landmark_index': LM,
+        'connections': OVERLAY_SKELETON,
+        'landmarks': np.rint(lms * OVERLAY_TRACK_SCALE).astype(int).ravel().tolist(),
+        'frame_idx': frame_idx.tolist(),
+        'is_inverted': metrics.column('is_inverted').astype(int).tolist(),
+        'phase': [phase_code.get(p, 0) for p in metrics.column('phase')],
+        'phase_names': PHASE_NAMES,
+        'phase_colors': {"Entry": "#3b82f6", "Pull": "#22c55e", "Push": "#f59e0b", "Recovery": "#6b7280"},
+        'horizontal_deviation': column('horizontal_deviation'),
+        'evf_plane_angle': column('evf_plane_angle'),
+        'torso_lean': column('torso_lean'),
+        'body_roll': column('body_roll'),
+        'kick_depth': column('kick_depth_proxy', 3),
+        'kick_symmetry': column('kick_symmetry'),
+        'score': column('score', 0),
+        'breath_state': metrics.column('breath_state').tolist(),
+        'breathing_during_pull': metrics.column('breathing_during_pull').astype(int).tolist(),
+        'limits': {
+            'horizontal_dev_good': DEFAULT_HORIZONTAL_DEV_GOOD, 'horizontal_dev_ok': DEFAULT_HORIZONTAL_DEV_OK,
+            'evf_good': DEFAULT_EVF_ANGLE_GOOD, 'evf_ok': DEFAULT_EVF_ANGLE_OK,
+            'torso_good': DEFAULT_TORSO_GOOD, 'torso_ok': DEFAULT_TORSO_OK,
+            'roll_good': DEFAULT_ROLL_GOOD, 'roll_ok': DEFAULT_ROLL_OK,
+            'kick_depth_good': DEFAULT_KICK_DEPTH_GOOD, 'kick_depth_ok': DEFAULT_KICK_DEPTH_OK,
+            'kick_sym_good': (0, DEFAULT_KICK_SYM_MAX_GOOD), 'kick_sym_ok': (0, 25),
+        },
+    }
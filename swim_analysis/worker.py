@@ -0,0 +1,171 @@
+"""
+Analysis worker pool for the dashboard's job queue.
+
+    python -m swim_analysis.worker --jobs-dir swim_jobs --workers 2
+
+Runs N worker processes that take jobs from the queue one at a time. A
+worker that crashes (segfault in the pose model, out of memory) only loses
+its current job, which is requeued; the supervisor starts a replacement.
+
+N is capped by what the host can run without oversubscription
+(plan_workers): JOB_CORES_PER_ANALYSIS cores and JOB_MEMORY_PER_ANALYSIS_MB
+of memory per analysis. Each job gets an equal share of the cores for
+OpenCV and ffmpeg, and a worker does not claim a job while available
+memory is below one analysis' worth. Everything else waits in the queue.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+
+import cv2
+
+from .constants import (
+    JOB_CORES_PER_ANALYSIS, JOB_HEARTBEAT_S, JOB_MEMORY_PER_ANALYSIS_MB, JOB_POLL_INTERVAL_S, JOB_PRUNE_INTERVAL_S,
+)
+from .jobs import JobQueue, run_job
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOBS_DIR = os.environ.get("SWIM_JOB_DIR", "swim_jobs")
+
+
+# ─────────────────────────────────────────────
+# ADMISSION CONTROL
+# ─────────────────────────────────────────────
+
+def available_memory_mb() -> Optional[float]:
+    """Memory available for new processes (MemAvailable on Linux), None if unknown"""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def plan_workers(requested: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Concurrent analyses this host can sustain and the threads each one gets.
+
+    Returns:
+        - workers: min(requested, cores / JOB_CORES_PER_ANALYSIS, memory / JOB_MEMORY_PER_ANALYSIS_MB), at least 1
+        - threads per job (OpenCV and ffmpeg): the cores split evenly between the workers
+    """
+    cores = os.cpu_count() or 1
+    cap = max(1, cores // JOB_CORES_PER_ANALYSIS)
+    memory = available_memory_mb()
+    if memory is not None:
+        cap = min(cap, max(1, int(memory // JOB_MEMORY_PER_ANALYSIS_MB)))
+    workers = cap if requested is None else max(1, min(requested, cap))
+    return workers, max(1, cores // workers)
+
+
+def worker_loop(root: str, worker_id: str, max_running: int, threads: int) -> None:
+    """Claim and run jobs until terminated (runs in a child process)"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)   # Ctrl+C is handled by the supervisor
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)  # Not the supervisor's inherited handler
+    cv2.setNumThreads(threads)   # This job's share of the cores
+    queue = JobQueue(root)
+    last_beat = 0.0
+    while True:
+        if time.monotonic() - last_beat >= JOB_HEARTBEAT_S:
+            queue.worker_heartbeat(worker_id)
+            last_beat = time.monotonic()
+        memory = available_memory_mb()
+        job = None
+        if memory is None or memory >= JOB_MEMORY_PER_ANALYSIS_MB:
+            job = queue.claim(worker_id, max_running=max_running)
+        if job is None:
+            time.sleep(JOB_POLL_INTERVAL_S)
+            continue
+        logger.info("Worker %s: analyzing %s (job %s)", worker_id, job.name, job.id)
+        run_job(queue, job, threads=threads)
+        queue.worker_heartbeat(worker_id)
+        last_beat = time.monotonic()
+
+
+def _start(root: str, max_running: int, threads: int) -> multiprocessing.Process:
+    worker_id = uuid.uuid4().hex[:12]
+    proc = multiprocessing.Process(target=worker_loop, args=(root, worker_id, max_running, threads),
+                                   name=f"swim-worker-{worker_id}", daemon=True)
+    proc.worker_id = worker_id
+    proc.start()
+    return proc
+
+
+def supervise(root: str, workers: Optional[int] = None) -> None:
+    """
+    Keep the planned number of worker processes running (see plan_workers),
+    requeueing the job of any that dies, until SIGINT/SIGTERM. Every
+    JOB_PRUNE_INTERVAL_S, jobs finished longer than JOB_RETENTION_S ago are
+    deleted (JobQueue.prune).
+    """
+    queue = JobQueue(root)
+    n, threads = plan_workers(workers)
+    if workers is not None and n < workers:
+        logger.warning("Host can sustain %d concurrent analyses, not %d: the rest will queue", n, workers)
+    procs: Dict[str, multiprocessing.Process] = {}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for _ in range(n):
+        proc = _start(root, n, threads)
+        procs[proc.worker_id] = proc
+    logger.info("Started %d workers (%d threads each) on %s", n, threads, queue.root)
+
+    next_prune = time.monotonic()
+    while not stopping:
+        if time.monotonic() >= next_prune:
+            pruned = queue.prune()
+            if pruned:
+                logger.info("Pruned %d finished jobs", pruned)
+            next_prune = time.monotonic() + JOB_PRUNE_INTERVAL_S
+        for worker_id, proc in list(procs.items()):
+            if proc.is_alive():
+                continue
+            logger.warning("Worker %s exited with code %s, restarting", worker_id, proc.exitcode)
+            queue.release_worker_jobs(worker_id, f"worker crashed (exit code {proc.exitcode})")
+            del procs[worker_id]
+            new = _start(root, n, threads)
+            procs[new.worker_id] = new
+        time.sleep(JOB_POLL_INTERVAL_S)
+
+    logger.info("Stopping workers")
+    for proc in procs.values():
+        proc.terminate()
+    for worker_id, proc in procs.items():
+        proc.join()
+        queue.release_worker_jobs(worker_id, "worker pool stopped")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run analysis workers for the dashboard's job queue.")
+    parser.add_argument("--jobs-dir", default=DEFAULT_JOBS_DIR,
+                        help="Queue directory shared with the dashboard (default: $SWIM_JOB_DIR or swim_jobs)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Concurrent analyses (default and maximum: what the host's cores and memory allow)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(levelname)s %(message)s")
+    supervise(args.jobs_dir, args.workers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
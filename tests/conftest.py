@@ -0,0 +1,15 @@
+import pytest
+
+from swim_analysis import FrameMetrics
+
+
+@pytest.fixture
+def make_metrics():
+    """FrameMetrics factory: frame i at fps, neutral values unless overridden"""
+    def make(i: int, fps: float = 30.0, **overrides) -> FrameMetrics:
+        values = dict(time_s=i / fps, elbow_angle=120.0, knee_left=170.0, knee_right=170.0, kick_symmetry=0.0,
+                      kick_depth_proxy=0.2, symmetry_hips=0.0, score=80.0, body_roll=40.0, torso_lean=0.0,
+                      forearm_vertical=0.0, phase="Pull", breath_state="-", frame_idx=i)
+        values.update(overrides)
+        return FrameMetrics(**values)
+    return make
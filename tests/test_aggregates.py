@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from swim_analysis import PartialSummary, SummaryAccumulator, merge_partial_summaries
+from swim_analysis.aggregates import RunningStat
+
+PHASES = ["Entry", "Pull", "Push", "Recovery"]
+# Chunk boundaries, with empty chunks at the start, in the middle and at the end
+BOUNDS = [0, 0, 37, 120, 120, 121, 250, 300, 300]
+
+
+def chunks(values, bounds=BOUNDS):
+    return [values[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def check_stat(stat: RunningStat, values: np.ndarray) -> None:
+    assert stat.count == len(values)
+    assert stat.total == pytest.approx(values.sum())
+    assert stat.mean == pytest.approx(values.mean())
+    assert stat.variance == pytest.approx(values.var(ddof=1))
+    assert (stat.min, stat.max) == (values.min(), values.max())
+
+
+def test_running_stat_merge_matches_single_pass():
+    values = np.random.default_rng(0).normal(1e4, 3.0, BOUNDS[-1])        # Large mean, small spread
+    online = RunningStat()
+    for x in values:
+        online.add(float(x))
+    check_stat(online, values)
+    check_stat(RunningStat.from_array(values), values)
+
+    parts = [RunningStat.from_array(chunk) for chunk in chunks(values)]
+    forward, backward = RunningStat(), RunningStat()
+    for part in parts:
+        forward = forward.merge(part)
+        backward = part.merge(backward)
+    check_stat(forward, values)
+    check_stat(backward, values)
+    # Pairwise, as a tree of workers would reduce them
+    while len(parts) > 1:
+        parts = [a.merge(b) for a, b in zip(parts[::2], parts[1::2])] + parts[len(parts) // 2 * 2:]
+    check_stat(parts[0], values)
+
+    empty = RunningStat().merge(RunningStat())
+    assert empty.count == 0 and empty.variance == 0.0 and empty.mean_or(-1.0) == -1.0
+
+
+def test_partial_summary_merge_matches_single_pass(make_metrics):
+    rng = np.random.default_rng(1)
+    n = BOUNDS[-1]
+    frames = [make_metrics(i, score=float(rng.uniform(40, 100)), body_roll=float(rng.normal(40, 8)),
+                           confidence=float(rng.uniform(0.3, 1.0)), phase=PHASES[rng.integers(4)],
+                           is_gliding=bool(rng.random() < 0.2), glide_score=float(rng.uniform(50, 100)),
+                           evf_plane_angle=float(rng.uniform(0, 60)))
+              for i in range(n)]
+    times = np.arange(n) / 30.0
+    stroke_rows = np.flatnonzero(np.arange(n) % 23 == 5)
+    breath_rows = np.flatnonzero(np.arange(n) % 41 == 7)
+
+    def partial(a: int, b: int) -> PartialSummary:
+        acc = SummaryAccumulator(conf_threshold=0.6)
+        for m in frames[a:b]:
+            acc.add(m)
+        strokes = [float(times[i]) for i in stroke_rows if a <= i < b]
+        breaths = [i for i in breath_rows if a <= i < b]
+        return PartialSummary(accumulator=acc, duration_s=(b - a) / 30.0,
+                              stroke_segments=[strokes] if strokes else [],
+                              breath_events=[(float(times[i]), 'L' if i % 2 else 'R') for i in breaths],
+                              breaths_during_pull=sum(frames[i].phase == "Pull" for i in breaths),
+                              glide_frames=sum(m.is_gliding for m in frames[a:b]))
+
+    whole = partial(0, n)
+    parts = [partial(a, b) for a, b in zip(BOUNDS[:-1], BOUNDS[1:])]
+    for merged in (merge_partial_summaries(parts), merge_partial_summaries(parts[::-1])):
+        for name in ('score', 'body_roll', 'evf_angle', 'glide_score'):
+            for frames_kind in ('all_frames', 'high_conf'):
+                got = getattr(merged.accumulator, frames_kind)[name]
+                want = getattr(whole.accumulator, frames_kind)[name]
+                assert got.count == want.count
+                assert got.mean == pytest.approx(want.mean)
+                assert got.variance == pytest.approx(want.variance)
+                assert (got.min, got.max) == (want.min, want.max)
+        assert merged.accumulator.confidence.mean == pytest.approx(whole.accumulator.confidence.mean)
+        assert merged.accumulator.all_frames.phase_counts == whole.accumulator.all_frames.phase_counts
+        assert merged.accumulator.last_time_s == whole.accumulator.last_time_s
+        assert merged.duration_s == pytest.approx(whole.duration_s)
+        assert merged.total_strokes == whole.total_strokes == len(stroke_rows)
+        assert (merged.breath_left, merged.breath_right) == (whole.breath_left, whole.breath_right)
+        assert merged.breaths_during_pull == whole.breaths_during_pull
+        assert merged.glide_frames == whole.glide_frames
+        assert merged.clips == 5                          # Empty chunks are not clips
+
+    assert merge_partial_summaries([]).accumulator.count == 0
@@ -0,0 +1,35 @@
+import json
+import os
+
+import pandas as pd
+
+import batch_analyze
+
+SETTINGS = {"height_cm": 180, "discipline": "pool", "conf_thresh": 0.5, "yaw_thresh": 0.15, "view": None,
+            "heavy_model": False, "smoothing": "ema", "video": False, "tracks": False}
+
+
+def test_failed_reanalysis_replaces_the_old_result(tmp_path):
+    video = tmp_path / "clip.mp4"
+    video.write_bytes(b"not a video")
+    out_dir = str(tmp_path / "out")
+    sha = batch_analyze.file_sha256(str(video))
+    folder = batch_analyze.artifact_dir(out_dir, str(video), sha)
+    os.makedirs(folder)
+    old_row = dict.fromkeys(batch_analyze.INDEX_COLUMNS, "")
+    old_row.update(file=str(video), sha256=sha, status="ok", artifacts=folder, avg_score=80.0)
+
+    def write_old_manifest():
+        with open(os.path.join(folder, batch_analyze.MANIFEST_NAME), "w") as f:
+            json.dump({"settings": {**SETTINGS, "height_cm": 170}, "row": old_row}, f)
+
+    # Different settings: re-analyzed, and the file is no video
+    write_old_manifest()
+    rows = batch_analyze.run_batch([str(video)], out_dir, SETTINGS, workers=1)
+    assert [row["status"] for row in rows] == ["failed"]
+    assert batch_analyze.read_manifest(folder) is None          # Not skipped as done on the next run
+    assert pd.read_csv(batch_analyze.write_index(out_dir, rows))["status"].tolist() == ["failed"]
+
+    # A manifest that still lists the video as done does not hide this run's failure
+    write_old_manifest()
+    assert pd.read_csv(batch_analyze.write_index(out_dir, rows))["status"].tolist() == ["failed"]
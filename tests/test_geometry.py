@@ -0,0 +1,104 @@
+import math
+from collections import deque
+
+import numpy as np
+import pytest
+
+from swim_analysis.geometry import LM, calculate_angle, compute_geometry, detect_strokes, lm_array_to_dict
+
+
+# Per-frame formulas the geometry kernel replaced
+def legacy_torso_lean(lm_pixel) -> float:
+    mid_s = ((lm_pixel["left_shoulder"][0] + lm_pixel["right_shoulder"][0]) / 2,
+             (lm_pixel["left_shoulder"][1] + lm_pixel["right_shoulder"][1]) / 2)
+    mid_h = ((lm_pixel["left_hip"][0] + lm_pixel["right_hip"][0]) / 2,
+             (lm_pixel["left_hip"][1] + lm_pixel["right_hip"][1]) / 2)
+    return math.degrees(math.atan2(mid_s[1] - mid_h[1], mid_s[0] - mid_h[0]))
+
+
+def legacy_forearm_vertical(lm_pixel) -> float:
+    dx = lm_pixel["left_wrist"][0] - lm_pixel["left_elbow"][0]
+    dy = lm_pixel["left_wrist"][1] - lm_pixel["left_elbow"][1]
+    return abs(math.degrees(math.atan2(dx, -dy)))
+
+
+def legacy_strokes(elbow_angles, times, threshold: float = 10, window: int = 9, refractory_s: float = 0.5):
+    """The frame-by-frame detector detect_strokes replaced: a sliding window checked as each frame arrives"""
+    elbow_win, time_win, strokes = deque(maxlen=window), deque(maxlen=window), []
+    for elbow, t in zip(elbow_angles, times):
+        elbow_win.append(elbow)
+        time_win.append(t)
+        arr = list(elbow_win)
+        mid = len(arr) // 2
+        others = arr[:mid] + arr[mid + 1:]
+        if len(arr) >= window and arr[mid] < min(others) and arr[mid] + threshold <= min(others):
+            if not strokes or time_win[mid] - strokes[-1] >= refractory_s:
+                strokes.append(time_win[mid])
+    return strokes
+
+
+@pytest.fixture
+def poses() -> np.ndarray:
+    pts = np.random.default_rng(0).uniform(0, 1000, (400, 13, 2))
+    pts[0] = 500.0                                          # Every point coincident
+    pts[1, LM["left_wrist"]] = pts[1, LM["left_elbow"]]     # Zero-length forearm
+    pts[2, LM["left_shoulder"]] = pts[2, LM["left_hip"]]    # Shoulders and hips share a midpoint
+    pts[2, LM["right_shoulder"]] = pts[2, LM["right_hip"]]
+    pts[3, :, 1] = 300.0                                    # Everything on one horizontal line
+    return pts
+
+
+def test_kernel_matches_per_frame_formulas(poses):
+    batch = compute_geometry(poses)
+    for i, pts in enumerate(poses):
+        lm = lm_array_to_dict(pts)
+        single = compute_geometry(pts)
+        for name, value in single.items():
+            np.testing.assert_allclose(batch[name][i], value, rtol=1e-12, atol=1e-9, err_msg=name)
+
+        for name, (a, b, c) in {
+            'elbow_left': ("left_shoulder", "left_elbow", "left_wrist"),
+            'elbow_right': ("right_shoulder", "right_elbow", "right_wrist"),
+            'knee_left': ("left_hip", "left_knee", "left_ankle"),
+            'knee_right': ("right_hip", "right_knee", "right_ankle"),
+        }.items():
+            assert batch[name][i] == pytest.approx(calculate_angle(lm[a], lm[b], lm[c]), abs=1e-6), name
+        assert batch['torso_lean'][i] == pytest.approx(legacy_torso_lean(lm), abs=1e-9)
+        assert batch['forearm_vertical'][i] == pytest.approx(legacy_forearm_vertical(lm), abs=1e-9)
+
+
+def elbow_series(seed: int, n: int) -> np.ndarray:
+    """Whole-degree random walk with sharp dips, some exactly at the prominence, some on a plateau"""
+    rng = np.random.default_rng(seed)
+    elbow = np.clip(140 + np.cumsum(rng.integers(-3, 4, n)), 60, 180).astype(np.float64)
+    for i in rng.choice(np.arange(4, n - 4), n // 15, replace=False):
+        elbow[i] = elbow[i - 4:i + 5].min() - rng.choice([9, 10, 10, 11, 25])
+    for i in rng.choice(np.arange(4, n - 4), n // 60, replace=False):
+        elbow[i + 1] = elbow[i]                           # Two-frame minimum: not strictly below
+    return elbow
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("prominence", [5, 10])
+def test_detect_strokes_matches_sliding_window(seed, prominence):
+    elbow = elbow_series(seed, 3000)
+    # Whole-ms frame times, so candidates exactly 0.5 s apart are decided the same way
+    times = np.round(np.arange(len(elbow)) * (1000 / 30)) / 1000
+    stroke_times, stroke_indices = detect_strokes(elbow, times, prominence=prominence)
+    assert stroke_times.tolist() == legacy_strokes(elbow.tolist(), times.tolist(), threshold=prominence)
+    np.testing.assert_array_equal(times[stroke_indices], stroke_times)
+
+
+def test_detect_strokes_edge_cases():
+    elbow = np.full(60, 150.0)
+    times = np.arange(60) / 20
+    elbow[8] = 140.0                                      # 0.40 s: exactly 10° below every neighbour
+    elbow[18] = 130.0                                     # 0.90 s: exactly 0.5 s after it
+    elbow[27] = 130.0                                     # 1.35 s: inside the refractory period
+    elbow[38] = 130.0                                     # 1.90 s
+    elbow[[46, 47]] = 130.0                               # Flat-bottomed: not strictly below
+    assert detect_strokes(elbow, times)[0].tolist() == legacy_strokes(elbow, times) == [0.4, 0.9, 1.9]
+
+    elbow[8] = 140.5                                      # 9.5° below
+    assert detect_strokes(elbow, times)[0].tolist() == legacy_strokes(elbow, times) == [0.9, 1.9]
+    assert len(detect_strokes(elbow[:8], times[:8])[0]) == 0          # Shorter than the window
@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+from swim_analysis import SessionHistory, SessionSummary
+from swim_analysis import history as history_module
+
+
+def summary(score: float = 80.0) -> SessionSummary:
+    return SessionSummary(60.0, score, 40.0, 55.0, 30.0, 10.0, 5, 5, 30, 0.1, 0.2, "OK", 0.9,
+                          diagnostics=["note"])
+
+
+@pytest.fixture
+def history(tmp_path) -> SessionHistory:
+    return SessionHistory(str(tmp_path / "history"))
+
+
+def test_resave_replaces_session_and_keeps_new_artifacts(history):
+    first = history.save_session("Ann", summary(70.0), "a.mp4", video_sha256="abc",
+                                 artifacts={"report.pdf": b"first"})
+    second = history.save_session("Ann", summary(90.0), "a.mp4", video_sha256="abc",
+                                  artifacts={"report.pdf": b"second"})
+
+    assert second != first
+    sessions = history.sessions("Ann")
+    assert sessions['session_id'].tolist() == [second]
+    assert sessions['avg_score'].tolist() == [90.0]
+    with open(os.path.join(sessions['artifact_dir'][0], "report.pdf"), 'rb') as f:
+        assert f.read() == b"second"
+    assert not os.path.exists(os.path.join(history.root, "artifacts", str(first)))
+
+
+def test_deleted_session_id_is_not_reused(history):
+    first = history.save_session("Ann", summary(), "a.mp4", video_sha256="abc", artifacts={"a.csv": b"1"})
+    history.delete_session(first)
+    second = history.save_session("Ann", summary(), "b.mp4", video_sha256="def", artifacts={"b.csv": b"2"})
+    assert second > first
+
+
+def test_migration_keeps_existing_sessions(tmp_path, monkeypatch):
+    # A store created before sessions used AUTOINCREMENT, with one saved session
+    root = str(tmp_path / "history")
+    monkeypatch.setattr(history_module, "_MIGRATIONS", history_module._MIGRATIONS[:1])
+    session_id = SessionHistory(root).save_session("Ann", summary(), "a.mp4", video_sha256="abc")
+    monkeypatch.undo()
+
+    history = SessionHistory(root)
+    assert history.sessions("Ann")['session_id'].tolist() == [session_id]
+    assert history.diagnostics(session_id) == ["note"]
+    history.delete_session(session_id)
+    assert history.save_session("Ann", summary(), "b.mp4", video_sha256="def") > session_id
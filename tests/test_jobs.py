@@ -0,0 +1,101 @@
+import hashlib
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from swim_analysis import JOB_CANCELLED, JOB_QUEUED, JOB_RUNNING, JobQueue
+from swim_analysis import jobs
+from swim_analysis.pipeline import AnalysisCancelled
+
+SETTINGS = {"height_cm": 180, "discipline": "pool", "conf_thresh": 0.5, "yaw_thresh": 0.5}
+
+
+@pytest.fixture
+def video_bytes(tmp_path) -> bytes:
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30.0, (64, 48))
+    for i in range(10):
+        writer.write(np.full((48, 64, 3), i * 20, dtype=np.uint8))
+    writer.release()
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.fixture
+def queue(tmp_path) -> JobQueue:
+    return JobQueue(str(tmp_path / "jobs"))
+
+
+def test_claim_cancel_resume(queue, video_bytes):
+    first = queue.submit("a.avi", video_bytes, SETTINGS, owner="a")
+    second = queue.submit("b.avi", video_bytes, SETTINGS, owner="b")
+    assert first.frames == 10
+
+    claimed = queue.claim("w1")
+    assert claimed.id == first.id and claimed.status == JOB_RUNNING and claimed.attempts == 1
+
+    # A queued job is cancelled at once, a running one only flagged for its worker
+    queue.cancel(second.id)
+    assert queue.get(second.id).status == JOB_CANCELLED
+    queue.cancel(first.id)
+    assert queue.get(first.id).status == JOB_RUNNING
+    assert queue.cancel_requested(first.id)
+    queue.mark_cancelled(first.id)
+    assert queue.get(first.id).status == JOB_CANCELLED
+    assert queue.claim("w1") is None
+
+    assert queue.resume(first.id)
+    assert not queue.resume(first.id)          # Already queued
+    resumed = queue.get(first.id)
+    assert resumed.status == JOB_QUEUED and resumed.attempts == 0
+    assert not queue.cancel_requested(first.id)
+    assert queue.claim("w2").id == first.id
+
+
+def test_cancelled_job_discards_partial_video(queue, video_bytes, monkeypatch):
+    def cancel_midway(path, analyzer, frame_callback=None, **kwargs):
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        for _ in range(3):
+            frame_callback(frame)
+        raise AnalysisCancelled()
+
+    analyzer_from_settings = jobs.analyzer_from_settings
+    monkeypatch.setattr(jobs, "analyzer_from_settings",
+                        lambda settings, **kwargs: analyzer_from_settings(settings, replay=True, **kwargs))
+    monkeypatch.setattr(jobs, "analyze_video", cancel_midway)
+
+    job = queue.submit("a.avi", video_bytes, SETTINGS)
+    jobs.run_job(queue, queue.claim("w1"))
+
+    assert queue.get(job.id).status == JOB_CANCELLED
+    assert not os.path.exists(os.path.join(job.job_dir, "annotated_raw.avi"))
+    assert os.path.exists(job.input_path)      # Kept for a resume
+
+
+def test_find_reattaches_by_upload_and_settings(queue, video_bytes):
+    job = queue.submit("a.avi", video_bytes, SETTINGS, owner="a")
+    sha = hashlib.sha256(video_bytes).hexdigest()
+    assert job.video_sha256 == sha
+
+    assert queue.find(sha, dict(reversed(list(SETTINGS.items()))), owner="a").id == job.id
+    assert queue.find(sha, {**SETTINGS, "conf_thresh": 0.7}, owner="a") is None
+    assert queue.find(sha, SETTINGS, owner="b") is None
+    assert queue.find("0" * 64, SETTINGS, owner="a") is None
+
+    newer = queue.submit("a.avi", video_bytes, SETTINGS, owner="a")      # Newest wins
+    assert queue.find(sha, SETTINGS, owner="a").id == newer.id
+
+
+def test_prune_deletes_old_finished_jobs(queue, video_bytes):
+    done = queue.submit("a.avi", video_bytes, SETTINGS)
+    running = queue.submit("b.avi", video_bytes, SETTINGS)
+    queue.claim("w1")
+    queue.complete(done.id)
+    queue.claim("w1")
+
+    assert queue.prune(max_age_s=3600) == 0         # Finished too recently
+    assert queue.prune(max_age_s=-1) == 1
+    assert queue.get(done.id) is None and not os.path.exists(done.job_dir)
+    assert queue.get(running.id).status == JOB_RUNNING and os.path.exists(running.job_dir)
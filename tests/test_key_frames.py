@@ -0,0 +1,37 @@
+from swim_analysis.key_frames import KeyFrameTracker
+
+
+def feed_dropped_elbow(tracker, make_metrics, events):
+    """events: {frame index: evf angle} for frames with a dropped elbow; other frames do not qualify"""
+    for i in range(max(events) + 1):
+        angle = events.get(i)
+        tracker.update(make_metrics(i, is_dropped_elbow=angle is not None, evf_plane_angle=angle or 0.0), i)
+
+
+def test_sustained_event_takes_one_slot(make_metrics):
+    # A dropped elbow held for 1 s at 30 fps, then six short events 3 s apart
+    events = {i: 60.0 + i * 0.1 for i in range(30)}
+    for n in range(6):
+        events[90 * (n + 1)] = 50.0 - n
+    tracker = KeyFrameTracker(k=5, oversample=4, min_gap_s=0.5)
+    feed_dropped_elbow(tracker, make_metrics, events)
+
+    top = tracker.top('dropped_elbow')
+    assert len(top) == 5
+    assert top[0].frame_idx == 29                       # Peak of the sustained event
+    assert [c.frame_idx for c in top[1:]] == [90, 180, 270, 360]
+    times = sorted(c.time_s for c in top)
+    assert all(b - a >= 0.5 for a, b in zip(times, times[1:]))
+
+
+def test_stronger_neighbour_replaces_peak(make_metrics):
+    tracker = KeyFrameTracker(k=5, min_gap_s=0.5)
+    feed_dropped_elbow(tracker, make_metrics, {0: 40.0, 5: 70.0, 10: 55.0, 60: 45.0})
+    assert [(c.frame_idx, c.value) for c in tracker.top('dropped_elbow')] == [(5, 70.0), (60, 45.0)]
+
+
+def test_heap_is_bounded(make_metrics):
+    tracker = KeyFrameTracker(k=2, oversample=2, min_gap_s=0.5)
+    feed_dropped_elbow(tracker, make_metrics, {30 * n: float(n) for n in range(20)})
+    assert len(tracker.heaps['dropped_elbow']) == 4
+    assert [c.value for c in tracker.top('dropped_elbow')] == [19.0, 18.0]
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from swim_analysis import AthleteProfile, CameraView, FrameMetricStore, SummaryAccumulator, SwimAnalyzer, WaterPosition
+from swim_analysis.pool import segment_pool_lengths
+
+FPS = 30.0
+
+
+def pool_store(make_metrics, wall_turn: bool, breaths=()) -> FrameMetricStore:
+    """
+    Two 20 s stretches facing opposite ways. With wall_turn the swimmer
+    crosses the frame and comes back, the pose is lost for 0.8 s at the wall
+    and the push-off is streamlined; without it only the facing flips.
+    Frames in breaths are breaths taken during the pull.
+    """
+    store = FrameMetricStore()
+    for i in range(int(40 * FPS)):
+        t = i / FPS
+        second = t >= 20.0
+        if wall_turn and 20.0 <= t < 20.8:
+            continue
+        hip_x = (0.1 + 0.7 * t / 20 if not second else 0.8 - 0.7 * (t - 20) / 20) if wall_turn else 0.5
+        landmarks = np.zeros((33, 2), dtype=np.float32)
+        landmarks[23, 0] = landmarks[24, 0] = hip_x
+        landmarks[0, 0] = hip_x + (-0.2 if second else 0.2)
+        extension = 1.0 if wall_turn and 20.0 <= t < 23.0 else 0.3
+        store.append(make_metrics(i, FPS, arm_extension=extension, breathing_during_pull=i in breaths), landmarks)
+    return store
+
+
+def test_wall_turn_splits_lengths(make_metrics):
+    segmentation = segment_pool_lengths(pool_store(make_metrics, wall_turn=True), [])
+    assert segmentation is not None
+    assert segmentation.n_turns == 1
+    assert [s.length_number for s in segmentation.lengths] == [1, 2]
+    assert 19.5 < segmentation.turn_times[0] < 21.0
+    assert not segmentation.free_mask.all()
+
+
+def test_facing_flip_without_turn_cues_is_not_a_turn(make_metrics):
+    assert segment_pool_lengths(pool_store(make_metrics, wall_turn=False), []) is None
+
+
+def pool_analyzer(view: CameraView = CameraView.SIDE) -> SwimAnalyzer:
+    return SwimAnalyzer(AthleteProfile(180, "pool"), 0.5, 0.5, manual_camera_view=view,
+                        manual_water_position=WaterPosition.UNDERWATER, render_overlays=False, replay=True)
+
+
+@pytest.mark.parametrize("view,segmented", [(CameraView.SIDE, True), (CameraView.FRONT, False)])
+def test_only_side_view_is_segmented(make_metrics, view, segmented):
+    analyzer = pool_analyzer(view)
+    analyzer.metrics = pool_store(make_metrics, wall_turn=True)
+    assert (analyzer.get_pool_segmentation() is not None) == segmented
+
+
+def test_breaths_at_the_wall_are_not_counted(make_metrics):
+    breaths = [int(10 * FPS), int(21 * FPS), int(30 * FPS)]     # The second is during the push-off
+    analyzer = pool_analyzer()
+    analyzer.metrics = pool_store(make_metrics, wall_turn=True, breaths=breaths)
+    analyzer.breath_events = [(i / FPS, 'L') for i in breaths]
+    analyzer.breaths_during_pull = len(breaths)
+    free = analyzer.get_pool_segmentation().free_mask
+    times = analyzer.metrics.column('time_s')
+    assert free[times == 10.0].all() and not free[times == 21.0].any()
+
+    partial = analyzer.get_partial_summary()
+    assert [t for t, _ in partial.breath_events] == [10.0, 30.0]
+    assert partial.breaths_during_pull == 2
+    assert partial.accumulator.last_time_s == times[free][-1]
+
+
+def test_accumulator_ends_at_last_selected_row(make_metrics):
+    store = pool_store(make_metrics, wall_turn=False)
+    times = store.column('time_s')
+    assert SummaryAccumulator.from_store(store, times < 20.0).last_time_s == pytest.approx(20.0 - 1 / FPS)
+    assert SummaryAccumulator.from_store(store, np.zeros(len(store), dtype=bool)).last_time_s == 0.0
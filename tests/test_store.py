@@ -0,0 +1,59 @@
+import os
+import pickle
+
+import numpy as np
+
+from swim_analysis import FrameMetricStore
+
+PHASES = ["Entry", "Pull", "Push", "Recovery"]
+
+
+def fill(store: FrameMetricStore, make_metrics, start: int, stop: int) -> None:
+    for i in range(start, stop):
+        store.append(make_metrics(i, score=float(i % 100), phase=PHASES[i % 4], is_gliding=i % 3 == 0),
+                     np.full((33, 2), i / 1000, dtype=np.float32))
+
+
+def check_rows(store: FrameMetricStore, n: int) -> None:
+    assert len(store) == n
+    np.testing.assert_array_equal(store.column('frame_idx'), np.arange(n))
+    np.testing.assert_array_equal(store.column('score'), np.arange(n) % 100)
+    assert store.column('phase').tolist() == [PHASES[i % 4] for i in range(n)]
+    np.testing.assert_array_equal(store.column('is_gliding'), np.arange(n) % 3 == 0)
+    np.testing.assert_allclose(store.column('landmarks')[:, 0, 0], np.arange(n) / 1000, rtol=1e-6)
+
+
+def test_spills_past_memory_limit(make_metrics):
+    store = FrameMetricStore(batch_rows=16, max_memory_rows=40)
+    fill(store, make_metrics, 0, 32)
+    assert not store.spilled
+    fill(store, make_metrics, 32, 103)                 # Third batch crosses max_memory_rows
+    assert store.spilled and os.path.isdir(store.spill_dir)
+    assert store._batches == []
+
+    check_rows(store, 103)                             # 96 spilled rows + 7 pending
+    assert store[50].phase == PHASES[50 % 4]
+    np.testing.assert_array_equal(store.column('frame_idx', step=10), np.arange(0, 103, 10))
+    rows = list(store.iter_rows())
+    assert [m.frame_idx for m, _ in rows] == list(range(103))
+    assert rows[-1][1][0, 0] == np.float32(0.102)
+
+    spill_dir = store.spill_dir
+    store.close()
+    assert not os.path.exists(spill_dir)
+
+
+def test_setstate_truncates_rows_flushed_after_snapshot(tmp_path, make_metrics):
+    store = FrameMetricStore(batch_rows=16, spill_dir=str(tmp_path))
+    fill(store, make_metrics, 0, 40)
+    snapshot = pickle.dumps(store)                     # 32 flushed rows + 8 pending
+
+    # The run continues past the snapshot, then dies
+    fill(store, make_metrics, 40, 80)
+    assert os.path.getsize(os.path.join(str(tmp_path), "frame_idx.bin")) == 80 * 8
+
+    restored = pickle.loads(snapshot)
+    check_rows(restored, 40)
+    assert os.path.getsize(os.path.join(str(tmp_path), "frame_idx.bin")) == 32 * 8
+    fill(restored, make_metrics, 40, 80)               # Resumed appends line up with the snapshot
+    check_rows(restored, 80)
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from swim_analysis import (
+    LANDMARK_TRACK_COORD_SCALE, AthleteProfile, CameraView, LandmarkFrames, LandmarkTrack, LandmarkTrackWriter,
+    SwimAnalyzer, WaterPosition, analyze_video, replay_landmarks, replay_track, synthetic_landmarks,
+)
+
+FPS = 30.0
+SIZE = (640, 360)
+
+
+def write_track(path, frames: LandmarkFrames, codec: str = 'zlib', chunk_frames: int = 64) -> None:
+    with LandmarkTrackWriter(str(path), FPS, *SIZE, chunk_frames=chunk_frames, codec=codec) as writer:
+        for i in range(len(frames)):
+            writer.append(frames.frame_idx[i], frames.time_ms[i] / 1000, frames.landmarks[i], frames.visibility[i])
+
+
+def replay_analyzer() -> SwimAnalyzer:
+    return SwimAnalyzer(AthleteProfile(180, "pool"), 0.5, 0.5, manual_camera_view=CameraView.SIDE,
+                        manual_water_position=WaterPosition.UNDERWATER, render_overlays=False, replay=True)
+
+
+@pytest.fixture
+def frames() -> LandmarkFrames:
+    # Drop every tenth frame: tracks only hold frames with a pose
+    frames = LandmarkFrames.concatenate(list(synthetic_landmarks(900, FPS, chunk_frames=100)))
+    keep = frames.frame_idx % 10 != 9
+    return LandmarkFrames(frames.frame_idx[keep], frames.time_ms[keep], frames.landmarks[keep],
+                          frames.visibility[keep])
+
+
+@pytest.mark.parametrize("codec", ['zlib', 'raw'])
+def test_round_trip(tmp_path, frames, codec):
+    path = tmp_path / "clip.track"
+    write_track(path, frames, codec)
+    with LandmarkTrack(str(path)) as track:
+        assert len(track) == len(frames)
+        assert (track.fps, track.width, track.height) == (FPS, *SIZE)
+        decoded = track.read()
+        np.testing.assert_array_equal(decoded.frame_idx, frames.frame_idx)
+        np.testing.assert_array_equal(decoded.time_ms, frames.time_ms)
+        np.testing.assert_allclose(decoded.landmarks, frames.landmarks, atol=0.5 / LANDMARK_TRACK_COORD_SCALE + 1e-6)
+        np.testing.assert_allclose(decoded.visibility, frames.visibility, atol=0.5 / 255 + 1e-6)
+
+        # Random access by video frame, across chunk boundaries and the dropped frames
+        part = track.read_frames(100, 250)
+        expected = (frames.frame_idx >= 100) & (frames.frame_idx < 250)
+        np.testing.assert_array_equal(part.frame_idx, frames.frame_idx[expected])
+        chunked = LandmarkFrames.concatenate(list(track.iter_chunks(100, 250)))
+        np.testing.assert_array_equal(chunked.landmarks, part.landmarks)
+
+
+def test_incomplete_track_is_rejected(tmp_path, frames):
+    path = tmp_path / "clip.track"
+    writer = LandmarkTrackWriter(str(path), FPS, *SIZE, chunk_frames=64)
+    for i in range(100):
+        writer.append(frames.frame_idx[i], frames.time_ms[i] / 1000, frames.landmarks[i], frames.visibility[i])
+    writer._file.flush()                          # As left behind by a crashed writer
+    with pytest.raises(ValueError):
+        LandmarkTrack(str(path))
+    writer.close()
+
+
+def test_replay_track_matches_in_memory_replay(tmp_path, frames):
+    path = tmp_path / "clip.track"
+    write_track(path, frames)
+
+    from_track = replay_analyzer()
+    assert replay_track(str(path), from_track) == len(frames)
+    in_memory = replay_analyzer()
+    replay_landmarks([frames], in_memory, SIZE, FPS)
+
+    assert len(from_track.metrics) == len(in_memory.metrics) > 0
+    np.testing.assert_array_equal(from_track.metrics.column('frame_idx'), in_memory.metrics.column('frame_idx'))
+    assert len(from_track.stroke_times) == len(in_memory.stroke_times) > 0
+    assert from_track.get_summary().avg_score == pytest.approx(in_memory.get_summary().avg_score, abs=0.5)
+
+
+def test_track_cannot_be_resumed(tmp_path, frames):
+    path = tmp_path / "clip.track"
+    write_track(path, frames)
+    with pytest.raises(ValueError):
+        analyze_video(str(tmp_path / "clip.mp4"), replay_analyzer(), start_frame=10, track_path=str(path))
+    with LandmarkTrack(str(path)) as track:       # The earlier attempt's poses are untouched
+        assert len(track) == len(frames)
+
+
+def test_synthetic_landmarks_have_the_intended_cadence():
+    analyzer = replay_analyzer()
+    replay_landmarks(synthetic_landmarks(1800, FPS, stroke_period_s=1.5, frame_size=SIZE), analyzer, SIZE, FPS)
+
+    # A stroke every 1.5 s from 0.75 s, alternating arms
+    strokes = np.asarray(analyzer.stroke_times)
+    assert len(strokes) == 40
+    np.testing.assert_allclose(np.diff(strokes), 1.5, atol=1 / FPS + 0.002)     # Nearest frame, in whole ms
+
+    # A breath every third stroke from 1.5 s, alternating sides
+    assert [side for _, side in analyzer.breath_events] == ['R', 'L'] * 6 + ['R']
+    np.testing.assert_allclose([t for t, _ in analyzer.breath_events], 1.5 + 4.5 * np.arange(13), atol=0.2)
+
+
+def test_batched_replay_matches_per_pose_processing(frames):
+    batched = replay_analyzer()
+    replay_landmarks([frames], batched, SIZE, FPS)
+    per_pose = replay_analyzer()
+    for i in range(len(frames)):
+        per_pose.process_landmarks(frames.landmarks[i, :, :2].astype(np.float64),
+                                   frames.visibility[i].astype(np.float64), frames.time_ms[i] / 1000, FPS,
+                                   int(frames.frame_idx[i]), frame_size=SIZE)
+
+    assert len(batched.metrics) == len(per_pose.metrics) == len(frames)
+    for name in ('score', 'elbow_angle', 'body_roll', 'vertical_drop', 'horizontal_deviation', 'phase'):
+        np.testing.assert_array_equal(batched.metrics.column(name), per_pose.metrics.column(name))
+    assert batched.stroke_times == per_pose.stroke_times
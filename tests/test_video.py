@@ -0,0 +1,37 @@
+import os
+import tempfile
+
+import cv2
+import numpy as np
+import pytest
+
+from swim_analysis import AthleteProfile, SwimAnalyzer, render_annotated_video
+from swim_analysis import video
+
+
+@pytest.fixture
+def clip(tmp_path) -> str:
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30.0, (64, 48))
+    for i in range(10):
+        writer.write(np.full((48, 64, 3), i * 20, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+def test_failed_render_leaves_no_temp_files(tmp_path, clip, make_metrics, monkeypatch):
+    scratch = tmp_path / "scratch"
+    scratch.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(scratch))
+
+    analyzer = SwimAnalyzer(AthleteProfile(180, "pool"), 0.5, 0.5, render_overlays=False, replay=True)
+    analyzer.metrics.append(make_metrics(3), np.full((33, 2), 0.5, dtype=np.float32))
+
+    def broken_overlay(*args, **kwargs):
+        raise RuntimeError("overlay failed")
+
+    monkeypatch.setattr(video, "draw_frame_overlay", broken_overlay)
+    with pytest.raises(RuntimeError):
+        render_annotated_video(clip, analyzer)
+    assert os.listdir(scratch) == []
+    assert os.path.exists(clip)                # The caller's input is kept